@@ -1,6 +1,20 @@
 #!/usr/bin/env python3
 """
-analyze_device.py v1.0.6 - Analyze PLC Function Block and extract patterns
+analyze_device.py v1.0.9 - Analyze PLC Function Block and extract patterns
+
+CHANGELOG v1.0.9:
+- NEW: Reads the interface from <name>.block.json (xml_to_scl --sidecar) when
+  it matches the .scl content, instead of re-parsing the VAR sections
+- NEW: --no-sidecar forces text parsing; source_files.block_sidecar in output
+
+CHANGELOG v1.0.8:
+- NEW: Single-pass SCL lexer; VAR sections, symbol usage, portability and
+  pattern/taxonomy detection consume the token stream instead of rescanning text
+- CHANGED: Comments, strings and REGION titles no longer produce symbols or patterns
+
+CHANGELOG v1.0.7:
+- NEW: --batch mode: discover all FBs under a folder, analyze them in a
+  process pool and write a consolidated device_catalogue.json
 
 CHANGELOG v1.0.6:
 - CHANGED: Portability check now detects UNDECLARED SYMBOLS (not %I/%Q)
@@ -11,15 +25,19 @@ CHANGELOG v1.0.6:
 - REMOVED: "DB_xxx" check (unpredictable naming)
 
 Usage:
-    python analyze_device.py <fb_file.scl> [--udt-path <udt_folder>] [--output <output_folder>]
+    python analyze_device.py <fb_file.scl> [--udt-path <udt_folder>] [--output <output_folder>] [--no-sidecar]
+    python analyze_device.py --batch <project_folder> [--udt-path <udt_folder>] [--output <output_folder>] [--jobs N]
 """
 
 import os
 import re
 import json
+import hashlib
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional, Set
+from typing import List, Dict, Tuple, Optional, Set, NamedTuple, Iterable
 
 # =============================================================================
 # CONSTANTS
@@ -102,27 +120,155 @@ FRAMEWORK_WHITELIST_PREFIXES = [
     'Sys',         # System framework DB (Sys.Clock_1S, etc.)
 ]
 
+# Batch mode
+CATALOGUE_FILE = 'device_catalogue.json'
+BATCH_OUTPUT_DIR = 'device_analysis'
+FB_DECLARATION_RE = re.compile(r'^\s*FUNCTION_BLOCK\b', re.MULTILINE)
+SEVERITIES = ['CRITICAL', 'WARNING', 'MEDIUM', 'LOW', 'INFO']
+
+# Structured sidecar written by xml_to_scl (--sidecar) next to each generated FB/FC
+BLOCK_SIDECAR_SUFFIX = '.block.json'
+BLOCK_SIDECAR_VERSION = 1
+SIDECAR_SECTIONS = {
+    'Input': 'VAR_INPUT',
+    'Output': 'VAR_OUTPUT',
+    'InOut': 'VAR_IN_OUT',
+    'Static': 'VAR',
+    'Temp': 'VAR_TEMP',
+    'Constant': 'VAR_CONSTANT',
+}
+
+# =============================================================================
+# SCL LEXER (NEW in v1.0.8)
+# =============================================================================
+
+# One alternation, tried in order. Typed literals (T#5s, INT#3, 16#FF) and
+# numbers are lexed whole so they never leak identifiers like 'FF' or 's'.
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|\(\*.*?\*\)|/\*.*?\*/)
+  | (?P<string>'[^'\n]*'?)
+  | (?P<quoted>"[^"\n]*"?)
+  | (?P<literal>[A-Za-z_]\w*\#[^\s;,)\]]+|\d+\#[0-9A-Za-z_]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<ident>\#\w+|[A-Za-z_]\w*)
+  | (?P<op>:=|=>|<>|<=|>=|\.\.|\*\*|\S)
+""", re.VERBOSE | re.DOTALL)
+
+
+class Token(NamedTuple):
+    kind: str    # 'ident', 'quoted', 'string', 'literal', 'op'
+    text: str
+    line: int    # 1-based line in the source
+    start: int   # offset in the source
+
+
+def tokenize_scl(content: str) -> List[Token]:
+    """
+    Lex SCL source in one pass.
+    Whitespace and comments are dropped; every other token carries its line number.
+    """
+    tokens = []
+    append = tokens.append
+    line = 1
+    for match in TOKEN_RE.finditer(content):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == 'ws' or kind == 'comment':
+            line += text.count('\n')
+            continue
+        append(Token(kind, text, line, match.start()))
+    return tokens
+
+
+def token_name(token: Token) -> str:
+    """Identifier without the # local prefix, quoted name without quotes."""
+    if token.kind == 'quoted':
+        return token.text.strip('"')
+    return token.text.lstrip('#')
+
+
+def token_words(tokens: Iterable[Token]) -> List[str]:
+    """Identifier and quoted-name texts in source order (comments/strings excluded)."""
+    return [token_name(tok) for tok in tokens if tok.kind == 'ident' or tok.kind == 'quoted']
+
+
+def contains_any(words: Iterable[str], *parts: str) -> bool:
+    """True if any word contains any of the parts (substring match)."""
+    return any(part in word for word in words for part in parts)
+
+
+def contains_in_order(words: Iterable[str], *parts: str) -> bool:
+    """True if the parts occur as substrings in this order across the word sequence."""
+    index = 0
+    for word in words:
+        position = 0
+        while index < len(parts):
+            position = word.find(parts[index], position)
+            if position < 0:
+                break
+            position += len(parts[index])
+            index += 1
+        if index == len(parts):
+            return True
+    return False
+
+
+def statement_end(tokens: List[Token], index: int) -> int:
+    """Index of the ';' closing the statement that contains tokens[index] (or len(tokens))."""
+    while index < len(tokens) and not (tokens[index].kind == 'op' and tokens[index].text == ';'):
+        index += 1
+    return index
+
+
 # =============================================================================
 # VAR EXTRACTION
 # =============================================================================
 
-def extract_var_sections(content: str) -> Dict[str, str]:
+VAR_SECTION_KEYWORDS = {'VAR_INPUT', 'VAR_OUTPUT', 'VAR_IN_OUT', 'VAR_TEMP', 'VAR_STATIC', 'VAR'}
+
+# Declaration line parts (compiled once: called for every declaration)
+AT_MAPPING_RE = re.compile(r'\bAT\s+(%[IMQ][WDB]?[0-9]+(?:\.[0-9]+)?)', re.I)
+AT_MAPPING_SUB_RE = re.compile(r'\s*AT\s+%[IMQ][WDB]?[0-9]+(?:\.[0-9]+)?\s*', re.I)
+RETAIN_ATTR_RE = re.compile(r'\{\s*RETAIN\s*\}', re.I)
+CONSTANT_ATTR_RE = re.compile(r'\{\s*CONSTANT\s*\}', re.I)
+ATTRIBUTES_RE = re.compile(r'\{[^}]*\}')
+DECLARATION_RE = re.compile(r'(\w+)\s*:\s*(.+?)(?:\s*:=\s*(.+))?$')
+ARRAY_TYPE_RE = re.compile(r'Array\s*\[([^\]]+)\]\s+of\s+(.+)', re.I)
+
+
+def extract_var_sections(content: str, tokens: Optional[List[Token]] = None) -> Dict[str, str]:
     """
     Extract all VAR sections from SCL content.
+    Section keywords are located in the token stream, so VAR/END_VAR in comments are ignored.
     Returns dict: {'VAR_INPUT': '...content...', 'VAR_OUTPUT': '...', ...}
     """
+    if tokens is None:
+        tokens = tokenize_scl(content)
     sections = {}
     
-    var_section_pattern = r'\b(VAR_INPUT|VAR_OUTPUT|VAR_IN_OUT|VAR_TEMP|VAR\s+CONSTANT|VAR_STATIC|VAR)\b(.*?)END_VAR'
-    
-    matches = re.finditer(var_section_pattern, content, re.DOTALL | re.IGNORECASE)
-    
-    for match in matches:
-        section_type = match.group(1).strip().upper()
-        section_content = match.group(2).strip()
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        keyword = tok.text.upper() if tok.kind == 'ident' else ''
+        if keyword not in VAR_SECTION_KEYWORDS:
+            i += 1
+            continue
         
-        if section_type == 'VAR CONSTANT':
+        section_type = keyword
+        start = tok.start + len(tok.text)
+        if (keyword == 'VAR' and i + 1 < len(tokens) and tokens[i + 1].kind == 'ident'
+                and tokens[i + 1].text.upper() == 'CONSTANT'):
             section_type = 'VAR_CONSTANT'
+            i += 1
+            start = tokens[i].start + len(tokens[i].text)
+        
+        end = i + 1
+        while end < len(tokens) and not (tokens[end].kind == 'ident' and tokens[end].text.upper() == 'END_VAR'):
+            end += 1
+        if end == len(tokens):
+            break
+        section_content = content[start:tokens[end].start].strip()
+        i = end + 1
         
         if section_type in sections:
             sections[section_type] += '\n' + section_content
@@ -153,18 +299,18 @@ def parse_var_declaration(line: str) -> Optional[Dict]:
     
     # Check for AT mapping
     at_mapping = None
-    at_match = re.search(r'\bAT\s+(%[IMQ][WDB]?[0-9]+(?:\.[0-9]+)?)', line, re.I)
+    at_match = AT_MAPPING_RE.search(line)
     if at_match:
         at_mapping = at_match.group(1)
-        line = re.sub(r'\s*AT\s+%[IMQ][WDB]?[0-9]+(?:\.[0-9]+)?\s*', ' ', line, flags=re.I)
+        line = AT_MAPPING_SUB_RE.sub(' ', line)
     
     # Check for RETAIN/CONSTANT attributes
-    has_retain = bool(re.search(r'\{\s*RETAIN\s*\}', line, re.I))
-    has_constant = 'VAR CONSTANT' in line.upper() or bool(re.search(r'\{\s*CONSTANT\s*\}', line, re.I))
-    line = re.sub(r'\{[^}]*\}', '', line).strip()
+    has_retain = bool(RETAIN_ATTR_RE.search(line))
+    has_constant = 'VAR CONSTANT' in line.upper() or bool(CONSTANT_ATTR_RE.search(line))
+    line = ATTRIBUTES_RE.sub('', line).strip()
     
     # Parse name : type := default
-    match = re.match(r'(\w+)\s*:\s*(.+?)(?:\s*:=\s*(.+))?$', line)
+    match = DECLARATION_RE.match(line)
     if not match:
         return None
     
@@ -177,7 +323,7 @@ def parse_var_declaration(line: str) -> Optional[Dict]:
     array_bounds = None
     element_type = type_str
     if is_array:
-        array_match = re.match(r'Array\s*\[([^\]]+)\]\s+of\s+(.+)', type_str, re.I)
+        array_match = ARRAY_TYPE_RE.match(type_str)
         if array_match:
             array_bounds = array_match.group(1)
             element_type = array_match.group(2).strip()
@@ -238,12 +384,12 @@ def parse_var_section(section_content: str, section_type: str) -> List[Dict]:
     return variables
 
 
-def extract_all_variables(content: str) -> Dict[str, List[Dict]]:
+def extract_all_variables(content: str, tokens: Optional[List[Token]] = None) -> Dict[str, List[Dict]]:
     """
     Extract all variables from all VAR sections.
     Returns: {'VAR_INPUT': [...], 'VAR_OUTPUT': [...], ...}
     """
-    sections = extract_var_sections(content)
+    sections = extract_var_sections(content, tokens)
     all_vars = {}
     
     for section_type, section_content in sections.items():
@@ -253,6 +399,76 @@ def extract_all_variables(content: str) -> Dict[str, List[Dict]]:
     return all_vars
 
 
+# =============================================================================
+# BLOCK SIDECAR (NEW in v1.0.9)
+# =============================================================================
+
+def load_block_sidecar(fb_path: str, content: str) -> Tuple[Optional[Dict], str]:
+    """
+    Load <name>.block.json next to the FB if it describes this exact .scl content
+    (SHA-256 of the text without BOM). Returns (sidecar or None, sidecar path or '').
+    """
+    sidecar_path = os.path.splitext(fb_path)[0] + BLOCK_SIDECAR_SUFFIX
+    if not os.path.isfile(sidecar_path):
+        return None, ''
+    
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return None, ''
+    
+    digest = hashlib.sha256(content.lstrip('\ufeff').encode('utf-8')).hexdigest()
+    if (not isinstance(sidecar, dict) or sidecar.get('sidecar_version') != BLOCK_SIDECAR_VERSION
+            or sidecar.get('scl_sha256') != digest):
+        return None, ''
+    return sidecar, sidecar_path
+
+
+def sidecar_variable(member: Dict, section: Optional[str] = None) -> Dict:
+    """Convert a sidecar member to the parse_var_declaration() format."""
+    type_str = member['type']
+    is_array = 'array_bounds' in member
+    element_type = type_str
+    if is_array:
+        array_match = ARRAY_TYPE_RE.match(type_str)
+        if array_match:
+            element_type = array_match.group(2).strip()
+    is_struct = element_type.upper() == 'STRUCT'
+    
+    var = {
+        'name': member['name'],
+        'type': element_type,
+        'full_type': type_str,
+        'is_array': is_array,
+        'array_bounds': member.get('array_bounds'),
+        'is_struct': is_struct,
+        'default': member.get('value'),
+        'comment': member.get('comment'),
+        'at_mapping': None,
+        'retain': False,
+        'constant': False
+    }
+    if is_struct:
+        var['struct_fields'] = [sidecar_variable(child) for child in member.get('members', [])]
+    if section:
+        var['section'] = section
+    return var
+
+
+def variables_from_sidecar(sidecar: Dict) -> Dict[str, List[Dict]]:
+    """
+    Build the extract_all_variables() result from a block sidecar.
+    Returns: {'VAR_INPUT': [...], 'VAR_OUTPUT': [...], ...}
+    """
+    all_vars = {}
+    for section, members in sidecar.get('interface', {}).items():
+        section_type = SIDECAR_SECTIONS.get(section)
+        if section_type and members:
+            all_vars[section_type] = [sidecar_variable(member, section_type) for member in members]
+    return all_vars
+
+
 # =============================================================================
 # SYMBOL EXTRACTION (NEW in v1.0.6)
 # =============================================================================
@@ -271,23 +487,35 @@ def extract_declared_symbols(all_vars: Dict[str, List[Dict]]) -> Set[str]:
     return declared
 
 
-def extract_body(content: str) -> str:
+BODY_END_KEYWORDS = {'END_FUNCTION_BLOCK', 'END_FUNCTION', 'END_PROGRAM'}
+
+CONVERSION_FUNCTION_RE = re.compile(r'^[A-Z]+_TO_[A-Z]+$')
+
+
+def extract_body(tokens: List[Token]) -> Tuple[List[Token], int]:
     """
-    Extract the code body (BEGIN...END_FUNCTION_BLOCK).
-    Remove comments and parser artifacts.
+    Extract the code body tokens (BEGIN...END_FUNCTION_BLOCK).
+    Comments are already dropped by the lexer; [LAD code not found] and similar
+    bracketed parser artifacts are removed here.
+    Returns: (body_tokens, line of BEGIN)
     """
-    match = re.search(r'\bBEGIN\b(.+?)(?:END_FUNCTION_BLOCK|END_FUNCTION|END_PROGRAM)', 
-                      content, re.DOTALL | re.IGNORECASE)
-    if match:
-        body = match.group(1)
-        # Remove single-line comments
-        body = re.sub(r'//.*$', '', body, flags=re.MULTILINE)
-        # Remove block comments /* ... */
-        body = re.sub(r'/\*.*?\*/', '', body, flags=re.DOTALL)
-        # Remove [LAD code not found] and similar parser artifacts
-        body = re.sub(r'\[.*?\]', '', body)
-        return body
-    return ""
+    begin = next((i for i, tok in enumerate(tokens)
+                  if tok.kind == 'ident' and tok.text.upper() == 'BEGIN'), None)
+    if begin is None:
+        return [], 0
+    
+    body = []
+    depth = 0
+    for tok in tokens[begin + 1:]:
+        if tok.kind == 'ident' and tok.text.upper() in BODY_END_KEYWORDS:
+            break
+        if tok.kind == 'op' and tok.text == '[':
+            depth += 1
+        elif tok.kind == 'op' and tok.text == ']' and depth:
+            depth -= 1
+        elif not depth:
+            body.append(tok)
+    return body, tokens[begin].line
 
 
 # Timer/Counter field names (built-in, not user symbols)
@@ -295,72 +523,60 @@ TIMER_COUNTER_FIELDS = {
     'IN', 'PT', 'Q', 'ET', 'R', 'PV', 'CV', 'QU', 'QD', 'CLK'
 }
 
-def extract_used_symbols(body: str) -> Dict[str, List[int]]:
+def extract_used_symbols(body: List[Token], first_line: int = 1) -> Dict[str, List[int]]:
     """
-    Extract all ROOT symbols used in code body with line numbers.
+    Extract all ROOT symbols used in code body with line numbers
+    (relative to first_line, the BEGIN line).
     Returns: {symbol: [line_numbers]}
     
     For dot-notation (symbol.field.subfield), only extracts 'symbol'.
     For #local_var, extracts 'local_var'.
+    Strings, quoted names, typed literals and REGION titles are not symbols.
     """
     used_symbols = {}
-    lines = body.split('\n')
+    previous = None
+    region_line = 0
     
-    for line_num, line in enumerate(lines, 1):
-        # Remove comments
-        if '//' in line:
-            line = line.split('//')[0]
+    for tok in body:
+        after_dot = previous is not None and previous.kind == 'op' and previous.text == '.'
+        previous = tok
         
-        # Remove string literals (single and double quotes)
-        line = re.sub(r"'[^']*'", '', line)
-        line = re.sub(r'"[^"]*"', '', line)
+        if tok.kind != 'ident' or after_dot or tok.line == region_line:
+            continue
         
-        # Remove time/date literals: T#xxx, TIME#xxx, S5T#xxx, D#xxx, DT#xxx, TOD#xxx
-        line = re.sub(r'\b(T|TIME|S5T|S5TIME|LT|LTIME|D|DATE|DT|DATE_AND_TIME|TOD|TIME_OF_DAY|LTOD|LDT)#[^\s;,\)]+', '', line, flags=re.I)
+        token = token_name(tok)
         
-        # Find complete identifiers with optional dot-notation
-        # Match: #?identifier(.field)* 
-        # We only care about the ROOT identifier
-        full_refs = re.findall(r'#?([A-Za-z_][A-Za-z0-9_]*)(?:\.[A-Za-z_][A-Za-z0-9_]*)*', line)
+        # Skip keywords (REGION: the rest of the line is its title)
+        if token.upper() in SCL_KEYWORDS:
+            if token.upper() == 'REGION':
+                region_line = tok.line
+            continue
         
-        for token in full_refs:
-            # Skip if empty
-            if not token:
-                continue
-            
-            # Skip keywords
-            if token.upper() in SCL_KEYWORDS:
-                continue
-            
-            # Skip primitive types
-            if token in PRIMITIVE_TYPES:
-                continue
-            
-            # Skip FB instance types
-            if token in FB_INSTANCE_TYPES:
-                continue
-            
-            # Skip native functions
-            if token in SCL_NATIVE_FUNCTIONS:
-                continue
-            
-            # Skip timer/counter fields (in case they appear standalone)
-            if token in TIMER_COUNTER_FIELDS:
-                continue
-            
-            # Skip conversion functions (pattern-based)
-            if re.match(r'^[A-Z]+_TO_[A-Z]+$', token):
-                continue
-            
-            # Skip numeric literals that matched as identifiers
-            if re.match(r'^[0-9]', token):
-                continue
-            
-            # Record usage
-            if token not in used_symbols:
-                used_symbols[token] = []
-            if line_num not in used_symbols[token]:
-                used_symbols[token].append(line_num)
+        # Skip primitive types
+        if token in PRIMITIVE_TYPES:
+            continue
+        
+        # Skip FB instance types
+        if token in FB_INSTANCE_TYPES:
+            continue
+        
+        # Skip native functions
+        if token in SCL_NATIVE_FUNCTIONS:
+            continue
+        
+        # Skip timer/counter fields (in case they appear standalone)
+        if token in TIMER_COUNTER_FIELDS:
+            continue
+        
+        # Skip conversion functions (pattern-based)
+        if CONVERSION_FUNCTION_RE.match(token):
+            continue
+        
+        # Record usage (tokens come in line order)
+        line_num = tok.line - first_line + 1
+        lines = used_symbols.setdefault(token, [])
+        if not lines or lines[-1] != line_num:
+            lines.append(line_num)
     
     return used_symbols
 
@@ -563,8 +779,15 @@ def extract_metadata(content: str, fb_path: str) -> Tuple[str, str, str]:
     return fb_name, version, author
 
 
-def detect_device_taxonomy(content: str, fb_name: str) -> Tuple[str, str]:
-    """Detect device_family and device_type from code patterns."""
+def detect_device_taxonomy(content: str, fb_name: str, tokens: Optional[List[Token]] = None) -> Tuple[str, str]:
+    """Detect device_family and device_type from code patterns (identifiers and quoted names)."""
+    if tokens is None:
+        tokens = tokenize_scl(content)
+    words = token_words(tokens)
+    unique = set(words)
+    lower = [word.lower() for word in words]
+    lower_unique = set(lower)
+    
     device_family = "generic"
     device_type = "actuator_generic"
     
@@ -572,14 +795,14 @@ def detect_device_taxonomy(content: str, fb_name: str) -> Tuple[str, str]:
     # Detect by presence of multiple L2 FB instance types
     l2_fb_types = ['ValveMachine_FB', 'FeedMachine_FB', 'SpeedMachine_FB', 
                    'Positioning_DOL_Machine_FB', 'MotorMachine_FB', 'CylinderMachine_FB']
-    l2_instance_count = sum(1 for fb in l2_fb_types if fb in content)
+    l2_instance_count = sum(1 for fb in l2_fb_types if contains_any(unique, fb))
     if l2_instance_count >= 2:
         device_family = "aggregator"
         device_type = "multi_device"
         return device_family, device_type
     
     # Priority 1: MOTION (most specific patterns)
-    if re.search(r'MC_MoveAbsolute|MC_Home|MC_MoveRelative|MC_Power', content):
+    if contains_any(unique, 'MC_MoveAbsolute', 'MC_Home', 'MC_MoveRelative', 'MC_Power'):
         device_family = "motion"
         if re.search(r'Rot|Turn|Rotation', fb_name, re.I):
             device_type = "rotary_servo"
@@ -587,72 +810,72 @@ def detect_device_taxonomy(content: str, fb_name: str) -> Tuple[str, str]:
             device_type = "linear_servo"
         return device_family, device_type
     
-    if re.search(r'TAx_DriveInterface', content):
+    if contains_any(unique, 'TAx_DriveInterface'):
         device_family = "motion"
         device_type = "servo_drive"
         return device_family, device_type
     
-    if re.search(r'PosFbk_ITF', content) and not re.search(r'MC_', content):
+    if contains_any(unique, 'PosFbk_ITF') and not contains_any(unique, 'MC_'):
         device_family = "motion"
         device_type = "linear_onoff"
         return device_family, device_type
     
     # Priority 2: DRIVE
-    if re.search(r'SinaInfeed|Infeed_ON|EnableInfeed', content):
+    if contains_any(unique, 'SinaInfeed', 'Infeed_ON', 'EnableInfeed'):
         device_family = "drive"
         device_type = "infeed"
         return device_family, device_type
     
-    if re.search(r'SinaSpeed|SinaMC', content):
+    if contains_any(unique, 'SinaSpeed', 'SinaMC'):
         device_family = "drive"
         device_type = "drive_control"
         return device_family, device_type
     
     # Priority 3: ACTUATOR (specific patterns)
-    if re.search(r'\bMotorCtrl\b|\bMotorSts\b', content):
+    if 'MotorCtrl' in unique or 'MotorSts' in unique:
         device_family = "actuator"
         device_type = "motor_contactor"
         return device_family, device_type
     
-    if re.search(r'VFD|FrequencyConverter', content):
+    if contains_any(unique, 'VFD', 'FrequencyConverter'):
         device_family = "actuator"
         device_type = "motor_vfd"
         return device_family, device_type
     
     # Priority 4: PNEUMATIC
-    if re.search(r'Extend.*Retract|Retract.*Extend', content, re.I | re.S):
+    if contains_any(lower_unique, 'extend') and contains_any(lower_unique, 'retract'):
         device_family = "pneumatic"
         device_type = "cylinder_double"
         return device_family, device_type
     
-    if re.search(r'Open.*Close.*Grip|Grip.*Open.*Close', content, re.I | re.S):
+    if contains_in_order(lower, 'open', 'close', 'grip') or contains_in_order(lower, 'grip', 'open', 'close'):
         device_family = "pneumatic"
         device_type = "gripper"
         return device_family, device_type
     
-    if re.search(r'\bOpen\b.*\bClose\b|\bClose\b.*\bOpen\b', content, re.I | re.S):
+    if 'open' in lower_unique and 'close' in lower_unique:
         device_family = "pneumatic"
         device_type = "valve"
         return device_family, device_type
     
     # Priority 5: SENSOR
-    if re.search(r'PosFbk_|Encoder|TExtEncoder', content):
+    if contains_any(unique, 'PosFbk_', 'Encoder', 'TExtEncoder'):
         device_family = "sensor"
         device_type = "encoder"
         return device_family, device_type
     
     # Priority 6: ORCHESTRATOR (only if no device patterns matched)
-    if re.search(r'\bAreaInterface\b|\bAreaConfig\b', content):
+    if 'AreaInterface' in unique or 'AreaConfig' in unique:
         device_family = "orchestrator"
         device_type = "area_manager"
         return device_family, device_type
     
-    if re.search(r'ZoneInterface|ZoneSafetyInterface', content):
+    if contains_any(unique, 'ZoneInterface', 'ZoneSafetyInterface'):
         device_family = "orchestrator"
         device_type = "zone_manager"
         return device_family, device_type
     
-    if re.search(r'\bMachineInterface\b|\bMachineStatus\b', content):
+    if 'MachineInterface' in unique or 'MachineStatus' in unique:
         device_family = "orchestrator"
         device_type = "machine_coordinator"
         return device_family, device_type
@@ -676,12 +899,33 @@ def should_skip_portability_check(fb_name: str) -> bool:
     return False
 
 
-def analyze_portability(content: str, fb_path: str, all_vars: Dict[str, List[Dict]]) -> Tuple[str, List[str], List[Dict]]:
+MANUAL_EDGE_LAST_RE = re.compile(r'\w_(?:old|prev|last)$', re.I)
+MANUAL_EDGE_AUX_RE = re.compile(r'\w_(?:old|prev|aux)', re.I)
+
+
+def find_manual_edges(tokens: List[Token], name_re: re.Pattern) -> List[int]:
+    """Lines with 'AND NOT <name>' where the name matches name_re (one entry per line)."""
+    lines = []
+    for i in range(len(tokens) - 2):
+        tok = tokens[i]
+        if tok.kind != 'ident' or tok.text.upper() != 'AND' or (lines and lines[-1] == tok.line):
+            continue
+        negation, operand = tokens[i + 1], tokens[i + 2]
+        if (negation.kind == 'ident' and negation.text.upper() == 'NOT' and operand.kind == 'ident'
+                and negation.line == tok.line == operand.line and name_re.search(token_name(operand))):
+            lines.append(tok.line)
+    return lines
+
+
+def analyze_portability(content: str, fb_path: str, all_vars: Dict[str, List[Dict]],
+                        tokens: Optional[List[Token]] = None) -> Tuple[str, List[str], List[Dict]]:
     """
     Analyze portability by detecting undeclared symbols.
     
     Returns: (status, violation_ids, anti_patterns)
     """
+    if tokens is None:
+        tokens = tokenize_scl(content)
     anti_patterns = []
     violations = []
     ap_counter = 1
@@ -705,8 +949,8 @@ def analyze_portability(content: str, fb_path: str, all_vars: Dict[str, List[Dic
     
     # Extract declared and used symbols
     declared = extract_declared_symbols(all_vars)
-    body = extract_body(content)
-    used = extract_used_symbols(body)
+    body, begin_line = extract_body(tokens)
+    used = extract_used_symbols(body, begin_line)
     
     # Find undeclared symbols
     undeclared = find_undeclared_symbols(declared, used)
@@ -731,23 +975,20 @@ def analyze_portability(content: str, fb_path: str, all_vars: Dict[str, List[Dic
     
     # Additional checks: Manual edge detection (MEDIUM)
     lines = content.split('\n')
-    for line_num, line in enumerate(lines, 1):
-        if re.match(r'^\s*//', line):
-            continue
-        if re.search(r'\bAND\s+NOT\s+\w+_(old|prev|last)\b', line, re.I):
-            ap_id = f"AP{ap_counter:03d}"
-            anti_patterns.append({
-                "id": ap_id,
-                "type": "manual_edge_detection",
-                "severity": "MEDIUM",
-                "file": fb_filename,
-                "line": line_num,
-                "code": line.strip()[:80],
-                "rule": "use_native_triggers",
-                "impact": "Code verbosity, non-standard",
-                "suggested_fix": "Use R_TRIG or F_TRIG"
-            })
-            ap_counter += 1
+    for line_num in find_manual_edges(tokens, MANUAL_EDGE_LAST_RE):
+        ap_id = f"AP{ap_counter:03d}"
+        anti_patterns.append({
+            "id": ap_id,
+            "type": "manual_edge_detection",
+            "severity": "MEDIUM",
+            "file": fb_filename,
+            "line": line_num,
+            "code": lines[line_num - 1].strip()[:80],
+            "rule": "use_native_triggers",
+            "impact": "Code verbosity, non-standard",
+            "suggested_fix": "Use R_TRIG or F_TRIG"
+        })
+        ap_counter += 1
     
     # Determine status
     # WARNING-level issues don't cause FAIL, only INFO that there are dependencies
@@ -767,72 +1008,144 @@ def analyze_portability(content: str, fb_path: str, all_vars: Dict[str, List[Dic
 # PATTERN DETECTION
 # =============================================================================
 
-def detect_patterns(content: str) -> Dict:
+def is_op(tok: Token, text: str) -> bool:
+    return tok.kind == 'op' and tok.text == text
+
+
+def find_assignment(tokens: List[Token], field: str) -> Optional[int]:
+    """Index of the first '<ident>.<field> :=' (index of <field>), or None."""
+    for i in range(2, len(tokens) - 1):
+        if (tokens[i].kind == 'ident' and tokens[i].text == field and tokens[i - 2].kind == 'ident'
+                and is_op(tokens[i - 1], '.') and is_op(tokens[i + 1], ':=')):
+            return i
+    return None
+
+
+def statement_text(content: str, tokens: List[Token], start: int, index: int) -> str:
+    """Source text from offset start to the ';' ending the statement of tokens[index] ('' if unterminated)."""
+    end = statement_end(tokens, index)
+    if end == len(tokens):
+        return ""
+    return content[start:tokens[end].start + 1]
+
+
+def detect_patterns(content: str, tokens: Optional[List[Token]] = None) -> Dict:
     """Detect command/status patterns, state machine, timers, edge detection."""
+    if tokens is None:
+        tokens = tokenize_scl(content)
+    unique = set(token_words(tokens))
+    
+    # One pass over the token stream: statements/lines that later checks need
+    permitted_not = False       # <x>.Permitted := ... NOT ...;
+    request_permitted = False   # <x>.Request := ... .Permitted ...;
+    struct_request = False      # <x>.Request ... .Permitted on one line
+    request_lines, command_lines = set(), set()
+    case_lines = set()
+    explicit_case = False
+    region_quoted, region_words = [], []
+    timers, fb_calls, calls = {}, {}, set()
+    edge_manual = bool(find_manual_edges(tokens, MANUAL_EDGE_AUX_RE))
+    
+    for i, tok in enumerate(tokens):
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        if tok.kind == 'ident' or tok.kind == 'quoted':
+            name = token_name(tok)
+            if 'Request' in name:
+                request_lines.add(tok.line)
+            if 'Command' in name:
+                command_lines.add(tok.line)
+        if tok.kind == 'ident':
+            upper = name.upper()
+            if upper == 'CASE':
+                case_lines.add(tok.line)
+            elif upper == 'OF' and tok.line in case_lines:
+                explicit_case = True
+            elif upper == 'REGION' and nxt is not None and nxt.line == tok.line:
+                if nxt.kind == 'quoted':
+                    region_quoted.append(token_name(nxt))
+                elif nxt.kind == 'ident' and nxt.text[0].isalpha():
+                    region_words.append(nxt.text)
+            if nxt is not None and is_op(nxt, '('):
+                calls.add(name)
+                if tok.text.startswith('#'):
+                    fb_calls.setdefault(name, None)
+            if (nxt is not None and is_op(nxt, ':') and i + 2 < len(tokens)
+                    and tokens[i + 2].kind == 'ident' and tokens[i + 2].text in ('IEC_TIMER', 'TON', 'TOF', 'TP')
+                    and not tok.text.startswith('#')):
+                timers.setdefault(tok.text, None)
+        elif is_op(tok, '.') and nxt is not None and nxt.kind == 'ident':
+            after = tokens[i + 2] if i + 2 < len(tokens) else None
+            if nxt.text == 'Permitted' and after is not None and is_op(after, ':='):
+                end = statement_end(tokens, i + 2)
+                if any(t.kind == 'ident' and t.text.upper() == 'NOT' for t in tokens[i + 3:end]):
+                    permitted_not = True
+            elif nxt.text == 'Request':
+                rest = tokens[i + 2:statement_end(tokens, i + 2)]
+                permitted_after = [rest[j + 1].line for j in range(len(rest) - 1)
+                                   if is_op(rest[j], '.') and rest[j + 1].text.startswith('Permitted')]
+                if after is not None and is_op(after, ':=') and permitted_after:
+                    request_permitted = True
+                if i > 0 and tokens[i - 1].kind == 'ident' and nxt.line in permitted_after:
+                    struct_request = True
     
     pattern_cmd = "unknown"
     confidence = "LOW"
     evidence = ""
     
-    if re.search(r'\.Permitted\s*:=.*NOT', content) and re.search(r'\.Request\s*:=.*\.Permitted', content):
+    if permitted_not and request_permitted:
         pattern_cmd = "Permitted→Request→Cmd→Done"
         confidence = "HIGH"
-        match = re.search(r'(\w+\.Permitted\s*:=[^;]+;)', content)
-        if match:
-            evidence = match.group(1)[:80]
-    elif re.search(r'SafeStop.*RunPermitted|RunPermitted.*SafeStop', content, re.S):
+        index = find_assignment(tokens, 'Permitted')
+        if index is not None:
+            owner = tokens[index - 2]
+            evidence = statement_text(content, tokens, owner.start + len(owner.text) - len(token_name(owner)), index)[:80]
+    elif contains_any(unique, 'SafeStop') and contains_any(unique, 'RunPermitted'):
         pattern_cmd = "SafeStop→RunPermitted→Run"
         confidence = "MEDIUM"
-        match = re.search(r'(RunPermitted\s*:=[^;]+;)', content)
-        if match:
-            evidence = match.group(1)[:80]
-    elif re.search(r'Request.*Command|Command.*Request', content):
+        for i, tok in enumerate(tokens[:-1]):
+            if tok.kind == 'ident' and tok.text.endswith('RunPermitted') and is_op(tokens[i + 1], ':='):
+                start = tok.start + len(tok.text) - len('RunPermitted')
+                evidence = statement_text(content, tokens, start, i)[:80]
+                break
+    elif request_lines & command_lines:
         pattern_cmd = "Request→Cmd"
         confidence = "MEDIUM"
     
     # State machine
     state_type = "implicit"
-    if re.search(r'CASE\s+\w+\s+OF', content):
+    if explicit_case:
         state_type = "explicit_case"
-    elif re.search(r'\w+\.Request.*\.Permitted', content):
+    elif struct_request:
         state_type = "struct_pattern"
     
     # States from REGION
-    states = re.findall(r'REGION\s+"([^"]+)"', content)
-    if not states:
-        states = re.findall(r'REGION\s+([A-Za-z][A-Za-z0-9_]*)', content)
-        states = [s for s in states if s not in ['END_REGION', 'REGION']]
+    states = region_quoted or [s for s in region_words if s not in ['END_REGION', 'REGION']]
     if not states:
         states = ["Main"]
-    seen = set()
-    states = [s for s in states if not (s in seen or seen.add(s))]
+    states = list(dict.fromkeys(states))
     
     # Timers
-    timers = list(set(re.findall(r'(\w+)\s*:\s*(?:IEC_TIMER|TON|TOF|TP)\b', content)))
+    timers = list(timers)
     
     # Edge detection
     edge = "none"
-    if re.search(r'\bR_TRIG\b|\bF_TRIG\b', content):
+    if 'R_TRIG' in unique or 'F_TRIG' in unique:
         edge = "R_TRIG/F_TRIG"
-    elif re.search(r'\bPosEdge\s*\(|\bNegEdge\s*\(', content):
+    elif 'PosEdge' in calls or 'NegEdge' in calls:
         edge = "FC_PosEdge/NegEdge"
-    elif re.search(r'\bAND\s+NOT\s+\w+_(old|prev|aux)', content, re.I):
+    elif edge_manual:
         edge = "manual"
     
     # Math functions
-    math_funcs = []
-    for func in ['ABS', 'MAX', 'MIN', 'LIMIT', 'SEL', 'SQRT', 'SIN', 'COS', 'ROUND', 'TRUNC']:
-        if re.search(rf'\b{func}\s*\(', content):
-            math_funcs.append(func)
+    math_funcs = [func for func in ['ABS', 'MAX', 'MIN', 'LIMIT', 'SEL', 'SQRT', 'SIN', 'COS', 'ROUND', 'TRUNC']
+                  if func in calls]
     
     # Motion control functions
-    motion_funcs = []
-    for func in ['MC_MoveAbsolute', 'MC_MoveRelative', 'MC_Home', 'MC_Power', 'MC_Stop', 'MC_Halt']:
-        if func in content:
-            motion_funcs.append(func)
+    motion_funcs = [func for func in ['MC_MoveAbsolute', 'MC_MoveRelative', 'MC_Home', 'MC_Power', 'MC_Stop', 'MC_Halt']
+                    if contains_any(unique, func)]
     
     # FB calls
-    fb_calls = list(set(re.findall(r'#(\w+)\s*\(', content)))
+    fb_calls = list(fb_calls)
     
     return {
         "command_status": {"pattern": pattern_cmd, "confidence": confidence, "evidence": evidence},
@@ -881,7 +1194,8 @@ def generate_pattern_json(fb_path: str, fb_name: str, version: str, author: str,
                           device_family: str, device_type: str,
                           portability_status: str, portability_violations: List[str],
                           anti_patterns: List[Dict], patterns: Dict,
-                          contract: Dict, udt_path: Optional[str]) -> Dict:
+                          contract: Dict, udt_path: Optional[str],
+                          block_sidecar: str = "") -> Dict:
     """Generate device_pattern JSON according to schema v1.0.2."""
     
     return {
@@ -895,7 +1209,8 @@ def generate_pattern_json(fb_path: str, fb_name: str, version: str, author: str,
             "analyzed_at": datetime.now().isoformat(),
             "source_files": {
                 "fb_scl": fb_path,
-                "udt_path": udt_path or ""
+                "udt_path": udt_path or "",
+                "block_sidecar": block_sidecar
             },
             "portability_gate": {
                 "status": portability_status,
@@ -1020,7 +1335,7 @@ Total: {len(anti)}
 
 """
     # Group by severity
-    for severity in ['CRITICAL', 'WARNING', 'MEDIUM', 'LOW', 'INFO']:
+    for severity in SEVERITIES:
         sev_aps = [ap for ap in anti if ap['severity'] == severity]
         if sev_aps:
             report += f"### {severity}\n\n"
@@ -1067,8 +1382,14 @@ Total: {len(anti)}
 # =============================================================================
 
 def analyze_device(fb_path: str, udt_path: Optional[str] = None, 
-                   output_path: Optional[str] = None) -> Dict:
-    """Main analysis function."""
+                   output_path: Optional[str] = None, verbose: bool = True,
+                   use_sidecar: bool = True) -> Dict:
+    """
+    Main analysis function. verbose=False suppresses console output (batch mode).
+    use_sidecar=False ignores <name>.block.json and parses the VAR sections.
+    """
+    
+    log = print if verbose else (lambda *args, **kwargs: None)
     
     if output_path is None:
         output_path = os.path.dirname(fb_path) or '.'
@@ -1077,58 +1398,65 @@ def analyze_device(fb_path: str, udt_path: Optional[str] = None,
     with open(fb_path, 'r', encoding='utf-8', errors='replace') as f:
         content = f.read()
     
+    # Lex once: all analysis steps consume the same token stream
+    tokens = tokenize_scl(content)
+    
     # Extract metadata
     fb_name, version, author = extract_metadata(content, fb_path)
-    print(f"Analyzing: {fb_name} v{version} by {author}")
+    log(f"Analyzing: {fb_name} v{version} by {author}")
     
     # Device taxonomy
-    device_family, device_type = detect_device_taxonomy(content, fb_name)
-    print(f"Device: {device_family}/{device_type}")
+    device_family, device_type = detect_device_taxonomy(content, fb_name, tokens)
+    log(f"Device: {device_family}/{device_type}")
     
-    # Extract variables
-    all_vars = extract_all_variables(content)
+    # Extract variables (from the xml_to_scl sidecar when it matches this file)
+    sidecar, sidecar_path = load_block_sidecar(fb_path, content) if use_sidecar else (None, '')
+    if sidecar is not None:
+        all_vars = variables_from_sidecar(sidecar)
+    else:
+        all_vars = extract_all_variables(content, tokens)
     var_counts = {k: len(v) for k, v in all_vars.items()}
-    print(f"Variables: {var_counts}")
+    log(f"Variables: {var_counts}" + (" (sidecar)" if sidecar is not None else ""))
     
     # Build contract
     contract = build_contract_from_variables(all_vars)
     
     # Portability analysis (NEW in v1.0.6)
     portability_status, portability_violations, anti_patterns = analyze_portability(
-        content, fb_path, all_vars
+        content, fb_path, all_vars, tokens
     )
-    print(f"Portability: {portability_status} ({len(portability_violations)} issues)")
+    log(f"Portability: {portability_status} ({len(portability_violations)} issues)")
     
     # Pattern detection
-    patterns = detect_patterns(content)
-    print(f"Pattern: {patterns['command_status']['pattern']} ({patterns['command_status']['confidence']})")
+    patterns = detect_patterns(content, tokens)
+    log(f"Pattern: {patterns['command_status']['pattern']} ({patterns['command_status']['confidence']})")
     
     # Generate JSON
     pattern_data = generate_pattern_json(
         fb_path, fb_name, version, author, device_family, device_type,
         portability_status, portability_violations, anti_patterns,
-        patterns, contract, udt_path
+        patterns, contract, udt_path, sidecar_path
     )
     
     os.makedirs(output_path, exist_ok=True)
     json_path = os.path.join(output_path, f"device_pattern_{fb_name}.json")
     with open(json_path, 'w', encoding='utf-8') as f:
         json.dump(pattern_data, f, indent=2, ensure_ascii=False)
-    print(f"[OK] JSON: {json_path}")
+    log(f"[OK] JSON: {json_path}")
     
     # Generate Markdown
     md_content = generate_markdown_report(pattern_data)
     md_path = os.path.join(output_path, f"DEVICE_{fb_name}.md")
     with open(md_path, 'w', encoding='utf-8') as f:
         f.write(md_content)
-    print(f"[OK] MD: {md_path}")
+    log(f"[OK] MD: {md_path}")
     
     # Summary
     warning_count = len([a for a in anti_patterns if a['severity'] == 'WARNING'])
     medium_count = len([a for a in anti_patterns if a['severity'] == 'MEDIUM'])
     low_count = len([a for a in anti_patterns if a['severity'] == 'LOW'])
     
-    print(f"""
+    log(f"""
 ========================================
 ANALYSIS COMPLETE: {fb_name}
 ========================================
@@ -1157,19 +1485,192 @@ Contract:
     return pattern_data
 
 
+# =============================================================================
+# BATCH MODE
+# =============================================================================
+
+def discover_function_blocks(root: str, exclude: Optional[str] = None) -> List[str]:
+    """
+    Find all .scl files under root that declare a FUNCTION_BLOCK.
+    Returns paths sorted for a deterministic catalogue; `exclude` skips a subfolder (output).
+    """
+    exclude = os.path.abspath(exclude) if exclude else None
+    fb_files = []
+    
+    for dirpath, dirnames, filenames in os.walk(root):
+        if exclude and os.path.abspath(dirpath) == exclude:
+            dirnames[:] = []
+            continue
+        for filename in filenames:
+            if not filename.lower().endswith('.scl'):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                if FB_DECLARATION_RE.search(f.read()):
+                    fb_files.append(path)
+    
+    return sorted(fb_files)
+
+
+def _analyze_for_catalogue(job: Tuple[str, Optional[str], str, bool]) -> Dict:
+    """Process-pool worker: analyze one FB and return its catalogue entry."""
+    fb_path, udt_path, output_path, use_sidecar = job
+    try:
+        data = analyze_device(fb_path, udt_path, output_path, verbose=False, use_sidecar=use_sidecar)
+    except Exception as e:
+        return {"source_file": fb_path, "error": f"{type(e).__name__}: {e}"}
+    
+    md = data["metadata"]
+    severity_counts = Counter(ap["severity"] for ap in data["anti_patterns"])
+    return {
+        "fb_name": md["fb_name"],
+        "source_file": fb_path,
+        "device_family": md["device_family"],
+        "device_type": md["device_type"],
+        "portability_status": md["portability_gate"]["status"],
+        "command_status": data["patterns"]["command_status"]["pattern"],
+        "interface_source": "sidecar" if md["source_files"]["block_sidecar"] else "scl",
+        "anti_patterns": {sev: severity_counts[sev] for sev in SEVERITIES if severity_counts[sev]},
+        "anti_pattern_types": dict(Counter(ap["type"] for ap in data["anti_patterns"])),
+        "json": f"device_pattern_{md['fb_name']}.json",
+        "report": f"DEVICE_{md['fb_name']}.md"
+    }
+
+
+def build_catalogue(entries: List[Dict], root: str, udt_path: Optional[str]) -> Dict:
+    """Consolidated catalogue: per-FB entries + family/portability/anti-pattern summary."""
+    devices = sorted((e for e in entries if "error" not in e), key=lambda e: e["fb_name"].lower())
+    errors = [e for e in entries if "error" in e]
+    
+    families: Dict[str, Dict] = {}
+    for device in devices:
+        family = families.setdefault(device["device_family"], {"count": 0, "types": {}})
+        family["count"] += 1
+        family["types"][device["device_type"]] = family["types"].get(device["device_type"], 0) + 1
+    
+    by_severity = Counter()
+    by_type = Counter()
+    for device in devices:
+        by_severity.update(device["anti_patterns"])
+        by_type.update(device["anti_pattern_types"])
+    
+    names = Counter(device["fb_name"] for device in devices)
+    
+    return {
+        "schema_version": "1.0.0",
+        "generated_at": datetime.now().isoformat(),
+        "source_root": root,
+        "udt_path": udt_path or "",
+        "summary": {
+            "total_fbs": len(entries),
+            "analyzed": len(devices),
+            "errors": len(errors),
+            "families": dict(sorted(families.items())),
+            "portability": dict(sorted(Counter(d["portability_status"] for d in devices).items())),
+            "anti_patterns": {
+                "total": sum(by_severity.values()),
+                "by_severity": {sev: by_severity[sev] for sev in SEVERITIES if by_severity[sev]},
+                "by_type": dict(by_type.most_common())
+            },
+            # Same FB name in several files: their output files overwrite each other
+            "duplicate_names": sorted(name for name, count in names.items() if count > 1)
+        },
+        "devices": devices,
+        "errors": errors
+    }
+
+
+def analyze_batch(root: str, udt_path: Optional[str] = None, output_path: Optional[str] = None,
+                  max_workers: Optional[int] = None, use_sidecar: bool = True) -> Dict:
+    """
+    Analyze every FB under root in a process pool.
+    Writes device_pattern_*.json / DEVICE_*.md per FB and device_catalogue.json in output_path.
+    """
+    if output_path is None:
+        output_path = os.path.join(root, BATCH_OUTPUT_DIR)
+    os.makedirs(output_path, exist_ok=True)
+    
+    fb_files = discover_function_blocks(root, exclude=output_path)
+    print(f"Batch: {len(fb_files)} Function Blocks in {root}")
+    
+    jobs = [(fb_path, udt_path, output_path, use_sidecar) for fb_path in fb_files]
+    entries = []
+    if max_workers == 1 or len(jobs) <= 1:
+        results = map(_analyze_for_catalogue, jobs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        workers = max_workers or os.cpu_count() or 1
+        results = executor.map(_analyze_for_catalogue, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+    
+    try:
+        for index, entry in enumerate(results, 1):
+            entries.append(entry)
+            if "error" in entry:
+                print(f"[{index}/{len(jobs)}] [ERROR] {entry['source_file']}: {entry['error']}")
+            else:
+                print(f"[{index}/{len(jobs)}] {entry['fb_name']}: "
+                      f"{entry['device_family']}/{entry['device_type']} {entry['portability_status']}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    catalogue = build_catalogue(entries, root, udt_path)
+    catalogue_path = os.path.join(output_path, CATALOGUE_FILE)
+    with open(catalogue_path, 'w', encoding='utf-8') as f:
+        json.dump(catalogue, f, indent=2, ensure_ascii=False)
+    
+    summary = catalogue["summary"]
+    families = ', '.join(f"{name} {info['count']}" for name, info in summary["families"].items())
+    portability = ', '.join(f"{status} {count}" for status, count in summary["portability"].items())
+    severities = ', '.join(f"{sev} {count}" for sev, count in summary["anti_patterns"]["by_severity"].items())
+    print(f"""
+========================================
+BATCH ANALYSIS COMPLETE
+========================================
+Function Blocks: {summary['analyzed']}/{summary['total_fbs']} ({summary['errors']} errors)
+Families:        {families or 'none'}
+Portability:     {portability or 'none'}
+Anti-Patterns:   {summary['anti_patterns']['total']} total ({severities or 'none'})
+{"[WARN] Duplicate FB names: " + ', '.join(summary['duplicate_names']) if summary['duplicate_names'] else ""}
+[OK] Catalogue: {catalogue_path}
+========================================
+""")
+    
+    return catalogue
+
+
 def main():
-    parser = argparse.ArgumentParser(description='Analyze PLC Function Block and extract patterns (v1.0.6)')
-    parser.add_argument('fb_file', help='Path to SCL Function Block file')
+    parser = argparse.ArgumentParser(description='Analyze PLC Function Block and extract patterns (v1.0.9)')
+    parser.add_argument('fb_file', nargs='?', help='Path to SCL Function Block file')
+    parser.add_argument('--batch', '-b', metavar='DIR',
+                        help='Analyze every FB under DIR and write device_catalogue.json')
     parser.add_argument('--udt-path', '-u', help='Path to UDT folder (optional)')
-    parser.add_argument('--output', '-o', help='Output directory (default: same as FB)')
+    parser.add_argument('--output', '-o',
+                        help=f'Output directory (default: same as FB, or DIR/{BATCH_OUTPUT_DIR} with --batch)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Worker processes for --batch (default: CPU count)')
+    parser.add_argument('--no-sidecar', action='store_true',
+                        help='Ignore <name>.block.json sidecars and parse the VAR sections')
     
     args = parser.parse_args()
     
+    if args.batch:
+        if not os.path.isdir(args.batch):
+            print(f"[ERROR] Folder not found: {args.batch}")
+            return 1
+        catalogue = analyze_batch(args.batch, args.udt_path, args.output, args.jobs,
+                                  use_sidecar=not args.no_sidecar)
+        return 1 if catalogue["summary"]["errors"] else 0
+    
+    if not args.fb_file:
+        parser.error('fb_file or --batch is required')
+    
     if not os.path.exists(args.fb_file):
         print(f"[ERROR] File not found: {args.fb_file}")
         return 1
     
-    analyze_device(args.fb_file, args.udt_path, args.output)
+    analyze_device(args.fb_file, args.udt_path, args.output, use_sidecar=not args.no_sidecar)
     return 0
 
 
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+pattern_index.py - Indexed, lazily-loaded access to JSON_integrazione pattern knowledge
+
+The *_semantic_v*.json and *_Integration_Patterns.json files are flattened into
+a path index:
+
+    machine / level / section / item
+
+- machine: file name without the suffix (FeedMachine, HydraulicUnit, Area, ...)
+- level:   L1 / L2 / L3 from the section prefix (L1_SpeedAxis, L3_Validation_Checklist);
+           every section of *_L3_semantic_* and *_Integration_Patterns files is L3;
+           other sections of L1_L2_L3 files (meta, UDTs, Standard_Schema) are 'common'
+- section: top-level key of the file
+- item:    key (or list position) inside the section; scalar and empty sections
+           have no items
+
+The index is cached in a compact binary form (.pattern_index/ next to the JSON
+files): one data file with every item as compact JSON plus an offset table.
+The cache is rebuilt when a JSON file is added, removed or changes mtime/size;
+items are decoded from the memory-mapped data file only when requested.
+
+Usage:
+    python pattern_index.py --machines
+    python pattern_index.py --find "*/L3/*/aggregation_rules"
+    python pattern_index.py FeedMachine/L2/L2_FeedMachine/CIn
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+import argparse
+import fnmatch
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+DEFAULT_JSON_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'JSON_integrazione'))
+CACHE_DIR_NAME = '.pattern_index'
+DATA_FILE = 'patterns.dat'
+INDEX_FILE = 'patterns.idx'
+
+MAGIC = b'PATIDX01'
+HEADER = struct.Struct('<8sQ')
+
+# File name -> machine name / files whose sections are all L3
+MACHINE_SUFFIX_RE = re.compile(r'(?:_L1_L2_L3_semantic_v\d+|_L3_semantic_v\d+|_Integration_Patterns)$')
+L3_ONLY_FILE_RE = re.compile(r'(?:(?<!_L2)_L3_semantic_v\d+|_Integration_Patterns)$')
+SECTION_LEVEL_RE = re.compile(r'^(L[123])_')
+COMMON_LEVEL = 'common'
+
+# Item of scalar/empty sections (value stored as the single record of the section)
+NO_ITEM = None
+
+Item = Optional[Any]  # str (dict key), int (list position) or NO_ITEM
+
+# =============================================================================
+# FLATTENING
+# =============================================================================
+
+def machine_name(filename: str) -> str:
+    """FeedMachine_L1_L2_L3_semantic_v3.json -> FeedMachine"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return MACHINE_SUFFIX_RE.sub('', stem)
+
+
+def section_level(filename: str, section: str) -> str:
+    """Level of a top-level section: L1/L2/L3 or 'common'."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if L3_ONLY_FILE_RE.search(stem):
+        return 'L3'
+    match = SECTION_LEVEL_RE.match(section)
+    return match.group(1) if match else COMMON_LEVEL
+
+
+def flatten_document(filename: str, document: Dict) -> Iterator[Tuple[str, str, str, Item, Any]]:
+    """Yield (machine, level, section, item, value) for every item of a pattern file."""
+    machine = machine_name(filename)
+    for section, content in document.items():
+        level = section_level(filename, section)
+        if isinstance(content, dict) and content:
+            for item, value in content.items():
+                yield machine, level, section, item, value
+        elif isinstance(content, list) and content:
+            for position, value in enumerate(content):
+                yield machine, level, section, position, value
+        else:
+            yield machine, level, section, NO_ITEM, content
+
+
+def source_files(json_dir: str) -> Dict[str, Dict]:
+    """Pattern files of json_dir with mtime/size, keyed by file name."""
+    sources = {}
+    for filename in sorted(os.listdir(json_dir)):
+        if not filename.lower().endswith('.json'):
+            continue
+        stat = os.stat(os.path.join(json_dir, filename))
+        sources[filename] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return sources
+
+
+# =============================================================================
+# BINARY CACHE
+# =============================================================================
+
+def build_cache(json_dir: str, cache_dir: str, sources: Optional[Dict[str, Dict]] = None) -> None:
+    """
+    Parse every pattern file once and write patterns.dat / patterns.idx.
+    patterns.idx: magic + record count, n+1 uint64 offsets into patterns.dat,
+    then a JSON footer with the source file records and the path of each record.
+    """
+    if sources is None:
+        sources = source_files(json_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    offsets = array('Q', [0])
+    paths = []
+    data_tmp = os.path.join(cache_dir, DATA_FILE + '.tmp')
+    index_tmp = os.path.join(cache_dir, INDEX_FILE + '.tmp')
+    with open(data_tmp, 'wb') as data:
+        for filename in sources:
+            with open(os.path.join(json_dir, filename), 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            for machine, level, section, item, value in flatten_document(filename, document):
+                record = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                data.write(record)
+                offsets.append(offsets[-1] + len(record))
+                paths.append([machine, level, section, item, filename])
+
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    footer = json.dumps({'sources': sources, 'paths': paths},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    with open(index_tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(paths)))
+        offsets.tofile(f)
+        f.write(footer)
+
+    os.replace(data_tmp, os.path.join(cache_dir, DATA_FILE))
+    os.replace(index_tmp, os.path.join(cache_dir, INDEX_FILE))
+
+
+def read_cache_index(cache_dir: str) -> Optional[Tuple[array, Dict]]:
+    """(offsets, footer) of a cache, or None if missing/corrupt."""
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    magic, count = HEADER.unpack_from(raw)
+    end = HEADER.size + (count + 1) * 8
+    if magic != MAGIC or len(raw) < end:
+        return None
+
+    offsets = array('Q')
+    offsets.frombytes(raw[HEADER.size:end])
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    try:
+        footer = json.loads(raw[end:].decode('utf-8'))
+    except ValueError:
+        return None
+    return offsets, footer
+
+
+# =============================================================================
+# QUERY LAYER
+# =============================================================================
+
+class PatternIndex:
+    """Path index over JSON_integrazione; item values decoded on demand."""
+
+    def __init__(self, json_dir: str = DEFAULT_JSON_DIR, cache_dir: Optional[str] = None):
+        self.json_dir = json_dir
+        self.cache_dir = cache_dir or os.path.join(json_dir, CACHE_DIR_NAME)
+
+        sources = source_files(json_dir)
+        cached = read_cache_index(self.cache_dir)
+        if cached is None or cached[1].get('sources') != sources:
+            build_cache(json_dir, self.cache_dir, sources)
+            cached = read_cache_index(self.cache_dir)
+        self.offsets, footer = cached
+        self.sources = footer['sources']
+        self.paths: List[Tuple[str, str, str, Item, str]] = [tuple(p) for p in footer['paths']]
+
+        # machine -> level -> section -> item -> record position
+        self.tree: Dict[str, Dict[str, Dict[str, Dict[Item, int]]]] = {}
+        for position, (machine, level, section, item, _) in enumerate(self.paths):
+            self.tree.setdefault(machine, {}).setdefault(level, {}).setdefault(section, {})[item] = position
+
+        with open(os.path.join(self.cache_dir, DATA_FILE), 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b''
+        self._record = lru_cache(maxsize=1024)(self._decode)
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self) -> 'PatternIndex':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _decode(self, position: int) -> Any:
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return json.loads(self._data[start:end].decode('utf-8'))
+
+    # -- Navigation -----------------------------------------------------------
+
+    def machines(self) -> List[str]:
+        return list(self.tree)
+
+    def levels(self, machine: str) -> List[str]:
+        return list(self.tree.get(machine, {}))
+
+    def sections(self, machine: str, level: Optional[str] = None) -> List[str]:
+        """Sections of a machine (of one level, or all levels in file order)."""
+        levels = self.tree.get(machine, {})
+        if level is not None:
+            return list(levels.get(level, {}))
+        return [section for sections in levels.values() for section in sections]
+
+    def items(self, machine: str, level: str, section: str) -> List[Item]:
+        return [item for item in self.tree.get(machine, {}).get(level, {}).get(section, {})
+                if item is not NO_ITEM]
+
+    def level_of(self, machine: str, section: str) -> Optional[str]:
+        """Level holding a section (sections are unique within a machine)."""
+        for level, sections in self.tree.get(machine, {}).items():
+            if section in sections:
+                return level
+        return None
+
+    # -- Values ---------------------------------------------------------------
+
+    def get(self, machine: str, level: str, section: str, item: Item = NO_ITEM) -> Any:
+        """
+        Value of an item, or of a whole section when item is None.
+        List positions may be given as int or digit string. Raises KeyError for unknown paths.
+        """
+        records = self.tree[machine][level][section]
+        if item is not NO_ITEM:
+            if item not in records and isinstance(item, str) and item.isdigit():
+                item = int(item)
+            return self._record(records[item])
+        if NO_ITEM in records:
+            return self._record(records[NO_ITEM])
+
+        # Rebuild the section from its items
+        if isinstance(next(iter(records)), int):
+            return [self._record(position) for position in records.values()]
+        return {key: self._record(position) for key, position in records.items()}
+
+    def lookup(self, path: str) -> Any:
+        """Value at 'machine/level/section[/item]'; the level may be omitted."""
+        parts = path.strip('/').split('/')
+        if len(parts) >= 2 and parts[1] not in self.tree.get(parts[0], {}):
+            level = self.level_of(parts[0], parts[1])
+            if level is None:
+                raise KeyError(path)
+            parts.insert(1, level)
+        if len(parts) not in (3, 4):
+            raise KeyError(path)
+        return self.get(*parts)
+
+    def find(self, pattern: str) -> List[str]:
+        """Paths matching a glob pattern (e.g. '*/L3/*/aggregation_rules')."""
+        matches = []
+        for machine, level, section, item, _ in self.paths:
+            path = '/'.join(str(p) for p in (machine, level, section, item) if p is not NO_ITEM)
+            if fnmatch.fnmatchcase(path, pattern):
+                matches.append(path)
+        return matches
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Query JSON_integrazione pattern knowledge through a cached path index')
+    parser.add_argument('path', nargs='?', help='machine/level/section[/item] (level optional)')
+    parser.add_argument('--json-dir', default=DEFAULT_JSON_DIR, help='Pattern JSON folder (default: JSON_integrazione)')
+    parser.add_argument('--cache-dir', help=f'Index cache folder (default: <json-dir>/{CACHE_DIR_NAME})')
+    parser.add_argument('--machines', action='store_true', help='List machines with levels and sections')
+    parser.add_argument('--find', metavar='GLOB', help='List paths matching a glob pattern')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index cache')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.json_dir):
+        print(f"[ERROR] Folder not found: {args.json_dir}")
+        return 1
+
+    if args.rebuild:
+        build_cache(args.json_dir, args.cache_dir or os.path.join(args.json_dir, CACHE_DIR_NAME))
+
+    with PatternIndex(args.json_dir, args.cache_dir) as index:
+        if args.machines:
+            for machine in index.machines():
+                print(machine)
+                for level in index.levels(machine):
+                    print(f"  {level}: {', '.join(index.sections(machine, level))}")
+        elif args.find:
+            for path in index.find(args.find):
+                print(path)
+        elif args.path:
+            try:
+                value = index.lookup(args.path)
+            except KeyError:
+                print(f"[ERROR] Path not found: {args.path}")
+                return 1
+            print(json.dumps(value, indent=2, ensure_ascii=False))
+        else:
+            parser.error('path, --machines or --find is required')
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
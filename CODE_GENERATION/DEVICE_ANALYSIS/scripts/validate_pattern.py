@@ -4,23 +4,39 @@ validate_pattern.py - Validate device pattern JSON against schema v1.0.2
 
 Usage:
     python validate_pattern.py <pattern.json> [schema.json]
+    python validate_pattern.py --batch <folder_or_file> [...] [--schema schema.json] [--jobs N] [--summary summary.json]
 
 Example:
     python validate_pattern.py device_pattern_OnOffAxis.json
     python validate_pattern.py device_pattern_OnOffAxis.json custom_schema.json
+    python validate_pattern.py --batch ./device_analysis --summary validation_summary.json
+
+Batch mode compiles the schema once, validates every device_pattern_*.json found
+(folders are scanned recursively) in a process pool and reports all errors per file.
 """
 
 import sys
 import json
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   '..', 'schemas', 'device_pattern_schema.json')
+PATTERN_FILE_PREFIX = 'device_pattern_'
+
+# Below this many files the process pool costs more than it saves
+MIN_FILES_PER_WORKER = 64
+
 
 def validate_pattern(pattern_path, schema_path=None):
     """Validate a device pattern JSON file against the schema."""
     
     # Default schema path
     if schema_path is None:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        schema_path = os.path.join(script_dir, '..', 'device_pattern_schema.json')
+        schema_path = DEFAULT_SCHEMA_PATH
     
     # Load files
     try:
@@ -65,8 +81,8 @@ def validate_pattern(pattern_path, schema_path=None):
         return validate_basic(pattern, schema)
 
 
-def validate_basic(pattern, schema):
-    """Basic validation without jsonschema library."""
+def basic_errors(pattern, schema):
+    """All errors found by the basic checks (no jsonschema library)."""
     
     errors = []
     
@@ -123,6 +139,15 @@ def validate_basic(pattern, schema):
     if gate_status == 'FAIL' and constraints.get('portability_compliant') is True:
         errors.append("Inconsistency: portability_gate=FAIL but portability_compliant=true")
     
+    return errors
+
+
+def validate_basic(pattern, schema):
+    """Basic validation without jsonschema library."""
+    
+    errors = basic_errors(pattern, schema)
+    gate_status = pattern.get('metadata', {}).get('portability_gate', {}).get('status')
+    
     if errors:
         print(f"âŒ INVALID (basic check): {len(errors)} error(s)")
         for err in errors:
@@ -137,15 +162,169 @@ def validate_basic(pattern, schema):
         return True
 
 
+# =============================================================================
+# BATCH MODE
+# =============================================================================
+
+def load_schema(schema_path: Optional[str] = None) -> Dict:
+    """Read the pattern schema (default: ../schemas/device_pattern_schema.json)."""
+    with open(schema_path or DEFAULT_SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compile_validator(schema: Dict) -> Tuple[Callable[[Dict], List[Dict]], str]:
+    """
+    Compile the schema once into a reusable validator.
+    Returns (validate, kind): validate(pattern) gives every error as {path, message};
+    kind is 'jsonschema' or 'basic' (fallback when jsonschema is not installed).
+    """
+    try:
+        import jsonschema
+    except ImportError:
+        return (lambda pattern: [{'path': '', 'message': message}
+                                 for message in basic_errors(pattern, schema)]), 'basic'
+    
+    validator_cls = jsonschema.validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    validator = validator_cls(schema)
+    
+    def validate(pattern):
+        errors = sorted(validator.iter_errors(pattern), key=lambda e: [str(p) for p in e.absolute_path])
+        return [{'path': ' -> '.join(str(p) for p in e.absolute_path), 'message': e.message}
+                for e in errors]
+    
+    return validate, 'jsonschema'
+
+
+_worker_validate: Optional[Callable[[Dict], List[Dict]]] = None
+
+
+def _init_worker(schema: Dict) -> None:
+    """Process-pool initializer: compile the schema once per worker."""
+    global _worker_validate
+    _worker_validate, _ = compile_validator(schema)
+
+
+def _validate_file(path: str) -> Dict:
+    """Validate one pattern file with the worker's compiled validator."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            pattern = json.load(f)
+    except (OSError, ValueError) as e:
+        return {'file': path, 'fb_name': '', 'valid': False,
+                'errors': [{'path': '', 'message': f"Unreadable pattern file: {e}"}]}
+    
+    errors = _worker_validate(pattern) if isinstance(pattern, dict) else \
+        [{'path': '', 'message': 'Pattern is not a JSON object'}]
+    fb_name = pattern.get('metadata', {}).get('fb_name', '') if isinstance(pattern, dict) else ''
+    return {'file': path, 'fb_name': fb_name, 'valid': not errors, 'errors': errors}
+
+
+def collect_pattern_files(paths: List[str]) -> List[str]:
+    """Files as given, plus every device_pattern_*.json under the given folders (sorted)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for dirpath, _, filenames in os.walk(path):
+                found.extend(os.path.join(dirpath, name) for name in filenames
+                             if name.startswith(PATTERN_FILE_PREFIX) and name.endswith('.json'))
+            files.extend(sorted(found))
+        else:
+            files.append(path)
+    return files
+
+
+def validate_batch(paths: List[str], schema_path: Optional[str] = None,
+                   max_workers: Optional[int] = None) -> Dict:
+    """
+    Validate many pattern files against a schema compiled once.
+    Returns a machine-readable summary with all errors of every invalid file.
+    """
+    global _worker_validate
+    schema = load_schema(schema_path)
+    _worker_validate, kind = compile_validator(schema)  # Also checks the schema; used in-process
+    files = collect_pattern_files(paths)
+    
+    workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(files) < 2 * MIN_FILES_PER_WORKER:
+        results = list(map(_validate_file, files))
+    else:
+        workers = min(workers, len(files) // MIN_FILES_PER_WORKER)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(schema,)) as executor:
+            results = list(executor.map(_validate_file, files,
+                                        chunksize=max(1, len(files) // (workers * 4))))
+    
+    invalid = [r for r in results if not r['valid']]
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'schema': os.path.abspath(schema_path or DEFAULT_SCHEMA_PATH),
+        'schema_version': schema.get('properties', {}).get('schema_version', {}).get('const', ''),
+        'validator': kind,
+        'total': len(results),
+        'valid': len(results) - len(invalid),
+        'invalid': len(invalid),
+        'error_count': sum(len(r['errors']) for r in invalid),
+        'files': results
+    }
+
+
+def print_batch_summary(summary: Dict) -> None:
+    """Human-readable report: every invalid file with all its errors, then totals."""
+    for result in summary['files']:
+        if result['valid']:
+            continue
+        print(f"❌ INVALID: {result['file']} ({len(result['errors'])} error(s))")
+        for error in result['errors']:
+            location = f"{error['path']}: " if error['path'] else ''
+            print(f"   - {location}{error['message']}")
+    
+    print(f"""
+========================================
+BATCH VALIDATION COMPLETE
+========================================
+Files:     {summary['total']}
+Valid:     {summary['valid']}
+Invalid:   {summary['invalid']} ({summary['error_count']} errors)
+Validator: {summary['validator']}{'' if summary['validator'] == 'jsonschema' else '  (pip install jsonschema for full validation)'}
+========================================""")
+
+
 def main():
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Validate device pattern JSON against the schema')
+    parser.add_argument('pattern', nargs='?', help='Pattern JSON file')
+    parser.add_argument('schema', nargs='?', help='Schema JSON file (default: ../schemas/device_pattern_schema.json)')
+    parser.add_argument('--batch', '-b', nargs='+', metavar='PATH',
+                        help='Validate every device_pattern_*.json under these folders/files')
+    parser.add_argument('--schema', '-s', dest='schema_option', help='Schema JSON file for --batch')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Worker processes for --batch (default: CPU count)')
+    parser.add_argument('--summary', metavar='FILE',
+                        help="Write the JSON summary of --batch to FILE ('-' for stdout)")
+    
+    args = parser.parse_args()
+    schema_path = args.schema_option or args.schema
+    
+    if args.batch:
+        if args.pattern:
+            parser.error('--batch takes the files/folders itself; use --schema for the schema')
+        summary = validate_batch(args.batch, schema_path, args.jobs)
+        if args.summary == '-':
+            print(json.dumps(summary, indent=2, ensure_ascii=False))
+        else:
+            print_batch_summary(summary)
+            if args.summary:
+                with open(args.summary, 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, indent=2, ensure_ascii=False)
+                print(f"[OK] Summary: {args.summary}")
+        sys.exit(0 if summary['total'] and not summary['invalid'] else 1)
+    
+    if not args.pattern:
         print(__doc__)
         sys.exit(1)
     
-    pattern_path = sys.argv[1]
-    schema_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    success = validate_pattern(pattern_path, schema_path)
+    success = validate_pattern(args.pattern, schema_path)
     sys.exit(0 if success else 1)
 
 
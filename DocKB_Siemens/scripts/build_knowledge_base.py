@@ -4,10 +4,123 @@ Script per costruire una knowledge base strutturata dai JSON estratti
 """
 
 import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import Counter, defaultdict
+
+try:
+    from kb_text_index import TextIndexBuilder, tokenize
+    from kb_section_store import SECTIONS_INDEX, SectionStore, SectionStoreWriter
+except ImportError:
+    from .kb_text_index import TextIndexBuilder, tokenize
+    from .kb_section_store import SECTIONS_INDEX, SectionStore, SectionStoreWriter
+
+# Versione del formato della KB: incrementare quando cambia l'output (rebuild incrementali)
+BUILDER_VERSION = 5
+
+# Categorie di ricerca: una sezione appartiene alla categoria se contiene
+# almeno uno dei pattern (case-insensitive)
+SEARCH_CATEGORIES = {
+    'parameter': [r'parameter', r'p[0-9]+', r'config', r'setting'],
+    'fault': [r'fault', r'error', r'fail', r'warning'],
+    'alarm': [r'alarm', r'alm', r'event'],
+    'motor': [r'motor', r'drive', r'speed', r'frequency'],
+    'safety': [r'safety', r'notice', r'warning', r'danger'],
+    'function': [r'function', r'feature', r'operation'],
+    'appendix': [r'appendix', r'a:', r'b:', r'c:', r'd:'],
+}
+
+# Parole comuni escluse dalle keywords (oltre alle stopword dell'indice full-text)
+KEYWORD_STOPWORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'di', 'da',
+    'e', 'il', 'la', 'le', 'i', 'un', 'una', 'degli', 'delle'
+}
+
+# Indicizzazione parallela: sezioni per blocco e soglia minima di sezioni
+INDEX_CHUNK_SIZE = 2000
+PARALLEL_MIN_SECTIONS = 20000
+
+
+class SectionClassifier:
+    """
+    Classificazione di una sezione in tutte le categorie con un solo passaggio
+
+    Il testo viene portato in minuscolo una volta: i pattern letterali sono
+    cercati come sottostringhe (un pattern condiviso, es. 'warning', marca
+    tutte le sue categorie), quelli con metacaratteri sono uniti in
+    un'unica regex con gruppi nominati.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.order = list(categories)
+        owners: Dict[str, List[str]] = {}
+        for category, patterns in categories.items():
+            for pattern in patterns:
+                owners.setdefault(pattern, []).append(category)
+
+        self.literals = [(p.lower(), frozenset(cats)) for p, cats in owners.items() if re.escape(p) == p]
+        regex_patterns = [(p, cats) for p, cats in owners.items() if re.escape(p) != p]
+        self.groups = {f'p{i}': frozenset(cats) for i, (_, cats) in enumerate(regex_patterns)}
+        self.regex_categories = frozenset(chain.from_iterable(self.groups.values()))
+        self.regex = re.compile('|'.join(f'(?P<p{i}>{p})' for i, (p, _) in enumerate(regex_patterns)),
+                                re.IGNORECASE) if regex_patterns else None
+
+    def classify(self, lowered: str) -> List[str]:
+        """Categorie del testo (già in minuscolo), nell'ordine di definizione"""
+        found = set()
+        for keyword, categories in self.literals:
+            if not categories <= found and keyword in lowered:
+                found |= categories
+        if self.regex is not None and not self.regex_categories <= found:
+            for match in self.regex.finditer(lowered):
+                found |= self.groups[match.lastgroup]
+                if self.regex_categories <= found:
+                    break
+        return [category for category in self.order if category in found]
+
+
+CLASSIFIER = SectionClassifier(SEARCH_CATEGORIES)
+
+# Caratteri che re.IGNORECASE equipara a lettere ASCII ma che lower() non converte
+_REGEX_CASE_FOLD = {'ı': 'i', 'ſ': 's', 'İ': 'i'}
+
+
+def keywords_from_counts(counts: Counter, top_n: int = 5) -> List[str]:
+    """Keywords (token alfanumerici di almeno 4 caratteri) più frequenti"""
+    keywords = []
+    for term, _ in counts.most_common():
+        if len(term) >= 4 and term.isascii() and term.isalnum() and term not in KEYWORD_STOPWORDS:
+            keywords.append(term)
+            if len(keywords) == top_n:
+                break
+    return keywords
+
+
+def analyze_section(content: str) -> Tuple[List[str], Counter, int, List[str]]:
+    """
+    Analisi completa di una sezione in un passaggio
+
+    Returns:
+        (categorie, term frequency per l'indice full-text, numero di token, keywords)
+    """
+    lowered = content.lower()
+    tokens = tokenize(lowered)
+    counts = Counter(tokens)
+    if not lowered.isascii():
+        for char, folded in _REGEX_CASE_FOLD.items():
+            if char in content:
+                lowered = lowered.replace(char.lower(), folded)
+    return CLASSIFIER.classify(lowered), counts, len(tokens), keywords_from_counts(counts)
+
+
+def _analyze_chunk(contents: List[str]) -> List[Tuple[List[str], Counter, int, List[str]]]:
+    """Worker del process pool: analizza un blocco di sezioni"""
+    return [analyze_section(content) for content in contents]
 
 
 class KnowledgeBaseBuilder:
@@ -17,44 +130,63 @@ class KnowledgeBaseBuilder:
         self.sections = {}
         self.chapters = {}
         self.search_index = defaultdict(list)
+        self.text_index = TextIndexBuilder()
         self.metadata = {}
 
-    def load_sections(self) -> Dict[int, Dict[str, Any]]:
-        """Carica tutti i file sezione JSON (anche in sottocartelle)"""
-        print(f"Ricerca file JSON in {self.json_dir}...")
-        # Usa rglob per trovare i file anche nelle sottocartelle
-        section_files = list(self.json_dir.rglob('sezione_*.json'))
-        total_files = len(section_files)
-        
-        if total_files == 0:
-            print(f"⚠ Nessun file trovato in {self.json_dir}. Verificare il percorso.")
-            return {}
-
-        print(f"Caricamento di {total_files:,} sezioni...")
+    def _iter_section_sources(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Sezioni estratte come (nome, cartella PDF, dati)
 
-        sections = {}
-        # Contatore per ID univoci 
-        global_id_counter = 1
-        
-        for idx, section_file in enumerate(section_files, 1):
-            if idx % 1000 == 0:
-                print(f"  → Caricamento: {idx:,} / {total_files:,} ({(idx/total_files)*100:.1f}%)")
-                
+        Legge gli archivi sections.dat/.idx e, nelle cartelle senza archivio,
+        i singoli file sezione_*.json (estrazioni precedenti o minimal).
+        """
+        store_dirs = sorted(p.parent for p in self.json_dir.rglob(SECTIONS_INDEX))
+        for store_dir in store_dirs:
+            store = SectionStore(store_dir)
+            try:
+                for name, data in store:
+                    yield name, store_dir.name, data
+            finally:
+                store.close()
+
+        packed = set(store_dirs)
+        for section_file in self.json_dir.rglob('sezione_*.json'):
+            if section_file.parent in packed:
+                continue
             try:
                 with open(section_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    section_id = global_id_counter
-                    sections[section_id] = {
-                        'id': f'sezione_{section_id:06d}',
-                        'file': section_file.name,
-                        'source_pdf': section_file.parent.name,
-                        'content': data.get('content', ''),
-                        'length': data.get('length', 0),
-                        'line_count': data.get('line_count', 0)
-                    }
-                    global_id_counter += 1
             except Exception as e:
                 print(f"⚠ Errore parsing {section_file.name}: {e}")
+                continue
+            yield section_file.name, section_file.parent.name, data
+
+    def load_sections(self) -> Dict[int, Dict[str, Any]]:
+        """Carica tutte le sezioni estratte (anche in sottocartelle)"""
+        print(f"Ricerca sezioni in {self.json_dir}...")
+
+        sections = {}
+        # Contatore per ID univoci
+        global_id_counter = 1
+
+        for name, source_pdf, data in self._iter_section_sources():
+            if global_id_counter % 1000 == 0:
+                print(f"  → Caricamento: {global_id_counter:,} sezioni")
+
+            section_id = global_id_counter
+            sections[section_id] = {
+                'id': f'sezione_{section_id:06d}',
+                'file': name,
+                'source_pdf': source_pdf,
+                'content': data.get('content', ''),
+                'length': data.get('length', 0),
+                'line_count': data.get('line_count', 0)
+            }
+            global_id_counter += 1
+
+        if not sections:
+            print(f"⚠ Nessuna sezione trovata in {self.json_dir}. Verificare il percorso.")
+            return {}
 
         print(f"✓ Caricate {len(sections):,} sezioni totali")
         self.sections = sections
@@ -95,49 +227,62 @@ class KnowledgeBaseBuilder:
         self.chapters = dict(sorted(chapters.items()))
         return self.chapters
 
-    def build_search_index(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Crea indice di ricerca per keywords"""
+    def _analyze_sections(self, max_workers: Optional[int] = None) -> Iterable[Tuple[List[str], Counter, int, List[str]]]:
+        """analyze_section() per ogni sezione, in ordine; a blocchi in più processi per i manuali grandi"""
+        contents = [section['content'] for section in self.sections.values()]
+        chunks = [contents[i:i + INDEX_CHUNK_SIZE] for i in range(0, len(contents), INDEX_CHUNK_SIZE)]
+        workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+
+        if len(contents) < PARALLEL_MIN_SECTIONS or workers <= 1:
+            yield from map(analyze_section, contents)
+            return
+
+        print(f"  → {len(chunks)} blocchi su {workers} processi")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from chain.from_iterable(pool.map(_analyze_chunk, chunks))
+
+    def build_search_index(self, max_workers: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Crea indice di ricerca per categorie e indice full-text (BM25)
+
+        Categorie, token e keywords di ogni sezione sono calcolati in un unico
+        passaggio (analyze_section); le keywords restano sulla sezione per
+        enrich_sections().
+
+        Args:
+            max_workers: Processi per l'analisi (default: numero di CPU;
+                usati solo oltre PARALLEL_MIN_SECTIONS sezioni)
+        """
         total_sections = len(self.sections)
         print(f"\nCostruzione indice di ricerca per {total_sections:,} sezioni...")
 
         search_index = defaultdict(list)
-        categories = {
-            'parameter': [r'parameter', r'p[0-9]+', r'config', r'setting'],
-            'fault': [r'fault', r'error', r'fail', r'warning'],
-            'alarm': [r'alarm', r'alm', r'event'],
-            'motor': [r'motor', r'drive', r'speed', r'frequency'],
-            'safety': [r'safety', r'notice', r'warning', r'danger'],
-            'function': [r'function', r'feature', r'operation'],
-            'appendix': [r'appendix', r'a:', r'b:', r'c:', r'd:'],
-        }
+        text_index = TextIndexBuilder()
 
-        # Pre-compila le regex per categoria per velocità
-        compiled_regex = {cat: [re.compile(kw, re.IGNORECASE) for kw in kws] 
-                         for cat, kws in categories.items()}
-
-        for idx, (section_id, section) in enumerate(self.sections.items(), 1):
+        analyses = self._analyze_sections(max_workers)
+        for idx, ((section_id, section), analysis) in enumerate(zip(self.sections.items(), analyses), 1):
             if idx % 5000 == 0:
                 print(f"  → Indicizzazione: {idx:,} / {total_sections:,} ({(idx/total_sections)*100:.1f}%)")
-                
-            content = section['content']
-            
-            for category, regex_list in compiled_regex.items():
-                match_found = False
-                for pattern in regex_list:
-                    if pattern.search(content):
-                        match_found = True
-                        break
-                
-                if match_found:
-                    search_index[category].append({
-                        'section_id': section['id'],
-                        'section_num': section_id,
-                        'content_preview': content[:100].replace('\n', ' '),
-                        'relevance': 0.8
-                    })
+
+            section_categories, counts, length, keywords = analysis
+            preview = section['content'][:100].replace('\n', ' ')
+            section['keywords'] = keywords
+
+            for category in section_categories:
+                search_index[category].append({
+                    'section_id': section['id'],
+                    'section_num': section_id,
+                    'content_preview': preview,
+                    'relevance': 0.8
+                })
+
+            text_index.add_counts(counts, length, section_id=section['id'], section_num=section_id,
+                                  preview=preview, categories=section_categories)
 
         print(f"✓ Indicizzate {len(search_index)} categorie")
+        print(f"✓ Indice full-text: {len(text_index.postings):,} termini")
         self.search_index = search_index
+        self.text_index = text_index
         return dict(search_index)
 
     def build_master_index(self) -> Dict[str, Any]:
@@ -187,6 +332,12 @@ class KnowledgeBaseBuilder:
 
     def enrich_sections(self) -> Dict[str, Any]:
         """Arricchisce le sezioni con metadati e link"""
+        enriched = dict(self.iter_enriched_sections())
+        print(f"✓ Arricchite {len(enriched):,} sezioni")
+        return enriched
+
+    def iter_enriched_sections(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Sezioni arricchite con metadati e link, una alla volta"""
         total = len(self.sections)
         print(f"\nArricchimento di {total:,} sezioni con metadati...")
 
@@ -196,8 +347,6 @@ class KnowledgeBaseBuilder:
             for sid in s_ids:
                 section_to_chapter[sid] = chap_id
 
-        enriched = {}
-
         for idx, (section_id, section) in enumerate(self.sections.items(), 1):
             if idx % 10000 == 0:
                 print(f"  → Arricchimento: {idx:,} / {total:,} ({(idx/total)*100:.1f}%)")
@@ -205,8 +354,8 @@ class KnowledgeBaseBuilder:
             # Trova capitolo della sezione (veloce via mappa)
             chapter_id = section_to_chapter.get(section_id)
 
-            # Estrai keywords dal contenuto
-            keywords = self._extract_keywords(section['content'])
+            # Keywords già estratte da build_search_index(), altrimenti dal contenuto
+            keywords = section['keywords'] if 'keywords' in section else self._extract_keywords(section['content'])
 
             enriched_section = {
                 'id': section['id'],
@@ -226,23 +375,11 @@ class KnowledgeBaseBuilder:
                 }
             }
 
-            enriched[section['id']] = enriched_section
-
-        print(f"✓ Arricchite {len(enriched):,} sezioni")
-        return enriched
+            yield section['id'], enriched_section
 
     def _extract_keywords(self, text: str, top_n: int = 5) -> List[str]:
         """Estrae keywords dal testo"""
-        # Parole comuni da escludere
-        stopwords = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'di', 'da',
-            'e', 'il', 'la', 'le', 'i', 'un', 'una', 'degli', 'delle'
-        }
-
-        words = re.findall(r'\b[a-z0-9]{4,}\b', text.lower())
-        keywords = list(set(w for w in words if w not in stopwords))[:top_n]
-        return keywords
+        return keywords_from_counts(Counter(tokenize(text)), top_n)
 
     def _get_neighbor_section(self, section_id: int, offset: int) -> Optional[str]:
         """Ottiene sezione vicina"""
@@ -273,23 +410,16 @@ class KnowledgeBaseBuilder:
             json.dump(dict(self.search_index), f, indent=2, ensure_ascii=False)
         print(f"✓ search_index.json salvato")
 
-        # Salva sezioni arricchite
-        enriched = self.enrich_sections()
-        sections_dir = out_path / 'sections'
-        sections_dir.mkdir(exist_ok=True)
+        # Salva indice full-text
+        self.text_index.save(out_path)
+        print(f"✓ text_index.* salvati")
 
-        total_save = len(enriched)
-        print(f"\nSalvataggio di {total_save:,} file sezione...")
-
-        for idx, (section_id, enriched_data) in enumerate(enriched.items(), 1):
-            if idx % 5000 == 0:
-                print(f"  → Salvataggio: {idx:,} / {total_save:,} ({(idx/total_save)*100:.1f}%)")
-                
-            section_file = sections_dir / f"{section_id}.json"
-            with open(section_file, 'w', encoding='utf-8') as f:
-                json.dump(enriched_data, f, indent=2, ensure_ascii=False)
+        # Salva sezioni arricchite nell'archivio sections.dat/.idx
+        with SectionStoreWriter(out_path) as store:
+            for section_id, enriched_data in self.iter_enriched_sections():
+                store.add(section_id, enriched_data)
 
-        print(f"✓ {len(enriched):,} sezioni arricchite salvate in sections/")
+        print(f"✓ {len(store):,} sezioni arricchite salvate in sections.dat")
 
         # Salva metadata globali
         metadata = {
@@ -315,6 +445,7 @@ def main():
     parser = argparse.ArgumentParser(description='Build Knowledge Base from extracted JSON sections')
     parser.add_argument('--input-dir', default='output', help='Directory containing extracted JSON sections (default: output)')
     parser.add_argument('--output-dir', default='knowledge_base', help='Directory where to save the KB (default: knowledge_base)')
+    parser.add_argument('--jobs', type=int, default=None, help='Processes used to index large manuals (default: CPU count)')
     
     args = parser.parse_args()
     
@@ -331,7 +462,7 @@ def main():
     builder.identify_chapters()
 
     # Crea search index
-    builder.build_search_index()
+    builder.build_search_index(max_workers=args.jobs)
 
     # Crea indice master
     builder.build_master_index()
@@ -2,23 +2,167 @@
 """
 Estrae allarmi e fault dalla knowledge base SINAMICS
 Crea file di configurazione per uso in TIA Portal
+
+Tutte le sezioni della KB vengono scansionate (in più processi per i manuali
+grandi) cercando le voci SINAMICS a inizio riga, es. "F07801 (A) Motore:
+sovracorrente". Oltre ad alarms_faults.json viene scritta code_table.json,
+tabella ordinata per codice normalizzato con ricerca binaria (CodeTable).
 """
 
 import json
+import os
 import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from collections import defaultdict
 
+try:
+    from kb_section_store import SectionStore
+except ImportError:
+    from .kb_section_store import SectionStore
+
+# Versione dell'estrazione: incrementare quando cambia l'output (rebuild incrementali)
+ALARM_EXTRACTOR_VERSION = 2
+
+CODE_TABLE_FILE = "code_table.json"
+
+# Prefisso del codice -> tipo
+CODE_TYPES = {'A': 'alarm', 'F': 'fault'}
+
+# Voce allarme/fault a inizio riga: lettera, numero, reazione opzionale tra parentesi, testo
+ENTRY_RE = re.compile(r'^[ \t]*([AF])(\d{4,5})\b[ \t]*(?:\(([^)\n]*)\))?[ \t]*(.*)$', re.MULTILINE)
+REMEDY_RE = re.compile(r'^[ \t]*(?:remedy|rimedio|abhilfe)[ \t]*:?[ \t]*(.*)$', re.MULTILINE | re.IGNORECASE)
+CODE_KEY_RE = re.compile(r'([AF]?)[ \t]*0*(\d{1,6})')
+
+# Lunghezza massima di descrizione e soluzione
+TEXT_LIMIT = 200
+
+# Sezioni per blocco e soglia oltre la quale la scansione usa più processi
+SCAN_CHUNK_SIZE = 5000
+PARALLEL_MIN_SECTIONS = 20000
+
+
+def normalize_code(code: str) -> Optional[str]:
+    """
+    Chiave di ordinamento di un codice: numero a 5 cifre + lettera
+
+    'F7801', 'f07801' -> '07801F'; '7801' -> '07801' (prefisso di A/F)
+    Ritorna None se il codice non ha il formato SINAMICS.
+    """
+    match = CODE_KEY_RE.fullmatch(code.strip().upper())
+    if match is None:
+        return None
+    letter, number = match.groups()
+    return number.zfill(5) + letter
+
+
+def scan_section(section_id: str, content: str) -> List[Dict[str, Any]]:
+    """Voci di allarme/fault contenute in una sezione, nell'ordine del testo"""
+    entries = []
+    matches = list(ENTRY_RE.finditer(content))
+    for i, match in enumerate(matches):
+        letter, number, reaction, text = match.groups()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        description = text.strip()
+        if not description:
+            # Testo sulla riga successiva
+            description = content[match.end():end].strip().split('\n', 1)[0].strip()
+
+        entry = {
+            'code': letter + number,
+            'description': description[:TEXT_LIMIT],
+            'section_id': section_id,
+            'type': CODE_TYPES[letter],
+        }
+        if reaction and reaction.strip():
+            entry['reaction'] = reaction.strip()
+        remedy = REMEDY_RE.search(content, match.end(), end)
+        if remedy and remedy.group(1).strip():
+            entry['solution'] = remedy.group(1).strip()[:TEXT_LIMIT]
+        entries.append(entry)
+    return entries
+
+
+def _scan_store_range(kb_dir: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Worker del process pool: scansiona le sezioni [start, end) dell'archivio"""
+    store = SectionStore(kb_dir)
+    try:
+        entries = []
+        for position, section_id in enumerate(store.ids()[start:end], start):
+            entries.extend(scan_section(section_id, store.at(position).get('content', '')))
+        return entries
+    finally:
+        store.close()
+
+
+class CodeTable:
+    """Tabella allarmi/fault ordinata per codice normalizzato (ricerca binaria)"""
+
+    def __init__(self, keys: List[str], entries: List[Dict[str, Any]]):
+        self.keys = keys
+        self.entries = entries
+
+    @classmethod
+    def from_database(cls, data: Dict[str, Any]) -> 'CodeTable':
+        """Tabella dal risultato di build_database() (o da alarms_faults.json)"""
+        rows = []
+        for group in ('alarms', 'faults'):
+            for code, entry in data.get(group, {}).items():
+                key = normalize_code(entry.get('code', code))
+                if key is not None:
+                    rows.append((key, entry))
+        rows.sort(key=lambda row: row[0])
+        return cls([key for key, _ in rows], [entry for _, entry in rows])
+
+    @classmethod
+    def load(cls, path) -> 'CodeTable':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['keys'], data['entries'])
+
+    def save(self, path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'keys': self.keys, 'entries': self.entries},
+                      f, ensure_ascii=False, separators=(',', ':'))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, code: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Voci con il codice indicato
+
+        Args:
+            code: 'F07801', 'F7801' o solo il numero ('7801': allarmi e fault)
+            kind: 'alarm' o 'fault' per filtrare il tipo
+        """
+        key = normalize_code(code)
+        if key is None:
+            return []
+        results = []
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i].startswith(key):
+            entry = self.entries[i]
+            if kind is None or entry.get('type') == kind:
+                results.append(entry)
+            i += 1
+        return results
+
 
 class AlarmFaultExtractor:
     """Estrae e organizza dati di allarmi e fault"""
 
-    def __init__(self, kb_dir: str = "knowledge_base"):
+    def __init__(self, kb_dir: str = "knowledge_base", max_workers: Optional[int] = None):
         self.kb_dir = Path(kb_dir)
         self.sections_dir = self.kb_dir / "sections"
+        # Archivio sezioni (sections.dat/.idx); le KB precedenti usano sections/
+        self.sections = SectionStore.open(self.kb_dir)
+        self.max_workers = max_workers
         self.alarms = defaultdict(dict)
         self.faults = defaultdict(dict)
+        self._database: Optional[Dict[str, Any]] = None
 
     def extract_from_section(self, section_id: str) -> Tuple[str, str, str]:
         """
@@ -28,105 +172,99 @@ class AlarmFaultExtractor:
             section_id: ID della sezione
 
         Returns:
-            Tuple (tipo, codice, descrizione) o None
+            Tuple (tipo, codice, descrizione) della prima voce o None
         """
-        section_file = self.sections_dir / f"{section_id}.json"
-
-        if not section_file.exists():
-            return None
-
         try:
-            with open(section_file, 'r', encoding='utf-8') as f:
-                section = json.load(f)
-
-            content = section.get('content', '').lower()
-            lines = section.get('content', '').split('\n')
-
-            # Pattern per allarmi e fault
-            alarm_pattern = r'(?:alarm|alm)\s+([0-9]+|[a-f0-9]{5})'
-            fault_pattern = r'(?:fault|f[0-9]{4,5}|error|err)\s+([0-9]+|[a-f0-9]{5})'
-
-            # Cerca pattern in contenuto
-            alarm_match = re.search(alarm_pattern, content)
-            fault_match = re.search(fault_pattern, content)
-
-            description = '\n'.join(lines[:5])  # Prime 5 righe come descrizione
-
-            if alarm_match:
-                alarm_code = alarm_match.group(1)
-                return ('alarm', alarm_code, description)
-            elif fault_match:
-                fault_code = fault_match.group(1)
-                return ('fault', fault_code, description)
-
-            return None
+            if self.sections is not None:
+                section = self.sections.get(section_id)
+                if section is None:
+                    return None
+            else:
+                section_file = self.sections_dir / f"{section_id}.json"
+                if not section_file.exists():
+                    return None
+                with open(section_file, 'r', encoding='utf-8') as f:
+                    section = json.load(f)
         except json.JSONDecodeError:
             return None
 
+        entries = scan_section(section_id, section.get('content', ''))
+        if not entries:
+            return None
+        return (entries[0]['type'], entries[0]['code'], entries[0]['description'])
+
+    def iter_sections(self) -> Iterator[Tuple[str, str]]:
+        """(id, contenuto) di tutte le sezioni della KB, in ordine"""
+        if self.sections is not None:
+            for section_id, section in self.sections:
+                yield section_id, section.get('content', '')
+        elif self.sections_dir.exists():
+            for section_file in sorted(self.sections_dir.glob('*.json')):
+                try:
+                    with open(section_file, 'r', encoding='utf-8') as f:
+                        section = json.load(f)
+                except json.JSONDecodeError:
+                    continue
+                yield section.get('id', section_file.stem), section.get('content', '')
+
+    def _scan(self) -> Iterable[Dict[str, Any]]:
+        """Voci di tutte le sezioni; a blocchi in più processi per i manuali grandi"""
+        total = len(self.sections) if self.sections is not None else 0
+        chunks = -(-total // SCAN_CHUNK_SIZE)
+        workers = min(self.max_workers or os.cpu_count() or 1, chunks)
+
+        if total < PARALLEL_MIN_SECTIONS or workers <= 1:
+            for section_id, content in self.iter_sections():
+                yield from scan_section(section_id, content)
+            return
+
+        print(f"  → {total:,} sezioni in {chunks} blocchi su {workers} processi")
+        starts = range(0, total, SCAN_CHUNK_SIZE)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for entries in pool.map(_scan_store_range, [str(self.kb_dir)] * chunks, starts,
+                                    [min(start + SCAN_CHUNK_SIZE, total) for start in starts]):
+                yield from entries
+
     def build_database(self) -> Dict[str, Dict]:
         """
-        Costruisce il database di allarmi e fault
+        Costruisce il database di allarmi e fault (calcolato una sola volta)
+
+        Per ogni codice vale la prima occorrenza nel manuale; alarms e faults
+        sono ordinati per codice normalizzato.
 
         Returns:
             Dizionario con allarmi e fault organizzati
         """
+        if self._database is not None:
+            return self._database
+
         print("Estrazione allarmi e fault dalla knowledge base...")
 
-        # Cerca nella categoria alarm
-        search_file = self.kb_dir / "search_index.json"
-        if search_file.exists():
-            with open(search_file, 'r', encoding='utf-8') as f:
-                search_index = json.load(f)
-
-            # Processa sezioni di allarmi
-            if 'alarm' in search_index:
-                print("\nELABORAZIONE ALLARMI:")
-                for item in search_index['alarm'][:100]:  # Limita a 100
-                    section_id = item.get('section_id')
-                    content_preview = item.get('content_preview', '')
-
-                    # Estrai codice allarme dal preview
-                    alarm_match = re.search(r'([a-f0-9]{5}|[0-9]{4,5})', content_preview)
-                    if alarm_match:
-                        alarm_code = alarm_match.group(1)
-                        description = content_preview[:200]
-
-                        self.alarms[alarm_code] = {
-                            'code': alarm_code,
-                            'description': description.strip(),
-                            'section_id': section_id,
-                            'type': 'alarm'
-                        }
-
-            # Processa sezioni di fault
-            if 'fault' in search_index:
-                print("\nELABORAZIONE FAULT:")
-                for item in search_index['fault'][:100]:  # Limita a 100
-                    section_id = item.get('section_id')
-                    content_preview = item.get('content_preview', '')
-
-                    # Estrai codice fault dal preview
-                    fault_match = re.search(r'([a-f0-9]{5}|[0-9]{4,5}|f[0-9]{4})', content_preview)
-                    if fault_match:
-                        fault_code = fault_match.group(1)
-                        description = content_preview[:200]
-
-                        self.faults[fault_code] = {
-                            'code': fault_code,
-                            'description': description.strip(),
-                            'section_id': section_id,
-                            'type': 'fault'
-                        }
-
-        print(f"\n✓ Estratti {len(self.alarms)} allarmi")
-        print(f"✓ Estratti {len(self.faults)} fault")
-
-        return {
-            'alarms': dict(self.alarms),
-            'faults': dict(self.faults),
-            'total_alarms': len(self.alarms),
-            'total_faults': len(self.faults),
+        for entry in self._scan():
+            target = self.alarms if entry['type'] == 'alarm' else self.faults
+            if entry['code'] not in target:
+                target[entry['code']] = entry
+
+        alarms = dict(sorted(self.alarms.items(), key=lambda item: normalize_code(item[0])))
+        faults = dict(sorted(self.faults.items(), key=lambda item: normalize_code(item[0])))
+
+        print(f"\n✓ Estratti {len(alarms)} allarmi")
+        print(f"✓ Estratti {len(faults)} fault")
+
+        self._database = {
+            'alarms': alarms,
+            'faults': faults,
+            'total_alarms': len(alarms),
+            'total_faults': len(faults),
         }
+        return self._database
+
+    def save_code_table(self, output_file: str = CODE_TABLE_FILE) -> CodeTable:
+        """Salva la tabella dei codici ordinata (ricerca binaria con CodeTable)"""
+        table = CodeTable.from_database(self.build_database())
+        table.save(output_file)
+        print(f"✓ Tabella codici salvata: {output_file} ({len(table)} voci)")
+        return table
 
     def save_to_json(self, output_file: str = "alarms_faults.json") -> None:
         """Salva i dati in JSON"""
@@ -156,7 +294,7 @@ class AlarmFaultExtractor:
                     code,
                     alarm['description'],
                     alarm['section_id'],
-                    'Vedere manuale SINAMICS'
+                    alarm.get('solution', 'Vedere manuale SINAMICS')
                 ])
 
             # Fault
@@ -166,7 +304,7 @@ class AlarmFaultExtractor:
                     code,
                     fault['description'],
                     fault['section_id'],
-                    'Vedere manuale SINAMICS'
+                    fault.get('solution', 'Vedere manuale SINAMICS')
                 ])
 
         print(f"✓ CSV salvato: {output_file}")
@@ -286,7 +424,14 @@ END_FUNCTION
 
 def main():
     """Main function"""
-    extractor = AlarmFaultExtractor(kb_dir="knowledge_base")
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Extract alarms and faults from a SINAMICS KB')
+    parser.add_argument('--kb-dir', default='knowledge_base', help='Knowledge base directory (default: knowledge_base)')
+    parser.add_argument('--jobs', type=int, default=None, help='Processes used to scan large KBs (default: CPU count)')
+    args = parser.parse_args()
+
+    extractor = AlarmFaultExtractor(kb_dir=args.kb_dir, max_workers=args.jobs)
 
     print("=== Estrazione Allarmi e Fault da SINAMICS KB ===\n")
 
@@ -298,6 +443,7 @@ def main():
     extractor.save_to_json("alarms_faults.json")
     extractor.save_to_csv("alarms_faults.csv")
     extractor.save_to_scl_include("Alarms_Faults.scl")
+    extractor.save_code_table(CODE_TABLE_FILE)
 
     # Stampa statistiche
     print(f"\n=== Statistiche ===")
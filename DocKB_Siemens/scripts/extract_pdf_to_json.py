@@ -4,11 +4,26 @@ Script per estrarre dati da PDF e salvarli in JSON usando pandoc
 """
 
 import json
+import re
 import subprocess
 import sys
 import os
+import textwrap
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    from kb_section_store import SECTIONS_DATA, SectionStoreWriter
+except ImportError:
+    from .kb_section_store import SECTIONS_DATA, SectionStoreWriter
+
+# Versione dell'estrazione: incrementare quando cambia l'output (rebuild incrementali)
+EXTRACTOR_VERSION = 4
+
+# Pagine per ogni chiamata a pdftotext (-f/-l)
+PAGES_PER_CHUNK = 25
 
 
 class PDFExtractor:
@@ -54,13 +69,35 @@ class PDFExtractor:
             
             raise RuntimeError(install_msg)
 
-    def extract_text(self) -> str:
-        """Estrae il testo dal PDF usando pdftotext"""
-        print(f"Estrazione testo da: {self.pdf_path}")
+    def page_count(self) -> Optional[int]:
+        """Numero di pagine del PDF (pdfinfo), None se non determinabile"""
+        try:
+            result = subprocess.run(
+                ['pdfinfo', str(self.pdf_path)],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            return None
+        match = re.search(r'^Pages:\s+(\d+)', result.stdout, re.MULTILINE)
+        return int(match.group(1)) if match else None
+
+    def extract_text(self, first_page: Optional[int] = None, last_page: Optional[int] = None) -> str:
+        """Estrae il testo dal PDF (o da un intervallo di pagine) usando pdftotext"""
+        if first_page is None:
+            print(f"Estrazione testo da: {self.pdf_path}")
+
+        cmd = ['pdftotext']
+        if first_page is not None:
+            cmd += ['-f', str(first_page)]
+        if last_page is not None:
+            cmd += ['-l', str(last_page)]
+        cmd += [str(self.pdf_path), '-']
 
         try:
             result = subprocess.run(
-                ['pdftotext', str(self.pdf_path), '-'],
+                cmd,
                 capture_output=True,
                 text=True,
                 check=True
@@ -69,121 +106,182 @@ class PDFExtractor:
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Errore durante estrazione: {e.stderr}")
 
-    def extract_to_json(self, output_dir: str = ".") -> Dict[str, Any]:
-        """
-        Estrae PDF e struttura i dati in formato JSON
-
-        Args:
-            output_dir: Directory dove salvare i file JSON
-
-        Returns:
-            Dizionario con i dati estratti
+    def iter_text_chunks(self, max_workers: Optional[int] = None,
+                         pages_per_chunk: int = PAGES_PER_CHUNK) -> Iterator[str]:
         """
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-
-        # Estrai il testo
-        text_content = self.extract_text()
-
-        # Struttura i dati
-        data = self._structure_content(text_content)
-
-        # Salva il JSON principale
-        main_json_path = output_path / "documento.json"
-        with open(main_json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-
-        print(f"✓ JSON salvato: {main_json_path}")
-
-        # Se il documento ha sezioni, salva anche file separati
-        if 'sezioni' in data and data['sezioni']:
-            self._save_sections(data['sezioni'], output_path)
+        Testo del PDF a blocchi di pagine, nell'ordine del documento
 
-        return data
-
-    def _structure_content(self, text: str) -> Dict[str, Any]:
-        """
-        Struttura il contenuto del testo estratto
+        I blocchi sono estratti in parallelo (un pdftotext -f/-l per blocco, i
+        thread attendono solo i processi); in memoria restano al massimo due
+        blocchi per worker. Ogni pagina termina con form feed come
+        nell'estrazione completa, quindi i blocchi concatenati coincidono con
+        l'output di extract_text().
 
         Args:
-            text: Testo estratto dal PDF
-
-        Returns:
-            Dizionario con dati strutturati
+            max_workers: pdftotext in parallelo (default: numero di CPU)
+            pages_per_chunk: Pagine per blocco
         """
-        lines = text.split('\n')
-
-        # Rimuovi righe vuote iniziali/finali
-        while lines and not lines[0].strip():
-            lines.pop(0)
-        while lines and not lines[-1].strip():
-            lines.pop()
-
-        # Struttura base
-        structured_data = {
-            "metadata": {
-                "source": self.pdf_path.name,
-                "total_lines": len(lines),
-                "extraction_method": "pandoc"
-            },
-            "sezioni": self._extract_sections(lines),
-            "content": {
-                "text": text.strip(),
-                "lines_count": len([l for l in lines if l.strip()])
-            }
-        }
-
-        return structured_data
-
-    def _extract_sections(self, lines: List[str]) -> List[Dict[str, Any]]:
+        pages = self.page_count()
+        if not pages or pages <= pages_per_chunk:
+            # Numero di pagine ignoto o documento piccolo: una sola estrazione
+            yield self.extract_text()
+            return
+
+        ranges = iter([(first, min(first + pages_per_chunk - 1, pages))
+                       for first in range(1, pages + 1, pages_per_chunk)])
+        chunks = -(-pages // pages_per_chunk)
+        workers = min(max_workers or os.cpu_count() or 1, chunks)
+        print(f"Estrazione testo da: {self.pdf_path} ({pages} pagine, {chunks} blocchi, {workers} worker)")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for _ in range(workers * 2):
+                page_range = next(ranges, None)
+                if page_range is None:
+                    break
+                pending.append(pool.submit(self.extract_text, *page_range))
+            while pending:
+                text = pending.popleft().result()
+                page_range = next(ranges, None)
+                if page_range is not None:
+                    pending.append(pool.submit(self.extract_text, *page_range))
+                yield text
+
+    def iter_sections(self, chunks: Iterable[str],
+                      stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
         """
-        Estrae sezioni dal contenuto (basato su righe vuote e lunghezza)
+        Sezioni del testo (blocchi separati da righe vuote), in streaming
 
         Args:
-            lines: List di righe di testo
+            chunks: Blocchi di testo consecutivi (es. iter_text_chunks())
+            stats: Se passato, riceve 'total_lines' (senza righe vuote iniziali
+                e finali) e 'lines_count' (righe non vuote)
 
-        Returns:
-            List di sezioni strutturate
+        Yields:
+            Sezioni strutturate {content, length, line_count}
         """
-        sezioni = []
-        current_section = []
-
-        for line in lines:
+        current_section: List[str] = []
+        partial = ''
+        line_no = 0
+        first_line = last_line = None
+        non_empty = 0
+
+        def lines_of(chunk_iter):
+            nonlocal partial
+            for chunk in chunk_iter:
+                lines = (partial + chunk).split('\n')
+                partial = lines.pop()
+                yield from lines
+            yield partial
+
+        for line in lines_of(chunks):
+            line_no += 1
             if not line.strip():
                 if current_section:
-                    sezioni.append({
-                        "content": '\n'.join(current_section),
-                        "length": len('\n'.join(current_section)),
-                        "line_count": len(current_section)
-                    })
+                    yield self._make_section(current_section)
                     current_section = []
             else:
+                non_empty += 1
+                if first_line is None:
+                    first_line = line_no
+                last_line = line_no
                 current_section.append(line)
 
         # Aggiungi l'ultima sezione se esiste
         if current_section:
-            sezioni.append({
-                "content": '\n'.join(current_section),
-                "length": len('\n'.join(current_section)),
-                "line_count": len(current_section)
-            })
-
-        return sezioni
+            yield self._make_section(current_section)
+
+        if stats is not None:
+            stats['total_lines'] = last_line - first_line + 1 if first_line else 0
+            stats['lines_count'] = non_empty
+
+    @staticmethod
+    def _make_section(lines: List[str]) -> Dict[str, Any]:
+        content = '\n'.join(lines)
+        return {
+            "content": content,
+            "length": len(content),
+            "line_count": len(lines)
+        }
 
-    def _save_sections(self, sezioni: List[Dict[str, Any]], output_path: Path) -> None:
+    def extract_to_json(self, output_dir: str = ".", include_text: bool = True,
+                        max_workers: Optional[int] = None, pages_per_chunk: int = PAGES_PER_CHUNK,
+                        text_file: Optional[str] = None) -> Dict[str, Any]:
         """
-        Salva ogni sezione in un file JSON separato
+        Estrae PDF e struttura i dati in formato JSON
+
+        Le sezioni vengono scritte (documento.json e archivio sections.dat/.idx
+        con id sezione_NNN) man mano che i blocchi di pagine sono estratti,
+        senza tenerle in memoria.
 
         Args:
-            sezioni: List di sezioni
-            output_path: Directory di output
+            output_dir: Directory dove salvare i file JSON
+            include_text: Salva anche il testo completo in content.text
+            max_workers: pdftotext in parallelo (default: numero di CPU)
+            pages_per_chunk: Pagine per blocco di estrazione
+            text_file: Se indicato, il testo estratto viene scritto anche in questo file
+
+        Returns:
+            Dizionario con metadata e content (le sezioni sono solo su disco)
         """
-        for idx, sezione in enumerate(sezioni, 1):
-            section_file = output_path / f"sezione_{idx:03d}.json"
-            with open(section_file, 'w', encoding='utf-8') as f:
-                json.dump(sezione, f, indent=2, ensure_ascii=False)
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
 
-        print(f"✓ {len(sezioni)} sezioni separate salvate in {output_path}")
+        text_parts: Optional[List[str]] = [] if include_text else None
+        stats: Dict[str, int] = {}
+
+        main_json_path = output_path / "documento.json"
+        tmp_path = main_json_path.with_name(main_json_path.name + ".tmp")
+        text_out = None
+        try:
+            if text_file:
+                Path(text_file).parent.mkdir(parents=True, exist_ok=True)
+                text_out = open(text_file, 'w', encoding='utf-8')
+
+            def chunks():
+                for chunk in self.iter_text_chunks(max_workers, pages_per_chunk):
+                    if text_parts is not None:
+                        text_parts.append(chunk)
+                    if text_out is not None:
+                        text_out.write(chunk)
+                    yield chunk
+
+            # documento.json scritto in streaming, stesso formato di json.dump(indent=2)
+            with open(tmp_path, 'w', encoding='utf-8') as f, SectionStoreWriter(output_path) as sections:
+                f.write('{\n  "sezioni": [')
+                total_sections = 0
+                for total_sections, sezione in enumerate(self.iter_sections(chunks(), stats), 1):
+                    if total_sections > 1:
+                        f.write(',')
+                    f.write('\n' + textwrap.indent(json.dumps(sezione, indent=2, ensure_ascii=False), '    '))
+                    sections.add(f"sezione_{total_sections:03d}", sezione)
+                f.write('\n  ],\n' if total_sections else '],\n')
+
+                content: Dict[str, Any] = {"lines_count": stats['lines_count']}
+                if text_parts is not None:
+                    content = {"text": ''.join(text_parts).strip(), **content}
+                data = {
+                    "metadata": {
+                        "source": self.pdf_path.name,
+                        "total_lines": stats['total_lines'],
+                        "total_sections": total_sections,
+                        "extraction_method": "pandoc"
+                    },
+                    "content": content
+                }
+                f.write(json.dumps(data, indent=2, ensure_ascii=False)[2:])
+            os.replace(tmp_path, main_json_path)
+        finally:
+            if text_out is not None:
+                text_out.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        print(f"✓ JSON salvato: {main_json_path}")
+        if total_sections:
+            print(f"✓ {total_sections} sezioni salvate in {output_path}/sections.dat")
+
+        return data
 
     def save_text(self, text: str, output_path: str) -> None:
         """
@@ -218,6 +316,12 @@ def main():
     pdf_group.add_argument('--pdf-dir', help='Directory containing PDF files')
     
     parser.add_argument('--output-dir', default='output', help='Output directory (default: output)')
+    parser.add_argument('--no-text', action='store_true',
+                        help='Omit the full text copy (content.text) from documento.json')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Parallel pdftotext processes (default: CPU count)')
+    parser.add_argument('--pages-per-chunk', type=int, default=PAGES_PER_CHUNK,
+                        help=f'Pages per pdftotext call (default: {PAGES_PER_CHUNK})')
     
     args = parser.parse_args()
     
@@ -268,18 +372,20 @@ def main():
             # Crea l'estrattore
             extractor = PDFExtractor(str(pdf_file))
 
-            # Estrai a JSON
+            # Estrai a JSON (il testo estratto va in streaming nel file .txt)
             print("\n=== Estrazione a JSON ===")
-            json_data = extractor.extract_to_json(str(pdf_output_dir))
-            print(f"Dati estratti: {json_data['metadata']}")
-            print(f"Sezioni trovate: {len(json_data['sezioni'])}")
-            total_sections += len(json_data['sezioni'])
-
-            # Salva il testo estratto
-            print("\n=== Salvataggio testo estratto ===")
-            text_content = json_data['content']['text']
             txt_filename = f"{pdf_output_dir}/{pdf_file.stem}.txt"
-            extractor.save_text(text_content, txt_filename)
+            json_data = extractor.extract_to_json(
+                str(pdf_output_dir),
+                include_text=not args.no_text,
+                max_workers=args.jobs,
+                pages_per_chunk=args.pages_per_chunk,
+                text_file=txt_filename
+            )
+            print(f"Dati estratti: {json_data['metadata']}")
+            print(f"Sezioni trovate: {json_data['metadata']['total_sections']}")
+            total_sections += json_data['metadata']['total_sections']
+            print(f"✓ Testo salvato: {txt_filename}")
 
             # Stampa statistiche per questo PDF
             print("\n=== Statistiche ===")
@@ -293,6 +399,9 @@ def main():
             if json_files:
                 json_size = sum(f.stat().st_size for f in json_files) / 1024 / 1024
                 print(f"Dimensione totale JSON: {json_size:.2f} MB")
+            sections_file = Path(pdf_output_dir) / SECTIONS_DATA
+            if sections_file.exists():
+                print(f"Archivio sezioni: {sections_file.stat().st_size / 1024 / 1024:.2f} MB")
 
             print("\n✓ Estrazione completata!")
             processed_count += 1
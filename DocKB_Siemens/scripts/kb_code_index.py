@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Indice hash dei codici allarme/fault di una KB unificata o master
+
+Ogni voce è raggiungibile con più chiavi: codice esatto ('F07801'), codice
+normalizzato con lettera ('07801F') e solo numero ('07801'). Le query
+accettano anche le varianti dei buffer diagnostici PLC: numero senza zeri
+iniziali ('7801'), esadecimale ('16#1E79', 'W#16#1E79', '0x1E79').
+
+L'indice viene salvato accanto alla KB (code_index.json) insieme al record
+del file sorgente e ricostruito solo quando la sorgente cambia.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from extract_alarms_faults import normalize_code
+    from kb_state import artifact_record
+except ImportError:
+    from .extract_alarms_faults import normalize_code
+    from .kb_state import artifact_record
+
+CODE_INDEX_FILE = "code_index.json"
+INDEX_VERSION = 1
+
+KINDS = ('ALARM', 'FAULT')
+
+# Notazioni esadecimali: 16#1E79, W#16#1E79, DW#16#1E79, 0x1E79
+HEX_RE = re.compile(r'(?:D?W#)?16#([0-9A-F]+)|0X([0-9A-F]+)')
+
+
+def entry_keys(code: str) -> List[str]:
+    """Chiavi di indice di un codice"""
+    code = code.strip().upper()
+    keys = [code]
+    normalized = normalize_code(code)
+    if normalized is not None:
+        keys.append(normalized)
+        if not normalized.isdigit():
+            keys.append(normalized[:-1])
+    return list(dict.fromkeys(keys))
+
+
+def query_keys(code: str) -> List[str]:
+    """Chiavi da provare per una query, in ordine di priorità"""
+    code = code.strip().upper()
+    keys = [code]
+    normalized = normalize_code(code)
+    if normalized is not None:
+        keys.append(normalized)
+    hex_match = HEX_RE.fullmatch(code)
+    if hex_match:
+        keys.append(str(int(hex_match.group(1) or hex_match.group(2), 16)).zfill(5))
+    return list(dict.fromkeys(keys))
+
+
+class CodeIndex:
+    """Voci allarme/fault per tipo + dizionario chiave -> posizioni delle voci"""
+
+    def __init__(self, entries: Dict[str, List[Dict[str, Any]]], keys: Dict[str, Dict[str, List[int]]]):
+        self.entries = entries
+        self.keys = keys
+
+    @classmethod
+    def build(cls, sources: Dict[str, Iterable[Tuple[str, Dict[str, Any]]]]) -> 'CodeIndex':
+        """
+        Costruisce l'indice
+
+        Args:
+            sources: tipo ('ALARM'/'FAULT') -> coppie (chiave KB, voce) nell'ordine della KB
+        """
+        entries: Dict[str, List[Dict[str, Any]]] = {}
+        keys: Dict[str, Dict[str, List[int]]] = {}
+        for kind in KINDS:
+            kind_entries = entries[kind] = []
+            kind_keys = keys[kind] = {}
+            for kb_key, entry in sources.get(kind, ()):
+                position = len(kind_entries)
+                kind_entries.append({**entry, '_key': kb_key})
+                for key in entry_keys(entry.get('code') or kb_key):
+                    kind_keys.setdefault(key, []).append(position)
+        return cls(entries, keys)
+
+    @classmethod
+    def cached(cls, kb_dir, source_file, loader: Callable[[], Dict[str, Iterable[Tuple[str, Dict[str, Any]]]]]) -> 'CodeIndex':
+        """
+        Indice da code_index.json se costruito dalla stessa sorgente, altrimenti
+        costruito con loader() e salvato (se la directory è scrivibile)
+        """
+        cache_file = Path(kb_dir) / CODE_INDEX_FILE
+        cache = {}
+        if cache_file.exists():
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                cache = {}
+
+        source = artifact_record(source_file, cache.get('source'))
+        if (cache.get('version') == INDEX_VERSION and source is not None
+                and cache.get('source', {}).get('sha256') == source['sha256']):
+            return cls(cache['entries'], cache['keys'])
+
+        index = cls.build(loader())
+        if source is not None:
+            try:
+                tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump({'version': INDEX_VERSION, 'source': source,
+                               'entries': index.entries, 'keys': index.keys},
+                              f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_file, cache_file)
+            except OSError:
+                pass
+        return index
+
+    def lookup(self, kind: str, code: str, system: str = None,
+               system_field: str = 'source_system') -> Optional[Dict[str, Any]]:
+        """Prima voce di tipo `kind` con il codice indicato (opzionalmente di un sistema)"""
+        kind_keys = self.keys.get(kind, {})
+        kind_entries = self.entries.get(kind, [])
+        for key in query_keys(code):
+            for position in kind_keys.get(key, ()):
+                entry = kind_entries[position]
+                if not system or entry.get(system_field) == system:
+                    return entry
+
+        # Codici fuori formato SINAMICS: confronto sul suffisso della chiave KB
+        if normalize_code(code) is None and not HEX_RE.fullmatch(code.strip().upper()):
+            for entry in kind_entries:
+                if system and entry.get(system_field) != system:
+                    continue
+                if entry['_key'].endswith(code) or entry.get('code', '') == code:
+                    return entry
+        return None
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Ingestione batch di PDF in Knowledge Base
+
+Ogni PDF passa per le fasi copia -> estrazione JSON (pdftotext) -> costruzione
+KB -> estrazione allarmi/fault. I PDF sono elaborati in parallelo in un process
+pool (un PDF per processo); il processo principale stampa l'avanzamento per
+fase e, alla fine, aggiorna kb_registry.json una sola volta con scrittura
+atomica (file temporaneo + rename).
+
+La voce di registry salva hash del PDF, versione dell'estrattore e, per ogni
+fase, la chiave di input e il record dell'artefatto prodotto: alla successiva
+ingestione vengono rieseguite solo le fasi con input cambiati.
+
+L'output dei singoli step viene scritto in <kb_dir>/ingest.log, così i log dei
+processi paralleli non si mescolano sulla console.
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    from extract_pdf_to_json import PDFExtractor, EXTRACTOR_VERSION
+    from build_knowledge_base import KnowledgeBaseBuilder, BUILDER_VERSION
+    from extract_alarms_faults import AlarmFaultExtractor, ALARM_EXTRACTOR_VERSION, CODE_TABLE_FILE
+    from kb_state import artifact_record, file_sha256, same_content, stage_key
+except ImportError:
+    from .extract_pdf_to_json import PDFExtractor, EXTRACTOR_VERSION
+    from .build_knowledge_base import KnowledgeBaseBuilder, BUILDER_VERSION
+    from .extract_alarms_faults import AlarmFaultExtractor, ALARM_EXTRACTOR_VERSION, CODE_TABLE_FILE
+    from .kb_state import artifact_record, file_sha256, same_content, stage_key
+
+STAGES = ('copy', 'extract', 'build', 'alarms')
+LOG_FILE = "ingest.log"
+
+# Artefatto di riferimento di ogni fase (relativo alla directory della KB);
+# il suo hash è l'input della fase successiva
+STAGE_ARTIFACTS = {
+    'copy': None,
+    'extract': 'output/documento.json',
+    'build': 'knowledge_base/index.json',
+    'alarms': 'alarms_faults.json',
+}
+
+# Callback di avanzamento del processo corrente: (kb_name, stage, status, seconds)
+_progress: Optional[Callable[[tuple], None]] = None
+
+
+def _init_worker(events) -> None:
+    """Initializer del pool: gli eventi di avanzamento vanno sulla coda del processo principale"""
+    global _progress
+    _progress = events.put
+
+
+def _report(kb_name: str, stage: str, status: str, seconds: float = 0.0) -> None:
+    if _progress is not None:
+        _progress((kb_name, stage, status, seconds))
+
+
+def make_job(pdf_file, kb_name: str, description: str = "", kb_dir=None,
+             scl_include: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Crea un job di ingestione
+
+    Args:
+        pdf_file: PDF sorgente
+        kb_name: Nome della KB
+        description: Descrizione per il registry
+        kb_dir: Directory della KB (contiene PDF, output/ e knowledge_base/)
+        scl_include: Genera anche AlarmHandler.scl
+        force: Riesegue tutte le fasi anche se gli input non sono cambiati
+    """
+    return {
+        'pdf_file': str(pdf_file),
+        'name': kb_name,
+        'description': description,
+        'kb_dir': str(kb_dir),
+        'scl_include': scl_include,
+        'force': force,
+        'previous': None,
+    }
+
+
+def ingest_pdf(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Elabora un PDF e ritorna la voce di registry
+
+    Eseguita nei processi del pool; l'output delle fasi va in <kb_dir>/ingest.log.
+    Con job['previous'] (voce di registry precedente) le fasi con la stessa
+    chiave di input e artefatto invariato vengono saltate.
+
+    Returns:
+        {'entry': voce registry, 'stages': {fase: secondi}, 'skipped': [fasi], 'log': path del log}
+    """
+    kb_name = job['name']
+    kb_dir = Path(job['kb_dir'])
+    kb_dir.mkdir(exist_ok=True, parents=True)
+    output_dir = kb_dir / 'output'
+    kb_out_dir = kb_dir / 'knowledge_base'
+    log_path = kb_dir / LOG_FILE
+    dest_pdf = kb_dir / Path(job['pdf_file']).name
+    previous = job.get('previous') or {}
+    previous_stages = {} if job.get('force') else previous.get('stages', {})
+
+    pdf_sha256 = file_sha256(job['pdf_file'])
+    stage_records: Dict[str, Dict[str, Any]] = {}
+    stages: Dict[str, float] = {}
+    skipped: List[str] = []
+
+    def copy_pdf():
+        if Path(job['pdf_file']).resolve() != dest_pdf.resolve():
+            shutil.copy2(job['pdf_file'], dest_pdf)
+
+    def extract():
+        # Il testo completo non serve alla KB: solo le sezioni
+        PDFExtractor(str(dest_pdf)).extract_to_json(str(output_dir), include_text=False)
+
+    def build():
+        builder = KnowledgeBaseBuilder(str(output_dir))
+        builder.load_sections()
+        builder.identify_chapters()
+        builder.build_search_index(max_workers=job.get('index_workers'))
+        builder.build_master_index()
+        builder.save_knowledge_base(str(kb_out_dir))
+
+    def alarms():
+        extractor = AlarmFaultExtractor(str(kb_out_dir), max_workers=job.get('index_workers'))
+        extractor.save_to_json(str(kb_dir / 'alarms_faults.json'))
+        extractor.save_to_csv(str(kb_dir / 'alarms_faults.csv'))
+        extractor.save_code_table(str(kb_dir / CODE_TABLE_FILE))
+        if job.get('scl_include'):
+            extractor.save_to_scl_include(str(kb_dir / 'AlarmHandler.scl'))
+
+    def artifact_path(stage: str) -> Path:
+        return dest_pdf if stage == 'copy' else kb_dir / STAGE_ARTIFACTS[stage]
+
+    def stage_input(stage: str) -> Optional[str]:
+        if stage == 'copy':
+            return stage_key('copy', pdf_sha256)
+        if stage == 'extract':
+            return stage_key('extract', EXTRACTOR_VERSION, pdf_sha256)
+        upstream = stage_records[STAGES[STAGES.index(stage) - 1]]['artifact']
+        if upstream is None:
+            # Artefatto a monte mancante: la fase viene sempre rieseguita
+            return None
+        upstream = upstream['sha256']
+        if stage == 'build':
+            return stage_key('build', BUILDER_VERSION, upstream)
+        return stage_key('alarms', ALARM_EXTRACTOR_VERSION, upstream, bool(job.get('scl_include')))
+
+    with open(log_path, 'w', encoding='utf-8') as log:
+        for stage, step in zip(STAGES, (copy_pdf, extract, build, alarms)):
+            key = stage_input(stage)
+            prev = previous_stages.get(stage, {})
+            if key is not None and prev.get('input') == key:
+                record = artifact_record(artifact_path(stage), prev.get('artifact'))
+                if same_content(record, prev.get('artifact')):
+                    stage_records[stage] = {'input': key, 'artifact': record}
+                    skipped.append(stage)
+                    _report(kb_name, stage, 'skip')
+                    continue
+            # Una fase rieseguita invalida le successive
+            previous_stages = {}
+
+            _report(kb_name, stage, 'start')
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(log):
+                step()
+            stages[stage] = time.perf_counter() - start
+            stage_records[stage] = {'input': key, 'artifact': artifact_record(artifact_path(stage))}
+            _report(kb_name, stage, 'done', stages[stage])
+
+    entry = {
+        "name": kb_name,
+        "pdf_file": str(dest_pdf),
+        "kb_directory": str(kb_dir),
+        "description": job.get('description', ''),
+        "output_dir": str(output_dir),
+        "knowledge_base_dir": str(kb_out_dir),
+        "status": "active",
+        "pdf_sha256": pdf_sha256,
+        "extractor_version": EXTRACTOR_VERSION,
+        "stages": stage_records,
+    }
+    return {'entry': entry, 'stages': stages, 'skipped': skipped, 'log': str(log_path)}
+
+
+def update_registry(registry_file, entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggiunge/sostituisce (per nome) le voci nel registry con scrittura atomica
+
+    Returns:
+        Registry aggiornato
+    """
+    registry_path = Path(registry_file)
+    if registry_path.exists():
+        with open(registry_path, 'r', encoding='utf-8') as f:
+            registry = json.load(f)
+    else:
+        registry = {"knowledge_bases": []}
+
+    kbs = registry.setdefault("knowledge_bases", [])
+    positions = {kb.get('name'): i for i, kb in enumerate(kbs)}
+    for entry in entries:
+        pos = positions.get(entry['name'])
+        if pos is None:
+            positions[entry['name']] = len(kbs)
+            kbs.append(entry)
+        else:
+            kbs[pos] = {**kbs[pos], **entry}
+
+    tmp_path = registry_path.with_name(registry_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, registry_path)
+    return registry
+
+
+def _drain(events, progress: Callable[[tuple], None]) -> None:
+    """Inoltra alla callback gli eventi di avanzamento già arrivati"""
+    while True:
+        try:
+            event = events.get_nowait()
+        except queue_module.Empty:
+            return
+        progress(event)
+
+
+def _print_progress(event: tuple) -> None:
+    kb_name, stage, status, seconds = event
+    step = STAGES.index(stage) + 1
+    if status == 'start':
+        print(f"   → [{kb_name}] {step}/{len(STAGES)} {stage}...")
+    elif status == 'skip':
+        print(f"   = [{kb_name}] {step}/{len(STAGES)} {stage} (invariato)")
+    else:
+        print(f"   ✓ [{kb_name}] {step}/{len(STAGES)} {stage} ({seconds:.1f}s)")
+
+
+def ingest_pdfs(jobs: List[Dict[str, Any]], registry_file=None, max_workers: Optional[int] = None,
+                progress: Callable[[tuple], None] = _print_progress) -> Dict[str, Any]:
+    """
+    Elabora più PDF in parallelo e aggiorna il registry una sola volta
+
+    Args:
+        jobs: Job creati con make_job()
+        registry_file: kb_registry.json da aggiornare (None: nessun aggiornamento)
+        max_workers: Processi del pool (default: numero di CPU, al massimo len(jobs))
+        progress: Callback per gli eventi (kb_name, stage, status, seconds)
+
+    Returns:
+        {'results': {kb_name: risultato di ingest_pdf}, 'errors': {kb_name: messaggio},
+         'registry': registry aggiornato o None}
+
+    Raises:
+        ValueError: Due job con lo stesso nome o la stessa directory KB
+    """
+    global _progress
+    # Risultati, errori e voci di registry sono indicizzati per nome: i duplicati
+    # si sovrascriverebbero (e scriverebbero in parallelo nella stessa directory)
+    for key, label in (('name', 'nome'), ('kb_dir', 'directory KB')):
+        values = [str(Path(job[key]).resolve()) if key == 'kb_dir' else job[key] for job in jobs]
+        duplicates = sorted({value for value in values if values.count(value) > 1})
+        if duplicates:
+            raise ValueError(f"Job duplicati per {label}: {', '.join(duplicates)}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    if not jobs:
+        return {'results': results, 'errors': errors, 'registry': None}
+
+    # Voci di registry precedenti, per saltare le fasi invariate
+    if registry_file is not None and Path(registry_file).exists():
+        with open(registry_file, 'r', encoding='utf-8') as f:
+            known = {kb.get('name'): kb for kb in json.load(f).get('knowledge_bases', [])}
+        jobs = [{**job, 'previous': job.get('previous') or known.get(job['name'])} for job in jobs]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        # Un PDF per processo: indicizzazione e scansione allarmi di ogni KB restano seriali
+        jobs = [{**job, 'index_workers': 1} for job in jobs]
+
+    if workers == 1:
+        # Un solo processo: niente pool, stesso flusso
+        _progress = progress
+        try:
+            for job in jobs:
+                try:
+                    results[job['name']] = ingest_pdf(job)
+                except Exception as e:
+                    errors[job['name']] = str(e)
+        finally:
+            _progress = None
+    else:
+        ctx = multiprocessing.get_context()
+        events = ctx.Queue()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(events,)) as pool:
+            futures = {pool.submit(ingest_pdf, job): job['name'] for job in jobs}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                _drain(events, progress)
+                for future in done:
+                    kb_name = futures[future]
+                    try:
+                        results[kb_name] = future.result()
+                    except Exception as e:
+                        errors[kb_name] = str(e)
+        _drain(events, progress)
+        events.close()
+
+    registry = None
+    if registry_file is not None and results:
+        # Voci nell'ordine dei job, indipendente dall'ordine di completamento
+        registry = update_registry(registry_file, [results[job['name']]['entry']
+                                                   for job in jobs if job['name'] in results])
+
+    return {'results': results, 'errors': errors, 'registry': registry}
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Archivio compatto delle sezioni (un file dati + indice di offset)
+
+Sostituisce le migliaia di file sezione_NNN.json (output dell'estrazione PDF)
+e sections/<id>.json (Knowledge Base).
+
+Formato su disco (nella directory di output o della KB):
+- sections.dat  record JSON compatti (UTF-8) concatenati, nell'ordine di inserimento
+- sections.idx  magic + numero di record (uint64) + lunghezza di sections.dat
+                (uint64) + n+1 offset in sections.dat (uint64 little-endian)
+                + lista JSON degli id
+
+I due file sono rinominati uno dopo l'altro: la lunghezza registrata
+nell'indice lega la coppia, e un indice che non corrisponde al file dati
+(es. interruzione tra i due rename) viene rifiutato in apertura.
+
+Entrambi i file sono letti via mmap: una sezione si recupera per posizione o
+per id in O(1), senza aprire file.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SECTIONS_DATA = "sections.dat"
+SECTIONS_INDEX = "sections.idx"
+
+MAGIC = b'KBSECT02'
+_HEADER = struct.Struct('<8sQQ')
+
+
+class SectionStoreWriter:
+    """Scrive un archivio di sezioni (file temporanei + rename alla chiusura)"""
+
+    def __init__(self, output_dir):
+        self.out_path = Path(output_dir)
+        self.out_path.mkdir(parents=True, exist_ok=True)
+        self._data = open(self.out_path / (SECTIONS_DATA + ".tmp"), 'wb')
+        self.offsets = array('Q', [0])
+        self.ids: List[str] = []
+
+    def __enter__(self) -> 'SectionStoreWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, section_id: str, record: Dict[str, Any]) -> int:
+        """Accoda una sezione e ritorna la sua posizione"""
+        data = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self._data.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        self.ids.append(section_id)
+        return len(self.ids) - 1
+
+    def close(self) -> None:
+        """Scrive sections.idx e rende visibile l'archivio"""
+        self._data.close()
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        with open(self.out_path / (SECTIONS_INDEX + ".tmp"), 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(self.ids), self.offsets[-1]))
+            offsets.tofile(f)
+            f.write(json.dumps(self.ids, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        os.replace(self.out_path / (SECTIONS_DATA + ".tmp"), self.out_path / SECTIONS_DATA)
+        os.replace(self.out_path / (SECTIONS_INDEX + ".tmp"), self.out_path / SECTIONS_INDEX)
+
+    def abort(self) -> None:
+        """Scarta l'archivio in scrittura"""
+        self._data.close()
+        for name in (SECTIONS_DATA, SECTIONS_INDEX):
+            tmp_path = self.out_path / (name + ".tmp")
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+
+def _map(path: Path) -> Optional[mmap.mmap]:
+    with open(path, 'rb') as f:
+        if not f.seek(0, 2):
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SectionStore:
+    """Archivio di sezioni su disco, mappato in memoria"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._index = _map(self.directory / SECTIONS_INDEX)
+        valid = self._index is not None and len(self._index) >= _HEADER.size
+        magic, count, data_length = _HEADER.unpack_from(self._index) if valid else (None, 0, 0)
+        start, end = _HEADER.size, _HEADER.size + (count + 1) * 8
+        if magic != MAGIC or len(self._index) < end:
+            self.close()
+            raise ValueError(f"Archivio sezioni non valido: {self.directory / SECTIONS_INDEX}")
+        self.count = count
+        self._data = _map(self.directory / SECTIONS_DATA)
+
+        # Indice e dati devono essere della stessa scrittura
+        actual_length = len(self._data) if self._data is not None else 0
+        last_offset = struct.unpack_from('<Q', self._index, end - 8)[0]
+        if actual_length != data_length or last_offset != data_length:
+            self.close()
+            raise ValueError(f"Archivio sezioni incoerente: {self.directory / SECTIONS_DATA} "
+                             f"({actual_length} byte, attesi {data_length})")
+
+        if sys.byteorder == 'little':
+            self._offsets = memoryview(self._index)[start:end].cast('Q')
+        else:
+            self._offsets = array('Q', self._index[start:end])
+            self._offsets.byteswap()
+        self._ids_start = end
+        self._positions: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def open(cls, directory) -> Optional['SectionStore']:
+        """Ritorna l'archivio della directory, o None se non esiste"""
+        path = Path(directory)
+        if (path / SECTIONS_INDEX).exists() and (path / SECTIONS_DATA).exists():
+            return cls(path)
+        return None
+
+    def close(self) -> None:
+        offsets = getattr(self, '_offsets', None)
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        for name in ('_index', '_data'):
+            mapped = getattr(self, name, None)
+            if mapped is not None:
+                mapped.close()
+                setattr(self, name, None)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def ids(self) -> List[str]:
+        """Id delle sezioni, in ordine di posizione"""
+        return json.loads(self._index[self._ids_start:].decode('utf-8'))
+
+    def position(self, section_id: str) -> Optional[int]:
+        """Posizione di una sezione (mappa id -> posizione caricata al primo uso)"""
+        if self._positions is None:
+            self._positions = {sid: pos for pos, sid in enumerate(self.ids())}
+        return self._positions.get(section_id)
+
+    def at(self, position: int) -> Dict[str, Any]:
+        """Sezione alla posizione indicata"""
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return json.loads(self._data[start:end].decode('utf-8'))
+
+    def get(self, section_id: str) -> Optional[Dict[str, Any]]:
+        """Sezione con l'id indicato, None se assente"""
+        position = self.position(section_id)
+        return None if position is None else self.at(position)
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for position, section_id in enumerate(self.ids()):
+            yield section_id, self.at(position)
+
+
+def count_sections(directory) -> int:
+    """Numero di sezioni di una directory (archivio o file sezione_*.json)"""
+    path = Path(directory)
+    if (path / SECTIONS_INDEX).exists():
+        with open(path / SECTIONS_INDEX, 'rb') as f:
+            header = f.read(_HEADER.size)
+        magic, count, _ = _HEADER.unpack(header) if len(header) == _HEADER.size else (None, 0, 0)
+        if magic == MAGIC:
+            return count
+    return sum(1 for _ in path.glob('sezione_*.json'))
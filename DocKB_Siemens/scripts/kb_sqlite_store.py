@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Store SQLite (FTS5) per le Knowledge Base unificate
+
+Alternativa opzionale ai JSON index.json / search_index.json / alarms_faults.json:
+sezioni, capitoli, allarmi e fault in tabelle SQLite con indici FTS5. Viene
+scritto dagli script unify_* e letto da master_kb_search / sinamics_kb_search,
+che così a freddo leggono solo le pagine del database toccate dalla query
+invece di deserializzare tutti i JSON.
+
+Se il modulo sqlite3 di Python non supporta FTS5 lo store non viene scritto e
+i searcher continuano a usare i JSON.
+"""
+
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+STORE_FILE = "kb.sqlite"
+STORE_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE sections (
+    id INTEGER PRIMARY KEY,
+    section_id TEXT,
+    section_num INTEGER,
+    source TEXT,
+    relevance REAL,
+    preview TEXT
+);
+CREATE TABLE section_categories (
+    category TEXT,
+    section INTEGER,
+    PRIMARY KEY (category, section)
+) WITHOUT ROWID;
+CREATE TABLE chapters (
+    id INTEGER PRIMARY KEY,
+    chapter_id TEXT,
+    source TEXT,
+    title TEXT,
+    sections_count INTEGER,
+    data TEXT
+);
+CREATE INDEX chapters_chapter_id ON chapters(chapter_id);
+CREATE TABLE codes (
+    id INTEGER PRIMARY KEY,
+    kind TEXT,
+    key TEXT,
+    code TEXT,
+    source TEXT,
+    description TEXT,
+    solution TEXT,
+    section_id TEXT,
+    data TEXT
+);
+CREATE INDEX codes_code ON codes(kind, code);
+CREATE VIRTUAL TABLE sections_fts USING fts5(preview, content='sections', content_rowid='id');
+CREATE VIRTUAL TABLE chapters_fts USING fts5(title, content='chapters', content_rowid='id');
+CREATE VIRTUAL TABLE codes_fts USING fts5(code, description, solution, content='codes', content_rowid='id');
+"""
+
+# Token della query FTS5 (le keyword utente non sono sintassi FTS5)
+_QUERY_TOKEN_RE = re.compile(r'\w+')
+
+
+def fts5_available() -> bool:
+    """True se il sqlite3 di Python è compilato con FTS5"""
+    try:
+        conn = sqlite3.connect(':memory:')
+        try:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def fts_query(text: str) -> str:
+    """Converte una keyword in query FTS5 (termini in AND, prefisso sull'ultimo)"""
+    tokens = _QUERY_TOKEN_RE.findall(text)
+    if not tokens:
+        return ''
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def write_kb_store(output_dir, index: Dict[str, Any], search_index: Dict[str, List[Dict[str, Any]]],
+                   alarms: Dict[str, Dict[str, Any]], faults: Dict[str, Dict[str, Any]],
+                   source_field: str) -> Optional[Path]:
+    """
+    Scrive lo store SQLite della KB unificata
+
+    Args:
+        output_dir: directory della KB unificata
+        index: indice (metadata, capitoli, ...) come in index.json
+        search_index: categoria -> sezioni, come in search_index.json
+        alarms: chiave -> allarme, come in alarms_faults.json
+        faults: chiave -> fault, come in alarms_faults.json
+        source_field: campo con la KB/sistema di origine ('source_kb', 'source_system')
+
+    Returns:
+        Path dello store, o None se FTS5 non è disponibile
+    """
+    if not fts5_available():
+        return None
+
+    out_path = Path(output_dir)
+    store_file = out_path / STORE_FILE
+    tmp_file = out_path / (STORE_FILE + ".tmp")
+    if tmp_file.exists():
+        tmp_file.unlink()
+
+    conn = sqlite3.connect(tmp_file)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            _write_meta(conn, index, source_field)
+            _write_sections(conn, search_index, source_field)
+            _write_chapters(conn, index.get('chapters', []), source_field)
+            _write_codes(conn, 'ALARM', alarms, source_field)
+            _write_codes(conn, 'FAULT', faults, source_field)
+            for table in ('sections_fts', 'chapters_fts', 'codes_fts'):
+                conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    # Sostituzione atomica: i searcher non vedono mai uno store parziale
+    os.replace(tmp_file, store_file)
+    return store_file
+
+
+def _write_meta(conn: sqlite3.Connection, index: Dict[str, Any], source_field: str) -> None:
+    header = {k: v for k, v in index.items() if k != 'chapters'}
+    conn.executemany("INSERT INTO meta(key, value) VALUES (?, ?)", [
+        ('version', str(STORE_VERSION)),
+        ('source_field', source_field),
+        ('index', json.dumps(header, ensure_ascii=False)),
+    ])
+
+
+def _write_sections(conn: sqlite3.Connection, search_index: Dict[str, List[Dict[str, Any]]],
+                    source_field: str) -> None:
+    # Una riga per sezione, le categorie in section_categories. Gli id sezione
+    # si ripetono tra KB diverse: la chiave include sistema e KB di origine
+    rows = {}
+    categories = []
+    for category, items in search_index.items():
+        for item in items:
+            key = (item.get('source_system'), item.get('source_kb'), item.get('section_id'))
+            rowid = rows.get(key)
+            if rowid is None:
+                rowid = rows[key] = len(rows) + 1
+                conn.execute(
+                    "INSERT INTO sections(id, section_id, section_num, source, relevance, preview) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (rowid, item.get('section_id', ''), item.get('section_num', 0), item.get(source_field),
+                     item.get('relevance', 0.5), item.get('content_preview', ''))
+                )
+            categories.append((category, rowid))
+    conn.executemany("INSERT OR IGNORE INTO section_categories(category, section) VALUES (?, ?)", categories)
+
+
+def _write_chapters(conn: sqlite3.Connection, chapters: Iterable[Dict[str, Any]], source_field: str) -> None:
+    conn.executemany(
+        "INSERT INTO chapters(chapter_id, source, title, sections_count, data) VALUES (?, ?, ?, ?, ?)",
+        ((ch.get('id', ''), ch.get(source_field), ch.get('title', ''), ch.get('sections_count', 0),
+          json.dumps(ch, ensure_ascii=False))
+         for ch in chapters)
+    )
+
+
+def _write_codes(conn: sqlite3.Connection, kind: str, entries: Dict[str, Dict[str, Any]],
+                 source_field: str) -> None:
+    conn.executemany(
+        "INSERT INTO codes(kind, key, code, source, description, solution, section_id, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((kind, key, entry.get('code', ''), entry.get(source_field), entry.get('description', ''),
+          entry.get('solution', ''), entry.get('section_id', ''), json.dumps(entry, ensure_ascii=False))
+         for key, entry in entries.items())
+    )
+
+
+class KBStore:
+    """Store SQLite in sola lettura di una KB unificata"""
+
+    def __init__(self, kb_dir):
+        self.kb_dir = Path(kb_dir)
+        # Sola lettura: la connessione può essere usata dai thread di ricerca
+        self.conn = sqlite3.connect(f"{(self.kb_dir / STORE_FILE).resolve().as_uri()}?mode=ro",
+                                    uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self.source_field = self._meta.get('source_field', 'source_kb')
+
+    @classmethod
+    def open(cls, kb_dir) -> Optional['KBStore']:
+        """Ritorna lo store della KB, o None se la KB non ne ha uno leggibile"""
+        if not (Path(kb_dir) / STORE_FILE).exists():
+            return None
+        try:
+            return cls(kb_dir)
+        except sqlite3.DatabaseError:
+            return None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def index(self) -> Dict[str, Any]:
+        """Indice della KB senza capitoli (metadata, sistemi/KB, categorie)"""
+        return json.loads(self._meta.get('index', '{}'))
+
+    def categories(self) -> List[str]:
+        """Categorie di ricerca con almeno una sezione"""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT category FROM section_categories")]
+
+    def search_sections(self, keyword: str, source: str = None, category: str = None,
+                        limit: int = 10) -> List[Dict[str, Any]]:
+        """Ricerca FTS5 nelle anteprime delle sezioni, ordinata per bm25"""
+        query = fts_query(keyword)
+        if not query:
+            return []
+        sql = ("SELECT s.id, s.section_id, s.section_num, s.source, s.relevance, s.preview, "
+               "bm25(sections_fts) AS score "
+               "FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid "
+               "WHERE sections_fts MATCH ?")
+        params: List[Any] = [query]
+        if source:
+            sql += " AND s.source = ?"
+            params.append(source)
+        if category:
+            sql += " AND EXISTS (SELECT 1 FROM section_categories c WHERE c.category = ? AND c.section = s.id)"
+            params.append(category)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        results = []
+        for row in self.conn.execute(sql, params).fetchall():
+            result = dict(row)
+            result['categories'] = [category] if category else self._section_categories(row['id'])
+            results.append(result)
+        return results
+
+    def _section_categories(self, rowid: int) -> List[str]:
+        return [row[0] for row in self.conn.execute(
+            "SELECT category FROM section_categories WHERE section = ?", (rowid,))]
+
+    def sections_by_category(self, category: str) -> List[Dict[str, Any]]:
+        """Sezioni di una categoria, nell'ordine del search index"""
+        return [dict(row) for row in self.conn.execute(
+            "SELECT s.section_id, s.section_num, s.source, s.relevance, s.preview "
+            "FROM section_categories c JOIN sections s ON s.id = c.section "
+            "WHERE c.category = ? ORDER BY s.id", (category,))]
+
+    def chapters(self, source: str = None, limit: int = None) -> List[Dict[str, Any]]:
+        """Capitoli (dati completi), filtrati per KB/sistema di origine"""
+        sql = "SELECT data FROM chapters"
+        params: List[Any] = []
+        if source:
+            sql += " WHERE source = ?"
+            params.append(source)
+        sql += " ORDER BY id LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def chapter(self, chapter_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT data FROM chapters WHERE chapter_id = ? ORDER BY id LIMIT 1", (chapter_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search_chapters(self, keyword: str, source: str = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Ricerca FTS5 nei titoli dei capitoli, ordinata per bm25"""
+        query = fts_query(keyword)
+        if not query:
+            return []
+        sql = ("SELECT c.data FROM chapters_fts JOIN chapters c ON c.id = chapters_fts.rowid "
+               "WHERE chapters_fts MATCH ?")
+        params: List[Any] = [query]
+        if source:
+            sql += " AND c.source = ?"
+            params.append(source)
+        sql += " ORDER BY bm25(chapters_fts) LIMIT ?"
+        params.append(limit)
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def codes(self, kind: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Coppie (chiave, voce) degli allarmi/fault di un tipo, nell'ordine della KB"""
+        for row in self.conn.execute("SELECT key, data FROM codes WHERE kind = ? ORDER BY id", (kind,)):
+            yield row[0], json.loads(row[1])
+
+    def search_codes(self, keyword: str, kind: str = None, source: str = None,
+                     limit: int = 10) -> List[Dict[str, Any]]:
+        """Ricerca FTS5 in codice, descrizione e soluzione di allarmi/fault"""
+        query = fts_query(keyword)
+        if not query:
+            return []
+        sql = ("SELECT c.kind, c.data FROM codes_fts JOIN codes c ON c.id = codes_fts.rowid "
+               "WHERE codes_fts MATCH ?")
+        params: List[Any] = [query]
+        if kind:
+            sql += " AND c.kind = ?"
+            params.append(kind)
+        if source:
+            sql += " AND c.source = ?"
+            params.append(source)
+        sql += " ORDER BY bm25(codes_fts) LIMIT ?"
+        params.append(limit)
+        return [{**json.loads(row['data']), 'type': row['kind']} for row in self.conn.execute(sql, params)]
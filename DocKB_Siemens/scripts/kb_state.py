@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Stato per le build incrementali delle Knowledge Base
+
+Ogni artefatto è descritto da un record {sha256, size, mtime_ns}: se dimensione
+e mtime non cambiano l'hash registrato viene riusato senza rileggere il file.
+Le chiavi di input di una fase (versione dello step + hash degli input)
+decidono se la fase va rieseguita.
+
+Usato da kb_ingest (registry: solo le fasi con input cambiati vengono
+rieseguite), dagli script unify_* (unify_state.json: l'unificazione, sempre
+completa, viene saltata se le sorgenti sono invariate) e da
+update_scl_from_unified_kb.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+HASH_CHUNK = 1 << 20
+
+# Stato dell'ultima unificazione, nella directory della KB unificata
+UNIFY_STATE_FILE = "unify_state.json"
+
+
+def file_sha256(path) -> str:
+    """SHA-256 del contenuto di un file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_record(path, previous: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Record {sha256, size, mtime_ns} di un file, None se non esiste
+
+    Se size e mtime coincidono con `previous` l'hash non viene ricalcolato.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous
+    return {'sha256': file_sha256(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def same_content(record: Optional[Dict[str, Any]], previous: Optional[Dict[str, Any]]) -> bool:
+    """True se i due record descrivono lo stesso contenuto"""
+    return bool(record and previous) and record['sha256'] == previous.get('sha256')
+
+
+def stage_key(*parts: Any) -> str:
+    """Chiave di input di una fase: hash di versione e input"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_state(path) -> Dict[str, Any]:
+    """Carica un file di stato JSON ({} se assente o illeggibile)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(path, state: Dict[str, Any]) -> None:
+    """Salva un file di stato JSON con scrittura atomica"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def input_records(base_dir, files: Iterable[str],
+                  previous: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Record dei file di input (path relativi a base_dir)"""
+    previous = previous or {}
+    return {name: artifact_record(Path(base_dir) / name, previous.get(name)) for name in files}
+
+
+def detect_changes(out_path, sources: Dict[str, Tuple[Path, Iterable[str]]],
+                   outputs: Iterable[str], version: str = '',
+                   force: bool = False) -> Tuple[Optional[Set[str]], Set[str], Dict[str, Any]]:
+    """
+    Confronta le sorgenti di una unificazione con l'ultimo unify_state.json
+
+    Args:
+        out_path: directory della KB unificata
+        sources: nome -> (directory sorgente, file di input relativi)
+        outputs: file della KB unificata che devono esistere per saltare l'unificazione
+        version: chiave della versione del codice di unificazione (stage_key);
+                 se diversa da quella registrata serve una ricostruzione completa
+        force: ricostruzione completa in ogni caso
+
+    Returns:
+        (sorgenti cambiate, o None se lo stato precedente non è utilizzabile:
+         assente, versione diversa, output mancanti o force;
+         sorgenti rimosse; nuovo stato da salvare con save_state)
+    """
+    out_path = Path(out_path)
+    previous_state = load_state(out_path / UNIFY_STATE_FILE)
+    previous = previous_state.get('sources', {})
+
+    state = {'version': version, 'sources': {}}
+    changed = set()
+    for name, (path, files) in sources.items():
+        prev = previous.get(name, {})
+        records = input_records(path, files, prev.get('inputs'))
+        state['sources'][name] = {'path': str(path), 'inputs': records}
+        prev_inputs = prev.get('inputs', {})
+        if prev.get('path') != str(path) or any(
+                not same_content(record, prev_inputs.get(file)) and (record or prev_inputs.get(file))
+                for file, record in records.items()):
+            changed.add(name)
+
+    removed = set(previous) - set(sources)
+    if (force or not previous or previous_state.get('version') != version
+            or not all((out_path / name).exists() for name in outputs)):
+        return None, removed, state
+    return changed, removed, state
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Indice full-text invertito (BM25) per le Knowledge Base
+
+Ogni sezione è un documento: i termini (token alfanumerici, minuscoli) puntano
+a posting list ordinate per documento con la term frequency. Il punteggio
+BM25 è calcolato in fase di query, così gli indici di più KB si possono unire
+(unify_*) senza ricalcolare nulla, o interrogare separatamente con statistiche
+di collezione comuni (combine_stats) per avere punteggi confrontabili.
+
+Formato su disco (nella directory della KB):
+- text_index.json   intestazione: versione, numero documenti, lunghezza media, campi
+- text_index.terms  dizionario ordinato (byte UTF-8): magic + n + n+1 offset delle
+                    posting list (uint64) + n+1 offset dei termini (uint32) + termini
+- text_index.docs   magic + n + n+1 offset dei record (uint64) + n lunghezze (uint32)
+                    + righe JSON compatte dei metadati, concatenate
+- text_index.bin    posting list: per ogni termine df doc id (uint32) + df tf (uint16)
+
+Tutti gli interi sono little-endian. I file binari sono letti via mmap: una
+query cerca i termini con ricerca binaria nel dizionario, legge solo le loro
+posting list e decodifica solo i documenti restituiti.
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILE = "text_index.json"
+TERMS_FILE = "text_index.terms"
+DOCS_FILE = "text_index.docs"
+POSTINGS_FILE = "text_index.bin"
+INDEX_FILES = (INDEX_FILE, TERMS_FILE, DOCS_FILE, POSTINGS_FILE)
+FORMAT_VERSION = 2
+
+TERMS_MAGIC = b'KBTERM02'
+DOCS_MAGIC = b'KBDOCS02'
+_HEADER = struct.Struct('<8sQ')
+# Byte per documento in una posting list: doc id (uint32) + tf (uint16)
+POSTING_SIZE = 6
+
+# Parametri BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r'\w{2,}')
+STOPWORDS = frozenset({
+    'the', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+    'is', 'are', 'was', 'were', 'be', 'been', 'by', 'as', 'it', 'this', 'that',
+    'di', 'da', 'il', 'la', 'le', 'un', 'una', 'degli', 'delle',
+})
+
+# Campi dei documenti, salvati come righe JSON (liste) in text_index.docs
+DOC_FIELDS = ('section_id', 'section_num', 'preview', 'categories')
+
+
+def tokenize(text: str) -> List[str]:
+    """Divide il testo in termini indicizzabili"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _native(values: array) -> array:
+    """Posting list in little-endian (formato su disco)"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _map_file(path: Path) -> Optional[mmap.mmap]:
+    with open(path, 'rb') as f:
+        if not f.seek(0, 2):
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _view(buffer, start: int, count: int, typecode: str):
+    """count interi little-endian da buffer[start:] (memoryview senza copia se possibile)"""
+    size = array(typecode).itemsize
+    if sys.byteorder == 'little':
+        return memoryview(buffer)[start:start + count * size].cast(typecode)
+    values = array(typecode, buffer[start:start + count * size])
+    values.byteswap()
+    return values
+
+
+class TextIndexBuilder:
+    """Costruisce un indice invertito in memoria e lo salva su disco"""
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self.lengths = array('I')
+        self.postings: Dict[str, Tuple[array, array]] = {}
+
+    def add(self, text: str, **meta: Any) -> int:
+        """Aggiunge un documento (testo + metadati) e ritorna il suo doc id"""
+        tokens = tokenize(text)
+        return self.add_counts(Counter(tokens), len(tokens), **meta)
+
+    def add_counts(self, counts: Dict[str, int], length: int, **meta: Any) -> int:
+        """Aggiunge un documento già tokenizzato (term frequency + numero di token)"""
+        doc_id = len(self.docs)
+        self.docs.append(meta)
+        self.lengths.append(length)
+
+        postings = self.postings
+        for term, tf in counts.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array('I'), array('H'))
+            entry[0].append(doc_id)
+            entry[1].append(min(tf, 0xFFFF))
+        return doc_id
+
+    def add_index(self, index: 'TextIndex', **extra: Any) -> None:
+        """Accoda tutti i documenti di un altro indice (unificazione KB)"""
+        offset = len(self.docs)
+        for doc in index.documents():
+            self.docs.append({**doc, **extra})
+        self.lengths.extend(index.lengths)
+
+        postings = self.postings
+        for term, docs, tfs in index.iter_postings():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array('I'), array('H'))
+            entry[0].extend(doc_id + offset for doc_id in docs)
+            entry[1].extend(tfs)
+
+    def save(self, output_dir) -> None:
+        """Scrive i file dell'indice (file temporanei + rename)"""
+        out_path = Path(output_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+
+        extra_fields = sorted({k for doc in self.docs for k in doc} - set(DOC_FIELDS))
+        fields = list(DOC_FIELDS) + extra_fields
+
+        # Posting list e dizionario, termini in ordine di byte UTF-8 (ricerca binaria)
+        terms = sorted((term.encode('utf-8'), term) for term in self.postings)
+        posting_offsets = array('Q', [0])
+        term_offsets = array('I', [0])
+        with open(out_path / (POSTINGS_FILE + ".tmp"), 'wb') as f:
+            for encoded, term in terms:
+                docs, tfs = self.postings[term]
+                _native(docs).tofile(f)
+                _native(tfs).tofile(f)
+                posting_offsets.append(posting_offsets[-1] + len(docs) * POSTING_SIZE)
+                term_offsets.append(term_offsets[-1] + len(encoded))
+        with open(out_path / (TERMS_FILE + ".tmp"), 'wb') as f:
+            f.write(_HEADER.pack(TERMS_MAGIC, len(terms)))
+            _native(posting_offsets).tofile(f)
+            _native(term_offsets).tofile(f)
+            f.write(b''.join(encoded for encoded, _ in terms))
+
+        # Metadati dei documenti: offset + lunghezze + righe JSON
+        rows = [json.dumps([doc.get(k) for k in fields], ensure_ascii=False,
+                           separators=(',', ':')).encode('utf-8') for doc in self.docs]
+        doc_offsets = array('Q', [0])
+        for row in rows:
+            doc_offsets.append(doc_offsets[-1] + len(row))
+        with open(out_path / (DOCS_FILE + ".tmp"), 'wb') as f:
+            f.write(_HEADER.pack(DOCS_MAGIC, len(rows)))
+            _native(doc_offsets).tofile(f)
+            _native(self.lengths).tofile(f)
+            f.write(b''.join(rows))
+
+        total_length = sum(self.lengths)
+        header = {
+            'version': FORMAT_VERSION,
+            'doc_count': len(self.docs),
+            'term_count': len(terms),
+            'avg_length': total_length / len(self.docs) if self.docs else 0.0,
+            'doc_fields': fields,
+        }
+        with open(out_path / (INDEX_FILE + ".tmp"), 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False)
+        # Intestazione per ultima: TextIndex.open richiede tutti i file
+        for name in (POSTINGS_FILE, TERMS_FILE, DOCS_FILE, INDEX_FILE):
+            os.replace(out_path / (name + ".tmp"), out_path / name)
+
+
+class TextIndex:
+    """Indice invertito su disco, mappato in memoria alla prima query"""
+
+    def __init__(self, kb_dir):
+        self.kb_dir = Path(kb_dir)
+        self._header: Optional[Dict[str, Any]] = None
+        self.lengths = array('I')
+        self._maps: List[mmap.mmap] = []
+        self._views: List[memoryview] = []
+
+    @classmethod
+    def open(cls, kb_dir) -> Optional['TextIndex']:
+        """Ritorna l'indice della KB, o None se la KB non ne ha uno (o ha il formato precedente)"""
+        kb_path = Path(kb_dir)
+        if all((kb_path / name).exists() for name in INDEX_FILES):
+            return cls(kb_path)
+        return None
+
+    def _map(self, name: str, magic: bytes) -> Tuple[mmap.mmap, int]:
+        mapped = _map_file(self.kb_dir / name)
+        if mapped is None:
+            raise ValueError(f"Indice full-text non valido: {self.kb_dir / name}")
+        self._maps.append(mapped)
+        file_magic, count = _HEADER.unpack_from(mapped)
+        if file_magic != magic:
+            raise ValueError(f"Indice full-text non valido: {self.kb_dir / name}")
+        return mapped, count
+
+    def _array(self, buffer, start: int, count: int, typecode: str):
+        values = _view(buffer, start, count, typecode)
+        if isinstance(values, memoryview):
+            self._views.append(values)
+        return values
+
+    def _load(self) -> Dict[str, Any]:
+        if self._header is None:
+            with open(self.kb_dir / INDEX_FILE, 'r', encoding='utf-8') as f:
+                header = json.load(f)
+            if header.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Versione indice full-text non supportata: {header.get('version')}")
+
+            terms, n_terms = self._map(TERMS_FILE, TERMS_MAGIC)
+            self._term_count = n_terms
+            start = _HEADER.size
+            self._posting_offsets = self._array(terms, start, n_terms + 1, 'Q')
+            start += (n_terms + 1) * 8
+            self._term_offsets = self._array(terms, start, n_terms + 1, 'I')
+            self._terms_start = start + (n_terms + 1) * 4
+            self._terms = terms
+
+            docs, n_docs = self._map(DOCS_FILE, DOCS_MAGIC)
+            start = _HEADER.size
+            self._doc_offsets = self._array(docs, start, n_docs + 1, 'Q')
+            start += (n_docs + 1) * 8
+            self.lengths = self._array(docs, start, n_docs, 'I')
+            self._rows_start = start + n_docs * 4
+            self._docs = docs
+
+            self._postings = _map_file(self.kb_dir / POSTINGS_FILE)
+            if self._postings is not None:
+                self._maps.append(self._postings)
+            self._header = header
+        return self._header
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._views, self._maps = [], []
+        self._header = None
+
+    @property
+    def doc_count(self) -> int:
+        return self._load()['doc_count']
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        """Metadati di un documento (decodificati solo su richiesta)"""
+        header = self._load()
+        start = self._rows_start + self._doc_offsets[doc_id]
+        end = self._rows_start + self._doc_offsets[doc_id + 1]
+        return dict(zip(header['doc_fields'], json.loads(self._docs[start:end].decode('utf-8'))))
+
+    def documents(self) -> Iterable[Dict[str, Any]]:
+        return (self.document(doc_id) for doc_id in range(self.doc_count))
+
+    def _term(self, position: int) -> bytes:
+        start = self._terms_start + self._term_offsets[position]
+        return self._terms[start:self._terms_start + self._term_offsets[position + 1]]
+
+    def _find_term(self, term: str) -> int:
+        """Posizione del termine nel dizionario (ricerca binaria), -1 se assente"""
+        self._load()
+        key = term.encode('utf-8')
+        lo, hi = 0, self._term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self._term_count and self._term(lo) == key else -1
+
+    def _postings_at(self, position: int) -> Tuple[array, array]:
+        offset = self._posting_offsets[position]
+        df = (self._posting_offsets[position + 1] - offset) // POSTING_SIZE
+        docs, tfs = array('I'), array('H')
+        end = offset + df * docs.itemsize
+        docs.frombytes(self._postings[offset:end])
+        tfs.frombytes(self._postings[end:end + df * tfs.itemsize])
+        if sys.byteorder != 'little':
+            docs.byteswap()
+            tfs.byteswap()
+        return docs, tfs
+
+    def postings(self, term: str) -> Tuple[array, array]:
+        """(doc id, term frequency) di un termine; array vuoti se assente"""
+        position = self._find_term(term)
+        if position < 0:
+            return array('I'), array('H')
+        return self._postings_at(position)
+
+    def iter_postings(self) -> Iterable[Tuple[str, array, array]]:
+        self._load()
+        for position in range(self._term_count):
+            docs, tfs = self._postings_at(position)
+            yield self._term(position).decode('utf-8'), docs, tfs
+
+    def collection_stats(self, query: str) -> Dict[str, Any]:
+        """
+        Statistiche BM25 dell'indice per i termini di una query
+
+        Sommate con combine_stats() su più indici e passate a search(), danno
+        punteggi confrontabili tra indici diversi (IDF e lunghezza media globali).
+
+        Returns:
+            {'doc_count': documenti, 'total_length': somma delle lunghezze, 'df': {termine: df}}
+        """
+        header = self._load()
+        df = {}
+        for term in set(tokenize(query)):
+            position = self._find_term(term)
+            if position >= 0:
+                df[term] = (self._posting_offsets[position + 1] - self._posting_offsets[position]) // POSTING_SIZE
+        return {'doc_count': header['doc_count'],
+                'total_length': header['avg_length'] * header['doc_count'],
+                'df': df}
+
+    def search(self, query: str, limit: int = 10,
+               accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+               stats: Optional[Dict[str, Any]] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Ricerca BM25
+
+        Args:
+            query: testo della query (termini in OR, ordinati per punteggio)
+            limit: numero massimo di risultati
+            accept: filtro opzionale sui metadati del documento
+            stats: statistiche di collezione (combine_stats) al posto di quelle
+                   dell'indice, per confrontare i punteggi di più indici
+
+        Returns:
+            Lista di (score, documento) in ordine di score decrescente
+        """
+        header = self._load()
+        if not header['doc_count']:
+            return []
+        if stats is None:
+            n_docs, avg_length, collection_df = header['doc_count'], header['avg_length'], {}
+        else:
+            n_docs, collection_df = stats['doc_count'], stats['df']
+            avg_length = stats['total_length'] / n_docs if n_docs else 0.0
+        avg_length = avg_length or 1.0
+        lengths = self.lengths
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs, tfs = self.postings(term)
+            if not len(docs):
+                continue
+            df = collection_df.get(term, len(docs))
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in zip(docs, tfs):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        if accept is None:
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(score, self.document(doc_id)) for doc_id, score in best]
+
+        results = []
+        for doc_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+            doc = self.document(doc_id)
+            if accept(doc):
+                results.append((score, doc))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+def combine_stats(stats: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Statistiche di collezione di più indici (TextIndex.collection_stats) sommate"""
+    combined: Dict[str, Any] = {'doc_count': 0, 'total_length': 0.0, 'df': Counter()}
+    for item in stats:
+        combined['doc_count'] += item['doc_count']
+        combined['total_length'] += item['total_length']
+        combined['df'].update(item['df'])
+    return combined
+
+
+def merge_text_indexes(sources: Iterable[Tuple[Any, Dict[str, Any]]], output_dir) -> int:
+    """
+    Unisce gli indici di più KB in output_dir
+
+    Args:
+        sources: (directory KB, metadati da aggiungere ai documenti) per ogni KB
+        output_dir: directory della KB unificata
+
+    Returns:
+        Numero di indici uniti (0: nessun indice scritto)
+    """
+    builder = TextIndexBuilder()
+    merged = 0
+    for kb_dir, extra in sources:
+        index = TextIndex.open(kb_dir)
+        if index is None:
+            continue
+        builder.add_index(index, **extra)
+        index.close()
+        merged += 1
+    if merged:
+        builder.save(output_dir)
+    return merged
@@ -5,12 +5,21 @@ Automatizza l'intero workflow di estrazione, indicizzazione e ricerca
 """
 
 import json
-import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import argparse
 
+try:
+    from sinamics_kb_search import SinamicsKBSearch
+    from kb_ingest import ingest_pdfs, make_job
+    from kb_text_index import combine_stats
+except ImportError:
+    from .sinamics_kb_search import SinamicsKBSearch
+    from .kb_ingest import ingest_pdfs, make_job
+    from .kb_text_index import combine_stats
+
 
 class MultiPDFKnowledgeBase:
     """Gestisce multiple Knowledge Base da PDF"""
@@ -18,6 +27,8 @@ class MultiPDFKnowledgeBase:
     def __init__(self, base_dir: str = "."):
         self.base_dir = Path(base_dir)
         self.kb_registry = self.load_registry()
+        # Searcher aperti (directory KB -> SinamicsKBSearch), riusati tra le ricerche
+        self._searchers: Dict[str, SinamicsKBSearch] = {}
 
     def load_registry(self) -> Dict[str, Any]:
         """Carica il registro delle KB"""
@@ -45,139 +56,44 @@ class MultiPDFKnowledgeBase:
             kb_name: Nome della knowledge base (es. "sinamics_s120", "sinamics_s150")
             description: Descrizione della KB
         """
-        pdf_file = Path(pdf_path)
-
-        if not pdf_file.exists():
-            raise FileNotFoundError(f"PDF non trovato: {pdf_path}")
-
-        # Crea directory per la KB
-        kb_dir = self.base_dir / kb_name
-        kb_dir.mkdir(exist_ok=True)
-
-        print(f"\n=== Elaborazione PDF per KB: {kb_name} ===")
-        print(f"PDF: {pdf_file}")
-        print(f"Directory: {kb_dir}")
-
-        # 1. Copia il PDF
-        import shutil
-        dest_pdf = kb_dir / pdf_file.name
-        shutil.copy2(pdf_file, dest_pdf)
-        print(f"✓ PDF copiato")
-
-        # 2. Estrai JSON
-        self._extract_pdf_to_json(dest_pdf, kb_dir)
-
-        # 3. Costruisci Knowledge Base
-        self._build_knowledge_base(kb_dir)
-
-        # 4. Estrai allarmi/fault
-        self._extract_alarms_faults(kb_dir)
-
-        # 5. Registra nel registry
-        self._register_kb(kb_name, str(dest_pdf), description, kb_dir)
-
-        print(f"✓ KB '{kb_name}' completata\n")
-
-    def _extract_pdf_to_json(self, pdf_file: Path, output_dir: Path) -> None:
-        """Estrae PDF a JSON"""
-        print("  Estrazione PDF → JSON...")
-
-        # Crea uno script temporaneo
-        script = output_dir / "extract_pdf.py"
-
-        # Usa lo script di estrazione globale
-        cmd = [
-            sys.executable,
-            str(self.base_dir / "extract_pdf_to_json.py")
-        ]
-
-        # Esegui con directory output
-        # Copia dello script e esecuzione locale
-        result = subprocess.run(
-            [sys.executable, "-c", f"""
-import sys
-sys.path.insert(0, '{self.base_dir}')
-from extract_pdf_to_json import PDFExtractor
-
-extractor = PDFExtractor('{pdf_file}')
-extractor.extract_to_json('{output_dir / 'output'}')
-"""],
-            capture_output=True,
-            text=True
-        )
+        self.add_pdfs([(pdf_path, kb_name, description)])
 
-        if result.returncode != 0:
-            print(f"  Errore: {result.stderr}")
-            raise RuntimeError("Estrazione PDF fallita")
-
-        print("  ✓ JSON estratto")
+    def add_pdfs(self, pdfs: List[Tuple[str, str, str]], max_workers: Optional[int] = None,
+                 force: bool = False) -> Dict[str, str]:
+        """
+        Aggiunge più PDF in parallelo (un processo per PDF)
 
-    def _build_knowledge_base(self, kb_dir: Path) -> None:
-        """Costruisce la knowledge base"""
-        print("  Costruzione Knowledge Base...")
+        Le fasi con input invariati rispetto al registry vengono saltate.
 
-        result = subprocess.run(
-            [sys.executable, "-c", f"""
-import sys
-sys.path.insert(0, '{self.base_dir}')
-from build_knowledge_base import KnowledgeBaseBuilder
-
-builder = KnowledgeBaseBuilder('{kb_dir / 'output'}')
-builder.load_sections()
-builder.identify_chapters()
-builder.build_search_index()
-builder.build_master_index()
-builder.save_knowledge_base('{kb_dir / 'knowledge_base'}')
-"""],
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
-            print(f"  Errore: {result.stderr}")
-            raise RuntimeError("Costruzione KB fallita")
-
-        print("  ✓ Knowledge Base costruita")
-
-    def _extract_alarms_faults(self, kb_dir: Path) -> None:
-        """Estrae allarmi e fault"""
-        print("  Estrazione allarmi/fault...")
-
-        result = subprocess.run(
-            [sys.executable, "-c", f"""
-import sys
-sys.path.insert(0, '{self.base_dir}')
-from extract_alarms_faults import AlarmFaultExtractor
-
-extractor = AlarmFaultExtractor('{kb_dir / 'knowledge_base'}')
-extractor.save_to_json('{kb_dir / 'alarms_faults.json'}')
-extractor.save_to_csv('{kb_dir / 'alarms_faults.csv'}')
-extractor.save_to_scl_include('{kb_dir / 'AlarmHandler.scl'}')
-"""],
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
-            print(f"  Avviso: Estrazione allarmi parziale")
-
-        print("  ✓ Allarmi/fault estratti")
-
-    def _register_kb(self, kb_name: str, pdf_path: str, description: str, kb_dir: Path) -> None:
-        """Registra la KB nel registry"""
-        entry = {
-            "name": kb_name,
-            "pdf_file": pdf_path,
-            "kb_directory": str(kb_dir),
-            "description": description,
-            "output_dir": str(kb_dir / "output"),
-            "knowledge_base_dir": str(kb_dir / "knowledge_base"),
-            "status": "active"
-        }
+        Args:
+            pdfs: Lista di (pdf_path, kb_name, description)
+            max_workers: Processi paralleli (default: numero di CPU)
+            force: Rielabora tutte le fasi
 
-        # Aggiungi al registry
-        self.kb_registry["knowledge_bases"].append(entry)
-        self.save_registry()
+        Returns:
+            Errori per KB (vuoto se tutte completate)
+        """
+        jobs = []
+        for pdf_path, kb_name, description in pdfs:
+            if not Path(pdf_path).exists():
+                raise FileNotFoundError(f"PDF non trovato: {pdf_path}")
+            jobs.append(make_job(pdf_path, kb_name, description, self.base_dir / kb_name,
+                                 scl_include=True, force=force))
+
+        print(f"\n=== Elaborazione {len(jobs)} PDF ===")
+        for job in jobs:
+            print(f"PDF: {job['pdf_file']} → {job['kb_dir']}")
+
+        # Registry aggiornato una sola volta, a elaborazione conclusa
+        outcome = ingest_pdfs(jobs, self.base_dir / "kb_registry.json", max_workers=max_workers)
+        if outcome['registry'] is not None:
+            self.kb_registry = outcome['registry']
+
+        for kb_name in outcome['results']:
+            print(f"✓ KB '{kb_name}' completata")
+        for kb_name, error in outcome['errors'].items():
+            print(f"✗ KB '{kb_name}': {error}")
+        return outcome['errors']
 
     def list_kbs(self) -> None:
         """Lista tutte le KB registrate"""
@@ -196,30 +112,82 @@ extractor.save_to_scl_include('{kb_dir / 'AlarmHandler.scl'}')
             print(f"  Status: {kb['status']}")
             print()
 
-    def search_all_kbs(self, keyword: str, limit: int = 5) -> Dict[str, List]:
-        """Ricerca in tutte le KB"""
-        results = {}
-
-        for kb in self.kb_registry.get("knowledge_bases", []):
-            kb_name = kb['name']
-            kb_dir = Path(kb['knowledge_base_dir'])
-
-            try:
-                result = subprocess.run(
-                    [sys.executable, str(self.base_dir / "sinamics_kb_search.py"),
-                     "--search", keyword,
-                     "--limit", str(limit),
-                     "--kb-dir", str(kb_dir),
-                     "--json"],
-                    capture_output=True,
-                    text=True
-                )
-
-                if result.returncode == 0:
-                    results[kb_name] = json.loads(result.stdout)
-            except Exception as e:
-                print(f"Errore ricerca in {kb_name}: {e}")
+    def _kb_search_dir(self, kb: Dict[str, Any]) -> Path:
+        """Directory knowledge_base di una KB del registry (i percorsi registrati includono già base_dir)"""
+        return Path(kb.get('knowledge_base_dir') or Path(kb['kb_directory']) / "knowledge_base")
+
+    def _get_searcher(self, kb: Dict[str, Any]) -> SinamicsKBSearch:
+        """Searcher della KB, aperto una sola volta"""
+        kb_dir = str(self._kb_search_dir(kb))
+        searcher = self._searchers.get(kb_dir)
+        if searcher is None:
+            searcher = self._searchers[kb_dir] = SinamicsKBSearch(kb_dir)
+        return searcher
+
+    def _keyword_stats(self, kb: Dict[str, Any], keyword: str) -> Optional[Dict[str, Any]]:
+        """Statistiche BM25 di una KB per la keyword (None senza indice full-text o in errore)"""
+        try:
+            return self._get_searcher(kb).keyword_stats(keyword)
+        except Exception:
+            # L'errore viene riportato dalla ricerca
+            return None
+
+    def _search_kb(self, kb: Dict[str, Any], keyword: str, limit: int,
+                   stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Ricerca in una KB, risultati marcati con il nome della KB"""
+        try:
+            results = self._get_searcher(kb).search_by_keyword(keyword, limit=limit, stats=stats)
+        except Exception as e:
+            print(f"Errore ricerca in {kb['name']}: {e}")
+            return []
+        return [{**result, 'kb': kb['name']} for result in results]
+
+    def search_kbs(self, keyword: str, limit: int = 5, kb_name: Optional[str] = None,
+                   max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Ricerca in tutte le KB in parallelo (thread pool, nello stesso processo)
 
+        Args:
+            keyword: Parola chiave da cercare
+            limit: Numero massimo di risultati complessivi
+            kb_name: Limita la ricerca a una KB
+            max_workers: Thread del pool (default: ThreadPoolExecutor)
+
+        Returns:
+            Risultati di tutte le KB con campo 'kb'. Le KB con indice full-text sono
+            interrogate con statistiche BM25 comuni (numero di documenti, lunghezza media
+            e document frequency sommati su tutte), quindi il loro 'score' è confrontabile
+            tra KB: questi risultati vengono prima, per score, con relevance normalizzata
+            sul miglior score. Seguono i risultati delle KB senza indice full-text, per
+            relevance (normalizzata sul primo risultato della propria KB).
+        """
+        kbs = [kb for kb in self.kb_registry.get("knowledge_bases", [])
+               if not kb_name or kb['name'] == kb_name]
+        if not kbs:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # IDF e lunghezza media globali: prima le statistiche di ogni KB, poi le ricerche
+            stats = combine_stats(item for item in pool.map(lambda kb: self._keyword_stats(kb, keyword), kbs)
+                                  if item is not None)
+            per_kb = pool.map(lambda kb: self._search_kb(kb, keyword, limit, stats), kbs)
+            merged = [result for results in per_kb for result in results]
+
+        merged.sort(key=lambda r: ('score' in r, r.get('score', r.get('relevance', 0))), reverse=True)
+        merged = merged[:limit]
+
+        top_score = max((r['score'] for r in merged if 'score' in r), default=0)
+        if top_score > 0:
+            for result in merged:
+                if 'score' in result:
+                    result['relevance'] = result['score'] / top_score
+        return merged
+
+    def search_all_kbs(self, keyword: str, limit: int = 5, kb_name: Optional[str] = None) -> Dict[str, List]:
+        """Ricerca in tutte le KB, risultati raggruppati per KB"""
+        results: Dict[str, List] = {}
+        for result in self.search_kbs(keyword, limit, kb_name=kb_name):
+            results.setdefault(result['kb'], []).append(result)
         return results
 
     def generate_unified_index(self, output_file: str = "unified_kb_index.json") -> None:
@@ -259,20 +227,23 @@ def main():
         epilog='''
 Esempi:
   %(prog)s --add documento.pdf --name sinamics_s120 --desc "SINAMICS S120/S150"
+  %(prog)s --add manuale1.pdf manuale2.pdf manuale3.pdf --jobs 4
   %(prog)s --list
   %(prog)s --search "parametri" --name sinamics_s120
   %(prog)s --unified-index
         '''
     )
 
-    parser.add_argument('--add', metavar='PDF_FILE', help='Aggiungi nuovo PDF')
-    parser.add_argument('--name', help='Nome della knowledge base')
+    parser.add_argument('--add', metavar='PDF_FILE', nargs='+', help='Aggiungi nuovi PDF')
+    parser.add_argument('--name', help='Nome della knowledge base (un solo PDF; default: nome del file)')
     parser.add_argument('--desc', default='', help='Descrizione KB')
     parser.add_argument('--list', action='store_true', help='Lista KB registrate')
     parser.add_argument('--search', help='Ricerca in tutte le KB')
     parser.add_argument('--kb-name', help='Filtra ricerca per KB specifica')
     parser.add_argument('--limit', type=int, default=5, help='Limite risultati')
     parser.add_argument('--unified-index', action='store_true', help='Genera indice unificato')
+    parser.add_argument('--jobs', type=int, default=None, help='PDF elaborati in parallelo con --add')
+    parser.add_argument('--force', action='store_true', help='Con --add rielabora anche i PDF invariati')
 
     args = parser.parse_args()
 
@@ -280,17 +251,22 @@ Esempi:
         kb_manager = MultiPDFKnowledgeBase()
 
         if args.add:
-            if not args.name:
+            if len(args.add) == 1 and not args.name:
                 print("Errore: --name è obbligatorio con --add")
                 sys.exit(1)
-            kb_manager.add_pdf(args.add, args.name, args.desc)
+            if len(args.add) > 1 and args.name:
+                print("Errore: --name vale per un solo PDF (con più PDF si usa il nome del file)")
+                sys.exit(1)
+            pdfs = [(pdf, args.name or Path(pdf).stem, args.desc) for pdf in args.add]
+            if kb_manager.add_pdfs(pdfs, max_workers=args.jobs, force=args.force):
+                sys.exit(1)
 
         elif args.list:
             kb_manager.list_kbs()
 
         elif args.search:
             print(f"\nRicerca '{args.search}' in tutte le KB...")
-            results = kb_manager.search_all_kbs(args.search, args.limit)
+            results = kb_manager.search_all_kbs(args.search, args.limit, kb_name=args.kb_name)
 
             for kb_name, kb_results in results.items():
                 print(f"\n{kb_name}:")
@@ -5,9 +5,19 @@ Ricerca unificata in SINAMICS S120/S150 + S7-1500
 """
 
 import json
+import sys
 import argparse
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
+
+try:
+    from kb_text_index import TextIndex
+    from kb_sqlite_store import KBStore, STORE_FILE
+    from kb_code_index import CodeIndex
+except ImportError:
+    from .kb_text_index import TextIndex
+    from .kb_sqlite_store import KBStore, STORE_FILE
+    from .kb_code_index import CodeIndex
 
 
 class MasterKBSearcher:
@@ -23,11 +33,21 @@ class MasterKBSearcher:
         self.index = {}
         self.search_index = {}
         self.alarms_faults = {}
+        # Indice full-text (BM25) della Master KB, caricato alla prima ricerca
+        self.text_index = TextIndex.open(self.kb_path)
+        # Store SQLite (FTS5): se presente i JSON grandi non vengono caricati
+        self.store = KBStore.open(self.kb_path)
+        # Indice hash dei codici allarme/fault, costruito (o letto dalla cache) al primo uso
+        self._code_index: Optional[CodeIndex] = None
 
         self._load_kb()
 
     def _load_kb(self) -> None:
         """Carica la Master KB"""
+        if self.store is not None:
+            self.index = self.store.index()
+            return
+
         # Carica master index
         index_file = self.kb_path / "master_index.json"
         if index_file.exists():
@@ -49,6 +69,11 @@ class MasterKBSearcher:
     def search_by_keyword(self, keyword: str, system: str = None,
                          category: str = None, limit: int = 5) -> List[Dict[str, Any]]:
         """Ricerca per keyword"""
+        if self.text_index is not None:
+            return self._search_text_index(keyword, system, category, limit)
+        if self.store is not None:
+            return self._search_store(keyword, system, category, limit)
+
         results = []
 
         for cat, items in self.search_index.items():
@@ -78,57 +103,88 @@ class MasterKBSearcher:
         results.sort(key=lambda x: -x['relevance'])
         return results[:limit]
 
-    def search_alarm_by_code(self, code: str, system: str = None) -> Dict[str, Any]:
-        """Ricerca allarme per codice"""
-        alarms = self.alarms_faults.get('alarms', {})
-
-        for key, alarm in alarms.items():
-            if system and alarm.get('source_system') != system:
-                continue
-
-            if key.endswith(code) or alarm.get('code', '') == code:
-                return {
-                    'found': True,
-                    'code': alarm.get('code', ''),
-                    'type': 'ALARM',
-                    'description': alarm.get('description', ''),
-                    'solution': alarm.get('solution', ''),
-                    'system': alarm.get('source_system', 'UNKNOWN'),
-                    'section_id': alarm.get('section_id', '')
-                }
-
+    def _search_text_index(self, keyword: str, system: str = None,
+                           category: str = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Ricerca BM25 nell'indice full-text, relevance normalizzata sul primo risultato"""
+        def accept(doc: Dict[str, Any]) -> bool:
+            if system and doc.get('source_system') != system:
+                return False
+            return not category or category in (doc.get('categories') or [])
+
+        hits = self.text_index.search(keyword, limit=limit,
+                                      accept=accept if (system or category) else None)
+        if not hits:
+            return []
+        top_score = hits[0][0]
+        return [
+            {
+                'section_id': doc.get('section_id', ''),
+                'section_num': doc.get('section_num', 0),
+                'content': (doc.get('preview') or '')[:200],
+                'category': category or (doc.get('categories') or ['text'])[0],
+                'system': doc.get('source_system', 'UNKNOWN'),
+                'relevance': round(score / top_score, 3)
+            }
+            for score, doc in hits
+        ]
+
+    def _search_store(self, keyword: str, system: str = None,
+                      category: str = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Ricerca FTS5 nelle anteprime dello store SQLite"""
+        return [
+            {
+                'section_id': row['section_id'],
+                'section_num': row['section_num'],
+                'content': (row['preview'] or '')[:200],
+                'category': (row['categories'] or ['text'])[0],
+                'system': row['source'] or 'UNKNOWN',
+                'relevance': row['relevance']
+            }
+            for row in self.store.search_sections(keyword, source=system, category=category, limit=limit)
+        ]
+
+    @property
+    def code_index(self) -> CodeIndex:
+        """Indice dei codici allarme/fault (cache code_index.json accanto alla KB)"""
+        if self._code_index is None:
+            if self.store is not None:
+                self._code_index = CodeIndex.cached(
+                    self.kb_path, self.kb_path / STORE_FILE,
+                    lambda: {kind: self.store.codes(kind) for kind in ('ALARM', 'FAULT')})
+            else:
+                self._code_index = CodeIndex.cached(
+                    self.kb_path, self.kb_path / "master_alarms_faults.json",
+                    lambda: {'ALARM': self.alarms_faults.get('alarms', {}).items(),
+                             'FAULT': self.alarms_faults.get('faults', {}).items()})
+        return self._code_index
+
+    def _code_result(self, kind: str, code: str, system: str = None) -> Dict[str, Any]:
+        """Ricerca allarme/fault nell'indice dei codici"""
+        entry = self.code_index.lookup(kind, code, system)
+        if entry is None:
+            label = 'Allarme' if kind == 'ALARM' else 'Fault'
+            return {'found': False, 'code': code, 'type': kind, 'error': f'{label} {code} non trovato'}
+        return self._code_entry(kind, entry)
+
+    def _code_entry(self, kind: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultato di un allarme/fault trovato"""
         return {
-            'found': False,
-            'code': code,
-            'type': 'ALARM',
-            'error': f'Allarme {code} non trovato'
+            'found': True,
+            'code': entry.get('code', ''),
+            'type': kind,
+            'description': entry.get('description', ''),
+            'solution': entry.get('solution', ''),
+            'system': entry.get('source_system', 'UNKNOWN'),
+            'section_id': entry.get('section_id', '')
         }
 
+    def search_alarm_by_code(self, code: str, system: str = None) -> Dict[str, Any]:
+        """Ricerca allarme per codice"""
+        return self._code_result('ALARM', code, system)
+
     def search_fault_by_code(self, code: str, system: str = None) -> Dict[str, Any]:
         """Ricerca fault per codice"""
-        faults = self.alarms_faults.get('faults', {})
-
-        for key, fault in faults.items():
-            if system and fault.get('source_system') != system:
-                continue
-
-            if key.endswith(code) or fault.get('code', '') == code:
-                return {
-                    'found': True,
-                    'code': fault.get('code', ''),
-                    'type': 'FAULT',
-                    'description': fault.get('description', ''),
-                    'solution': fault.get('solution', ''),
-                    'system': fault.get('source_system', 'UNKNOWN'),
-                    'section_id': fault.get('section_id', '')
-                }
-
-        return {
-            'found': False,
-            'code': code,
-            'type': 'FAULT',
-            'error': f'Fault {code} non trovato'
-        }
+        return self._code_result('FAULT', code, system)
 
     def search_alarm_or_fault(self, code: str, system: str = None) -> Dict[str, Any]:
         """Ricerca unificata allarme/fault"""
@@ -140,6 +196,37 @@ class MasterKBSearcher:
         # Se non trovato, prova i fault
         return self.search_fault_by_code(code, system)
 
+    def search_codes(self, codes: Iterable[str], system: str = None) -> Dict[str, Dict[str, Any]]:
+        """Ricerca unificata di più codici (es. buffer diagnostico PLC): codice -> risultato"""
+        results = {}
+        for code in codes:
+            code = code.strip()
+            if code and code not in results:
+                results[code] = self.search_alarm_or_fault(code, system)
+        return results
+
+    def search_alarm_text(self, keyword: str, kind: str = None, system: str = None,
+                          limit: int = 5) -> List[Dict[str, Any]]:
+        """Ricerca allarmi/fault per testo (codice, descrizione, soluzione); kind: 'ALARM' o 'FAULT'"""
+        if self.store is not None:
+            return [self._code_entry(entry['type'], entry)
+                    for entry in self.store.search_codes(keyword, kind=kind, source=system, limit=limit)]
+
+        keyword_lower = keyword.lower()
+        results = []
+        for entry_kind, key in (('ALARM', 'alarms'), ('FAULT', 'faults')):
+            if kind and kind != entry_kind:
+                continue
+            for entry in self.alarms_faults.get(key, {}).values():
+                if system and entry.get('source_system') != system:
+                    continue
+                text = ' '.join(str(entry.get(field, '')) for field in ('code', 'description', 'solution'))
+                if keyword_lower in text.lower():
+                    results.append(self._code_entry(entry_kind, entry))
+                    if len(results) >= limit:
+                        return results
+        return results
+
     def list_systems(self) -> Dict[str, Any]:
         """Lista i sistemi disponibili"""
         return {
@@ -149,6 +236,17 @@ class MasterKBSearcher:
 
     def list_chapters(self, system: str = None, limit: int = 20) -> List[Dict[str, Any]]:
         """Lista capitoli"""
+        if self.store is not None:
+            return [
+                {
+                    'id': chapter.get('id', ''),
+                    'title': chapter.get('title', ''),
+                    'system': chapter.get('source_system', 'UNKNOWN'),
+                    'sections_count': chapter.get('sections_count', 0)
+                }
+                for chapter in self.store.chapters(source=system, limit=limit)
+            ]
+
         chapters = []
 
         for cat, items in self.search_index.items():
@@ -168,6 +266,26 @@ class MasterKBSearcher:
 
         return chapters[:limit]
 
+    def search_chapters(self, keyword: str, system: str = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Ricerca nei titoli dei capitoli"""
+        if self.store is not None:
+            chapters = self.store.search_chapters(keyword, source=system, limit=limit)
+        else:
+            keyword_lower = keyword.lower()
+            chapters = [item for item in self.search_index.get('chapters', [])
+                        if keyword_lower in str(item.get('title', '')).lower()
+                        and (not system or item.get('source_system') == system)][:limit]
+
+        return [
+            {
+                'id': chapter.get('id', ''),
+                'title': chapter.get('title', ''),
+                'system': chapter.get('source_system', 'UNKNOWN'),
+                'sections_count': chapter.get('sections_count', 0)
+            }
+            for chapter in chapters
+        ]
+
     def get_system_stats(self, system: str = None) -> Dict[str, Any]:
         """Statistiche del sistema"""
         metadata = self.index.get('metadata', {})
@@ -214,6 +332,14 @@ Esempi:
   # Ricerca unificata
   %(prog)s --code "2135"
 
+  # Ricerca testuale in allarmi/fault e nei titoli dei capitoli
+  %(prog)s --search-alarms "overtemperature"
+  %(prog)s --search-chapters "PROFIdrive"
+
+  # Ricerca di più codici (anche esadecimali, es. da buffer diagnostico)
+  %(prog)s --codes F07801 A7850 16#1E79
+  %(prog)s --codes-file diagnostica.txt --json
+
   # Lista sistemi
   %(prog)s --list-systems
 
@@ -232,6 +358,10 @@ Esempi:
     parser.add_argument('--alarm', help='Ricerca allarme per codice')
     parser.add_argument('--fault', help='Ricerca fault per codice')
     parser.add_argument('--code', help='Ricerca unificata (alarm o fault)')
+    parser.add_argument('--codes', nargs='+', help='Ricerca unificata di più codici')
+    parser.add_argument('--codes-file', help='File con un codice per riga (- per stdin)')
+    parser.add_argument('--search-alarms', metavar='TEXT', help='Ricerca testuale in allarmi/fault')
+    parser.add_argument('--search-chapters', metavar='TEXT', help='Ricerca nei titoli dei capitoli')
     parser.add_argument('--system', help='Filtra per sistema (SINAMICS_S120_S150 o S7-1500)')
     parser.add_argument('--category', help='Filtra per categoria')
     parser.add_argument('--list-systems', action='store_true', help='Lista sistemi disponibili')
@@ -299,13 +429,51 @@ Esempi:
             else:
                 print(f"\n❌ {result['error']}")
 
+    elif args.codes or args.codes_file:
+        codes = list(args.codes or [])
+        if args.codes_file:
+            if args.codes_file == '-':
+                codes.extend(sys.stdin.read().split())
+            else:
+                with open(args.codes_file, 'r', encoding='utf-8') as f:
+                    codes.extend(f.read().split())
+        result = searcher.search_codes(codes, system=args.system)
+        if not args.json:
+            found = sum(1 for item in result.values() if item['found'])
+            print(f"\n🔍 Codici: {found}/{len(result)} trovati")
+            for code, item in result.items():
+                if item['found']:
+                    print(f"  ✓ {code}: {item['type']} {item['code']} - {item['description'][:80]}")
+                else:
+                    print(f"  ❌ {item['error']}")
+
+    elif args.search_alarms:
+        result = searcher.search_alarm_text(args.search_alarms, system=args.system, limit=args.limit)
+        if not args.json:
+            print(f"\n🔍 Allarmi/fault: '{args.search_alarms}'")
+            if not result:
+                print("   ❌ Nessun risultato trovato")
+            for item in result:
+                print(f"  • {item['type']} {item['code']} - {item['description'][:80]}")
+                print(f"    Sistema: {item['system']}")
+
+    elif args.search_chapters:
+        result = searcher.search_chapters(args.search_chapters, system=args.system, limit=args.limit)
+        if not args.json:
+            print(f"\n📖 Capitoli: '{args.search_chapters}'")
+            if not result:
+                print("   ❌ Nessun risultato trovato")
+            for chapter in result:
+                print(f"  • {chapter['title']}")
+                print(f"    Sistema: {chapter['system']} | Sezioni: {chapter['sections_count']}")
+
     elif args.list_systems:
         result = searcher.list_systems()
         if not args.json:
             metadata = result.get('metadata', {})
             print(f"\n📚 Sistemi disponibili:")
-            for sys in result.get('systems', []):
-                print(f"  • {sys}")
+            for system_name in result.get('systems', []):
+                print(f"  • {system_name}")
             print(f"\n📊 Statistiche Master:")
             print(f"   Sezioni totali: {metadata.get('total_sections', 0):,}")
             print(f"   Capitoli totali: {metadata.get('total_chapters', 0)}")
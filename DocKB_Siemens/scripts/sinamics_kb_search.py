@@ -11,6 +11,15 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 import re
 
+try:
+    from kb_text_index import TextIndex
+    from kb_sqlite_store import KBStore
+    from kb_section_store import SectionStore
+except ImportError:
+    from .kb_text_index import TextIndex
+    from .kb_sqlite_store import KBStore
+    from .kb_section_store import SectionStore
+
 
 class SinamicsKBSearch:
     """Interfaccia di ricerca per la knowledge base SINAMICS"""
@@ -24,7 +33,13 @@ class SinamicsKBSearch:
         self.metadata_file = self.kb_dir / "metadata.json"
 
         self._validate_kb()
+        # Store SQLite (FTS5) delle KB unificate: sostituisce index/search_index JSON
+        self.store = KBStore.open(self.kb_dir)
         self._load_indexes()
+        # Indice full-text (BM25), caricato alla prima ricerca
+        self.text_index = TextIndex.open(self.kb_dir)
+        # Archivio sezioni (sections.dat/.idx); le KB precedenti usano sections/
+        self.sections = SectionStore.open(self.kb_dir)
 
     def _validate_kb(self) -> None:
         """Valida che la KB esista"""
@@ -35,11 +50,15 @@ class SinamicsKBSearch:
 
     def _load_indexes(self) -> None:
         """Carica gli indici in memoria"""
-        with open(self.index_file, 'r', encoding='utf-8') as f:
-            self.index = json.load(f)
+        if self.store is not None:
+            self.index = self.store.index()
+            self.search_index = {}
+        else:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
 
-        with open(self.search_file, 'r', encoding='utf-8') as f:
-            self.search_index = json.load(f)
+            with open(self.search_file, 'r', encoding='utf-8') as f:
+                self.search_index = json.load(f)
 
         if self.metadata_file.exists():
             with open(self.metadata_file, 'r', encoding='utf-8') as f:
@@ -47,17 +66,30 @@ class SinamicsKBSearch:
         else:
             self.metadata = {}
 
-    def search_by_keyword(self, keyword: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def keyword_stats(self, keyword: str) -> Optional[Dict[str, Any]]:
+        """Statistiche BM25 della KB per la keyword (None senza indice full-text)"""
+        if self.text_index is None:
+            return None
+        return self.text_index.collection_stats(keyword)
+
+    def search_by_keyword(self, keyword: str, limit: int = 10,
+                          stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Ricerca per keyword nel contenuto delle sezioni
 
         Args:
             keyword: Parola chiave da cercare
             limit: Numero massimo di risultati
+            stats: Statistiche BM25 di più KB (combine_stats), per punteggi confrontabili tra KB
 
         Returns:
-            Lista di sezioni corrispondenti
+            Lista di sezioni corrispondenti; solo i risultati dell'indice full-text hanno 'score' (BM25)
         """
+        if self.text_index is not None:
+            return self._search_text_index(keyword, limit, stats)
+        if self.store is not None:
+            return self._search_store(keyword, limit)
+
         results = []
         keyword_lower = keyword.lower()
         pattern = re.compile(keyword_lower, re.IGNORECASE)
@@ -77,6 +109,49 @@ class SinamicsKBSearch:
         results = sorted(results, key=lambda x: x.get('relevance', 0), reverse=True)[:limit]
         return results
 
+    def _search_text_index(self, keyword: str, limit: int,
+                           stats: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Ricerca BM25 nell'indice full-text: 'score' grezzo, relevance normalizzata sul primo risultato"""
+        hits = self.text_index.search(keyword, limit=limit, stats=stats)
+        if not hits:
+            return []
+        top_score = hits[0][0]
+        return [
+            {
+                'type': 'text',
+                'category': (doc.get('categories') or ['text'])[0],
+                'section_id': doc.get('section_id'),
+                'relevance': score / top_score,
+                'score': round(score, 4),
+                'preview': doc.get('preview', '')
+            }
+            for score, doc in hits
+        ]
+
+    def _search_store(self, keyword: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Ricerca FTS5 nelle anteprime dello store SQLite
+
+        Il bm25() di FTS5 è calcolato sulle sole anteprime e non è confrontabile con
+        lo 'score' dell'indice full-text: i risultati hanno solo la relevance,
+        normalizzata sul primo risultato.
+        """
+        rows = self.store.search_sections(keyword, limit=limit)
+        if not rows:
+            return []
+        # bm25() di FTS5 è negativo (più basso = migliore)
+        top_score = rows[0]['score']
+        return [
+            {
+                'type': 'text',
+                'category': (row['categories'] or ['text'])[0],
+                'section_id': row['section_id'],
+                'relevance': row['score'] / top_score if top_score else 1.0,
+                'preview': row['preview'] or ''
+            }
+            for row in rows
+        ]
+
     def search_by_category(self, category: str) -> List[Dict[str, Any]]:
         """
         Ricerca per categoria
@@ -89,6 +164,20 @@ class SinamicsKBSearch:
         """
         category_lower = category.lower()
 
+        if self.store is not None:
+            sections = self.store.sections_by_category(category_lower)
+            if not sections:
+                available = self.list_categories()
+                raise ValueError(f"Categoria '{category}' non trovata. Disponibili: {', '.join(available)}")
+            return [
+                {
+                    'section_id': s['section_id'],
+                    'relevance': s['relevance'],
+                    'preview': s['preview'] or ''
+                }
+                for s in sections
+            ]
+
         if category_lower not in self.search_index:
             available = list(self.search_index.keys())
             raise ValueError(f"Categoria '{category}' non trovata. Disponibili: {', '.join(available)}")
@@ -113,6 +202,12 @@ class SinamicsKBSearch:
         Returns:
             Dati completi della sezione
         """
+        if self.sections is not None:
+            section = self.sections.get(section_id)
+            if section is None:
+                raise FileNotFoundError(f"Sezione non trovata: {section_id}")
+            return section
+
         section_file = self.sections_dir / f"{section_id}.json"
 
         if not section_file.exists():
@@ -131,6 +226,12 @@ class SinamicsKBSearch:
         Returns:
             Dati del capitolo
         """
+        if self.store is not None:
+            chapter = self.store.chapter(chapter_id)
+            if chapter is None:
+                raise ValueError(f"Capitolo non trovato: {chapter_id}")
+            return chapter
+
         for chapter in self.index.get('chapters', []):
             if chapter['id'] == chapter_id:
                 return chapter
@@ -147,9 +248,39 @@ class SinamicsKBSearch:
         Returns:
             Lista di capitoli
         """
-        chapters = self.index.get('chapters', [])
-        if limit:
-            chapters = chapters[:limit]
+        if self.store is not None:
+            chapters = self.store.chapters(limit=limit or None)
+        else:
+            chapters = self.index.get('chapters', [])
+            if limit:
+                chapters = chapters[:limit]
+
+        return [
+            {
+                'id': ch['id'],
+                'title': ch.get('title', ''),
+                'sections_count': ch.get('sections_count', 0)
+            }
+            for ch in chapters
+        ]
+
+    def search_chapters(self, keyword: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Ricerca nei titoli dei capitoli (FTS5 se la KB ha lo store SQLite)
+
+        Args:
+            keyword: Testo da cercare nel titolo
+            limit: Numero massimo di capitoli
+
+        Returns:
+            Capitoli corrispondenti
+        """
+        if self.store is not None:
+            chapters = self.store.search_chapters(keyword, limit=limit)
+        else:
+            keyword_lower = keyword.lower()
+            chapters = [ch for ch in self.index.get('chapters', [])
+                        if keyword_lower in ch.get('title', '').lower()][:limit]
 
         return [
             {
@@ -162,6 +293,8 @@ class SinamicsKBSearch:
 
     def list_categories(self) -> List[str]:
         """Lista le categorie di ricerca disponibili"""
+        if self.store is not None:
+            return self.store.categories()
         return list(self.search_index.keys())
 
     def get_metadata(self) -> Dict[str, Any]:
@@ -230,6 +363,7 @@ Esempi:
   %(prog)s --get sezione_000001
   %(prog)s --chapter ch_0
   %(prog)s --list-chapters
+  %(prog)s --search-chapters "PROFIdrive"
   %(prog)s --list-categories
   %(prog)s --metadata
         '''
@@ -241,6 +375,7 @@ Esempi:
     parser.add_argument('--get', metavar='SECTION_ID', help='Recupera una sezione')
     parser.add_argument('--chapter', help='Informazioni su un capitolo')
     parser.add_argument('--list-chapters', action='store_true', help='Lista tutti i capitoli')
+    parser.add_argument('--search-chapters', metavar='TEXT', help='Ricerca nei titoli dei capitoli')
     parser.add_argument('--list-categories', action='store_true', help='Lista categorie')
     parser.add_argument('--navigate', metavar='SECTION_ID', help='Naviga sezione (con --direction)')
     parser.add_argument('--direction', choices=['next', 'previous'], default='next')
@@ -277,6 +412,12 @@ Esempi:
                      '\n'.join([f"{ch['id']}: {ch['title']} ({ch['sections_count']} sezioni)"
                               for ch in chapters])
 
+        elif args.search_chapters:
+            chapters = kb.search_chapters(args.search_chapters, limit=args.limit)
+            output = json.dumps(chapters, indent=2, ensure_ascii=False) if args.json else \
+                     '\n'.join([f"{ch['id']}: {ch['title']} ({ch['sections_count']} sezioni)"
+                              for ch in chapters]) or "Nessun capitolo trovato."
+
         elif args.list_categories:
             categories = kb.list_categories()
             output = json.dumps(categories, indent=2, ensure_ascii=False) if args.json else \
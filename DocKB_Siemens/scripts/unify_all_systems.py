@@ -4,21 +4,43 @@ Unifica SINAMICS + S7-1500 in un unico master index globale
 Sistema completo di documentazione tecnica Siemens
 """
 
+import argparse
 import json
 from pathlib import Path
 from typing import Dict, List, Any
 from collections import defaultdict
 
+try:
+    from kb_text_index import (FORMAT_VERSION as TEXT_INDEX_VERSION, INDEX_FILES as TEXT_INDEX_FILES,
+                               merge_text_indexes)
+    from kb_sqlite_store import STORE_VERSION, write_kb_store
+    from kb_state import UNIFY_STATE_FILE, detect_changes, save_state, stage_key
+except ImportError:
+    from .kb_text_index import (FORMAT_VERSION as TEXT_INDEX_VERSION, INDEX_FILES as TEXT_INDEX_FILES,
+                                merge_text_indexes)
+    from .kb_sqlite_store import STORE_VERSION, write_kb_store
+    from .kb_state import UNIFY_STATE_FILE, detect_changes, save_state, stage_key
+
+# Versione della logica di unificazione: se cambia, la prossima esecuzione ricostruisce tutto
+UNIFY_VERSION = 1
+
 
 class MasterUnifiedKB:
     """Master unified KB per SINAMICS + S7-1500"""
 
+    # File di ogni sistema unificato che contribuiscono alla master KB
+    SYSTEM_INPUTS = ('index.json', 'search_index.json', *TEXT_INDEX_FILES, 'alarms_faults.json')
+    # Output che devono esistere per saltare l'unificazione
+    MASTER_OUTPUTS = ('master_index.json', 'master_search_index.json', 'master_alarms_faults.json')
+
     def __init__(self):
         self.systems = {}  # {system_name: {kbs_data}}
         self.master_index = {}
         self.master_search_index = defaultdict(list)
         self.master_alarms = {}
         self.master_faults = {}
+        # Stato delle sorgenti da salvare con la master KB, impostato da detect_changes
+        self.unify_state = None
 
     def load_system(self, system_name: str, unified_kb_dir: str) -> None:
         """Carica un sistema già unificato"""
@@ -39,17 +61,13 @@ class MasterUnifiedKB:
             with open(alarms_file, 'r', encoding='utf-8') as f:
                 alarms_data = json.load(f)
 
-        search_data = {}
-        if search_file.exists():
-            with open(search_file, 'r', encoding='utf-8') as f:
-                search_data = json.load(f)
-
+        # Il search index (il file più grande) viene letto in build_master_index
         self.systems[system_name] = {
             'path': kb_path,
             'index': index_data,
             'alarms': alarms_data.get('alarms', {}),
             'faults': alarms_data.get('faults', {}),
-            'search_index': search_data,
+            'search_file': search_file,
             'metadata': index_data.get('metadata', {})
         }
 
@@ -60,6 +78,43 @@ class MasterUnifiedKB:
         print(f"  Allarmi: {len(self.systems[system_name]['alarms'])}")
         print(f"  Fault: {len(self.systems[system_name]['faults'])}")
 
+    def detect_changes(self, output_dir: str, system_dirs: Dict[str, str], force: bool = False) -> bool:
+        """
+        Confronta i sistemi unificati con l'ultima unificazione in output_dir
+
+        Usa solo gli hash dei file di input: i sistemi vengono caricati dopo, e
+        solo se la master KB va ricostruita. La ricostruzione è sempre completa.
+
+        Args:
+            output_dir: directory dell'output unificato
+            system_dirs: nome sistema -> directory della sua KB unificata
+            force: ricostruzione anche se nulla è cambiato
+
+        Returns:
+            True se la master KB va ricostruita
+        """
+        changed, removed, self.unify_state = detect_changes(
+            Path(output_dir),
+            {name: (Path(system_dir), self.SYSTEM_INPUTS) for name, system_dir in system_dirs.items()},
+            self.MASTER_OUTPUTS,
+            version=stage_key('unify', UNIFY_VERSION, TEXT_INDEX_VERSION, STORE_VERSION),
+            force=force
+        )
+        if changed is None:
+            print("\n🔄 Ricostruzione master KB (nessuno stato valido, versione cambiata o --force)")
+            return True
+        if not changed and not removed:
+            return False
+        print(f"\n🔄 Ricostruzione master KB: {len(changed)} sistemi modificati, {len(removed)} rimossi")
+        return True
+
+    def _load_search_index(self, system: Dict[str, Any]) -> Dict[str, List]:
+        search_file = system['search_file']
+        if not search_file.exists():
+            return {}
+        with open(search_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     def build_master_index(self) -> Dict[str, Any]:
         """Costruisce l'indice master"""
         print("\n🔗 Costruzione master index...")
@@ -85,7 +140,8 @@ class MasterUnifiedKB:
                 self.master_faults[key] = {**fault, 'source_system': system_name}
 
             # Consolidate search indices
-            for category, items in system_data['search_index'].items():
+            search_data = self._load_search_index(system_data)
+            for category, items in search_data.items():
                 for item in items:
                     item['source_system'] = system_name
                     self.master_search_index[category].append(item)
@@ -141,6 +197,14 @@ class MasterUnifiedKB:
             json.dump(dict(self.master_search_index), f, indent=2, ensure_ascii=False)
         print(f"  ✓ master_search_index.json")
 
+        # Unisce gli indici full-text dei sistemi
+        merged = merge_text_indexes(
+            ((system['path'], {'source_system': name}) for name, system in self.systems.items()),
+            out_path
+        )
+        if merged:
+            print(f"  ✓ text_index.* ({merged} sistemi uniti)")
+
         # Salva master allarmi/fault
         with open(out_path / "master_alarms_faults.json", 'w', encoding='utf-8') as f:
             json.dump({
@@ -151,6 +215,20 @@ class MasterUnifiedKB:
             }, f, indent=2, ensure_ascii=False)
         print(f"  ✓ master_alarms_faults.json ({len(self.master_alarms)} allarmi, {len(self.master_faults)} fault)")
 
+        # Salva store SQLite (FTS5) con i capitoli dei sistemi
+        chapters = [
+            {**chapter, 'source_system': system_name}
+            for system_name, system in self.systems.items()
+            for chapter in system['index'].get('chapters', [])
+        ]
+        store_file = write_kb_store(out_path, {**self.master_index, 'chapters': chapters},
+                                    dict(self.master_search_index),
+                                    self.master_alarms, self.master_faults, 'source_system')
+        if store_file:
+            print(f"  ✓ {store_file.name} (FTS5)")
+        else:
+            print(f"  ⚠ SQLite senza FTS5: store non creato")
+
         # Salva CSV
         import csv
         with open(out_path / "master_alarms_faults.csv", 'w', newline='', encoding='utf-8') as f:
@@ -191,11 +269,20 @@ class MasterUnifiedKB:
             }, f, indent=2, ensure_ascii=False)
         print(f"  ✓ master_metadata.json")
 
+        # Stato delle sorgenti: la prossima esecuzione salta se sono invariate
+        if self.unify_state is not None:
+            save_state(out_path / UNIFY_STATE_FILE, self.unify_state)
+            print(f"  ✓ {UNIFY_STATE_FILE}")
+
         print(f"\n✓ Master KB salvata in {output_dir}/")
 
 
 def main():
     """Funzione principale"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--force', action='store_true', help='Ricostruisce tutto anche se le sorgenti sono invariate')
+    args = parser.parse_args()
+
     print("=" * 80)
     print("UNIFICAZIONE MASTER KB: SINAMICS + S7-1500")
     print("=" * 80)
@@ -204,16 +291,28 @@ def main():
 
     master = MasterUnifiedKB()
 
-    # Carica i due sistemi unificati
-    print("\n📚 Caricamento sistemi...")
+    # I due sistemi unificati presenti
+    system_dirs = {
+        name: str(kb_base_path / directory)
+        for name, directory in (("SINAMICS_S120_S150", "unified_knowledge_base"),
+                                ("S7-1500", "unified_s7_1500_knowledge_base"))
+        if (kb_base_path / directory).exists()
+    }
+    if not system_dirs:
+        print("❌ Nessun sistema unificato trovato!")
+        return
 
-    sinamics_path = kb_base_path / "unified_knowledge_base"
-    if sinamics_path.exists():
-        master.load_system("SINAMICS_S120_S150", str(sinamics_path))
+    master_output_dir = str(kb_base_path / "master_knowledge_base")
 
-    s7_1500_path = kb_base_path / "unified_s7_1500_knowledge_base"
-    if s7_1500_path.exists():
-        master.load_system("S7-1500", str(s7_1500_path))
+    # Salta l'unificazione (senza caricare i sistemi) se nessun sistema è cambiato
+    if not master.detect_changes(master_output_dir, system_dirs, force=args.force):
+        print(f"\n✓ Master KB già aggiornata: {master_output_dir}")
+        return
+
+    # Carica i sistemi unificati
+    print("\n📚 Caricamento sistemi...")
+    for name, system_dir in system_dirs.items():
+        master.load_system(name, system_dir)
 
     if not master.systems:
         print("❌ Nessun sistema unificato trovato!")
@@ -223,7 +322,6 @@ def main():
     master.build_master_index()
 
     # Salva master KB
-    master_output_dir = str(kb_base_path / "master_knowledge_base")
     master.save_master_kb(master_output_dir)
 
     # Statistiche finali
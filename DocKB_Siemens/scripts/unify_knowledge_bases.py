@@ -4,21 +4,45 @@ Unifica tutte le Knowledge Base in un indice master globale
 Combina sezioni, capitoli, allarmi e fault da tutte le KB
 """
 
+import argparse
 import json
 from pathlib import Path
 from typing import Dict, List, Any
 from collections import defaultdict
 
+try:
+    from kb_text_index import (FORMAT_VERSION as TEXT_INDEX_VERSION, INDEX_FILES as TEXT_INDEX_FILES,
+                               merge_text_indexes)
+    from kb_sqlite_store import STORE_VERSION, write_kb_store
+    from kb_state import UNIFY_STATE_FILE, detect_changes, save_state, stage_key
+except ImportError:
+    from .kb_text_index import (FORMAT_VERSION as TEXT_INDEX_VERSION, INDEX_FILES as TEXT_INDEX_FILES,
+                                merge_text_indexes)
+    from .kb_sqlite_store import STORE_VERSION, write_kb_store
+    from .kb_state import UNIFY_STATE_FILE, detect_changes, save_state, stage_key
+
+# Versione della logica di unificazione: se cambia, la prossima esecuzione ricostruisce tutto
+UNIFY_VERSION = 1
+
 
 class UnifiedKnowledgeBase:
     """Crea una KB unificata da multiple KB separate"""
 
+    # File di ogni KB che contribuiscono alla KB unificata (relativi alla directory KB)
+    KB_INPUTS = ('knowledge_base/index.json', 'knowledge_base/search_index.json',
+                 *(f'knowledge_base/{name}' for name in TEXT_INDEX_FILES),
+                 'alarms_faults.json')
+    # Output che devono esistere per saltare l'unificazione
+    UNIFIED_OUTPUTS = ('index.json', 'search_index.json', 'alarms_faults.json')
+
     def __init__(self):
         self.kbs = {}
         self.unified_index = {}
         self.unified_search_index = defaultdict(list)
         self.unified_alarms = {}
         self.unified_faults = {}
+        # Stato delle sorgenti da salvare con la KB unificata, impostato da detect_changes
+        self.unify_state = None
 
     def load_kb(self, kb_dir: str, kb_name: str, description: str = "") -> None:
         """Carica una KB"""
@@ -73,6 +97,36 @@ class UnifiedKnowledgeBase:
         print(f"  Allarmi: {len(data.get('alarms', {}))}")
         print(f"  Fault: {len(data.get('faults', {}))}")
 
+    def detect_changes(self, output_dir: str, kb_dirs: Dict[str, str], force: bool = False) -> bool:
+        """
+        Confronta le KB sorgenti con l'ultima unificazione in output_dir
+
+        Usa solo gli hash dei file di input: le KB vengono caricate dopo, e solo
+        se la KB unificata va ricostruita. La ricostruzione è sempre completa.
+
+        Args:
+            output_dir: directory dell'output unificato
+            kb_dirs: nome KB -> directory della KB
+            force: ricostruzione anche se nulla è cambiato
+
+        Returns:
+            True se la KB unificata va ricostruita
+        """
+        changed, removed, self.unify_state = detect_changes(
+            Path(output_dir),
+            {kb_name: (Path(kb_dir), self.KB_INPUTS) for kb_name, kb_dir in kb_dirs.items()},
+            self.UNIFIED_OUTPUTS,
+            version=stage_key('unify', UNIFY_VERSION, TEXT_INDEX_VERSION, STORE_VERSION),
+            force=force
+        )
+        if changed is None:
+            print("\n🔄 Ricostruzione KB unificata (nessuno stato valido, versione cambiata o --force)")
+            return True
+        if not changed and not removed:
+            return False
+        print(f"\n🔄 Ricostruzione KB unificata: {len(changed)} KB modificate, {len(removed)} rimosse")
+        return True
+
     def build_unified_index(self) -> Dict[str, Any]:
         """Costruisce l'indice unificato"""
         print("\n🔗 Costruzione indice unificato...")
@@ -192,6 +246,14 @@ class UnifiedKnowledgeBase:
             json.dump(dict(self.unified_search_index), f, indent=2, ensure_ascii=False)
         print(f"  ✓ search_index.json")
 
+        # Unisce gli indici full-text delle singole KB
+        merged = merge_text_indexes(
+            ((kb['path'] / "knowledge_base", {'source_kb': kb_name}) for kb_name, kb in self.kbs.items()),
+            out_path
+        )
+        if merged:
+            print(f"  ✓ text_index.* ({merged} KB unite)")
+
         # Salva allarmi e fault
         with open(out_path / "alarms_faults.json", 'w', encoding='utf-8') as f:
             json.dump({
@@ -202,6 +264,14 @@ class UnifiedKnowledgeBase:
             }, f, indent=2, ensure_ascii=False)
         print(f"  ✓ alarms_faults.json ({len(self.unified_alarms)} allarmi, {len(self.unified_faults)} fault)")
 
+        # Salva store SQLite (FTS5) per i searcher
+        store_file = write_kb_store(out_path, self.unified_index, dict(self.unified_search_index),
+                                    self.unified_alarms, self.unified_faults, 'source_kb')
+        if store_file:
+            print(f"  ✓ {store_file.name} (FTS5)")
+        else:
+            print(f"  ⚠ SQLite senza FTS5: store non creato")
+
         # Salva CSV allarmi
         import csv
         with open(out_path / "alarms_faults.csv", 'w', newline='', encoding='utf-8') as f:
@@ -241,11 +311,20 @@ class UnifiedKnowledgeBase:
             }, f, indent=2, ensure_ascii=False)
         print(f"  ✓ metadata.json")
 
+        # Stato delle sorgenti: la prossima esecuzione salta se sono invariate
+        if self.unify_state is not None:
+            save_state(out_path / UNIFY_STATE_FILE, self.unify_state)
+            print(f"  ✓ {UNIFY_STATE_FILE}")
+
         print(f"\n✓ KB unificata salvata in {output_dir}/")
 
 
 def main():
     """Funzione principale"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--force', action='store_true', help='Ricostruisce tutto anche se le sorgenti sono invariate')
+    args = parser.parse_args()
+
     print("=" * 70)
     print("UNIFICAZIONE KNOWLEDGE BASE SINAMICS")
     print("=" * 70)
@@ -255,35 +334,31 @@ def main():
 
     unifier = UnifiedKnowledgeBase()
 
+    kbs = [
+        ("sinamics_s120_communication", "SINAMICS S120 Communication Function Manual 06/2019"),
+        ("sinamics_s120_drive_functions", "SINAMICS S120 Drive Functions Function Manual 06/2020"),
+        ("sinamics_s120_s150_list_manual", "SINAMICS S120/S150 List Manual 06/2020"),
+    ]
+
+    unified_output_dir = str(kb_base_path / "unified_knowledge_base")
+
+    # Salta l'unificazione (senza caricare le KB) se nessuna KB è cambiata
+    if not unifier.detect_changes(unified_output_dir, {kb_name: str(kb_base_path / kb_name) for kb_name, _ in kbs},
+                                  force=args.force):
+        print(f"\n✓ KB unificata già aggiornata: {unified_output_dir}")
+        return
+
     # Carica tutte le KB
     print("\n📚 Caricamento Knowledge Base...")
-    unifier.load_kb(
-        str(kb_base_path / "sinamics_s120_communication"),
-        "sinamics_s120_communication",
-        "SINAMICS S120 Communication Function Manual 06/2019"
-    )
-    unifier.load_alarms_faults(str(kb_base_path / "sinamics_s120_communication"), "sinamics_s120_communication")
-
-    unifier.load_kb(
-        str(kb_base_path / "sinamics_s120_drive_functions"),
-        "sinamics_s120_drive_functions",
-        "SINAMICS S120 Drive Functions Function Manual 06/2020"
-    )
-    unifier.load_alarms_faults(str(kb_base_path / "sinamics_s120_drive_functions"), "sinamics_s120_drive_functions")
-
-    unifier.load_kb(
-        str(kb_base_path / "sinamics_s120_s150_list_manual"),
-        "sinamics_s120_s150_list_manual",
-        "SINAMICS S120/S150 List Manual 06/2020"
-    )
-    unifier.load_alarms_faults(str(kb_base_path / "sinamics_s120_s150_list_manual"), "sinamics_s120_s150_list_manual")
+    for kb_name, description in kbs:
+        unifier.load_kb(str(kb_base_path / kb_name), kb_name, description)
+        unifier.load_alarms_faults(str(kb_base_path / kb_name), kb_name)
 
     # Costruisci indici unificati
     unifier.build_unified_index()
     unifier.build_unified_search_index()
 
     # Salva KB unificata in kb/unified_knowledge_base
-    unified_output_dir = str(kb_base_path / "unified_knowledge_base")
     unifier.save_unified_kb(unified_output_dir)
 
     # Statistiche finali
@@ -4,9 +4,18 @@ Aggiorna SINAMICS_AlarmHandler.scl con dati della Unified Knowledge Base
 Converte i dati JSON in array SCL con tutti gli allarmi/fault consolidati
 """
 
+import argparse
 import json
 from pathlib import Path
 
+try:
+    from kb_state import artifact_record, load_state, save_state, stage_key
+except ImportError:
+    from .kb_state import artifact_record, load_state, save_state, stage_key
+
+# Versione del generatore: incrementare quando cambia il template SCL
+SCL_GENERATOR_VERSION = 1
+
 
 def escape_scl_string(s: str) -> str:
     """Escapa una stringa per SCL (max 256 caratteri)"""
@@ -350,19 +359,36 @@ END_FUNCTION
 
 def main():
     """Funzione principale"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kb-dir', default=None, help='Directory della Unified KB')
+    parser.add_argument('--force', action='store_true', help='Rigenera anche se allarmi/fault sono invariati')
+    args = parser.parse_args()
+
     print("=" * 80)
     print("AGGIORNAMENTO SINAMICS_AlarmHandler.scl DALLA UNIFIED KB")
     print("=" * 80)
     print()
 
     try:
+        output_file = Path("SINAMICS_AlarmHandler_Unified.scl")
+        state_file = output_file.with_name(output_file.name + ".state.json")
+        kb_dir = Path(args.kb_dir) if args.kb_dir else Path(__file__).parent.parent / "kb" / "unified_knowledge_base"
+
+        # Rigenera solo se alarms_faults.json o il generatore sono cambiati
+        state = load_state(state_file)
+        alarms_record = artifact_record(kb_dir / "alarms_faults.json", state.get('alarms_faults'))
+        key = stage_key('scl', SCL_GENERATOR_VERSION, alarms_record and alarms_record['sha256'])
+        if not args.force and output_file.exists() and alarms_record and state.get('input') == key:
+            print(f"✓ {output_file} già aggiornato (allarmi/fault invariati)")
+            return 0
+
         # Genera nuovo SCL
-        scl_content = generate_scl_alarm_handler()
+        scl_content = generate_scl_alarm_handler(str(kb_dir))
 
         # Salva file
-        output_file = Path("SINAMICS_AlarmHandler_Unified.scl")
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(scl_content)
+        save_state(state_file, {'input': key, 'alarms_faults': alarms_record})
 
         print(f"\n✅ SCL generato con successo!")
         print(f"   File: {output_file}")
@@ -9,6 +9,7 @@ Usage:
     python batch_convert_project.py "path/to/project"  # Output: path/to/project_Parsed
 """
 
+import io
 import os
 import sys
 import argparse
@@ -27,6 +28,9 @@ current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
 from main import identify_file_type, process_file
+from block_sidecar import BLOCK_SIDECAR_SUFFIX
+from output_sink import BackgroundWriter, OutputSink, archive_mode, encode_text, open_sink
+from batch_telemetry import BatchTelemetry
 from utils import setup_logging
 
 logger = logging.getLogger(__name__)
@@ -47,6 +51,7 @@ class FileResult:
     # Timing
     start_time: datetime = field(default_factory=datetime.now)
     processing_time: float = 0.0
+    stage_times: Dict[str, float] = field(default_factory=dict)  # identify, convert, validate (s)
 
     # Sizes
     input_size: int = 0
@@ -54,6 +59,7 @@ class FileResult:
 
     # Output
     output_path: Optional[Path] = None
+    output_files: List[Path] = field(default_factory=list)  # all generated files, relative to the sink
 
     # Error information
     error_type: Optional[str] = None  # PARSE_ERROR, VALIDATION_ERROR, IO_ERROR, etc.
@@ -187,60 +193,6 @@ def extract_placeholder_lines(content: str, max_lines: int = 10) -> List[Tuple[i
     return lines
 
 
-def find_output_file(output_dir: Path, stem: str, file_type: str) -> Optional[Path]:
-    """Find output file generated based on type"""
-    extensions = {
-        'fb': '.scl',
-        'fc': '.scl',
-        'db': '.db',
-        'udt': '.udt',
-        'tags': '.csv',
-        'scl_copy': '.scl'
-    }
-
-    ext = extensions.get(file_type)
-    if not ext:
-        return None
-
-    # First try direct match
-    output_file = output_dir / f"{stem}{ext}"
-    if output_file.exists():
-        return output_file
-
-    # Try glob pattern (for cases where name differs from stem)
-    try:
-        matches = list(output_dir.glob(f"*{ext}"))
-        if matches:
-            # Return most recently created
-            return max(matches, key=lambda p: p.stat().st_mtime)
-    except:
-        pass
-
-    return None
-
-
-def create_directory_mirror(source_root: Path, output_root: Path, xml_files: List[Path]) -> int:
-    """Create mirrored directory structure"""
-    dirs_created = 0
-    dirs_to_create = set()
-
-    # Collect all unique parent directories
-    for xml_file in xml_files:
-        rel_path = xml_file.relative_to(source_root)
-        output_dir = output_root / rel_path.parent
-        dirs_to_create.add(output_dir)
-
-    # Create all directories
-    for dir_path in sorted(dirs_to_create):
-        try:
-            dir_path.mkdir(parents=True, exist_ok=True)
-            dirs_created += 1
-        except Exception as e:
-            logger.warning(f"Failed to create directory {dir_path}: {e}")
-
-    return dirs_created
-
-
 # ============================================================================
 # FILE PROCESSOR
 # ============================================================================
@@ -248,8 +200,21 @@ def create_directory_mirror(source_root: Path, output_root: Path, xml_files: Lis
 class FileProcessor:
     """Processes individual files with comprehensive tracking"""
 
+    def __init__(self, write_sidecars: bool = False, sink: Optional[OutputSink] = None,
+                 output_root: Optional[Path] = None):
+        # Write <name>.block.json next to every generated FB/FC
+        self.write_sidecars = write_sidecars
+        # Destination of generated files (None: files in the given output_dir)
+        self.sink = sink
+        # Output directory or archive the sink writes to, prefixed to result.output_path
+        self.output_root = output_root
+
     def process_with_tracking(self, xml_file: Path, output_dir: Path, source_root: Path) -> FileResult:
-        """Process single file with error tracking and validation"""
+        """
+        Process single file with error tracking and validation
+
+        output_dir is relative to the sink root when the processor has a sink.
+        """
 
         relative_path = xml_file.relative_to(source_root)
         result = FileResult(
@@ -262,7 +227,9 @@ class FileProcessor:
 
         # Step 1: Identify file type
         try:
+            stage_start = time.time()
             file_type = identify_file_type(xml_file)
+            result.stage_times['identify'] = time.time() - stage_start
             result.file_type = file_type
 
             if not file_type:
@@ -288,11 +255,8 @@ class FileProcessor:
         start_time = time.time()
 
         try:
-            # Ensure output directory exists
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # Call existing process_file function (ZERO MODIFICATIONS)
-            process_file(xml_file, output_dir)
+            # Output directories are created by the sink on first write
+            outputs = process_file(xml_file, output_dir, self.write_sidecars, self.sink)
 
         except FileNotFoundError as e:
             result.status = 'IO_ERROR'
@@ -317,20 +281,21 @@ class FileProcessor:
             return result
 
         result.processing_time = time.time() - start_time
+        result.stage_times['convert'] = result.processing_time
+        result.output_files = list(outputs)
 
-        # Step 4: Find output file
-        output_file = find_output_file(output_dir, xml_file.stem, file_type)
+        # Step 4: Main output file (the sidecar is written after it)
+        output_file = next((path for path in outputs if not path.name.endswith(BLOCK_SIDECAR_SUFFIX)), None)
 
-        if output_file and output_file.exists():
-            result.output_path = output_file
+        if output_file is not None:
+            content = outputs[output_file]
+            result.output_path = self.output_root / output_file if self.output_root else output_file
+            result.output_size = len(content)
 
-            try:
-                result.output_size = output_file.stat().st_size
-            except:
-                result.output_size = 0
-
-            # Step 5: Validate output for placeholders
-            validation_result = self.validate_output(output_file)
+            # Step 5: Validate output for placeholders (content as written, no re-read)
+            stage_start = time.time()
+            validation_result = self.validate_content(content.decode('utf-8', errors='replace'))
+            result.stage_times['validate'] = time.time() - stage_start
             result.has_placeholders = validation_result['has_placeholders']
             result.placeholder_count = validation_result['count']
             result.placeholder_lines = validation_result['lines']
@@ -349,28 +314,16 @@ class FileProcessor:
 
         return result
 
-    def validate_output(self, output_file: Path) -> Dict:
-        """Validate output file for quality issues"""
-        try:
-            with open(output_file, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+    def validate_content(self, content: str) -> Dict:
+        """Validate generated content for quality issues"""
+        placeholder_count = content.count('???')
+        placeholder_lines = extract_placeholder_lines(content) if placeholder_count > 0 else []
 
-            placeholder_count = content.count('???')
-            placeholder_lines = extract_placeholder_lines(content) if placeholder_count > 0 else []
-
-            return {
-                'has_placeholders': placeholder_count > 0,
-                'count': placeholder_count,
-                'lines': placeholder_lines
-            }
-
-        except Exception as e:
-            logger.warning(f"Error validating {output_file.name}: {e}")
-            return {
-                'has_placeholders': False,
-                'count': 0,
-                'lines': []
-            }
+        return {
+            'has_placeholders': placeholder_count > 0,
+            'count': placeholder_count,
+            'lines': placeholder_lines
+        }
 
 
 # ============================================================================
@@ -440,12 +393,35 @@ class StatisticsCollector:
         return self.summary
 
 
+def apply_write_errors(results: List[FileResult],
+                       write_errors: List[Tuple[str, Exception]]) -> List[Tuple[FileResult, str]]:
+    """
+    Mark files whose outputs the background writer failed to store
+
+    write_errors: (path relative to the sink, exception) as collected by
+    BackgroundWriter.errors. Returns (result, previous status) of the results
+    changed to IO_ERROR.
+    """
+    errors_by_path = {Path(relative_path).as_posix(): error for relative_path, error in write_errors}
+    failed = []
+    for result in results:
+        for output_file in result.output_files:
+            error = errors_by_path.get(output_file.as_posix())
+            if error is not None:
+                failed.append((result, result.status))
+                result.status = 'IO_ERROR'
+                result.error_type = 'WRITE_ERROR'
+                result.error_message = f"Output could not be written: {error}"
+                break
+    return failed
+
+
 # ============================================================================
 # ERROR FILE CREATOR
 # ============================================================================
 
-def create_error_file(output_dir: Path, result: FileResult):
-    """Create .error placeholder file for failed conversions"""
+def create_error_file(output_dir: Path, result: FileResult, sink: Optional[OutputSink] = None):
+    """Create .error placeholder file for failed conversions (output_dir relative to sink if given)"""
     try:
         error_file_path = output_dir / f"{result.source_path.name}.error"
 
@@ -494,8 +470,11 @@ Processing Time: {result.processing_time:.2f} seconds
 For more information, check the batch_conversion_report.csv file.
 """
 
-        with open(error_file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if sink is not None:
+            sink.write(error_file_path, encode_text(content))
+        else:
+            with open(error_file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
 
         logger.debug(f"Created error file: {error_file_path}")
 
@@ -511,137 +490,145 @@ class CSVReportGenerator:
     """Generates comprehensive CSV report"""
 
     def generate(self, report_path: Path, source_root: Path, output_root: Path,
-                 summary: BatchSummary, all_results: List[FileResult], total_time: float):
-        """Generate CSV report"""
+                 summary: BatchSummary, all_results: List[FileResult], total_time: float,
+                 sink: Optional[OutputSink] = None):
+        """Generate CSV report (report_path relative to sink if given)"""
         try:
-            with open(report_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
-
-                # Header
-                writer.writerow(['BATCH CONVERSION REPORT'])
-                writer.writerow(['Generated:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-                writer.writerow(['Source:', str(source_root)])
-                writer.writerow(['Output:', str(output_root)])
-                writer.writerow([])
-
-                # Summary section
-                writer.writerow(['=== SUMMARY ==='])
-                writer.writerow(['Total Files Discovered:', summary.total_files])
-                writer.writerow(['Files Processed:', summary.files_processed])
-                writer.writerow(['Successful Conversions:', summary.files_succeeded])
-                writer.writerow(['Failed Conversions:', summary.files_failed])
-                writer.writerow(['Validation Errors (??? found):', summary.files_validation_errors])
-                writer.writerow(['Skipped (Non-XML/Unsupported):', summary.files_skipped])
-                writer.writerow(['Overall Success Rate:', f"{summary.success_rate:.1f}%"])
-                writer.writerow(['Total Processing Time:', format_duration(total_time)])
-                writer.writerow(['Average Time per File:', f"{summary.average_time:.2f}s"])
-                writer.writerow([])
-
-                # File type distribution
-                writer.writerow(['=== FILE TYPE DISTRIBUTION ==='])
-                writer.writerow(['File Type', 'Total', 'Success', 'Failed', 'Validation Errors', 'Skipped', 'Success Rate'])
-
-                for file_type in ['fb', 'fc', 'db', 'udt', 'tags']:
-                    total = summary.file_type_counts.get(file_type, 0)
-                    if total > 0:
-                        success = summary.success_by_type.get(file_type, 0)
-                        failed = summary.failed_by_type.get(file_type, 0)
-                        validation = summary.validation_errors_by_type.get(file_type, 0)
-                        skipped = total - success - failed - validation
-
-                        # Calculate success rate (excluding skipped)
-                        processable = total - skipped
-                        if processable > 0:
-                            rate = (success / processable * 100)
-                        else:
-                            rate = 0.0
-
-                        writer.writerow([
-                            file_type.upper(),
-                            total,
-                            success,
-                            failed,
-                            validation,
-                            skipped,
-                            f"{rate:.1f}%"
-                        ])
-                writer.writerow([])
-
-                # Performance metrics
-                writer.writerow(['=== PERFORMANCE METRICS ==='])
-                writer.writerow(['Metric', 'Value'])
-                writer.writerow(['Total Processing Time:', format_duration(total_time)])
-                writer.writerow(['Average Time:', f"{summary.average_time:.2f}s"])
-                writer.writerow(['Median Time:', f"{summary.median_time:.2f}s"])
-                writer.writerow(['Min Time:', f"{summary.min_time:.2f}s"])
-                writer.writerow(['Max Time:', f"{summary.max_time:.2f}s"])
-
-                # Find slowest file
-                if all_results:
-                    slowest = max(all_results, key=lambda r: r.processing_time)
-                    writer.writerow(['Slowest File:', f"{slowest.relative_path} ({slowest.processing_time:.2f}s)"])
-                writer.writerow([])
-
-                # File size analysis
-                writer.writerow(['=== FILE SIZE ANALYSIS ==='])
-                writer.writerow(['Metric', 'Value'])
-                writer.writerow(['Total Input Size:', format_size(summary.total_input_size)])
-                writer.writerow(['Total Output Size:', format_size(summary.total_output_size)])
-
-                if summary.total_input_size > 0:
-                    size_change = ((summary.total_output_size - summary.total_input_size) / summary.total_input_size * 100)
-                    writer.writerow(['Size Change:', f"{size_change:+.1f}%"])
-
-                if summary.files_processed > 0:
-                    avg_input = summary.total_input_size / (summary.file_type_counts['fb'] + summary.file_type_counts['fc'] +
-                                                             summary.file_type_counts['db'] + summary.file_type_counts['udt'])
-                    avg_output = summary.total_output_size / (summary.files_succeeded + summary.files_validation_errors)
-                    writer.writerow(['Average Input:', format_size(int(avg_input))])
-                    writer.writerow(['Average Output:', format_size(int(avg_output))])
-
-                writer.writerow([])
-
-                # Directory breakdown
-                writer.writerow(['=== DIRECTORY BREAKDOWN ==='])
-                writer.writerow(['Directory', 'Total', 'Success', 'Failed', 'Validation Errors', 'Skipped', 'Success Rate'])
-
-                for dir_path in sorted(summary.directory_stats.keys()):
-                    dir_stat = summary.directory_stats[dir_path]
+            f = io.StringIO()
+            writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+
+            # Header
+            writer.writerow(['BATCH CONVERSION REPORT'])
+            writer.writerow(['Generated:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
+            writer.writerow(['Source:', str(source_root)])
+            writer.writerow(['Output:', str(output_root)])
+            writer.writerow([])
+
+            # Summary section
+            writer.writerow(['=== SUMMARY ==='])
+            writer.writerow(['Total Files Discovered:', summary.total_files])
+            writer.writerow(['Files Processed:', summary.files_processed])
+            writer.writerow(['Successful Conversions:', summary.files_succeeded])
+            writer.writerow(['Failed Conversions:', summary.files_failed])
+            writer.writerow(['Validation Errors (??? found):', summary.files_validation_errors])
+            writer.writerow(['Skipped (Non-XML/Unsupported):', summary.files_skipped])
+            writer.writerow(['Overall Success Rate:', f"{summary.success_rate:.1f}%"])
+            writer.writerow(['Total Processing Time:', format_duration(total_time)])
+            writer.writerow(['Average Time per File:', f"{summary.average_time:.2f}s"])
+            writer.writerow([])
+
+            # File type distribution
+            writer.writerow(['=== FILE TYPE DISTRIBUTION ==='])
+            writer.writerow(['File Type', 'Total', 'Success', 'Failed', 'Validation Errors', 'Skipped', 'Success Rate'])
+
+            for file_type in ['fb', 'fc', 'db', 'udt', 'tags']:
+                total = summary.file_type_counts.get(file_type, 0)
+                if total > 0:
+                    success = summary.success_by_type.get(file_type, 0)
+                    failed = summary.failed_by_type.get(file_type, 0)
+                    validation = summary.validation_errors_by_type.get(file_type, 0)
+                    skipped = total - success - failed - validation
+
+                    # Calculate success rate (excluding skipped)
+                    processable = total - skipped
+                    if processable > 0:
+                        rate = (success / processable * 100)
+                    else:
+                        rate = 0.0
+
                     writer.writerow([
-                        str(dir_path),
-                        dir_stat.total_files,
-                        dir_stat.success_count,
-                        dir_stat.failed_count,
-                        dir_stat.validation_error_count,
-                        dir_stat.skipped_count,
-                        f"{dir_stat.success_rate:.1f}%"
+                        file_type.upper(),
+                        total,
+                        success,
+                        failed,
+                        validation,
+                        skipped,
+                        f"{rate:.1f}%"
                     ])
+            writer.writerow([])
+
+            # Performance metrics
+            writer.writerow(['=== PERFORMANCE METRICS ==='])
+            writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Total Processing Time:', format_duration(total_time)])
+            writer.writerow(['Average Time:', f"{summary.average_time:.2f}s"])
+            writer.writerow(['Median Time:', f"{summary.median_time:.2f}s"])
+            writer.writerow(['Min Time:', f"{summary.min_time:.2f}s"])
+            writer.writerow(['Max Time:', f"{summary.max_time:.2f}s"])
+
+            # Find slowest file
+            if all_results:
+                slowest = max(all_results, key=lambda r: r.processing_time)
+                writer.writerow(['Slowest File:', f"{slowest.relative_path} ({slowest.processing_time:.2f}s)"])
+            writer.writerow([])
+
+            # File size analysis
+            writer.writerow(['=== FILE SIZE ANALYSIS ==='])
+            writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Total Input Size:', format_size(summary.total_input_size)])
+            writer.writerow(['Total Output Size:', format_size(summary.total_output_size)])
+
+            if summary.total_input_size > 0:
+                size_change = ((summary.total_output_size - summary.total_input_size) / summary.total_input_size * 100)
+                writer.writerow(['Size Change:', f"{size_change:+.1f}%"])
+
+            if summary.files_processed > 0:
+                avg_input = summary.total_input_size / (summary.file_type_counts['fb'] + summary.file_type_counts['fc'] +
+                                                         summary.file_type_counts['db'] + summary.file_type_counts['udt'])
+                avg_output = summary.total_output_size / (summary.files_succeeded + summary.files_validation_errors)
+                writer.writerow(['Average Input:', format_size(int(avg_input))])
+                writer.writerow(['Average Output:', format_size(int(avg_output))])
+
+            writer.writerow([])
+
+            # Directory breakdown
+            writer.writerow(['=== DIRECTORY BREAKDOWN ==='])
+            writer.writerow(['Directory', 'Total', 'Success', 'Failed', 'Validation Errors', 'Skipped', 'Success Rate'])
+
+            for dir_path in sorted(summary.directory_stats.keys()):
+                dir_stat = summary.directory_stats[dir_path]
+                writer.writerow([
+                    str(dir_path),
+                    dir_stat.total_files,
+                    dir_stat.success_count,
+                    dir_stat.failed_count,
+                    dir_stat.validation_error_count,
+                    dir_stat.skipped_count,
+                    f"{dir_stat.success_rate:.1f}%"
+                ])
+
+            writer.writerow([])
 
-                writer.writerow([])
+            # Detailed results
+            writer.writerow(['=== DETAILED FILE RESULTS ==='])
+            writer.writerow([
+                'File Path', 'Relative Path', 'File Type', 'Status',
+                'Time (s)', 'Input Size (bytes)', 'Output Size (bytes)',
+                'Error Type', 'Error Message', 'Has Placeholders', 'Placeholder Count', 'Timestamp'
+            ])
 
-                # Detailed results
-                writer.writerow(['=== DETAILED FILE RESULTS ==='])
+            for result in all_results:
                 writer.writerow([
-                    'File Path', 'Relative Path', 'File Type', 'Status',
-                    'Time (s)', 'Input Size (bytes)', 'Output Size (bytes)',
-                    'Error Type', 'Error Message', 'Has Placeholders', 'Placeholder Count', 'Timestamp'
+                    str(result.source_path),
+                    str(result.relative_path),
+                    result.file_type or '',
+                    result.status,
+                    f"{result.processing_time:.2f}",
+                    result.input_size,
+                    result.output_size or '',
+                    result.error_type or '',
+                    result.error_message or '',
+                    str(result.has_placeholders),
+                    result.placeholder_count,
+                    result.start_time.strftime('%Y-%m-%d %H:%M:%S')
                 ])
 
-                for result in all_results:
-                    writer.writerow([
-                        str(result.source_path),
-                        str(result.relative_path),
-                        result.file_type or '',
-                        result.status,
-                        f"{result.processing_time:.2f}",
-                        result.input_size,
-                        result.output_size or '',
-                        result.error_type or '',
-                        result.error_message or '',
-                        str(result.has_placeholders),
-                        result.placeholder_count,
-                        result.start_time.strftime('%Y-%m-%d %H:%M:%S')
-                    ])
+            content = f.getvalue().encode('utf-8-sig')
+            if sink is not None:
+                sink.write(report_path, content)
+            else:
+                with open(report_path, 'wb') as report_file:
+                    report_file.write(content)
 
             logger.info(f"Report generated: {report_path}")
 
@@ -758,7 +745,17 @@ def main():
     parser.add_argument("source", nargs='?', default=os.getcwd(),
                        help="Source directory (default: current directory)")
     parser.add_argument("--output", "-o",
-                       help="Output directory (default: {source}_Parsed)")
+                       help="Output directory or archive .zip/.tar/.tar.gz/.tar.xz (default: {source}_Parsed)")
+    parser.add_argument("--sidecar", action="store_true",
+                       help="Write <name>.block.json (parsed interface/networks) next to each FB/FC")
+    parser.add_argument("--sync-write", action="store_true",
+                       help="Write outputs in the conversion loop instead of a background writer thread")
+    parser.add_argument("--fsync", action="store_true",
+                       help="Directory output: write via temporary files, fsync per batch and rename atomically")
+    parser.add_argument("--events", metavar="FILE",
+                       help="Write a JSON-lines event stream (file started/finished, stage timings); '-' = stderr")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                       help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics during the run")
 
     args = parser.parse_args()
 
@@ -803,52 +800,89 @@ def main():
     max_depth = max(len(f.relative_to(source_root).parts) for f in all_files)
     print(f"Organized in {unique_dirs} directories (max depth: {max_depth} levels)")
 
-    # Phase 2: Create mirrored directory structure
-    print("\nCreating mirrored directory structure...")
-    dirs_created = create_directory_mirror(source_root, output_root, all_files)
-    print(f"Created {dirs_created} directories")
+    # Phase 2: Open output (directory tree created on demand, or a single archive)
+    sink = open_sink(output_root, durable=args.fsync)
+    if archive_mode(output_root):
+        print(f"\nWriting into archive: {output_root}")
+    if not args.sync_write:
+        # Conversion continues while the writer thread stores the previous outputs
+        sink = BackgroundWriter(sink)
 
     # Phase 3: Initialize processors and collectors
-    processor = FileProcessor()
+    processor = FileProcessor(write_sidecars=args.sidecar, sink=sink, output_root=output_root)
     stats = StatisticsCollector()
     progress = ProgressDisplay(len(all_files))
+    telemetry = BatchTelemetry(len(all_files), args.events, args.metrics_port,
+                               queue_depth=lambda: getattr(sink, 'pending_files', 0))
+    if telemetry.server:
+        print(f"Metrics: http://127.0.0.1:{telemetry.server.port}/metrics")
 
     # Phase 4: Batch processing
     print("\nStarting batch conversion and copying...\n")
     batch_start_time = time.time()
+    telemetry.run_started(source_root, output_root)
 
     for i, source_file in enumerate(all_files, 1):
-        # Calculate output directory
+        # Output directory, relative to the output root
         relative_path = source_file.relative_to(source_root)
-        output_dir = output_root / relative_path.parent
+        output_dir = relative_path.parent
 
         # Process file with tracking
+        telemetry.file_started(i, relative_path)
         result = processor.process_with_tracking(source_file, output_dir, source_root)
+        telemetry.file_finished(i, result)
 
         # Record statistics
         stats.record_file(result)
 
         # Create error file if needed
         if result.status in ['FAILED', 'VALIDATION_ERROR', 'IO_ERROR']:
-            create_error_file(output_dir, result)
+            create_error_file(output_dir, result, sink)
 
         # Update progress
         progress.update(i, result)
 
+    # Wait for the background writer: failed writes turn their files into IO errors
+    if isinstance(sink, BackgroundWriter):
+        sink.flush()
+        write_failures = apply_write_errors(stats.all_results, sink.errors)
+        for result, previous_status in write_failures:
+            telemetry.file_write_failed(result, previous_status)
+            create_error_file(result.relative_path.parent, result, sink)
+        if write_failures:
+            all_results = stats.all_results
+            stats = StatisticsCollector()
+            for result in all_results:
+                stats.record_file(result)
+
     total_time = time.time() - batch_start_time
     summary = stats.get_summary()
     summary.total_time = total_time
+    telemetry.run_finished(summary, total_time)
+    telemetry.close()
 
     # Phase 5: Generate report
     print("\n\nGenerating report...")
-    report_path = output_root / "batch_conversion_report.csv"
+    report_name = "batch_conversion_report.csv"
 
     report_generator = CSVReportGenerator()
-    report_generator.generate(report_path, source_root, output_root, summary, stats.all_results, total_time)
+    try:
+        report_generator.generate(Path(report_name), source_root, output_root, summary, stats.all_results,
+                                  total_time, sink)
+    finally:
+        sink.close()
+    report_path = output_root / report_name if not archive_mode(output_root) else f"{output_root} ({report_name})"
 
     # Phase 6: Print final summary
     print_final_summary(summary, report_path, total_time)
 
+    write_errors = getattr(sink, 'errors', [])
+    if write_errors:
+        print(f"ERROR: {len(write_errors)} output file(s) could not be written:")
+        for relative_path, error in write_errors:
+            print(f"  {relative_path}: {error}")
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,281 @@
+"""
+Live telemetry for batch conversion runs
+
+- EventStream: JSON-lines event log (run_started, file_started, file_finished
+  with stage timings and status, file_write_failed, run_finished), flushed line
+  by line so it can be tailed or shipped while the run is in progress.
+- BatchMetrics: counters/gauges/quantiles of the run, rendered in the
+  Prometheus text exposition format.
+- MetricsServer: serves BatchMetrics on http://127.0.0.1:<port>/metrics
+  during the run.
+
+BatchTelemetry combines them behind the hooks called by batch_convert_project.
+"""
+
+import json
+import math
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+METRIC_PREFIX = 'scl_batch'
+QUANTILES = (0.5, 0.95)
+
+
+# ============================================================================
+# EVENT STREAM
+# ============================================================================
+
+class EventStream:
+    """JSON-lines event log ('-' writes to stderr, keeping stdout for the progress display)"""
+
+    def __init__(self, target: str):
+        self._lock = threading.Lock()
+        if target == '-':
+            self._file: TextIO = sys.stderr
+            self._owned = False
+        else:
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(target, 'w', encoding='utf-8')
+            self._owned = True
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({'ts': round(time.time(), 6), 'event': event, **fields},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    """Prometheus label set, values escaped"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank quantile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class BatchMetrics:
+    """Counters and timings of a batch run (thread-safe: rendered by the HTTP thread)"""
+
+    def __init__(self, total_files: int, queue_depth: Optional[Callable[[], int]] = None):
+        self.total_files = total_files
+        self.queue_depth = queue_depth
+        self.start_time = time.time()
+        self.files_done = 0
+        self.in_progress = 0
+        self.status_counts: Dict[Tuple[str, str], int] = {}
+        self.error_counts: Dict[str, int] = {}
+        self.write_failures: Dict[Tuple[str, str], int] = {}
+        self.durations: Dict[str, List[float]] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def file_started(self):
+        with self._lock:
+            self.in_progress += 1
+
+    def record(self, result):
+        """Account a finished FileResult"""
+        file_type = result.file_type or 'none'
+        with self._lock:
+            self.in_progress = max(0, self.in_progress - 1)
+            self.files_done += 1
+            key = (result.status, file_type)
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+            if result.error_type:
+                self.error_counts[result.error_type] = self.error_counts.get(result.error_type, 0) + 1
+            if result.file_type:
+                self.durations.setdefault(file_type, []).append(result.processing_time)
+            for stage, seconds in result.stage_times.items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.bytes_in += result.input_size or 0
+            self.bytes_out += result.output_size or 0
+
+    def record_write_error(self, previous_status: str, result):
+        """Account a finished file whose output could not be written
+
+        files_total is a counter and keeps the status the file finished with;
+        the failure goes to its own counter, by that status.
+        """
+        file_type = result.file_type or 'none'
+        with self._lock:
+            key = (previous_status, file_type)
+            self.write_failures[key] = self.write_failures.get(key, 0) + 1
+            self.error_counts[result.error_type] = self.error_counts.get(result.error_type, 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        p = METRIC_PREFIX
+        with self._lock:
+            elapsed = time.time() - self.start_time
+            lines = [
+                f"# HELP {p}_files_total Files finished, by status and file type",
+                f"# TYPE {p}_files_total counter",
+            ]
+            for (status, file_type), count in sorted(self.status_counts.items()):
+                lines.append(f"{p}_files_total{_labels(status=status, file_type=file_type)} {count}")
+
+            lines += [
+                f"# HELP {p}_errors_total Failed files, by error type",
+                f"# TYPE {p}_errors_total counter",
+            ]
+            for error_type, count in sorted(self.error_counts.items()):
+                lines.append(f"{p}_errors_total{_labels(error_type=error_type)} {count}")
+
+            lines += [
+                f"# HELP {p}_write_failures_total Finished files whose output could not be written, "
+                f"by status at finish and file type",
+                f"# TYPE {p}_write_failures_total counter",
+            ]
+            for (status, file_type), count in sorted(self.write_failures.items()):
+                lines.append(f"{p}_write_failures_total{_labels(status=status, file_type=file_type)} {count}")
+
+            lines += [
+                f"# HELP {p}_file_duration_seconds Conversion time per file, by block type",
+                f"# TYPE {p}_file_duration_seconds summary",
+            ]
+            for file_type, values in sorted(self.durations.items()):
+                ordered = sorted(values)
+                for q in QUANTILES:
+                    lines.append(f"{p}_file_duration_seconds{_labels(file_type=file_type, quantile=q)} "
+                                 f"{quantile(ordered, q):.6f}")
+                lines.append(f"{p}_file_duration_seconds_sum{_labels(file_type=file_type)} {sum(values):.6f}")
+                lines.append(f"{p}_file_duration_seconds_count{_labels(file_type=file_type)} {len(values)}")
+
+            lines += [
+                f"# HELP {p}_stage_seconds_total Time spent per processing stage",
+                f"# TYPE {p}_stage_seconds_total counter",
+            ]
+            for stage, seconds in sorted(self.stage_seconds.items()):
+                lines.append(f"{p}_stage_seconds_total{_labels(stage=stage)} {seconds:.6f}")
+
+            gauges = [
+                ('files_discovered', 'Files to process in this run', self.total_files),
+                ('files_done', 'Files finished', self.files_done),
+                ('files_in_progress', 'Files being converted', self.in_progress),
+                ('files_per_second', 'Throughput since the start of the run',
+                 round(self.files_done / elapsed, 3) if elapsed > 0 else 0),
+                ('write_queue_depth', 'Output files waiting for the background writer',
+                 self.queue_depth() if self.queue_depth else 0),
+                ('input_bytes', 'Source bytes converted', self.bytes_in),
+                ('output_bytes', 'Bytes generated', self.bytes_out),
+                ('elapsed_seconds', 'Seconds since the start of the run', round(elapsed, 3)),
+            ]
+            for name, help_text, value in gauges:
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# HTTP ENDPOINT
+# ============================================================================
+
+class MetricsServer:
+    """Serves /metrics from a daemon thread"""
+
+    def __init__(self, metrics: BatchMetrics, port: int, host: str = '127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the progress display clean
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ============================================================================
+# RUN HOOKS
+# ============================================================================
+
+class BatchTelemetry:
+    """Event stream + metrics endpoint of one run (both optional)"""
+
+    def __init__(self, total_files: int, events_target: Optional[str] = None,
+                 metrics_port: Optional[int] = None, queue_depth: Optional[Callable[[], int]] = None):
+        self.metrics = BatchMetrics(total_files, queue_depth)
+        self.events = EventStream(events_target) if events_target else None
+        self.server = MetricsServer(self.metrics, metrics_port) if metrics_port is not None else None
+
+    def _emit(self, event: str, **fields):
+        if self.events:
+            self.events.emit(event, **fields)
+
+    def run_started(self, source_root: Path, output_root: Path):
+        self._emit('run_started', source=str(source_root), output=str(output_root),
+                   total_files=self.metrics.total_files)
+
+    def file_started(self, index: int, relative_path: Path):
+        self.metrics.file_started()
+        self._emit('file_started', index=index, path=Path(relative_path).as_posix())
+
+    def file_finished(self, index: int, result):
+        self.metrics.record(result)
+        self._emit('file_finished', index=index, path=Path(result.relative_path).as_posix(),
+                   file_type=result.file_type, status=result.status,
+                   duration=round(result.processing_time, 6),
+                   stages={stage: round(seconds, 6) for stage, seconds in result.stage_times.items()},
+                   input_size=result.input_size, output_size=result.output_size,
+                   placeholder_count=result.placeholder_count,
+                   error_type=result.error_type, error_message=result.error_message)
+
+    def file_write_failed(self, result, previous_status: str):
+        """A file whose output the background writer could not store (after its file_finished)"""
+        self.metrics.record_write_error(previous_status, result)
+        self._emit('file_write_failed', path=Path(result.relative_path).as_posix(),
+                   previous_status=previous_status, status=result.status,
+                   error_type=result.error_type, error_message=result.error_message)
+
+    def run_finished(self, summary, total_time: float):
+        self._emit('run_finished', total_time=round(total_time, 3),
+                   total_files=summary.total_files, succeeded=summary.files_succeeded,
+                   failed=summary.files_failed, validation_errors=summary.files_validation_errors,
+                   skipped=summary.files_skipped)
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        if self.events:
+            self.events.close()
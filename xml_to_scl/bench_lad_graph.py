@@ -0,0 +1,100 @@
+"""
+Benchmark: LADLogicParser on large synthetic LAD networks
+
+Builds one FlgNet with N rungs (Powerrail -> Contact -> Contact -> Coil) and
+reports parse and operation extraction time, plus the memory held by the
+LadGraph compared with the equivalent dict format (LadGraph.to_dicts()).
+
+Usage:
+    python bench_lad_graph.py [--rungs N [N ...]] [--repeat N]
+"""
+
+import time
+import argparse
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from lad_parser import LADLogicParser
+
+FLGNET_NS = "http://www.siemens.com/automation/Openness/SW/NetworkSource/FlgNet/v5"
+
+
+def build_network(rungs: int) -> ET.Element:
+    """CompileUnit with one FlgNet of `rungs` series rungs"""
+    parts = []
+    wires = []
+    uid = 1
+    for i in range(rungs):
+        a, b, q, c1, c2, coil = range(uid, uid + 6)
+        uid += 6
+        parts.append(f'<Access Scope="LocalVariable" UId="{a}"><Symbol><Component Name="a{i}" /></Symbol></Access>')
+        parts.append(f'<Access Scope="GlobalVariable" UId="{b}"><Symbol><Component Name="Db" /><Component Name="b{i}" /></Symbol></Access>')
+        parts.append(f'<Access Scope="LocalVariable" UId="{q}"><Symbol><Component Name="q{i}" /></Symbol></Access>')
+        parts.append(f'<Part Name="Contact" UId="{c1}" />')
+        parts.append(f'<Part Name="Contact" UId="{c2}"><Negated Name="operand" /></Part>')
+        parts.append(f'<Part Name="Coil" UId="{coil}" />')
+        wires.append(f'<Wire UId="{uid}"><Powerrail /><NameCon UId="{c1}" Name="in" /></Wire>')
+        wires.append(f'<Wire UId="{uid + 1}"><IdentCon UId="{a}" /><NameCon UId="{c1}" Name="operand" /></Wire>')
+        wires.append(f'<Wire UId="{uid + 2}"><NameCon UId="{c1}" Name="out" /><NameCon UId="{c2}" Name="in" /></Wire>')
+        wires.append(f'<Wire UId="{uid + 3}"><IdentCon UId="{b}" /><NameCon UId="{c2}" Name="operand" /></Wire>')
+        wires.append(f'<Wire UId="{uid + 4}"><NameCon UId="{c2}" Name="out" /><NameCon UId="{coil}" Name="in" /></Wire>')
+        wires.append(f'<Wire UId="{uid + 5}"><IdentCon UId="{q}" /><NameCon UId="{coil}" Name="operand" /></Wire>')
+        uid += 6
+    xml = (f'<CompileUnit><NetworkSource><FlgNet xmlns="{FLGNET_NS}">'
+           f'<Parts>{"".join(parts)}</Parts><Wires>{"".join(wires)}</Wires>'
+           f'</FlgNet></NetworkSource></CompileUnit>')
+    return ET.fromstring(xml)
+
+
+def traced_kb(build) -> float:
+    """KB still allocated by the object returned from build()"""
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LAD network graph")
+    parser.add_argument("--rungs", type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 92)
+    print("LAD GRAPH BENCHMARK")
+    print("=" * 92)
+    print(f"{'Rungs':>7s} {'Parts':>7s} {'Wires':>7s} {'Parse (ms)':>11s} {'Ops (ms)':>10s} "
+          f"{'Graph KB':>10s} {'Dicts KB':>10s}")
+    print("-" * 92)
+
+    for rungs in args.rungs:
+        compile_unit = build_network(rungs)
+
+        parse_time = ops_time = None
+        for _ in range(args.repeat):
+            lad = LADLogicParser(compile_unit)
+            start = time.perf_counter()
+            lad.parse()
+            middle = time.perf_counter()
+            operations = lad._extract_operations()
+            end = time.perf_counter()
+            parse_time = middle - start if parse_time is None else min(parse_time, middle - start)
+            ops_time = end - middle if ops_time is None else min(ops_time, end - middle)
+        assert len(operations) == rungs
+
+        def parsed_graph():
+            lad = LADLogicParser(compile_unit)
+            lad.parse()
+            return lad.graph
+
+        graph_kb = traced_kb(parsed_graph)
+        dicts_kb = traced_kb(lambda: parsed_graph().to_dicts())
+
+        print(f"{rungs:7d} {rungs * 6:7d} {rungs * 6:7d} {parse_time * 1000:11.1f} {ops_time * 1000:10.1f} "
+              f"{graph_kb:10.0f} {dicts_kb:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: single-pass placeholder engine vs sequential PATTERNS passes
+
+Runs both implementations over every XML/SCL file of a project tree (default:
+../PLC_410D1), once on the real content and once with '???' injected after
+every double quote (placeholder-dense worst case), and checks the outputs are
+identical.
+
+Usage:
+    python bench_placeholders.py [project_dir] [--repeat N]
+"""
+
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+from clean_placeholders import PlaceholderCleaner, replace_placeholders
+
+
+def clean_sequential(text: str, compiled) -> str:
+    """Previous implementation: one re.sub per PATTERNS entry."""
+    for pattern, replacement in compiled:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def best_of(repeat: int, func, texts):
+    """Return (best wall time, outputs) over repeat runs."""
+    best = None
+    outputs = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [func(text) for text in texts]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark placeholder replacement engines")
+    parser.add_argument("project_dir", nargs='?', default=str(Path(__file__).parent.parent / 'PLC_410D1'))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = Path(args.project_dir)
+    files = [p for p in root.rglob('*') if p.suffix in ('.xml', '.scl')]
+    if not files:
+        print(f"No XML/SCL files found in {root}")
+        sys.exit(1)
+
+    texts = [p.read_text(encoding='utf-8', errors='replace') for p in files]
+    dense = [text.replace('"', '"??? ') for text in texts]
+    compiled = [(re.compile(p), r) for p, r in PlaceholderCleaner.PATTERNS]
+
+    print("=" * 80)
+    print("PLACEHOLDER ENGINE BENCHMARK")
+    print("=" * 80)
+    print(f"Files: {len(files)} | Size: {sum(len(t) for t in texts) / 1e6:.1f} M chars\n")
+
+    for label, corpus in (('corpus', texts), ('dense', dense)):
+        seq_time, seq_out = best_of(args.repeat, lambda t: clean_sequential(t, compiled), corpus)
+        one_time, one_out = best_of(args.repeat, replace_placeholders, corpus)
+        placeholders = sum(t.count('???') for t in corpus)
+        status = 'identical' if seq_out == one_out else 'MISMATCH'
+        print(f"{label:7s} ({placeholders} x ???): sequential {seq_time*1000:8.1f} ms | "
+              f"single-pass {one_time*1000:8.1f} ms | speedup {seq_time/one_time:5.2f}x | {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: SCLTokenParser throughput on the SCL-heavy blocks of a project
+
+Collects every StructuredText network of a project tree (default:
+../PLC_410D1), picks the blocks with the most token elements and reports
+elements/s and tokens/s (Token + Blank + NewLine) for SCLTokenParser.parse().
+
+Usage:
+    python bench_scl_token_parser.py [project_dir] [--top N] [--repeat N]
+"""
+
+import sys
+import time
+import argparse
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from scl_token_parser import SCLTokenParser, local_name
+
+TOKEN_TAGS = ('Token', 'Blank', 'NewLine')
+
+
+def collect_blocks(root_dir: Path):
+    """Return [(path, [StructuredText elements], element_count, token_count)]"""
+    blocks = []
+    for path in sorted(root_dir.rglob('*.xml')):
+        try:
+            root = ET.parse(path).getroot()
+        except ET.ParseError:
+            continue
+        networks = [e for e in root.iter() if local_name(e.tag) == 'StructuredText']
+        if not networks:
+            continue
+        elements = 0
+        tokens = 0
+        for network in networks:
+            for elem in network.iter():
+                elements += 1
+                if local_name(elem.tag) in TOKEN_TAGS:
+                    tokens += 1
+        blocks.append((path, networks, elements, tokens))
+    return blocks
+
+
+def time_block(networks, repeat: int) -> float:
+    """Best wall time over repeat runs for parsing all networks of a block"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for network in networks:
+            SCLTokenParser(network).parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SCLTokenParser")
+    parser.add_argument("project_dir", nargs='?', default=str(Path(__file__).parent.parent / 'PLC_410D1'))
+    parser.add_argument("--top", type=int, default=15, help="Number of largest blocks to report")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    blocks = collect_blocks(Path(args.project_dir))
+    if not blocks:
+        print(f"No StructuredText networks found in {args.project_dir}")
+        sys.exit(1)
+
+    blocks.sort(key=lambda b: b[3], reverse=True)
+
+    print("=" * 96)
+    print("SCL TOKEN PARSER BENCHMARK")
+    print("=" * 96)
+    print(f"{'Block':45s} {'Networks':>8s} {'Tokens':>8s} {'Time (ms)':>10s} {'Tokens/s':>12s}")
+    print("-" * 96)
+
+    for path, networks, elements, tokens in blocks[:args.top]:
+        elapsed = time_block(networks, args.repeat)
+        print(f"{path.stem[:45]:45s} {len(networks):8d} {tokens:8d} {elapsed*1000:10.2f} {tokens/elapsed:12,.0f}")
+
+    total_elements = sum(b[2] for b in blocks)
+    total_tokens = sum(b[3] for b in blocks)
+    total = sum(time_block(b[1], max(1, args.repeat // 2)) for b in blocks)
+    print("-" * 96)
+    print(f"All {len(blocks)} SCL blocks: {total_tokens:,} tokens / {total_elements:,} elements in {total*1000:.1f} ms "
+          f"-> {total_tokens/total:,.0f} tokens/s, {total_elements/total:,.0f} elements/s")
+
+
+if __name__ == '__main__':
+    main()
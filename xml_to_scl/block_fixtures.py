@@ -0,0 +1,50 @@
+"""
+Shared fixtures of the unit tests: a minimal TIA Portal FB export and a test
+case working in a temporary directory.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+
+# Interface of the default fixture block: one Bool input
+ENABLE_INPUT = '''          <Section Name="Input">
+            <Member Name="Enable" Datatype="Bool" />
+          </Section>'''
+
+
+def fb_document(name: str, number: int, sections: str = ENABLE_INPUT) -> str:
+    """XML export of an SCL function block (sections: <Section> elements of its interface)"""
+    return f'''<?xml version="1.0" encoding="utf-8"?>
+<Document>
+  <SW.Blocks.FB ID="0">
+    <AttributeList>
+      <Name>{name}</Name>
+      <Number>{number}</Number>
+      <ProgrammingLanguage>SCL</ProgrammingLanguage>
+      <Interface>
+        <Sections xmlns="http://www.siemens.com/automation/Openness/SW/Interface/v5">
+{sections}
+        </Sections>
+      </Interface>
+    </AttributeList>
+  </SW.Blocks.FB>
+</Document>'''
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Test case with a fresh temporary directory in self.root"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_fb(self, path: Path, name: str, number: int, sections: str = ENABLE_INPUT) -> Path:
+        """Write an FB export to path (parents created) and return the path"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(fb_document(name, number, sections), encoding='utf-8')
+        return path
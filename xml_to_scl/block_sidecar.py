@@ -0,0 +1,153 @@
+"""
+Structured sidecar for generated FB/FC blocks
+
+Next to every generated <name>.scl the converter can write <name>.block.json:
+the block interface (declared SCL types, constant values, comments, nested
+struct members), the networks and the FB calls, as already parsed from the
+TIA Portal XML. Downstream tools (DEVICE_ANALYSIS/analyze_device.py) read it
+instead of re-parsing the VAR sections of the .scl text.
+
+The sidecar stores the SHA-256 of the generated SCL code, so a consumer can
+tell whether the .scl it is looking at is still the one the sidecar describes
+(a hand-edited .scl simply falls back to text parsing).
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    from .scl_generator_base import format_member_datatype, format_member_value
+except ImportError:
+    from scl_generator_base import format_member_datatype, format_member_value
+
+BLOCK_SIDECAR_SUFFIX = '.block.json'
+BLOCK_SIDECAR_VERSION = 1
+
+# Interface sections in declaration order (XML section names, as in parsed_data)
+INTERFACE_SECTIONS = ['Input', 'Output', 'InOut', 'Static', 'Temp', 'Constant']
+
+
+def sidecar_path(scl_path: Path) -> Path:
+    """Sidecar file of a generated .scl file"""
+    scl_path = Path(scl_path)
+    return scl_path.with_name(scl_path.stem + BLOCK_SIDECAR_SUFFIX)
+
+
+def scl_sha256(scl_code: str) -> str:
+    """Hash of the SCL text as generated (UTF-8, without BOM)"""
+    return hashlib.sha256(scl_code.lstrip('\ufeff').encode('utf-8')).hexdigest()
+
+
+def _compact_member(member: Dict, with_value: bool) -> Dict:
+    """Member as declared in the generated SCL (empty fields omitted)"""
+    if member.get('is_struct', False) and 'members' in member:
+        # Nested struct: declared inline as Struct ... END_STRUCT
+        return {
+            'name': member['name'],
+            'type': 'Struct',
+            'members': [_compact_member(child, with_value) for child in member['members']],
+            **({'comment': member['comment']} if member.get('comment') else {}),
+        }
+
+    compact = {
+        'name': member['name'],
+        'type': format_member_datatype(member),
+    }
+    if member.get('is_array'):
+        compact['array_bounds'] = member.get('array_bounds', '0..0')
+        compact['element_type'] = member.get('base_type', member.get('datatype', 'Void'))
+    if with_value:
+        value = format_member_value(member)
+        if value:
+            compact['value'] = value
+    if member.get('comment'):
+        compact['comment'] = member['comment']
+    if member.get('version'):
+        compact['version'] = member['version']
+    return compact
+
+
+def _compact_calls(fb_calls: List[Dict]) -> List[Dict]:
+    """FB calls reduced to instance / type / version"""
+    return [
+        {
+            'instance': call.get('instance', ''),
+            'fb_type': call.get('fb_type', ''),
+            'version': call.get('version', ''),
+        }
+        for call in fb_calls
+    ]
+
+
+def build_block_sidecar(data: Dict, scl_code: str) -> Dict:
+    """
+    Build the sidecar document of a parsed FB/FC.
+
+    Args:
+        data: FBFCParser.parse() result
+        scl_code: SCL code generated from data
+
+    Returns:
+        JSON-serializable sidecar dictionary
+    """
+    block_type = data.get('block_type', 'FB')
+    interface = data.get('interface', {})
+    networks = [
+        {
+            'number': network.get('number'),
+            'type': network.get('type'),
+            'title': network.get('title', ''),
+            'fb_calls': _compact_calls(network.get('fb_calls', [])),
+        }
+        for network in data.get('networks', [])
+    ]
+
+    # Unique FB calls of the block, in order of appearance
+    fb_calls = {}
+    for network in networks:
+        for call in network['fb_calls']:
+            fb_calls.setdefault((call['instance'], call['fb_type']), call)
+
+    return {
+        'sidecar_version': BLOCK_SIDECAR_VERSION,
+        'block_type': block_type,
+        'name': data.get('name', ''),
+        'number': data.get('number'),
+        'programming_language': data.get('programming_language', ''),
+        'author': data.get('author', ''),
+        'family': data.get('family', ''),
+        'version': data.get('version', ''),
+        'memory_layout': data.get('memory_layout', ''),
+        'scl_sha256': scl_sha256(scl_code),
+        'interface': {
+            section: [_compact_member(member, section == 'Constant')
+                      for member in interface.get(section, [])]
+            for section in INTERFACE_SECTIONS
+            if interface.get(section) and (section != 'Static' or block_type == 'FB')
+        },
+        'networks': networks,
+        'fb_calls': list(fb_calls.values()),
+    }
+
+
+def sidecar_content(data: Dict, scl_code: str) -> str:
+    """Sidecar document as written to <name>.block.json"""
+    return json.dumps(build_block_sidecar(data, scl_code), ensure_ascii=False, indent=1)
+
+
+def write_block_sidecar(data: Dict, scl_path: Path, scl_code: str) -> Path:
+    """
+    Write the sidecar next to a generated .scl file (atomic replace).
+
+    Returns:
+        Path of the written sidecar
+    """
+    path = sidecar_path(scl_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(sidecar_content(data, scl_code))
+    os.replace(tmp_path, path)
+    return path
@@ -11,24 +11,271 @@ Placeholder patterns handled:
 - "Passaggio XX - ??? lato operatore/motore" → "Passaggio XX - [TO BE DEFINED]"
 - "Passaggio XX (???) - [description]" → "Passaggio XX (UNKNOWN) - [description]"
 - Generic "??? what it means?" → "[TO BE CLARIFIED]"
+
+All patterns are compiled into one alternation (PLACEHOLDER_RE) and applied
+in a single pass through a dispatch table of replacements; the output is
+identical to applying PlaceholderCleaner.PATTERNS one after the other
+(see test_placeholder_cleanup.py).
+
+Cleanup engine:
+- Files are pre-filtered with an mmap byte scan for b'???', so files
+  without placeholders are never decoded or parsed.
+- Matching files are rewritten in place (temp file + atomic rename) by a
+  process pool; the original formatting of the XML is preserved.
+- --dry-run writes nothing and prints a unified diff report instead.
 """
 
 import re
+import os
 import sys
-import io
+import mmap
+import argparse
+import difflib
+import tempfile
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple, List
-import xml.etree.ElementTree as ET
+from typing import Tuple, List, Optional
 
 # Force UTF-8 output on Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
+PLACEHOLDER = '???'
+PLACEHOLDER_BYTES = b'???'
+
+# Text of <MultiLanguageText> / <Text> elements (optionally namespace-prefixed),
+# i.e. the only places the element-based cleaner ever touched.
+TEXT_ELEMENT_RE = re.compile(
+    r'(<(?:[\w.-]+:)?(MultiLanguageText|Text)(?:\s[^>]*)?>)([^<]*)(</(?:[\w.-]+:)?\2\s*>)'
+)
+
+# Single-pass equivalent of PlaceholderCleaner.PATTERNS. Every rule rewrites
+# a '???', so the alternation is anchored on that literal (the regex engine
+# then scans with a fast literal search) and the branch that matched selects
+# the replacement in PLACEHOLDER_REPLACEMENTS. The 'Passaggio NN' prefix of
+# the first two rules is checked by the dispatch functions with rfind() +
+# fullmatch() instead of inside the scan. The negative lookahead on the last
+# branch keeps runs such as '???? what it means?' identical to the sequential
+# passes, where the 'clarify' rule claims the last three '?' first.
+PLACEHOLDER_RE = re.compile(
+    r'\?\?\?(?:(?P<side>\s+lato)'
+    r'|(?P<step>\))'
+    r'|(?P<clarify>\s+what it means\?)'
+    r'|(?!\?{0,2}\s+what it means\?))'
+)
+SIDE_HEAD_RE = re.compile(r'Passaggio\s+\d+\s*-\s*')
+STEP_HEAD_RE = re.compile(r'Passaggio\s+\d+\s*\(')
+
+GENERIC_REPLACEMENT = '[PLACEHOLDER]'
+
+
+def _preceded_by(head_re: 're.Pattern', text: str, end: int) -> bool:
+    """True if head_re matches exactly text[i:end] for the last 'Passaggio' before end."""
+    start = text.rfind('Passaggio', 0, end)
+    return start != -1 and head_re.fullmatch(text, start, end) is not None
+
+
+def _replace_side(match: 're.Match') -> str:
+    if _preceded_by(SIDE_HEAD_RE, match.string, match.start()):
+        return '[UNDEFINED]' + match.group('side')
+    return GENERIC_REPLACEMENT + match.group('side')
+
+
+def _replace_step(match: 're.Match') -> str:
+    if _preceded_by(STEP_HEAD_RE, match.string, match.start()):
+        return 'UNKNOWN)'
+    return GENERIC_REPLACEMENT + ')'
+
+
+PLACEHOLDER_REPLACEMENTS = {
+    'side': _replace_side,
+    'step': _replace_step,
+    'clarify': lambda match: '[TO BE CLARIFIED]',
+}
+
+
+def _replace_placeholder(match: 're.Match') -> str:
+    """Dispatch a PLACEHOLDER_RE match to its replacement."""
+    kind = match.lastgroup
+    if kind is None:
+        return GENERIC_REPLACEMENT
+    return PLACEHOLDER_REPLACEMENTS[kind](match)
+
+
+def replace_placeholders(text: str) -> str:
+    """
+    Apply all placeholder rules to text in a single pass.
+
+    Without 'Passaggio' or 'what it means' in the text only the generic rule
+    can fire, which is a plain left-to-right str.replace().
+    """
+    if '???' not in text:
+        return text
+    if 'Passaggio' not in text and 'what it means' not in text:
+        return text.replace('???', GENERIC_REPLACEMENT)
+    return PLACEHOLDER_RE.sub(_replace_placeholder, text)
+
+@dataclass
+class CleanupResult:
+    """Result of cleaning a single file"""
+    path: Path
+    found: int = 0
+    replaced: int = 0
+    diff: str = ''
+    error: Optional[str] = None
+
+
+def has_placeholders(path: Path) -> bool:
+    """
+    Fast pre-filter: check raw file bytes for '???' without decoding or parsing.
+
+    Args:
+        path: File to scan
+
+    Returns:
+        True if the file contains at least one placeholder
+    """
+    try:
+        with open(path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return mm.find(PLACEHOLDER_BYTES) != -1
+            except ValueError:
+                # Empty files cannot be mapped
+                return False
+    except OSError:
+        return False
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write data to path via a temp file in the same directory + atomic rename."""
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def clean_content(content: str, text_only: bool = True) -> Tuple[str, int]:
+    """
+    Replace placeholders in raw file content.
+
+    Args:
+        content: Full file content
+        text_only: Only rewrite MultiLanguageText/Text element text
+                   (False = whole-file rewrite, like fix_xml_placeholders)
+
+    Returns:
+        Tuple of (cleaned_content, replaced) where replaced counts rewritten
+        text elements (text_only) or removed placeholders (whole file)
+    """
+    if not text_only:
+        cleaned, _ = PlaceholderCleaner.clean_text(content)
+        return cleaned, content.count(PLACEHOLDER) - cleaned.count(PLACEHOLDER)
+
+    replaced = 0
+
+    def _clean_element(match):
+        nonlocal replaced
+        text = match.group(3)
+        if PLACEHOLDER not in text:
+            return match.group(0)
+        replaced += 1
+        cleaned, _ = PlaceholderCleaner.clean_text(text)
+        return match.group(1) + cleaned + match.group(4)
+
+    return TEXT_ELEMENT_RE.sub(_clean_element, content), replaced
+
+
+def clean_file(path: Path, dry_run: bool = False, text_only: bool = True) -> CleanupResult:
+    """
+    Clean one file in place. Module-level so it can run in a process pool.
+
+    The file is read as bytes and decoded as UTF-8 (BOM and line endings are
+    kept as-is), so only the placeholder text itself changes on disk.
+    """
+    result = CleanupResult(path=path)
+    try:
+        raw = path.read_bytes()
+        content = raw.decode('utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        result.error = f"Cannot read {path.name}: {e}"
+        return result
+
+    result.found = content.count(PLACEHOLDER)
+    if result.found == 0:
+        return result
+
+    cleaned, replaced = clean_content(content, text_only=text_only)
+    if cleaned == content:
+        return result
+    result.replaced = replaced
+
+    if dry_run:
+        result.diff = ''.join(difflib.unified_diff(
+            content.splitlines(keepends=True),
+            cleaned.splitlines(keepends=True),
+            fromfile=f'a/{path.name}',
+            tofile=f'b/{path.name}',
+        ))
+        return result
+
+    try:
+        atomic_write_bytes(path, cleaned.encode('utf-8'))
+    except OSError as e:
+        result.error = f"Cannot write {path.name}: {e}"
+        result.replaced = 0
+    return result
+
+
+def _clean_file_task(args: Tuple[str, bool, bool]) -> CleanupResult:
+    """Process pool entry point (paths travel as str)."""
+    path_str, dry_run, text_only = args
+    return clean_file(Path(path_str), dry_run=dry_run, text_only=text_only)
+
+
+def clean_tree(root_dir: Path, dry_run: bool = False, text_only: bool = True,
+               workers: Optional[int] = None) -> Tuple[int, List[CleanupResult]]:
+    """
+    Clean every XML file under root_dir.
+
+    Files are pre-filtered with has_placeholders(); only candidates are
+    decoded and rewritten, in parallel when there is more than one.
+
+    Args:
+        root_dir: Directory to scan recursively
+        dry_run: Do not write, collect unified diffs instead
+        text_only: See clean_content()
+        workers: Process pool size (default: os.cpu_count()); 1 = in-process
+
+    Returns:
+        Tuple of (xml_files_scanned, results for files containing placeholders)
+    """
+    xml_files = sorted(root_dir.rglob('*.xml'))
+    candidates = [p for p in xml_files if has_placeholders(p)]
+
+    tasks = [(str(p), dry_run, text_only) for p in candidates]
+    if len(tasks) <= 1 or workers == 1:
+        results = [_clean_file_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_clean_file_task, tasks, chunksize=4))
+
+    return len(xml_files), [r for r in results if r.found > 0 or r.error]
+
 
 class PlaceholderCleaner:
     """Clean placeholder tokens from XML files."""
 
-    # Regex patterns to match and replace
+    # Reference rules, in priority order. clean_text() applies the equivalent
+    # compiled PLACEHOLDER_RE in one pass instead of one re.sub per rule.
     PATTERNS = [
         # Pattern 1: Passaggio XX - ??? lato operatore/motore
         (
@@ -58,7 +305,8 @@ class PlaceholderCleaner:
         self.placeholders_found = 0
         self.placeholders_replaced = 0
 
-    def clean_text(self, text: str) -> Tuple[str, int]:
+    @classmethod
+    def clean_text(cls, text: str) -> Tuple[str, int]:
         """
         Clean placeholder tokens from text.
 
@@ -70,132 +318,112 @@ class PlaceholderCleaner:
         if placeholder_count == 0:
             return text, 0
 
-        cleaned = text
-        for pattern, replacement in self.PATTERNS:
-            cleaned = re.sub(pattern, replacement, cleaned)
-
-        return cleaned, placeholder_count
+        return replace_placeholders(text), placeholder_count
 
-    def clean_xml_file(self, xml_path: Path) -> Tuple[int, int]:
+    def clean_xml_file(self, xml_path: Path, dry_run: bool = False) -> Tuple[int, int]:
         """
         Clean placeholders from XML file.
 
         Returns:
             Tuple of (placeholders_found, placeholders_replaced)
         """
-        try:
-            # Parse XML
-            tree = ET.parse(str(xml_path))
-            root = tree.getroot()
-        except ET.ParseError as e:
-            print(f"[ERROR] Error parsing {xml_path}: {e}", file=sys.stderr)
+        if not has_placeholders(xml_path):
             return 0, 0
 
-        found = 0
-        replaced = 0
-
-        # Namespaces used in TIA Portal XML
-        namespaces = {
-            'p': 'http://www.siemens.com/automation/Openness/SW/Interface/v5',
-            '': 'http://www.siemens.com/automation/Openness/SW/Interface/v5'
-        }
-
-        # Find all text elements
-        for elem in root.iter():
-            # Check tag name (handle namespaces)
-            tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-
-            # MultiLanguageText or Text elements
-            if tag in ('MultiLanguageText', 'Text') and elem.text:
-                if '???' in elem.text:
-                    found += elem.text.count('???')
-                    old_text = elem.text
-                    elem.text, _ = self.clean_text(elem.text)
-                    replaced += 1
-
-                    if self.verbose:
-                        print(f"  [{tag}]")
-                        print(f"    Before: {old_text[:80]}")
-                        print(f"    After:  {elem.text[:80]}")
-
-        # Write back to file only if changes were made
-        if replaced > 0:
-            try:
-                tree.write(
-                    str(xml_path),
-                    encoding='utf-8',
-                    xml_declaration=True
-                )
-                self.files_processed += 1
-                self.placeholders_found += found
-                self.placeholders_replaced += replaced
-
-                if not self.verbose:
-                    print(f"[OK] {xml_path.name}: {found} found, {replaced} cleaned")
-            except Exception as e:
-                print(f"[ERROR] Error writing {xml_path}: {e}", file=sys.stderr)
-                return found, 0
-
-        return found, replaced
-
-    def process_directory(self, root_dir: Path) -> None:
+        result = clean_file(xml_path, dry_run=dry_run)
+        self._record(result, dry_run)
+        return result.found, result.replaced
+
+    def _record(self, result: CleanupResult, dry_run: bool) -> None:
+        """Update counters and print per-file output for one result."""
+        if result.error:
+            print(f"[ERROR] {result.error}", file=sys.stderr)
+            return
+        if result.replaced == 0:
+            return
+
+        self.files_processed += 1
+        self.placeholders_found += result.found
+        self.placeholders_replaced += result.replaced
+
+        if dry_run:
+            print(result.diff)
+        elif self.verbose:
+            print(f"  [{result.path.name}]")
+        print(f"[OK] {result.path.name}: {result.found} found, {result.replaced} cleaned")
+
+    def process_directory(self, root_dir: Path, dry_run: bool = False,
+                          workers: Optional[int] = None) -> List[CleanupResult]:
         """
         Process all XML files in directory recursively.
-        """
-        xml_files = list(root_dir.rglob('*.xml'))
-        print(f"\n[INFO] Found {len(xml_files)} XML files\n")
 
-        files_with_placeholders = []
+        Args:
+            root_dir: Project directory
+            dry_run: Report a unified diff instead of writing files
+            workers: Process pool size (default: os.cpu_count())
+
+        Returns:
+            Results for the files that contained placeholders
+        """
+        total_files, results = clean_tree(root_dir, dry_run=dry_run, workers=workers)
+        print(f"\n[INFO] Scanned {total_files} XML files, {len(results)} contain placeholders\n")
 
-        for xml_file in xml_files:
-            found, replaced = self.clean_xml_file(xml_file)
-            if found > 0:
-                files_with_placeholders.append((xml_file, found, replaced))
+        for result in results:
+            self._record(result, dry_run)
 
         # Print summary
         print(f"\n{'='*80}")
-        print(f"CLEANUP SUMMARY")
+        print(f"CLEANUP SUMMARY{' (DRY RUN)' if dry_run else ''}")
         print(f"{'='*80}")
-        print(f"Total Files Processed: {len(xml_files)}")
-        print(f"Files With Placeholders: {len(files_with_placeholders)}")
+        print(f"Total Files Processed: {total_files}")
+        print(f"Files With Placeholders: {len(results)}")
         print(f"Total Placeholders Found: {self.placeholders_found}")
         print(f"Total Placeholders Replaced: {self.placeholders_replaced}")
         print(f"{'='*80}\n")
 
-        if files_with_placeholders:
+        if results:
             print("[INFO] FILES WITH PLACEHOLDERS FOUND:\n")
-            for file_path, found, replaced in files_with_placeholders:
-                rel_path = file_path.relative_to(root_dir)
+            for result in results:
+                rel_path = result.path.relative_to(root_dir)
                 print(f"  * {rel_path}")
-                print(f"    Found: {found}, Replaced: {replaced}\n")
+                print(f"    Found: {result.found}, Replaced: {result.replaced}\n")
+
+        return results
 
 
 def main():
     """Main entry point."""
-    if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <project_dir> [--verbose]")
-        print(f"\nExample: {sys.argv[0]} PLC_410D1 --verbose")
-        sys.exit(1)
-
-    project_dir = Path(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        description="Clean ??? placeholders from TIA Portal XML exports",
+        epilog=f"Example: {Path(sys.argv[0]).name} PLC_410D1 --dry-run"
+    )
+    parser.add_argument("project_dir", help="Project directory to scan recursively")
+    parser.add_argument("--verbose", action="store_true", help="Print each cleaned file")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Do not write files, print a unified diff report instead")
+    parser.add_argument("--workers", "-j", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    project_dir = Path(args.project_dir)
     if not project_dir.exists():
         print(f"❌ Directory not found: {project_dir}", file=sys.stderr)
         sys.exit(1)
 
-    verbose = '--verbose' in sys.argv
-
     print(f"\n{'='*80}")
     print(f"TIA PORTAL XML PLACEHOLDER CLEANER")
     print(f"{'='*80}")
     print(f"Project Directory: {project_dir}")
-    print(f"Verbose Mode: {'ON' if verbose else 'OFF'}")
+    print(f"Verbose Mode: {'ON' if args.verbose else 'OFF'}")
+    print(f"Dry Run: {'ON' if args.dry_run else 'OFF'}")
     print(f"{'='*80}\n")
 
-    cleaner = PlaceholderCleaner(verbose=verbose)
-    cleaner.process_directory(project_dir)
+    cleaner = PlaceholderCleaner(verbose=args.verbose)
+    cleaner.process_directory(project_dir, dry_run=args.dry_run, workers=args.workers)
 
     if cleaner.placeholders_replaced > 0:
-        print(f"[SUCCESS] CLEANUP COMPLETED - {cleaner.placeholders_replaced} files updated")
+        action = "WOULD UPDATE" if args.dry_run else "COMPLETED"
+        print(f"[SUCCESS] CLEANUP {action} - {cleaner.files_processed} files updated")
     else:
         print(f"[INFO] No placeholders found - no changes made")
 
@@ -3,7 +3,8 @@ Expression Tree Builder - Converte espressioni LAD complesse in SCL corretto
 Integra la logica del Fix per il bug di RestLimitSwitch in ValveMachine_FB
 """
 
-from typing import Dict, List, Optional, Set, Union
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Optional, Set, Union
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -80,6 +81,49 @@ def find_wire_source(target_uid: str, target_pin: str, wires: List) -> Optional[
     return None
 
 
+# Source pins of a Part accepted as logic outputs
+OUTPUT_PINS = ('out', 'out1', 'out2')
+
+
+def find_graph_source(target_uid: str, target_pin: str, graph) -> Optional[str]:
+    """
+    Come find_wire_source, ma su un LadGraph (lookup diretto, senza scansione)
+
+    Returns:
+        source UID oppure None
+    """
+    conn = graph.connection(target_uid, target_pin)
+    if conn is None:
+        return None
+    src_type, src_uid, src_pin = conn
+    if src_uid and (src_type == 'IdentCon' or (src_type == 'NameCon' and src_pin in OUTPUT_PINS)):
+        return src_uid
+    return None
+
+
+class GraphAccesses(Mapping):
+    """Vista UID -> LadAccess sugli Access di un LadGraph, creati su richiesta"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, uid: str) -> LadAccess:
+        part = self.graph.part(uid)
+        if part is None or part.get('type') != 'Access':
+            raise KeyError(uid)
+        return LadAccess(uid=uid, symbol=part.get('name', f'VAR_{uid}'), scope=part.get('scope', ''))
+
+    def __contains__(self, uid) -> bool:
+        part = self.graph.part(uid)
+        return part is not None and part.get('type') == 'Access'
+
+    def __iter__(self):
+        return (uid for uid, part in self.graph.iter_parts() if part.get('type') == 'Access')
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
 def build_expression_tree(part_uid: str, wires: List, parts: Dict,
                          accesses: Dict[str, LadAccess],
                          visited: Optional[Set[str]] = None) -> Optional[LadExpression]:
@@ -96,6 +140,48 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
     Returns:
         LadExpression tree o None se non costruibile
     """
+    def source(uid: str, pin: str) -> Optional[str]:
+        return find_wire_source(uid, pin, wires)
+
+    def part_info(uid: str) -> Optional[Dict]:
+        return parts.get(uid)
+
+    return _build_tree(part_uid, source, part_info, accesses, visited)
+
+
+def build_graph_expression_tree(part_uid: str, graph,
+                                visited: Optional[Set[str]] = None) -> Optional[LadExpression]:
+    """
+    Come build_expression_tree, ma direttamente su un LadGraph
+
+    Usare GraphAccesses(graph) come accesses per expression_to_scl.
+    """
+    def source(uid: str, pin: str) -> Optional[str]:
+        return find_graph_source(uid, pin, graph)
+
+    def part_info(uid: str) -> Optional[Dict]:
+        part = graph.part(uid)
+        if part is None or part.get('type') == 'Access':
+            return None
+        return {
+            'type': part.get('part_type', ''),
+            'negated': part.get('negated', False),
+            'cardinality': part.get('cardinality', 2)
+        }
+
+    return _build_tree(part_uid, source, part_info, GraphAccesses(graph), visited)
+
+
+def _build_tree(part_uid: str, source: Callable[[str, str], Optional[str]],
+                part_info: Callable[[str], Optional[Dict]], accesses,
+                visited: Optional[Set[str]] = None) -> Optional[LadExpression]:
+    """
+    Costruzione ricorsiva dell'albero, indipendente dal formato del grafo
+
+    Args:
+        source: (uid, pin) -> UID sorgente oppure None
+        part_info: uid -> {'type', 'negated', 'cardinality'} oppure None
+    """
     if visited is None:
         visited = set()
 
@@ -109,10 +195,13 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
         return LadExpression(ExprType.ACCESS, access_uid=part_uid)
 
     # Caso 2: UID è un Part (nodo interno)
-    if part_uid not in parts:
+    part = part_info(part_uid)
+    if part is None:
         return None
 
-    part = parts[part_uid]
+    def build(uid: str) -> Optional[LadExpression]:
+        return _build_tree(uid, source, part_info, accesses, visited.copy())
+
     part_type = part.get('type', '')  # Tipo del part (O, And, Contact, Le, ecc.)
 
     # OR block
@@ -121,9 +210,9 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
         operands = []
         for i in range(1, cardinality + 1):
             pin_name = f"in{i}" if i > 1 else "in"
-            source_uid = find_wire_source(part_uid, pin_name, wires)
+            source_uid = source(part_uid, pin_name)
             if source_uid:
-                child_expr = build_expression_tree(source_uid, wires, parts, accesses, visited.copy())
+                child_expr = build(source_uid)
                 if child_expr:
                     operands.append(child_expr)
 
@@ -131,18 +220,18 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
 
     # AND block (bitwise)
     elif part_type == 'And':
-        in1_uid = find_wire_source(part_uid, 'in1', wires)
-        in2_uid = find_wire_source(part_uid, 'in2', wires)
+        in1_uid = source(part_uid, 'in1')
+        in2_uid = source(part_uid, 'in2')
 
-        left = build_expression_tree(in1_uid, wires, parts, accesses, visited.copy()) if in1_uid else None
-        right = build_expression_tree(in2_uid, wires, parts, accesses, visited.copy()) if in2_uid else None
+        left = build(in1_uid) if in1_uid else None
+        right = build(in2_uid) if in2_uid else None
 
         if left and right:
             return LadExpression(ExprType.AND, operands=[left, right], part_uid=part_uid)
 
     # Contact (genera AND implicito se collegato in serie)
     elif part_type in ['Contact', 'PContact', 'NContact']:
-        operand_uid = find_wire_source(part_uid, 'operand', wires)
+        operand_uid = source(part_uid, 'operand')
         if operand_uid and operand_uid in accesses:
             is_negated = part.get('negated', False)
             return LadExpression(
@@ -157,11 +246,11 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
         operator_map = {'Le': '<=', 'Ge': '>=', 'Eq': '=', 'Ne': '<>', 'Lt': '<', 'Gt': '>'}
         operator = operator_map[part_type]
 
-        in1_uid = find_wire_source(part_uid, 'in1', wires)
-        in2_uid = find_wire_source(part_uid, 'in2', wires)
+        in1_uid = source(part_uid, 'in1')
+        in2_uid = source(part_uid, 'in2')
 
-        left = build_expression_tree(in1_uid, wires, parts, accesses, visited.copy()) if in1_uid else None
-        right = build_expression_tree(in2_uid, wires, parts, accesses, visited.copy()) if in2_uid else None
+        left = build(in1_uid) if in1_uid else None
+        right = build(in2_uid) if in2_uid else None
 
         if left and right:
             comp_expr = LadExpression(
@@ -173,9 +262,9 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
             )
 
             # Controlla se ha precondizione
-            pre_uid = find_wire_source(part_uid, 'pre', wires)
+            pre_uid = source(part_uid, 'pre')
             if pre_uid:
-                pre_expr = build_expression_tree(pre_uid, wires, parts, accesses, visited.copy())
+                pre_expr = build(pre_uid)
                 if pre_expr:
                     return LadExpression(ExprType.AND, operands=[pre_expr, comp_expr])
 
@@ -183,9 +272,9 @@ def build_expression_tree(part_uid: str, wires: List, parts: Dict,
 
     # NOT
     elif part_type == 'Not':
-        in_uid = find_wire_source(part_uid, 'in', wires)
+        in_uid = source(part_uid, 'in')
         if in_uid:
-            operand = build_expression_tree(in_uid, wires, parts, accesses, visited.copy())
+            operand = build(in_uid)
             if operand:
                 return LadExpression(ExprType.NOT, operand=operand, part_uid=part_uid)
 
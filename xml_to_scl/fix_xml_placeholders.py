@@ -3,12 +3,21 @@
 """
 Fix XML placeholders using regex on file contents.
 This is safer than parsing XML and re-writing.
+
+Shares the cleanup engine in clean_placeholders (mmap pre-filter, process
+pool, atomic rewrite) but rewrites placeholders anywhere in the file rather
+than only inside text elements.
 """
 
-import re
 import sys
+import argparse
 from pathlib import Path
 
+from clean_placeholders import clean_file, clean_tree
+
+
+DEFAULT_ROOT = Path("C:\\Projects\\MODULBLOCK_MBK2\\MBK_2\\PLC_410D1")
+
 
 def fix_placeholders_in_file(xml_path: Path, dry_run=False) -> tuple:
     """
@@ -16,80 +25,51 @@ def fix_placeholders_in_file(xml_path: Path, dry_run=False) -> tuple:
 
     Returns: (found_count, replaced_count)
     """
-    try:
-        content = xml_path.read_text(encoding='utf-8')
-    except Exception as e:
-        print(f"[ERROR] Cannot read {xml_path.name}: {e}")
-        return 0, 0
-
-    original = content
-    found_count = content.count('???')
-
-    if found_count == 0:
-        return 0, 0
-
-    # Pattern 1: Passaggio XX - ??? lato operatore/motore
-    content = re.sub(
-        r'(Passaggio\s+\d+\s*-\s*)\?\?\?(\s+lato)',
-        r'\1[UNDEFINED]\2',
-        content
-    )
-
-    # Pattern 2: Passaggio XX (???) - description
-    content = re.sub(
-        r'(Passaggio\s+\d+\s*\()\?\?\?(\))',
-        r'\1UNKNOWN\2',
-        content
-    )
-
-    # Pattern 3: Generic ??? with context
-    content = re.sub(
-        r'\?\?\?\s+what it means\?',
-        r'[TO BE CLARIFIED]',
-        content
-    )
-
-    # Pattern 4: Any remaining ???
-    content = re.sub(r'\?\?\?', r'[PLACEHOLDER]', content)
-
-    replaced_count = (original.count('???') - content.count('???'))
-
-    if replaced_count > 0 and not dry_run:
-        try:
-            xml_path.write_text(content, encoding='utf-8')
-        except Exception as e:
-            print(f"[ERROR] Cannot write {xml_path.name}: {e}")
-            return found_count, 0
-
-    return found_count, replaced_count
+    result = clean_file(xml_path, dry_run=dry_run, text_only=False)
+    if result.error:
+        print(f"[ERROR] {result.error}")
+        if result.found == 0:
+            return 0, 0
+    return result.found, result.replaced
 
 
 def main():
-    root_dir = Path("C:\\Projects\\MODULBLOCK_MBK2\\MBK_2\\PLC_410D1")
+    parser = argparse.ArgumentParser(description="Fix ??? placeholders in TIA Portal XML exports")
+    parser.add_argument("root_dir", nargs='?', default=str(DEFAULT_ROOT), help="Project directory")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Do not write files, print a unified diff report instead")
+    parser.add_argument("--workers", "-j", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    root_dir = Path(args.root_dir)
 
     print("\n" + "="*80)
     print("TIA PORTAL XML PLACEHOLDER FIXER")
     print("="*80 + "\n")
 
-    xml_files = list(root_dir.rglob('*.xml'))
-    print(f"[INFO] Found {len(xml_files)} XML files\n")
+    total_files, results = clean_tree(root_dir, dry_run=args.dry_run, text_only=False,
+                                      workers=args.workers)
+    print(f"[INFO] Found {total_files} XML files\n")
 
     total_found = 0
     total_replaced = 0
     files_with_issues = []
 
-    for xml_file in xml_files:
-        found, replaced = fix_placeholders_in_file(xml_file, dry_run=False)
-        if found > 0:
-            total_found += found
-            total_replaced += replaced
-            files_with_issues.append((xml_file.relative_to(root_dir), found, replaced))
-            print(f"[OK] {xml_file.name}: {found} found, {replaced} fixed")
+    for result in results:
+        if result.error:
+            print(f"[ERROR] {result.error}")
+        total_found += result.found
+        total_replaced += result.replaced
+        files_with_issues.append((result.path.relative_to(root_dir), result.found, result.replaced))
+        if args.dry_run and result.diff:
+            print(result.diff)
+        print(f"[OK] {result.path.name}: {result.found} found, {result.replaced} fixed")
 
     print("\n" + "="*80)
-    print("SUMMARY")
+    print("SUMMARY" + (" (DRY RUN)" if args.dry_run else ""))
     print("="*80)
-    print(f"Total Files Scanned: {len(xml_files)}")
+    print(f"Total Files Scanned: {total_files}")
     print(f"Files With Placeholders: {len(files_with_issues)}")
     print(f"Total Placeholders Found: {total_found}")
     print(f"Total Placeholders Fixed: {total_replaced}")
@@ -101,7 +81,7 @@ def main():
             print(f"  * {rel_path}")
             print(f"    Found: {found}, Fixed: {replaced}\n")
 
-    if total_replaced > 0:
+    if total_replaced > 0 and not args.dry_run:
         print(f"[SUCCESS] Fixed {total_replaced} placeholder(s) in {len(files_with_issues)} file(s)")
     else:
         print("[INFO] No changes made")
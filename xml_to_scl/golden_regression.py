@@ -0,0 +1,334 @@
+"""
+Golden-corpus regression runner
+
+Converts every XML (and copies every SCL) of a project such as PLC_410D1 in
+parallel and compares each generated file with the checked-in golden output
+(PLC_410D1_Parsed_Final) by content hash. Mismatches are reported with a
+unified diff. With --shard-index/--shard-count the corpus is split into stable
+shards (by relative path), so the full check can be spread over CI jobs.
+
+Usage:
+    python golden_regression.py                       # ../PLC_410D1 vs ../PLC_410D1_Parsed_Final
+    python golden_regression.py --shard-index 0 --shard-count 4 --jobs 4
+    python golden_regression.py --report golden.json --diff-dir golden_diffs
+    python golden_regression.py --update-golden       # accept current outputs
+"""
+
+import os
+import sys
+import json
+import shutil
+import zlib
+import difflib
+import hashlib
+import logging
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Setup path to import local modules
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from main import identify_file_type, process_file
+
+DEFAULT_SOURCE = current_dir.parent / 'PLC_410D1'
+DEFAULT_GOLDEN = current_dir.parent / 'PLC_410D1_Parsed_Final'
+
+SOURCE_PATTERNS = ('*.xml', '*.scl')
+
+# Generated next to the outputs but not part of the golden corpus
+IGNORED_SUFFIXES = ('.block.json', '.error')
+
+DEFAULT_DIFF_LINES = 60
+
+
+# ============================================================================
+# DATA STRUCTURES
+# ============================================================================
+
+@dataclass
+class OutputCheck:
+    """Comparison of one generated file with its golden counterpart"""
+    relative_path: str
+    status: str  # match, mismatch, new (no golden file)
+    sha256: str
+    golden_sha256: Optional[str] = None
+    diff: Optional[str] = None
+
+
+@dataclass
+class SourceCheck:
+    """Regression result of one source file"""
+    relative_path: str
+    status: str  # match, mismatch, new, no_output, expected_failure, skipped, error
+    outputs: List[OutputCheck] = field(default_factory=list)
+    error: Optional[str] = None
+    duration: float = 0.0
+
+
+# ============================================================================
+# SHARDING
+# ============================================================================
+
+def shard_of(relative_path: str, shard_count: int) -> int:
+    """Stable shard of a source file (independent of the other files in the corpus)"""
+    return zlib.crc32(relative_path.encode('utf-8')) % shard_count
+
+
+def discover_sources(source_root: Path, shard_index: int = 0, shard_count: int = 1) -> List[str]:
+    """Relative paths (posix) of the source files of one shard, sorted"""
+    files = set()
+    for pattern in SOURCE_PATTERNS:
+        files.update(p.relative_to(source_root).as_posix() for p in source_root.rglob(pattern))
+    return sorted(p for p in files if shard_of(p, shard_count) == shard_index)
+
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def sha256_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def unified_diff(golden: bytes, actual: bytes, relative_path: str, max_lines: int) -> str:
+    """Unified diff golden -> actual, truncated to max_lines"""
+    golden_lines = golden.decode('utf-8-sig', errors='replace').splitlines(keepends=True)
+    actual_lines = actual.decode('utf-8-sig', errors='replace').splitlines(keepends=True)
+    diff = list(difflib.unified_diff(golden_lines, actual_lines,
+                                     fromfile=f"golden/{relative_path}",
+                                     tofile=f"actual/{relative_path}"))
+    if max_lines and len(diff) > max_lines:
+        diff = diff[:max_lines] + [f"... ({len(diff) - max_lines} more diff lines)\n"]
+    return ''.join(diff)
+
+
+def _init_worker():
+    # Conversion errors are part of the result, not console noise
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+
+def check_source(job: Tuple[str, str, str, int, bool]) -> SourceCheck:
+    """Process-pool worker: convert one source file into a scratch directory and compare"""
+    source_root, golden_root, relative_path, diff_lines, update_golden = job
+    source_file = Path(source_root) / relative_path
+    golden_dir = (Path(golden_root) / relative_path).parent
+    start_time = time.time()
+
+    try:
+        if not identify_file_type(source_file):
+            # Not converted by the batch converter either (OB, technology objects, ...)
+            return SourceCheck(relative_path, 'skipped')
+
+        with tempfile.TemporaryDirectory(prefix='golden_') as scratch:
+            scratch_dir = Path(scratch)
+            process_file(source_file, scratch_dir)
+
+            outputs = []
+            for output_file in sorted(scratch_dir.iterdir()):
+                if output_file.name.endswith(IGNORED_SUFFIXES):
+                    continue
+                content = output_file.read_bytes()
+                golden_file = golden_dir / output_file.name
+                output_rel = (Path(relative_path).parent / output_file.name).as_posix()
+                check = OutputCheck(output_rel, 'new', sha256_bytes(content))
+
+                if golden_file.exists():
+                    golden_content = golden_file.read_bytes()
+                    check.golden_sha256 = sha256_bytes(golden_content)
+                    if check.golden_sha256 == check.sha256:
+                        check.status = 'match'
+                    else:
+                        check.status = 'mismatch'
+                        check.diff = unified_diff(golden_content, content, output_rel, diff_lines)
+
+                if update_golden and check.status != 'match':
+                    golden_dir.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(output_file, golden_file)
+                outputs.append(check)
+
+        if not outputs:
+            # Conversion failures are golden too: <name>.xml.error in the golden tree
+            expected = (golden_dir / f"{source_file.name}.error").exists()
+            status = 'expected_failure' if expected else 'no_output'
+        elif any(o.status == 'mismatch' for o in outputs):
+            status = 'mismatch'
+        elif any(o.status == 'new' for o in outputs):
+            status = 'new'
+        else:
+            status = 'match'
+        return SourceCheck(relative_path, status, outputs, duration=time.time() - start_time)
+
+    except Exception as e:
+        return SourceCheck(relative_path, 'error', error=f"{type(e).__name__}: {e}",
+                           duration=time.time() - start_time)
+
+
+def run_regression(source_root: Path, golden_root: Path, shard_index: int = 0, shard_count: int = 1,
+                   max_workers: Optional[int] = None, diff_lines: int = DEFAULT_DIFF_LINES,
+                   update_golden: bool = False) -> List[SourceCheck]:
+    """Check all source files of one shard (process pool unless max_workers == 1)"""
+    sources = discover_sources(source_root, shard_index, shard_count)
+    jobs = [(str(source_root), str(golden_root), rel, diff_lines, update_golden) for rel in sources]
+
+    if max_workers == 1 or len(jobs) <= 1:
+        _init_worker()
+        return list(map(check_source, jobs))
+
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(check_source, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def orphaned_golden_files(golden_root: Path, results: List[SourceCheck]) -> List[str]:
+    """Golden outputs no source file produced any more (only meaningful for a full run)"""
+    produced = {o.relative_path for r in results for o in r.outputs}
+    orphans = []
+    for path in golden_root.rglob('*'):
+        if path.is_file() and path.parent != golden_root and not path.name.endswith(IGNORED_SUFFIXES):
+            rel = path.relative_to(golden_root).as_posix()
+            if rel not in produced:
+                orphans.append(rel)
+    return sorted(orphans)
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+FAILING_STATUSES = ('mismatch', 'new', 'no_output', 'error')
+
+
+def summarize(results: List[SourceCheck]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def write_diffs(diff_dir: Path, results: List[SourceCheck]) -> int:
+    """One <output>.diff per mismatching output, mirrored under diff_dir"""
+    written = 0
+    for result in results:
+        for output in result.outputs:
+            if output.diff:
+                diff_file = diff_dir / f"{output.relative_path}.diff"
+                diff_file.parent.mkdir(parents=True, exist_ok=True)
+                diff_file.write_text(output.diff, encoding='utf-8')
+                written += 1
+    return written
+
+
+def write_report(report_path: Path, source_root: Path, golden_root: Path, shard: Tuple[int, int],
+                 results: List[SourceCheck], orphans: List[str], total_time: float):
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'source': str(source_root),
+        'golden': str(golden_root),
+        'shard_index': shard[0],
+        'shard_count': shard[1],
+        'total_time': round(total_time, 2),
+        'summary': summarize(results),
+        'orphaned_golden_files': orphans,
+        'failures': [asdict(r) for r in results if r.status in FAILING_STATUSES],
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def print_results(results: List[SourceCheck], orphans: List[str], show_diffs: int, total_time: float):
+    shown = 0
+    for result in results:
+        if result.status not in FAILING_STATUSES:
+            continue
+        if result.status == 'error':
+            print(f"  [ERROR]     {result.relative_path}: {result.error}")
+        elif result.status == 'no_output':
+            print(f"  [NO OUTPUT] {result.relative_path}")
+        for output in result.outputs:
+            if output.status == 'new':
+                print(f"  [NEW]       {output.relative_path} (no golden file)")
+            elif output.status == 'mismatch':
+                print(f"  [MISMATCH]  {output.relative_path}")
+                if shown < show_diffs:
+                    print(output.diff)
+                    shown += 1
+    for orphan in orphans:
+        print(f"  [ORPHAN]    {orphan} (golden file not produced)")
+
+    counts = ', '.join(f"{status} {count}" for status, count in summarize(results).items())
+    print(f"\nChecked {len(results)} source files in {total_time:.1f}s ({counts or 'none'})")
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-output regression check of the XML to SCL converter")
+    parser.add_argument("--source", default=str(DEFAULT_SOURCE),
+                        help=f"Project with the XML/SCL sources (default: {DEFAULT_SOURCE.name})")
+    parser.add_argument("--golden", default=str(DEFAULT_GOLDEN),
+                        help=f"Checked-in golden outputs (default: {DEFAULT_GOLDEN.name})")
+    parser.add_argument("--shard-index", type=int, default=0, help="Shard to check (0-based)")
+    parser.add_argument("--shard-count", type=int, default=1, help="Total number of shards")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--report", help="Write JSON report of the failures")
+    parser.add_argument("--diff-dir", help="Write one .diff file per mismatching output")
+    parser.add_argument("--diff-lines", type=int, default=DEFAULT_DIFF_LINES,
+                        help=f"Max diff lines per output, 0 = unlimited (default: {DEFAULT_DIFF_LINES})")
+    parser.add_argument("--show-diffs", type=int, default=5, help="Diffs printed to the console (default: 5)")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="Copy mismatching/new outputs into the golden tree")
+
+    args = parser.parse_args()
+
+    source_root = Path(args.source).resolve()
+    golden_root = Path(args.golden).resolve()
+    if not source_root.is_dir():
+        print(f"ERROR: Source directory not found: {source_root}")
+        sys.exit(2)
+    if not golden_root.is_dir() and not args.update_golden:
+        print(f"ERROR: Golden directory not found: {golden_root}")
+        sys.exit(2)
+    if args.shard_count < 1 or not 0 <= args.shard_index < args.shard_count:
+        print(f"ERROR: Invalid shard {args.shard_index}/{args.shard_count}")
+        sys.exit(2)
+
+    print(f"Source: {source_root}")
+    print(f"Golden: {golden_root}")
+    print(f"Shard:  {args.shard_index + 1}/{args.shard_count}\n")
+
+    start_time = time.time()
+    results = run_regression(source_root, golden_root, args.shard_index, args.shard_count,
+                             args.jobs, args.diff_lines, args.update_golden)
+    total_time = time.time() - start_time
+
+    # Orphans can only be detected when every source file was converted
+    orphans = orphaned_golden_files(golden_root, results) if args.shard_count == 1 else []
+
+    print_results(results, orphans, args.show_diffs, total_time)
+    if args.diff_dir:
+        written = write_diffs(Path(args.diff_dir), results)
+        print(f"Diffs: {written} files in {args.diff_dir}")
+    if args.report:
+        write_report(Path(args.report), source_root, golden_root, (args.shard_index, args.shard_count),
+                     results, orphans, total_time)
+        print(f"Report: {args.report}")
+
+    failed = any(r.status in FAILING_STATUSES for r in results) or bool(orphans)
+    if args.update_golden:
+        print("Golden outputs updated")
+        failed = any(r.status in ('no_output', 'error') for r in results)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
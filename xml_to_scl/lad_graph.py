@@ -0,0 +1,303 @@
+"""
+Compact LAD/FBD network graph
+
+FlgNet parts and wires are stored with dense integer node ids instead of
+string UIds. Pin names and connection types are interned to small integers and
+connections live in array-backed CSR adjacency, indexed both by destination
+(what drives this pin?) and by source (what does this part drive?).
+
+to_dicts() / from_dicts() convert from and to the dict format LADLogicParser
+used to keep (parts, connections, wires), for debug scripts and tests.
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Node id used for connection sources without UId (Powerrail)
+NO_NODE = -1
+
+# Keys of a connection source dict; anything else (test mocks) is kept as-is
+_SOURCE_KEYS = frozenset({'type', 'uid', 'name'})
+
+# (dest node, dest pin) packed into one int key
+_PIN_BITS = 20
+
+
+class LadGraph:
+    """
+    LAD network with integer node ids and CSR adjacency.
+
+    Every wire endpoint is an edge: source (type, node, pin) -> destination
+    (node, pin). A later wire into the same destination pin replaces the
+    earlier one, like the (dest_uid, dest_pin) -> source dict it replaces.
+    Queries take and return UId strings; the index is rebuilt lazily after
+    the graph is modified.
+    """
+
+    def __init__(self):
+        # Nodes: node id <-> UId, part data (None for wire-only endpoints)
+        self.uids: List[str] = []
+        self.node_ids: Dict[str, int] = {}
+        self.node_parts: List[Optional[Dict[str, Any]]] = []
+        self._part_order = array('i')
+
+        # Interned pin names and connection types, id 0 is None
+        self.pins: List[Optional[str]] = [None]
+        self.pin_ids: Dict[Optional[str], int] = {None: 0}
+        self.types: List[Optional[str]] = [None]
+        self.type_ids: Dict[Optional[str], int] = {None: 0}
+
+        # Edges in wire order (including replaced ones, for wires())
+        self.edge_dest = array('i')
+        self.edge_pin = array('i')
+        self.edge_dest_type = array('i')
+        self.edge_src = array('i')
+        self.edge_src_pin = array('i')
+        self.edge_src_type = array('i')
+
+        # Live connections: (dest, pin) key -> slot, slot -> current edge
+        self._slots: Dict[int, int] = {}
+        self._live = array('i')
+        # Source dicts with extra keys, by edge
+        self._raw_sources: Dict[int, Dict[str, Any]] = {}
+
+        # CSR index over live edges, built on demand
+        self._in_offsets: Optional[array] = None
+        self._in_edges = array('i')
+        self._out_offsets = array('i')
+        self._out_edges = array('i')
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def node(self, uid: str) -> int:
+        """Return the node id of a UId, allocating one if needed"""
+        node = self.node_ids.get(uid)
+        if node is None:
+            node = self.node_ids[uid] = len(self.uids)
+            self.uids.append(uid)
+            self.node_parts.append(None)
+            self._in_offsets = None
+        return node
+
+    def pin(self, name: Optional[str]) -> int:
+        """Return the interned id of a pin name"""
+        pin = self.pin_ids.get(name)
+        if pin is None:
+            pin = self.pin_ids[name] = len(self.pins)
+            self.pins.append(sys.intern(name))
+        return pin
+
+    def _type(self, name: Optional[str]) -> int:
+        type_id = self.type_ids.get(name)
+        if type_id is None:
+            type_id = self.type_ids[name] = len(self.types)
+            self.types.append(name)
+        return type_id
+
+    def add_part(self, uid: str, part: Dict[str, Any]):
+        """Add or replace the part data of a UId"""
+        node = self.node(uid)
+        if self.node_parts[node] is None:
+            self._part_order.append(node)
+        self.node_parts[node] = part
+
+    def connect(self, dest_uid: str, dest_pin: Optional[str],
+                src_type: Optional[str], src_uid: Optional[str], src_pin: Optional[str],
+                dest_type: Optional[str] = 'NameCon', raw: Optional[Dict[str, Any]] = None):
+        """Add a wire endpoint: source drives dest_uid:dest_pin"""
+        dest = self.node(dest_uid)
+        pin = self.pin(dest_pin)
+        edge = len(self.edge_dest)
+
+        self.edge_dest.append(dest)
+        self.edge_pin.append(pin)
+        self.edge_dest_type.append(self._type(dest_type))
+        self.edge_src.append(self.node(src_uid) if src_uid else NO_NODE)
+        self.edge_src_pin.append(self.pin(src_pin))
+        self.edge_src_type.append(self._type(src_type))
+        if raw is not None:
+            self._raw_sources[edge] = raw
+
+        key = (dest << _PIN_BITS) | pin
+        slot = self._slots.get(key)
+        if slot is None:
+            self._slots[key] = len(self._live)
+            self._live.append(edge)
+        else:
+            self._live[slot] = edge
+        self._in_offsets = None
+
+    def _build_index(self):
+        """Build destination and source CSR adjacency over live edges"""
+        n = len(self.uids)
+        live = self._live
+        edge_dest = self.edge_dest
+        edge_src = self.edge_src
+
+        in_counts = [0] * (n + 1)
+        out_counts = [0] * (n + 1)
+        for edge in live:
+            in_counts[edge_dest[edge] + 1] += 1
+            src = edge_src[edge]
+            if src != NO_NODE:
+                out_counts[src + 1] += 1
+        for i in range(n):
+            in_counts[i + 1] += in_counts[i]
+            out_counts[i + 1] += out_counts[i]
+
+        # Stable counting sort keeps connection order within each node
+        in_edges = array('i', bytes(4 * in_counts[n]))
+        out_edges = array('i', bytes(4 * out_counts[n]))
+        in_fill = in_counts[:n]
+        out_fill = out_counts[:n]
+        for edge in live:
+            dest = edge_dest[edge]
+            in_edges[in_fill[dest]] = edge
+            in_fill[dest] += 1
+            src = edge_src[edge]
+            if src != NO_NODE:
+                out_edges[out_fill[src]] = edge
+                out_fill[src] += 1
+
+        self._in_edges = in_edges
+        self._out_edges = out_edges
+        self._out_offsets = array('i', out_counts)
+        self._in_offsets = array('i', in_counts)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def part(self, uid: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Part data of a UId, or None"""
+        node = self.node_ids.get(uid)
+        return None if node is None else self.node_parts[node]
+
+    def iter_parts(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(uid, part) pairs in the order parts were added"""
+        uids = self.uids
+        node_parts = self.node_parts
+        for node in self._part_order:
+            yield uids[node], node_parts[node]
+
+    def _edge(self, uid: str, pin: Optional[str]) -> int:
+        """Live edge into uid:pin, or -1"""
+        node = self.node_ids.get(uid)
+        pin_id = self.pin_ids.get(pin)
+        if node is None or pin_id is None:
+            return -1
+        slot = self._slots.get((node << _PIN_BITS) | pin_id)
+        return -1 if slot is None else self._live[slot]
+
+    def _source_info(self, edge: int) -> Dict[str, Any]:
+        raw = self._raw_sources.get(edge)
+        if raw is not None:
+            return raw
+        src = self.edge_src[edge]
+        return {
+            'type': self.types[self.edge_src_type[edge]],
+            'uid': self.uids[src] if src != NO_NODE else None,
+            'name': self.pins[self.edge_src_pin[edge]]
+        }
+
+    def source(self, uid: str, pin: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Connection source dict {'type', 'uid', 'name'} driving uid:pin, or None"""
+        edge = self._edge(uid, pin)
+        return None if edge < 0 else self._source_info(edge)
+
+    def connection(self, uid: str, pin: Optional[str]) -> Optional[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """(type, uid, name) of the source driving uid:pin, or None"""
+        edge = self._edge(uid, pin)
+        if edge < 0:
+            return None
+        src = self.edge_src[edge]
+        return (self.types[self.edge_src_type[edge]],
+                self.uids[src] if src != NO_NODE else None,
+                self.pins[self.edge_src_pin[edge]])
+
+    def inputs(self, uid: str) -> Iterator[Tuple[Optional[str], Dict[str, Any]]]:
+        """(dest pin, source dict) for every connection into uid, in wire order"""
+        node = self.node_ids.get(uid)
+        if node is None:
+            return
+        if self._in_offsets is None:
+            self._build_index()
+        offsets = self._in_offsets
+        in_edges = self._in_edges
+        pins = self.pins
+        edge_pin = self.edge_pin
+        for i in range(offsets[node], offsets[node + 1]):
+            edge = in_edges[i]
+            yield pins[edge_pin[edge]], self._source_info(edge)
+
+    def outputs(self, uid: str) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """(dest uid, dest pin, source pin) for every connection driven by uid, in wire order"""
+        node = self.node_ids.get(uid)
+        if node is None:
+            return
+        if self._in_offsets is None:
+            self._build_index()
+        offsets = self._out_offsets
+        out_edges = self._out_edges
+        uids = self.uids
+        pins = self.pins
+        for i in range(offsets[node], offsets[node + 1]):
+            edge = out_edges[i]
+            yield uids[self.edge_dest[edge]], pins[self.edge_pin[edge]], pins[self.edge_src_pin[edge]]
+
+    # ------------------------------------------------------------------
+    # Dict format conversion
+    # ------------------------------------------------------------------
+
+    def parts_dict(self) -> Dict[str, Dict[str, Any]]:
+        """UId -> part data"""
+        return dict(self.iter_parts())
+
+    def connections_dict(self) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+        """(dest_uid, dest_pin) -> source dict, in wire order"""
+        uids = self.uids
+        pins = self.pins
+        return {
+            (uids[self.edge_dest[edge]], pins[self.edge_pin[edge]]): self._source_info(edge)
+            for edge in self._live
+        }
+
+    def wires(self) -> List[Dict[str, Any]]:
+        """Every wire endpoint as a flat dict, in wire order"""
+        uids = self.uids
+        pins = self.pins
+        types = self.types
+        wires = []
+        for edge in range(len(self.edge_dest)):
+            src = self.edge_src[edge]
+            wires.append({
+                'source_type': types[self.edge_src_type[edge]],
+                'source_uid': uids[src] if src != NO_NODE else None,
+                'source_name': pins[self.edge_src_pin[edge]],
+                'dest_type': types[self.edge_dest_type[edge]],
+                'dest_uid': uids[self.edge_dest[edge]],
+                'dest_name': pins[self.edge_pin[edge]]
+            })
+        return wires
+
+    def to_dicts(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[Tuple[str, Optional[str]], Dict[str, Any]], List[Dict[str, Any]]]:
+        """Convert to (parts, connections, wires) dict format"""
+        return self.parts_dict(), self.connections_dict(), self.wires()
+
+    @classmethod
+    def from_dicts(cls, parts: Dict[str, Dict[str, Any]],
+                   connections: Dict[Tuple[str, Optional[str]], Dict[str, Any]]) -> 'LadGraph':
+        """Build a graph from parts and (dest_uid, dest_pin) -> source dict connections"""
+        graph = cls()
+        for uid, part in parts.items():
+            graph.add_part(uid, part)
+        for (dest_uid, dest_pin), info in connections.items():
+            graph.connect(
+                dest_uid, dest_pin,
+                info.get('type'), info.get('uid'), info.get('name'),
+                raw=None if _SOURCE_KEYS.issuperset(info) else info
+            )
+        return graph
@@ -13,10 +13,15 @@ except ImportError:
     # Fallback/Mock for standalone testing without package structure
     from config import config, FB_SIGNATURES
 
+try:
+    from .lad_graph import LadGraph
+except ImportError:
+    from lad_graph import LadGraph
+
 try:
     from expression_builder import (
-        LadExpression, LadAccess, ExprType,
-        build_expression_tree, expression_to_scl,
+        LadExpression, ExprType,
+        build_graph_expression_tree, GraphAccesses, expression_to_scl,
         _format_scl_variable
     )
     # ENABLED: expression_builder available
@@ -38,6 +43,104 @@ logger = logging.getLogger(__name__)
 # Pins to exclude from FB/FC call parameters (LAD-specific, not needed in SCL)
 EXCLUDED_PINS = {'en', 'eno'}
 
+# Binary operators: part type -> SCL operator (used in expressions and operations)
+COMPARATOR_OPERATORS = {
+    'Eq': '=', 'Ne': '<>',
+    'Gt': '>', 'Lt': '<',
+    'Ge': '>=', 'Le': '<='
+}
+MATH_OPERATORS = {
+    'Mul': ' * ', 'Add': ' + ', 'Sub': ' - ', 'Div': ' / ', 'Mod': ' MOD ',
+    'And': ' AND ', 'Or': ' OR ', 'Xor': ' XOR '
+}
+
+# Functions resolved as SCL calls: part type -> SCL function name
+LOGIC_FUNCTIONS = {
+    'Abs': 'ABS', 'LIMIT': 'LIMIT', 'Sqr': 'SQR', 'Sqrt': 'SQRT',
+    'Round': 'ROUND', 'Trunc': 'TRUNC', 'Ceil': 'CEIL', 'Floor': 'FLOOR',
+    'Sin': 'SIN', 'Cos': 'COS', 'Tan': 'TAN', 'Asin': 'ASIN', 'Acos': 'ACOS', 'Atan': 'ATAN',
+    'Ln': 'LN', 'Exp': 'EXP', 'Expt': 'EXPT',
+    'Min': 'MIN', 'Max': 'MAX', 'Sel': 'SEL', 'Mux': 'MUX',
+    'Len': 'LEN', 'Concat': 'CONCAT', 'Left': 'LEFT', 'Right': 'RIGHT',
+    'Mid': 'MID', 'Find': 'FIND', 'Replace': 'REPLACE',
+    'Insert': 'INSERT', 'Delete': 'DELETE', 'String_to_Chars': 'Strg_TO_Chars',
+    'Chars_to_String': 'Chars_TO_Strg',
+    'Shl': 'SHL', 'Shr': 'SHR', 'Rol': 'ROL', 'Ror': 'ROR', 'Swap': 'SWAP',
+    'Scale_X': 'SCALE_X', 'Norm_X': 'NORM_X', 'Neg': 'NEG', 'Frac': 'FRAC',
+    'InRange': 'IN_RANGE', 'OutRange': 'OUT_RANGE',
+    'MoveBlk': 'MOVE_BLK', 'FillBlk': 'FILL_BLK',
+    'UMoveBlk': 'UMOVE_BLK', 'UFillBlk': 'UFILL_BLK',
+    'CountOfElements': 'CountOfElements', 'IsArray': 'IS_ARRAY',
+    'Peek': 'PEEK', 'Poke': 'POKE', 'PeekBool': 'PEEK_BOOL', 'Peek_Bool': 'PEEK_BOOL', 'PokeBool': 'POKE_BOOL', 'Poke_Bool': 'POKE_BOOL',
+    'To_Int': 'TO_INT', 'To_DInt': 'TO_DINT', 'To_Real': 'TO_REAL', 'To_LReal': 'TO_LREAL',
+    'To_Bool': 'TO_BOOL', 'To_Byte': 'TO_BYTE', 'To_Word': 'TO_WORD', 'To_DWord': 'TO_DWORD',
+    'To_Time': 'TO_TIME', 'To_SInt': 'TO_SINT', 'To_USInt': 'TO_USINT', 'To_UInt': 'TO_UINT', 'To_UDInt': 'TO_UDINT',
+    'To_String': 'TO_STRING', 'To_WString': 'TO_WSTRING',
+    'Bool_To_Int': 'BOOL_TO_INT', 'Bool_To_DInt': 'BOOL_TO_DInt', 'Bool_To_Byte': 'BOOL_TO_Byte',
+    'Int_To_Bool': 'INT_TO_BOOL', 'DInt_To_Bool': 'DINT_TO_BOOL',
+    # Advanced Types
+    'TypeOf': 'TypeOf', 'VariantGet': 'VariantGet', 'VariantPut': 'VariantPut', 'Ref': 'REF',
+    # System Functions Cases
+    'RD_SYS_T': 'RD_SYS_T', 'T_DIFF': 'T_DIFF', 'T_COMBINE': 'T_COMBINE',
+    'T_CONV': 'T_CONV', 'T_ADD': 'T_ADD', 'T_SUB': 'T_SUB',
+    'SET_CINT': 'SET_CINT', 'QRY_CINT': 'QRY_CINT', 'CAN_CINT': 'CAN_CINT'
+}
+
+# Pin names excluded from generic function parameters (EN/ENO or assignment result)
+FUNCTION_EXCLUDED_PINS = frozenset({'en', 'eno', 'out', 'out1', 'value', 'ret_val', 'retval'})
+
+# Instructions that become standalone operations in _extract_operations
+INSTRUCTION_TYPES = frozenset(MATH_OPERATORS) | frozenset({
+    'Abs', 'LIMIT', 'Sqr', 'Sqrt', 'Round', 'Trunc', 'Ceil', 'Floor', 'Sin', 'Cos', 'Tan',
+    'Asin', 'Acos', 'Atan', 'Ln', 'Exp', 'Expt', 'Min', 'Max', 'Sel', 'Mux',
+    'Len', 'Concat', 'Left', 'Right', 'Mid', 'Find', 'Replace', 'Insert', 'Delete',
+    'String_to_Chars', 'Chars_to_String',
+    'Shl', 'Shr', 'Rol', 'Ror', 'Swap',
+    'Scale_X', 'Norm_X', 'Neg', 'Frac', 'Convert',
+    'InRange', 'OutRange', 'MoveBlk', 'FillBlk', 'UMoveBlk', 'UFillBlk',
+    'CountOfElements', 'IsArray',
+    # System Functions
+    'SET_CINT', 'QRY_CINT', 'CAN_CINT', 'DIS_CINT', 'EN_CINT',
+    'RD_SYS_T', 'T_DIFF', 'T_COMBINE', 'T_CONV', 'T_ADD', 'T_SUB'
+})
+
+# VOID instructions do not return a value, so they generate a call directly
+VOID_INSTRUCTION_TYPES = frozenset({'MoveBlk', 'FillBlk', 'UMoveBlk', 'UFillBlk'})
+
+# Output pins an instruction result can be assigned from, in priority order
+INSTRUCTION_OUTPUT_PINS = ('out', 'out1', 'value', 'shl', 'shr', 'rol', 'ror', 'ret_val', 'retval')
+
+# Part type -> operation kind, see LADLogicParser._OPERATION_HANDLERS
+OPERATION_KINDS = {
+    'Coil': 'coil',
+    'SCoil': 'set_coil', 'RCoil': 'set_coil',
+    'Sr': 'flip_flop', 'Rs': 'flip_flop',
+    'Move': 'move',
+    **{name: 'instruction' for name in INSTRUCTION_TYPES},
+    'Label': 'label',
+    'Jump': 'jump', 'Jmp': 'jump',
+    'JmpN': 'jump_not',
+    'Return': 'return',
+    'Exit': 'exit',
+    'Continue': 'continue',
+}
+
+# Kinds that fall back to a generic FC/FB call when they produce no operation
+CALL_FALLBACK_KINDS = frozenset({'coil', 'set_coil', 'flip_flop', 'move', 'instruction'})
+
+
+def classify_operation(part: Dict[str, Any]) -> Optional[str]:
+    """
+    Return the operation kind of a parsed part, or None if it is not an operation.
+
+    Parts that are not a known instruction but carry a block or instance name
+    are generic FC/FB calls ('call').
+    """
+    kind = OPERATION_KINDS.get(part.get('part_type'))
+    if kind is None and (part.get('block_name') or part.get('instance_name')):
+        return 'call'
+    return kind
+
 class LADLogicParser:
     """Parser for LAD/FBD logic in FlgNet format"""
     
@@ -49,12 +152,37 @@ class LADLogicParser:
             compile_unit: CompileUnit XML element containing NetworkSource/FlgNet
         """
         self.compile_unit = compile_unit
-        self.parts = {}  # UId -> part data
-        self.wires = []  # List of wire connections
-        # Map (dest_uid, dest_pin) -> source_info
-        # source_info: {'type': 'Powerrail'|'IdentCon'|'NameCon', 'uid': ..., 'pin': ...}
-        self.connections = {} 
-        
+        # Parts and wire connections, see lad_graph.LadGraph
+        self.graph = LadGraph()
+
+    # Dict views of the graph (debugging, tests). Assigning them rebuilds the graph.
+
+    @property
+    def parts(self) -> Dict[str, Dict[str, Any]]:
+        """UId -> part data"""
+        return self.graph.parts_dict()
+
+    @parts.setter
+    def parts(self, parts: Dict[str, Dict[str, Any]]):
+        self.graph = LadGraph.from_dicts(parts, self.graph.connections_dict())
+
+    @property
+    def connections(self) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Map (dest_uid, dest_pin) -> source_info
+        source_info: {'type': 'Powerrail'|'IdentCon'|'NameCon', 'uid': ..., 'name': ...}
+        """
+        return self.graph.connections_dict()
+
+    @connections.setter
+    def connections(self, connections: Dict[tuple, Dict[str, Any]]):
+        self.graph = LadGraph.from_dicts(self.graph.parts_dict(), connections)
+
+    @property
+    def wires(self) -> List[Dict[str, Any]]:
+        """List of wire connections"""
+        return self.graph.wires()
+
     def parse(self) -> List[Dict[str, Any]]:
         """
         Parse FlgNet and extract FB calls with parameters.
@@ -263,8 +391,11 @@ class LADLogicParser:
                     
                     # Store block name even if no instance (for FCs)
                     part_data['block_name'] = call_info.get('Name')
-                            
-            self.parts[uid] = part_data
+
+            if part_data.get('part_type'):
+                part_data['op_kind'] = classify_operation(part_data)
+
+            self.graph.add_part(uid, part_data)
 
     def _parse_wires(self, flgnet: ET.Element):
         """Parse Wires section to build connections"""
@@ -303,72 +434,28 @@ class LADLogicParser:
                 source_uid = source.get('UId')
                 source_name = source.get('Name')
                 
-                # Iterate over all destinations (all children after the first one)
-                for dest in children[1:]:
-                    dest_tag = dest.tag.split('}')[-1]
-                    dest_uid = dest.get('UId')
-                    dest_name = dest.get('Name')
-                    
-                    if dest_uid:
-                        key = (dest_uid, dest_name) if dest_name else (dest_uid, None)
-                        
-                        self.connections[key] = {
-                            'type': source_tag,
-                            'uid': source_uid,
-                            'name': source_name
-                        }
-                        
-                        # Store for debugging and original logic compatibility
-                        self.wires.append({
-                            'source_type': source_tag,
-                            'source_uid': source_uid,
-                            'source_name': source_name,
-                            'dest_type': dest_tag,
-                            'dest_uid': dest_uid,
-                            'dest_name': dest_name
-                        })
-
-                # If there are more than 2 elements, it might be a chain? 
-                # Usually Wire has exactly 2 points.
-                # Exception: one output drives multiple inputs? 
-                # In that case, there would be multiple wires or multiple dests?
-                # The XML usually has separate Wire blocks for separate connections.
-                # Example:
+                # A Wire can have multiple targets, e.g. one output driving two inputs:
                 # <Wire UId="46">
                 #   <NameCon UId="33" Name="out" />
                 #   <NameCon UId="34" Name="in" />
                 #   <NameCon UId="35" Name="in" />
                 # </Wire>
-                # Oh, wait! Look at search result Step 50, Wire UId 46:
-                # Source: UId 33 out. Dests: UId 34 in AND UId 35 in.
-                # So a Wire can have multiple targets! source is [0], dests are [1:]
-                
-                if len(children) > 2:
-                    source = children[0]
-                    source_tag = source.tag.split('}')[-1]
-                    source_uid = source.get('UId')
-                    source_name = source.get('Name')
-                    
-                    for dest in children[1:]:
-                        dest_tag = dest.tag.split('}')[-1]
-                        dest_uid = dest.get('UId')
-                        dest_name = dest.get('Name')
-                        
-                        if dest_uid:
-                            key = (dest_uid, dest_name) if dest_name else (dest_uid, None)
-                            
-                            self.connections[key] = {
-                                'type': source_tag,
-                                'uid': source_uid,
-                                'name': source_name
-                            }
+                # so source is [0], dests are [1:]
+                for dest in children[1:]:
+                    dest_uid = dest.get('UId')
+                    if dest_uid:
+                        self.graph.connect(
+                            dest_uid, dest.get('Name') or None,
+                            source_tag, source_uid, source_name,
+                            dest_type=dest.tag.split('}')[-1]
+                        )
 
     def _extract_fb_calls(self) -> List[Dict[str, Any]]:
         """Extract FB calls with parameter connections"""
         fb_calls = []
         
         # Find all block calls (Parts or Call elements)
-        for uid, part in self.parts.items():
+        for uid, part in self.graph.iter_parts():
             # A call is anything with an instance_name OR a block_name from a Call element
             if part.get('type') == 'Part' and (part.get('instance_name') or part.get('block_name')):
                 fb_call = {
@@ -388,71 +475,59 @@ class LADLogicParser:
                 # Since we don't know the FB definition, we rely on Wires connecting to this UID.
                 
                 # Check all connections that target this UID
-                for (dest_uid, dest_pin), source_info in self.connections.items():
-                    if dest_uid == uid:
-                        # This wire connects TO the FB
-                        param_name = dest_pin
-                        
-                        # Skip EN/ENO pins - they are implicit in SCL
-                        if param_name and param_name.lower() in EXCLUDED_PINS:
-                            logger.debug(f"  Skipping LAD-specific pin: {param_name}")
-                            continue
-                        
-                        logger.debug(f"  Input pin: {param_name}")
-                        
-                        # Resolve the value
-                        value = self._resolve_input_connection(source_info)
-                        logger.debug(f"    Resolved to: {value}")
+                for param_name, source_info in self.graph.inputs(uid):
+                    # Skip EN/ENO pins - they are implicit in SCL
+                    if param_name and param_name.lower() in EXCLUDED_PINS:
+                        logger.debug(f"  Skipping LAD-specific pin: {param_name}")
+                        continue
 
-                        # Include any non-??? value (even falsy ones like 0, FALSE, empty string)
-                        if value and value != '???':
-                            fb_call['inputs'][param_name] = value
+                    logger.debug(f"  Input pin: {param_name}")
+
+                    # Resolve the value
+                    value = self._resolve_input_connection(source_info)
+                    logger.debug(f"    Resolved to: {value}")
+
+                    # Include any non-??? value (even falsy ones like 0, FALSE, empty string)
+                    if value and value != '???':
+                        fb_call['inputs'][param_name] = value
 
                 # Handle Outputs
                 # Output pins connect FROM the FB to something else.
-                # We need to find wires where SOURCE is this FB.
-                # This is harder with `self.connections` (dest->source).
-                # But we have `self.wires` or can iterate connections reverse.
-                # Wait, standard output parameters in SCL are `fb.Output := Var`.
-                # In LAD, if FB.Out -> Var, then Var is assigned FB.Out.
-                # So we want to find Vars connected to FB Outputs.
-                
-                # Iterate all connections, find if source is this FB
-                for (dest_uid, dest_pin), source_info in self.connections.items():
-                    if source_info['uid'] == uid:
-                        # This wire comes FROM the FB
-                        param_name = source_info.get('name')
-
-                        # Skip if output pin name is None (shouldn't normally happen)
-                        if not param_name:
-                            logger.debug(f"    Skipping FB output with no pin name")
-                            continue
-
-                        # Skip EN/ENO pins - they are implicit in SCL
-                        if param_name.lower() in EXCLUDED_PINS:
-                            logger.debug(f"  Skipping LAD-specific output pin: {param_name}")
-                            continue
+                # In LAD, if FB.Out -> Var, then Var is assigned FB.Out,
+                # so we want to find Vars connected to FB Outputs.
+                for dest_uid, dest_pin, param_name in self.graph.outputs(uid):
+                    # This wire comes FROM the FB
+
+                    # Skip if output pin name is None (shouldn't normally happen)
+                    if not param_name:
+                        logger.debug(f"    Skipping FB output with no pin name")
+                        continue
+
+                    # Skip EN/ENO pins - they are implicit in SCL
+                    if param_name.lower() in EXCLUDED_PINS:
+                        logger.debug(f"  Skipping LAD-specific output pin: {param_name}")
+                        continue
+
+                    logger.debug(f"  Output pin: {param_name}")
+
+                    # Destination is dest_uid/dest_pin
+                    # We want to know what Variable is connected there.
+                    # dest_uid should be an Access (variable).
+                    # If dest is another Part logic, it's not a direct assignment output.
+                    # But in SCL, output parameters map to variables.
+
+                    dest_part = self.graph.part(dest_uid)
+                    if dest_part and dest_part.get('type') == 'Access':
+                        var_name = dest_part.get('name', '???')
+                        scope = dest_part.get('scope', '')
+                        # Format with # prefix for local variables
+                        var_name = _format_scl_variable(var_name, scope)
+                        logger.debug(f"    Resolved to variable: {var_name}")
+                        fb_call['outputs'][param_name] = var_name
+                    elif dest_part:
+                        # Connected to logic?
+                        logger.debug(f"    Output {param_name} connected to part type {dest_part.get('type')}")
 
-                        logger.debug(f"  Output pin: {param_name}")
-
-                        # Destination is dest_uid/dest_pin
-                        # We want to know what Variable is connected there.
-                        # dest_uid should be an Access (variable).
-                        # If dest is another Part logic, it's not a direct assignment output.
-                        # But in SCL, output parameters map to variables.
-
-                        dest_part = self.parts.get(dest_uid)
-                        if dest_part and dest_part.get('type') == 'Access':
-                            var_name = dest_part.get('name', '???')
-                            scope = dest_part.get('scope', '')
-                            # Format with # prefix for local variables
-                            var_name = _format_scl_variable(var_name, scope)
-                            logger.debug(f"    Resolved to variable: {var_name}")
-                            fb_call['outputs'][param_name] = var_name
-                        elif dest_part:
-                            # Connected to logic?
-                            logger.debug(f"    Output {param_name} connected to part type {dest_part.get('type')}")
-                
                 # --- W4/W7 Fix: Inject Default Parameters for Standard Blocks ---
                 # Check if this block type has a known signature
                 # Use fb_call['fb_type'] which holds the block name (e.g. TSEND_C, TON)
@@ -526,60 +601,12 @@ class LADLogicParser:
             return None
 
         try:
-            # Convert parts to expression_builder format
-            converted_parts = {}
-            for uid, part_info in self.parts.items():
-                if part_info.get('type') == 'Access':
-                    # Accesses are handled separately
-                    continue
-                converted_parts[uid] = {
-                    'type': part_info.get('part_type', ''),
-                    'negated': part_info.get('negated', False),
-                    'cardinality': part_info.get('cardinality', 2)
-                }
-
-            # Convert accesses to expression_builder format
-            converted_accesses = {}
-            for uid, part_info in self.parts.items():
-                if part_info.get('type') == 'Access':
-                    converted_accesses[uid] = LadAccess(
-                        uid=uid,
-                        symbol=part_info.get('name', f'VAR_{uid}'),
-                        scope=part_info.get('scope', '')
-                    )
-
-            # Convert wires to expression_builder format
-            converted_wires = []
-            for (dest_uid, dest_pin), source_info in self.connections.items():
-                wire_conn = {
-                    'connections': []
-                }
-
-                # Add source
-                if source_info.get('type') == 'Powerrail':
-                    wire_conn['connections'].append((None, None, 'Powerrail'))
-                elif source_info.get('uid'):
-                    wire_conn['connections'].append((
-                        source_info['uid'],
-                        source_info.get('name'),
-                        source_info['type']
-                    ))
-
-                # Add destination
-                wire_conn['connections'].append((dest_uid, dest_pin, 'NameCon'))
-                converted_wires.append(wire_conn)
-
-            # Build expression tree
-            expr_tree = build_expression_tree(
-                start_uid,
-                converted_wires,
-                converted_parts,
-                converted_accesses
-            )
+            # Build expression tree directly on the network graph
+            expr_tree = build_graph_expression_tree(start_uid, self.graph)
 
             if expr_tree:
                 # Convert to SCL
-                result = expression_to_scl(expr_tree, converted_accesses)
+                result = expression_to_scl(expr_tree, GraphAccesses(self.graph))
                 logger.debug(f"Expression tree built for {start_uid}: {result}")
                 return result
 
@@ -610,8 +637,8 @@ class LADLogicParser:
         
         if src_type == 'IdentCon':
             # Direct variable connection
-            if src_uid in self.parts:
-                part = self.parts[src_uid]
+            part = self.graph.part(src_uid)
+            if part is not None:
                 name = part.get('name', '???')
                 scope = part.get('scope', '')
                 # Format with # prefix for local variables
@@ -639,14 +666,14 @@ class LADLogicParser:
         When pin is None or 'out', resolve the part's output completely.
         For Contact/OR/And/etc, this means evaluating the entire logic.
         """
-        if uid not in self.parts:
+        part = self.graph.part(uid)
+        if part is None:
             return '???'
 
         # --- Handle ENO pin requests ---
         if pin and pin.lower() == 'eno':
             return 'TRUE'
 
-        part = self.parts[uid]
         part_type = part.get('part_type')
 
         # Avoid infinite recursion (simple check) - could pass specialized set of visited nodes
@@ -660,11 +687,11 @@ class LADLogicParser:
             # Output = (Input AND Operand)
 
             # 1. Resolve 'in' (Input flow)
-            in_conn = self.connections.get((uid, 'in'))
+            in_conn = self.graph.source(uid, 'in')
             in_expr = self._resolve_input_connection(in_conn) if in_conn else 'TRUE'  # Default to TRUE at rung start
 
             # 2. Resolve 'operand' (Variable)
-            op_conn = self.connections.get((uid, 'operand'))
+            op_conn = self.graph.source(uid, 'operand')
             op_expr = self._resolve_input_connection(op_conn) if op_conn else '???'
 
             if part.get('negated'):
@@ -686,14 +713,13 @@ class LADLogicParser:
             
             # Check for in1, in2... up to reasonable number or scan connections
             # Scan connections is safer
-            found_inputs = []
-            for (curr_uid, curr_pin) in self.connections:
-                if curr_uid == uid and curr_pin and curr_pin.startswith('in'):
-                    found_inputs.append(curr_pin)
+            found_inputs = {}
+            for curr_pin, conn in self.graph.inputs(uid):
+                if curr_pin and curr_pin.startswith('in'):
+                    found_inputs[curr_pin] = conn
             
             for pin in sorted(found_inputs):
-                conn = self.connections[(uid, pin)]
-                val = self._resolve_input_connection(conn)
+                val = self._resolve_input_connection(found_inputs[pin])
                 exprs.append(val)
                 
             if not exprs:
@@ -706,28 +732,23 @@ class LADLogicParser:
             
         elif part_type in ['Coil', 'SCoil', 'RCoil']:
             # Coil output passes the input signal through
-            in_conn = self.connections.get((uid, 'in'))
+            in_conn = self.graph.source(uid, 'in')
             return self._resolve_input_connection(in_conn) if in_conn else '???'
 
         elif part_type == 'Not':
             # Inverter
-            in_conn = self.connections.get((uid, 'in'))
+            in_conn = self.graph.source(uid, 'in')
             val = self._resolve_input_connection(in_conn) if in_conn else '???'
             if val == '???': return '???'
             return f"NOT ({val})"
 
-        elif part_type in ['Eq', 'Ne', 'Gt', 'Lt', 'Ge', 'Le']:
+        elif part_type in COMPARATOR_OPERATORS:
             # Comparators
-            ops = {
-                'Eq': '=', 'Ne': '<>', 
-                'Gt': '>', 'Lt': '<', 
-                'Ge': '>=', 'Le': '<='
-            }
-            operator = ops.get(part_type, '=')
+            operator = COMPARATOR_OPERATORS.get(part_type, '=')
             
             # Resolve inputs
-            in1_conn = self.connections.get((uid, 'in1'))
-            in2_conn = self.connections.get((uid, 'in2'))
+            in1_conn = self.graph.source(uid, 'in1')
+            in2_conn = self.graph.source(uid, 'in2')
             
             in1 = self._resolve_input_connection(in1_conn) if in1_conn else '???'
             in2 = self._resolve_input_connection(in2_conn) if in2_conn else '???'
@@ -737,7 +758,7 @@ class LADLogicParser:
             # Handle 'pre' (Enable/Predecessor logic) if present
             # If 'pre' is missing/Powerrail, we just return comp_expr
             # If 'pre' exists, result is (pre AND comp_expr)
-            pre_conn = self.connections.get((uid, 'pre'))
+            pre_conn = self.graph.source(uid, 'pre')
             pre_expr = self._resolve_input_connection(pre_conn) if pre_conn else 'TRUE' # Default to True if not wired? Or FALSE? 
             # In LAD XML, if 'pre' is not listed in wires, it might be implicit TRUE (start of rung)?
             # But usually it is wired to Powerrail.
@@ -767,7 +788,7 @@ class LADLogicParser:
             # SCL doesn't have a direct "Scan for P edge" expression without an instance or aux memory.
             # We return a specific marker that users can search/replace if needed, 
             # or best effort expression if possible.
-            op_conn = self.connections.get((uid, 'operand'))
+            op_conn = self.graph.source(uid, 'operand')
             op_expr = self._resolve_input_connection(op_conn) if op_conn else '???'
             return f"PosEdge({op_expr})" 
 
@@ -776,17 +797,17 @@ class LADLogicParser:
             if part.get('instance_name'):
                 return f'#{part["instance_name"]}.Q'
                 
-            op_conn = self.connections.get((uid, 'operand'))
+            op_conn = self.graph.source(uid, 'operand')
             op_expr = self._resolve_input_connection(op_conn) if op_conn else '???'
             return f"NegEdge({op_expr})"
 
         elif part_type == 'PBox':
             # Positive Edge Box (P_TRIG)
             # Has 'in' and 'bit'
-            in_conn = self.connections.get((uid, 'in'))
+            in_conn = self.graph.source(uid, 'in')
             in_expr = self._resolve_input_connection(in_conn) if in_conn else '???'
             
-            bit_conn = self.connections.get((uid, 'bit'))
+            bit_conn = self.graph.source(uid, 'bit')
             bit_expr = self._resolve_input_connection(bit_conn) if bit_conn else '???'
             
             return f"PosEdge({in_expr}, {bit_expr})"
@@ -794,25 +815,21 @@ class LADLogicParser:
         elif part_type == 'NBox':
             # Negative Edge Box (N_TRIG)
             # Has 'in' and 'bit'
-            in_conn = self.connections.get((uid, 'in'))
+            in_conn = self.graph.source(uid, 'in')
             in_expr = self._resolve_input_connection(in_conn) if in_conn else '???'
             
-            bit_conn = self.connections.get((uid, 'bit'))
+            bit_conn = self.graph.source(uid, 'bit')
             bit_expr = self._resolve_input_connection(bit_conn) if bit_conn else '???'
             
             return f"NegEdge({in_expr}, {bit_expr})"
 
         # Mathematical and Standard Functions
-        elif part_type in ['Mul', 'Add', 'Sub', 'Div', 'Mod', 'And', 'Or', 'Xor']:
-            ops = {
-                'Mul': ' * ', 'Add': ' + ', 'Sub': ' - ', 'Div': ' / ', 'Mod': ' MOD ',
-                'And': ' AND ', 'Or': ' OR ', 'Xor': ' XOR '
-            }
-            op = ops.get(part_type)
+        elif part_type in MATH_OPERATORS:
+            op = MATH_OPERATORS[part_type]
             
             # Resolve inputs 'in1', 'in2'
-            in1_conn = self.connections.get((uid, 'in1'))
-            in2_conn = self.connections.get((uid, 'in2'))
+            in1_conn = self.graph.source(uid, 'in1')
+            in2_conn = self.graph.source(uid, 'in2')
             
             in1 = self._resolve_input_connection(in1_conn) if in1_conn else '???'
             in2 = self._resolve_input_connection(in2_conn) if in2_conn else '???'
@@ -830,55 +847,14 @@ class LADLogicParser:
                  func_name = f"{src_type}_TO_{dest_type}".upper()
              
              # Resolve input 'in'
-             in_conn = self.connections.get((uid, 'in'))
+             in_conn = self.graph.source(uid, 'in')
              in_expr = self._resolve_input_connection(in_conn) if in_conn else '???'
              
              return f"{func_name}({in_expr})"
 
-        elif part_type in ['Abs', 'LIMIT', 'Sqr', 'Sqrt', 'Round', 'Trunc', 'Ceil', 'Floor', 'Sin', 'Cos', 'Tan', 'Asin', 'Acos', 'Atan', 'Ln', 'Exp', 'Expt', 'Min', 'Max', 'Sel', 'Mux',
-                           'Len', 'Concat', 'Left', 'Right', 'Mid', 'Find', 'Replace', 'Insert', 'Delete', 'String_to_Chars', 'Chars_to_String',
-                           'Shl', 'Shr', 'Rol', 'Ror', 'Swap',
-                           'Scale_X', 'Norm_X', 'Neg', 'Frac',
-                           'InRange', 'OutRange', 'MoveBlk', 'FillBlk', 'UMoveBlk', 'UFillBlk',
-                           'CountOfElements', 'IsArray',
-                           'Peek', 'Poke', 'PeekBool', 'PokeBool', 'Peek_Bool', 'Poke_Bool',
-                           'To_Int', 'To_DInt', 'To_Real', 'To_LReal', 'To_Bool', 'To_Byte', 'To_Word', 'To_DWord', 'To_Time', 'To_SInt', 'To_USInt', 'To_UInt', 'To_UDInt', 'To_String', 'To_WString',
-                           'Bool_To_Int', 'Bool_To_DInt', 'Bool_To_Byte', 'Int_To_Bool', 'DInt_To_Bool',
-                           # Advanced Types
-                           'TypeOf', 'VariantGet', 'VariantPut', 'Ref',
-                           'RD_SYS_T', 'T_DIFF', 'T_COMBINE', 'T_CONV', 'T_ADD', 'T_SUB',
-                           'SET_CINT', 'QRY_CINT', 'CAN_CINT']:
+        elif part_type in LOGIC_FUNCTIONS:
              # Function Calls
-             func_map = {
-                'Abs': 'ABS', 'LIMIT': 'LIMIT', 'Sqr': 'SQR', 'Sqrt': 'SQRT',
-                'Round': 'ROUND', 'Trunc': 'TRUNC', 'Ceil': 'CEIL', 'Floor': 'FLOOR',
-                'Sin': 'SIN', 'Cos': 'COS', 'Tan': 'TAN', 'Asin': 'ASIN', 'Acos': 'ACOS', 'Atan': 'ATAN',
-                'Ln': 'LN', 'Exp': 'EXP', 'Expt': 'EXPT',
-                'Min': 'MIN', 'Max': 'MAX', 'Sel': 'SEL', 'Mux': 'MUX',
-                'Len': 'LEN', 'Concat': 'CONCAT', 'Left': 'LEFT', 'Right': 'RIGHT',
-                'Mid': 'MID', 'Find': 'FIND', 'Replace': 'REPLACE',
-                'Insert': 'INSERT', 'Delete': 'DELETE', 'String_to_Chars': 'Strg_TO_Chars',
-                'Chars_to_String': 'Chars_TO_Strg',
-                'Shl': 'SHL', 'Shr': 'SHR', 'Rol': 'ROL', 'Ror': 'ROR', 'Swap': 'SWAP',
-                'Scale_X': 'SCALE_X', 'Norm_X': 'NORM_X', 'Neg': 'NEG', 'Frac': 'FRAC',
-                'InRange': 'IN_RANGE', 'OutRange': 'OUT_RANGE', 
-                'MoveBlk': 'MOVE_BLK', 'FillBlk': 'FILL_BLK', 
-                'UMoveBlk': 'UMOVE_BLK', 'UFillBlk': 'UFILL_BLK',
-                'CountOfElements': 'CountOfElements', 'IsArray': 'IS_ARRAY',
-                'Peek': 'PEEK', 'Poke': 'POKE', 'PeekBool': 'PEEK_BOOL', 'Peek_Bool': 'PEEK_BOOL', 'PokeBool': 'POKE_BOOL', 'Poke_Bool': 'POKE_BOOL',
-                'To_Int': 'TO_INT', 'To_DInt': 'TO_DINT', 'To_Real': 'TO_REAL', 'To_LReal': 'TO_LREAL',
-                'To_Bool': 'TO_BOOL', 'To_Byte': 'TO_BYTE', 'To_Word': 'TO_WORD', 'To_DWord': 'TO_DWORD',
-                'To_Time': 'TO_TIME', 'To_SInt': 'TO_SINT', 'To_USInt': 'TO_USINT', 'To_UInt': 'TO_UINT', 'To_UDInt': 'TO_UDINT',
-                'To_String': 'TO_STRING', 'To_WString': 'TO_WSTRING',
-                'Bool_To_Int': 'BOOL_TO_INT', 'Bool_To_DInt': 'BOOL_TO_DInt', 'Bool_To_Byte': 'BOOL_TO_Byte',
-                'Int_To_Bool': 'INT_TO_BOOL', 'DInt_To_Bool': 'DINT_TO_BOOL',
-                'TypeOf': 'TypeOf', 'VariantGet': 'VariantGet', 'VariantPut': 'VariantPut', 'Ref': 'REF',
-                # System Functions Cases
-                'RD_SYS_T': 'RD_SYS_T', 'T_DIFF': 'T_DIFF', 'T_COMBINE': 'T_COMBINE', 
-                'T_CONV': 'T_CONV', 'T_ADD': 'T_ADD', 'T_SUB': 'T_SUB',
-                'SET_CINT': 'SET_CINT', 'QRY_CINT': 'QRY_CINT', 'CAN_CINT': 'CAN_CINT'
-             }
-             func_name = func_map.get(part_type, part_type.upper())
+             func_name = LOGIC_FUNCTIONS[part_type]
              
              # Resolve parameters based on standard naming (in, in1, in2, mn, mx, val, g, k)
              # We iterate connections to find relevant inputs
@@ -886,14 +862,11 @@ class LADLogicParser:
              
              # Gather all input connections
              input_args = {}
-             # Pin names to exclude from parameters list (as they are handled as EN/ENO or assignment result)
-             exclude_pins = ['en', 'eno', 'out', 'out1', 'value', 'ret_val', 'retval']
-             
-             for (curr_uid, curr_pin) in self.connections:
-                 if curr_uid == uid and curr_pin:
+
+             for curr_pin, conn in self.graph.inputs(uid):
+                 if curr_pin:
                      pin_lower = curr_pin.lower()
-                     if pin_lower not in exclude_pins:
-                         conn = self.connections[(uid, curr_pin)]
+                     if pin_lower not in FUNCTION_EXCLUDED_PINS:
                          val = self._resolve_input_connection(conn)
                          input_args[curr_pin] = val
              
@@ -913,7 +886,7 @@ class LADLogicParser:
                   return f"{func_name}({input_args['in']})"
              elif not params:
                   # Maybe implicit 'in'?
-                  conn = self.connections.get((uid, 'in'))
+                  conn = self.graph.source(uid, 'in')
                   if conn:
                       val = self._resolve_input_connection(conn)
                       return f"{func_name}({val})"
@@ -924,7 +897,7 @@ class LADLogicParser:
             # Move as an expression? Typically Move is an instruction.
             # But if used in a wire flow: In -> Move -> Out
             # It just passes value.
-            return self._resolve_input_connection(self.connections.get((uid, 'in')))
+            return self._resolve_input_connection(self.graph.source(uid, 'in'))
 
         elif part.get('instance_name'):
              # FB/Timer/Counter instance logic usage (e.g. TON Q output)
@@ -943,8 +916,8 @@ class LADLogicParser:
             
             # Resolve parameters
             input_args = {}
-            for (curr_uid, curr_pin), source_info in self.connections.items():
-                if curr_uid == uid and curr_pin and curr_pin not in ['en', 'eno', 'Ret_Val']:
+            for curr_pin, source_info in self.graph.inputs(uid):
+                if curr_pin and curr_pin not in ['en', 'eno', 'Ret_Val']:
                     # Use the common resolver
                     val = self._resolve_input_connection(source_info)
                     input_args[curr_pin] = val
@@ -966,7 +939,7 @@ class LADLogicParser:
         This method reconstructs the complete boolean expression.
         """
         # Backtrack from Coil's input to reconstruct the rung expression
-        conn = self.connections.get((coil_uid, 'in'))
+        conn = self.graph.source(coil_uid, 'in')
         if not conn:
             return '???'
 
@@ -976,263 +949,24 @@ class LADLogicParser:
     def _extract_operations(self) -> List[Dict]:
         """Extract logical operations (Coils, Assignments, SR/RS, Moves, etc.)"""
         operations = []
-        processed_parts = set()
-
-        OP_TYPES = ['Mul', 'Add', 'Sub', 'Div', 'Mod', 'And', 'Or', 'Xor']
-        FUNC_TYPES = ['Abs', 'LIMIT', 'Sqr', 'Sqrt', 'Round', 'Trunc', 'Ceil', 'Floor', 'Sin', 'Cos', 'Tan',
-                      'Asin', 'Acos', 'Atan', 'Ln', 'Exp', 'Expt', 'Min', 'Max', 'Sel', 'Mux',
-                      'Len', 'Concat', 'Left', 'Right', 'Mid', 'Find', 'Replace', 'Insert', 'Delete',
-                      'String_to_Chars', 'Chars_to_String',
-                      'Shl', 'Shr', 'Rol', 'Ror', 'Swap',
-                      'Scale_X', 'Norm_X', 'Neg', 'Frac', 'Convert',
-                      'InRange', 'OutRange', 'MoveBlk', 'FillBlk', 'UMoveBlk', 'UFillBlk',
-                      'CountOfElements', 'IsArray',
-                      # System Functions
-                      'SET_CINT', 'QRY_CINT', 'CAN_CINT', 'DIS_CINT', 'EN_CINT',
-                      'RD_SYS_T', 'T_DIFF', 'T_COMBINE', 'T_CONV', 'T_ADD', 'T_SUB']
-
-        for uid, part in self.parts.items():
-            name = part.get('part_type')
-            if not name or uid in processed_parts:
+        handlers = self._OPERATION_HANDLERS
+
+        for uid, part in self.graph.iter_parts():
+            if not part.get('part_type'):
                 continue
 
-            op_entry = None
-            
-            # --- COILS ---
-            if name == 'Coil':
-                negated = part.get('negated', False)
-                conn = self.connections.get((uid, 'in'))
-                expr = self._resolve_input_connection(conn) if conn else 'FALSE'
-                target_var = self._resolve_operand(uid)
-                if target_var:
-                    op_entry = {
-                        'type': 'assignment',
-                        'variable': target_var,
-                        'expression': f"NOT ({expr})" if negated else expr
-                    }
-            
-            elif name in ['SCoil', 'RCoil']:
-                conn = self.connections.get((uid, 'in'))
-                expr = self._resolve_input_connection(conn) if conn else 'FALSE'
-                target_var = self._resolve_operand(uid)
-                if target_var:
-                    op_entry = {
-                        'type': 'set' if name == 'SCoil' else 'reset',
-                        'variable': target_var,
-                        'condition': expr
-                    }
-
-            # --- FLIP-FLOPS ---
-            elif name in ['Sr', 'Rs']:
-                # TIA Portal XML uses lowercase pin names for SR/RS (s, r1, s1, r)
-                s_conn = self.connections.get((uid, 'S')) or self.connections.get((uid, 'S1')) or \
-                         self.connections.get((uid, 's')) or self.connections.get((uid, 's1'))
-                
-                r_conn = self.connections.get((uid, 'R')) or self.connections.get((uid, 'R1')) or \
-                         self.connections.get((uid, 'r')) or self.connections.get((uid, 'r1'))
-                
-                s_expr = self._resolve_input_connection(s_conn) if s_conn else 'FALSE'
-                r_expr = self._resolve_input_connection(r_conn) if r_conn else 'FALSE'
-                
-                target_var = self._resolve_operand(uid)
-                
-                if target_var:
-                    op_entry = {
-                        'type': 'sr' if name == 'Sr' else 'rs',
-                        'variable': target_var,
-                        's_expr': s_expr,
-                        'r_expr': r_expr
-                    }
-
-            # --- MOVE ---
-            elif name == 'Move':
-                en_conn = self.connections.get((uid, 'en'))
-                en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                
-                in_conn = self.connections.get((uid, 'in'))
-                src_expr = self._resolve_input_connection(in_conn) if in_conn else '???'
-                
-                dest_var = self._find_variable_connected_to_output(uid, 'out1')
-                
-                if dest_var:
-                    op_entry = {
-                        'type': 'move',
-                        'source': src_expr,
-                        'dest': dest_var,
-                        'en_expr': en_expr
-                    }
-
-            # --- MATH / INSTRUCTIONS ---
-            elif name in OP_TYPES or name in FUNC_TYPES:
-                # Map name to SCL function name to check properties
-                scl_name = name.upper()
-                if name in ['InRange', 'OutRange']: scl_name = 'IN_RANGE' if name == 'InRange' else 'OUT_RANGE'
-                if name == 'MoveBlk': scl_name = 'MOVE_BLK'
-                if name == 'FillBlk': scl_name = 'FILL_BLK'
-                if name == 'UMoveBlk': scl_name = 'UMOVE_BLK'
-                if name == 'UFillBlk': scl_name = 'UFILL_BLK'
-
-                # VOID functions do not return a value, so we generate a call directly
-                VOID_FUNCS = ['MOVE_BLK', 'FILL_BLK', 'UMOVE_BLK', 'UFILL_BLK']
-                
-                if scl_name in VOID_FUNCS:
-                    en_conn = self.connections.get((uid, 'en'))
-                    en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                    
-                    # Resolve call string
-                    call_expr = self._resolve_logic_part(uid, None)
-                    
-                    op_entry = {
-                        'type': 'instruction_call',
-                        'expression': call_expr,
-                        'en_expr': en_expr
-                    }
-                else:
-                    # Value-returning functions - find assignment target
-                    dest_var = None
-                    # Common output pins in TIA Portal LAD XML
-                    output_pins = ['out', 'out1', 'value', 'shl', 'shr', 'rol', 'ror', 'ret_val', 'retval']
-                    
-                    for pin in output_pins:
-                        # Try both the name as is and lowercase/uppercase variants if needed
-                        # _find_variable_connected_to_output should ideally handle this
-                        dest_var = self._find_variable_connected_to_output(uid, pin)
-                        if dest_var: break
-                    
-                    if dest_var: 
-                        en_conn = self.connections.get((uid, 'en'))
-                        en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                        
-                        # Re-resolve the expression for THIS part
-                        rhs_expr = self._resolve_logic_part(uid, None)
-                        
-                        op_entry = {
-                            'type': 'instruction_assignment',
-                            'variable': dest_var,
-                            'expression': rhs_expr,
-                            'en_expr': en_expr
-                        }
+            # Parts from _parse_parts are already classified
+            kind = part['op_kind'] if 'op_kind' in part else classify_operation(part)
+            if kind is None:
+                continue
 
-            if op_entry:
-                operations.append(op_entry)
-                processed_parts.add(uid)
-                
-            # --- CONTROL FLOW ---
-            elif name == 'Label':
-                 # Determine Label Name
-                 # Often in Attribute "Name" or as a child "AttributeList/Name"? 
-                 # In LAD XML, Label usually has a 'Name' attribute or 'LabelName'
-                 # Part for Label: <Part Name="Label" UId="21"> <AttributeList> <Attribute Name="Name" ...> </AttributeList>
-                 # Or shorter: <Part Name="Label"> <TemplateValue Name="Name" Type="Type">LabelName</TemplateValue>
-                 
-                 label_name = part.get('name') # We might need to check if 'name' was extracted correctly in _parse_parts
-                 
-                 # Let's check _parse_parts logic for 'name'.
-                 # Usually part_data['name'] is invalid for Label if it's not an Access.
-                 # For Part elements, we might need to look for specific attributes.
-                 if not label_name:
-                     # Attempt to find "LabelName" in template values or attributes
-                     tpl = part.get('template_values', {})
-                     if 'Name' in tpl:
-                         label_name = tpl['Name']
-                     
-                 # Fallback: check original element if needed (not accessible here easily without storing it)
-                 # But _parse_parts extracts TemplateValues.
-                 
-                 if label_name:
-                     op_entry = {
-                         'type': 'label_definition',
-                         'label': label_name
-                     }
-            
-            elif name in ['Jump', 'Jmp']:
-                 # Unconditional or conditional jump
-                 # Check connection to 'en' or 'in'
-                 en_conn = self.connections.get((uid, 'en'))
-                 en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                 
-                 # Target label
-                 # <TemplateValue Name="Target" Type="Type">LabelName</TemplateValue>
-                 tpl = part.get('template_values', {})
-                 target = tpl.get('Target')
-                 
-                 if target:
-                     op_entry = {
-                         'type': 'jump',
-                         'target': target,
-                         'condition': en_expr,
-                         'negated': False
-                     }
-
-            elif name == 'JmpN':
-                 # Conditional jump if RLO=0 (or N contact logic)
-                 # Actually JmpN usually means "Jump if Not".
-                 en_conn = self.connections.get((uid, 'en'))
-                 en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                 
-                 tpl = part.get('template_values', {})
-                 target = tpl.get('Target')
-                 
-                 if target:
-                     op_entry = {
-                         'type': 'jump',
-                         'target': target,
-                         'condition': en_expr,
-                         'negated': True
-                     }
-            
-            elif name == 'Return':
-                 # Return instruction
-                 en_conn = self.connections.get((uid, 'en'))
-                 en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                 
-                 op_entry = {
-                     'type': 'return',
-                     'condition': en_expr
-                 }
-
-            elif name == 'Exit':
-                 # Loop exit
-                 en_conn = self.connections.get((uid, 'en'))
-                 en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                 op_entry = { 'type': 'exit', 'condition': en_expr }
-
-            elif name == 'Continue':
-                 # Loop continue
-                 en_conn = self.connections.get((uid, 'en'))
-                 en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                 op_entry = { 'type': 'continue', 'condition': en_expr }
-
-            # --- GENERIC CALLS (FC/FB) ---
-            elif part.get('block_name') or part.get('instance_name'):
-                 # This covers calls that weren't processed as specific operations above
-                 en_conn = self.connections.get((uid, 'en'))
-                 en_expr = self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
-                 
-                 # Check if it has a return value (assignment)
-                 dest_var = self._find_variable_connected_to_output(uid, 'Ret_Val') or \
-                            self._find_variable_connected_to_output(uid, 'out')
-                 
-                 # Resolve call string
-                 call_expr = self._resolve_logic_part(uid, None)
-                 
-                 if dest_var:
-                      op_entry = {
-                          'type': 'instruction_assignment',
-                          'variable': dest_var,
-                          'expression': call_expr,
-                          'en_expr': en_expr
-                      }
-                 else:
-                      op_entry = {
-                          'type': 'instruction_call',
-                          'expression': call_expr,
-                          'en_expr': en_expr
-                      }
+            op_entry = handlers[kind](self, uid, part)
+            if not op_entry and kind in CALL_FALLBACK_KINDS and \
+                    (part.get('block_name') or part.get('instance_name')):
+                op_entry = self._op_call(uid, part)
 
             if op_entry:
                 operations.append(op_entry)
-                processed_parts.add(uid)
 
         # Deduplicate operations (same variable and expression)
         seen = {}
@@ -1246,16 +980,211 @@ class LADLogicParser:
 
         return deduped
 
+    def _resolve_en(self, uid) -> str:
+        """Resolve the EN input of a part (TRUE when not connected)"""
+        en_conn = self.graph.source(uid, 'en')
+        return self._resolve_input_connection(en_conn) if en_conn else 'TRUE'
+
+    # --- COILS ---
+    def _op_coil(self, uid, part) -> Optional[Dict]:
+        negated = part.get('negated', False)
+        conn = self.graph.source(uid, 'in')
+        expr = self._resolve_input_connection(conn) if conn else 'FALSE'
+        target_var = self._resolve_operand(uid)
+        if target_var:
+            return {
+                'type': 'assignment',
+                'variable': target_var,
+                'expression': f"NOT ({expr})" if negated else expr
+            }
+        return None
+
+    def _op_set_coil(self, uid, part) -> Optional[Dict]:
+        conn = self.graph.source(uid, 'in')
+        expr = self._resolve_input_connection(conn) if conn else 'FALSE'
+        target_var = self._resolve_operand(uid)
+        if target_var:
+            return {
+                'type': 'set' if part['part_type'] == 'SCoil' else 'reset',
+                'variable': target_var,
+                'condition': expr
+            }
+        return None
+
+    # --- FLIP-FLOPS ---
+    def _op_flip_flop(self, uid, part) -> Optional[Dict]:
+        # TIA Portal XML uses lowercase pin names for SR/RS (s, r1, s1, r)
+        s_conn = self.graph.source(uid, 'S') or self.graph.source(uid, 'S1') or \
+                 self.graph.source(uid, 's') or self.graph.source(uid, 's1')
+
+        r_conn = self.graph.source(uid, 'R') or self.graph.source(uid, 'R1') or \
+                 self.graph.source(uid, 'r') or self.graph.source(uid, 'r1')
+
+        s_expr = self._resolve_input_connection(s_conn) if s_conn else 'FALSE'
+        r_expr = self._resolve_input_connection(r_conn) if r_conn else 'FALSE'
+
+        target_var = self._resolve_operand(uid)
+
+        if target_var:
+            return {
+                'type': 'sr' if part['part_type'] == 'Sr' else 'rs',
+                'variable': target_var,
+                's_expr': s_expr,
+                'r_expr': r_expr
+            }
+        return None
+
+    # --- MOVE ---
+    def _op_move(self, uid, part) -> Optional[Dict]:
+        en_expr = self._resolve_en(uid)
+
+        in_conn = self.graph.source(uid, 'in')
+        src_expr = self._resolve_input_connection(in_conn) if in_conn else '???'
+
+        dest_var = self._find_variable_connected_to_output(uid, 'out1')
+
+        if dest_var:
+            return {
+                'type': 'move',
+                'source': src_expr,
+                'dest': dest_var,
+                'en_expr': en_expr
+            }
+        return None
+
+    # --- MATH / INSTRUCTIONS ---
+    def _op_instruction(self, uid, part) -> Optional[Dict]:
+        if part['part_type'] in VOID_INSTRUCTION_TYPES:
+            en_expr = self._resolve_en(uid)
+
+            # Resolve call string
+            call_expr = self._resolve_logic_part(uid, None)
+
+            return {
+                'type': 'instruction_call',
+                'expression': call_expr,
+                'en_expr': en_expr
+            }
+
+        # Value-returning functions - find assignment target
+        dest_var = None
+        for pin in INSTRUCTION_OUTPUT_PINS:
+            dest_var = self._find_variable_connected_to_output(uid, pin)
+            if dest_var:
+                break
+
+        if dest_var:
+            en_expr = self._resolve_en(uid)
+
+            # Re-resolve the expression for THIS part
+            rhs_expr = self._resolve_logic_part(uid, None)
+
+            return {
+                'type': 'instruction_assignment',
+                'variable': dest_var,
+                'expression': rhs_expr,
+                'en_expr': en_expr
+            }
+        return None
+
+    # --- CONTROL FLOW ---
+    def _op_label(self, uid, part) -> Optional[Dict]:
+        # Label name is either the part name or <TemplateValue Name="Name" Type="Type">LabelName</TemplateValue>
+        label_name = part.get('name')
+        if not label_name:
+            tpl = part.get('template_values', {})
+            if 'Name' in tpl:
+                label_name = tpl['Name']
+
+        if label_name:
+            return {
+                'type': 'label_definition',
+                'label': label_name
+            }
+        return None
+
+    def _op_jump(self, uid, part, negated: bool = False) -> Optional[Dict]:
+        # Unconditional or conditional jump, target label in
+        # <TemplateValue Name="Target" Type="Type">LabelName</TemplateValue>
+        en_expr = self._resolve_en(uid)
+
+        tpl = part.get('template_values', {})
+        target = tpl.get('Target')
+
+        if target:
+            return {
+                'type': 'jump',
+                'target': target,
+                'condition': en_expr,
+                'negated': negated
+            }
+        return None
+
+    def _op_jump_not(self, uid, part) -> Optional[Dict]:
+        # JmpN: jump if RLO=0
+        return self._op_jump(uid, part, negated=True)
+
+    def _op_return(self, uid, part) -> Optional[Dict]:
+        return {'type': 'return', 'condition': self._resolve_en(uid)}
+
+    def _op_exit(self, uid, part) -> Optional[Dict]:
+        # Loop exit
+        return {'type': 'exit', 'condition': self._resolve_en(uid)}
+
+    def _op_continue(self, uid, part) -> Optional[Dict]:
+        # Loop continue
+        return {'type': 'continue', 'condition': self._resolve_en(uid)}
+
+    # --- GENERIC CALLS (FC/FB) ---
+    def _op_call(self, uid, part) -> Optional[Dict]:
+        en_expr = self._resolve_en(uid)
+
+        # Check if it has a return value (assignment)
+        dest_var = self._find_variable_connected_to_output(uid, 'Ret_Val') or \
+                   self._find_variable_connected_to_output(uid, 'out')
+
+        # Resolve call string
+        call_expr = self._resolve_logic_part(uid, None)
+
+        if dest_var:
+            return {
+                'type': 'instruction_assignment',
+                'variable': dest_var,
+                'expression': call_expr,
+                'en_expr': en_expr
+            }
+        return {
+            'type': 'instruction_call',
+            'expression': call_expr,
+            'en_expr': en_expr
+        }
+
+    # Operation kind (see OPERATION_KINDS) -> handler(self, uid, part)
+    _OPERATION_HANDLERS = {
+        'coil': _op_coil,
+        'set_coil': _op_set_coil,
+        'flip_flop': _op_flip_flop,
+        'move': _op_move,
+        'instruction': _op_instruction,
+        'label': _op_label,
+        'jump': _op_jump,
+        'jump_not': _op_jump_not,
+        'return': _op_return,
+        'exit': _op_exit,
+        'continue': _op_continue,
+        'call': _op_call,
+    }
+
     def _resolve_operand(self, part_uid):
         """Resolve the operand variable for a Coil or SR/RS"""
-        info = self.connections.get((part_uid, 'operand'))
+        info = self.graph.source(part_uid, 'operand')
         if info and info['type'] == 'IdentCon': 
             return self._resolve_access_name(info['uid'])
         return None
 
     def _resolve_access_name(self, uid):
         """Reconstruct variable name from Access part with proper # prefix"""
-        part = self.parts.get(uid)
+        part = self.graph.part(uid)
         if not part: return "???"
         if part.get('name'):
             name = part.get('name')
@@ -1266,10 +1195,10 @@ class LADLogicParser:
     
     def _find_variable_connected_to_output(self, part_uid, pin_name):
         """Finds a variable connected to the output of a part"""
-        for (dest_uid, dest_pin), source_info in self.connections.items():
-            source_pin = source_info.get('name', '')
-            if source_info['uid'] == part_uid and (source_pin.lower() == pin_name.lower()):
-                dest_part = self.parts.get(dest_uid)
+        pin_name = pin_name.lower()
+        for dest_uid, dest_pin, source_pin in self.graph.outputs(part_uid):
+            if source_pin and source_pin.lower() == pin_name:
+                dest_part = self.graph.part(dest_uid)
                 if dest_part and dest_part.get('type') == 'Access':
                      return self._resolve_access_name(dest_uid)
         return None
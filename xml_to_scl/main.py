@@ -7,8 +7,8 @@ import os
 import sys
 import argparse
 import logging
-import shutil
 from pathlib import Path
+from typing import Dict, Optional
 import xml.etree.ElementTree as ET
 
 # Setup path to import local modules
@@ -18,12 +18,14 @@ sys.path.insert(0, str(current_dir))
 from utils import setup_logging
 from fbfc_parser import FBFCParser
 from fbfc_generator import FBFCGenerator
+from block_sidecar import sidecar_content, sidecar_path
 from db_parser import DBParser
 from db_generator import DBGenerator
 from udt_parser import UDTParser
 from udt_generator import UDTGenerator
 from plc_tag_parser import PLCTagParser
 from plc_tag_generator import PLCTagGenerator
+from output_sink import DirectorySink, OutputSink, archive_mode, encode_text, open_sink
 
 logger = logging.getLogger(__name__)
 
@@ -113,56 +115,91 @@ def identify_file_type(file_path: Path) -> str:
         
     return None
 
-def process_file(file_path: Path, output_dir: Path):
-    """Process a single file."""
+def generate_outputs(file_path: Path, ftype: str, write_sidecar: bool = False) -> Dict[str, bytes]:
+    """
+    Convert a single XML file in memory.
+
+    Returns:
+        Generated files (file name -> content as written to disk)
+    """
+    if ftype in ['fb', 'fc']:
+        parser = FBFCParser(file_path)
+        data = parser.parse()
+        generator = FBFCGenerator(data)
+        name = f"{data.get('name', file_path.stem)}.scl"
+        scl_code = generator.generate()
+        outputs = {name: encode_text(scl_code, 'utf-8-sig')}
+        if write_sidecar:
+            outputs[sidecar_path(Path(name)).name] = encode_text(sidecar_content(data, scl_code))
+        return outputs
+
+    elif ftype == 'db':
+        parser = DBParser(file_path)
+        data = parser.parse()
+        generator = DBGenerator(data)
+        return {f"{data.get('name', file_path.stem)}.db": encode_text(generator.generate(), 'utf-8-sig')}
+
+    elif ftype == 'udt':
+        parser = UDTParser(file_path)
+        data = parser.parse()
+        generator = UDTGenerator(data)
+        return {f"{data.get('name', file_path.stem)}.udt": encode_text(generator.generate(), 'utf-8-sig')}
+
+    elif ftype == 'tags':
+        parser = PLCTagParser()
+        tags = parser.parse(file_path)
+        # Tag generator works on list of tags
+        generator = PLCTagGenerator(tags)
+        return {f"{file_path.stem}.csv": encode_text(generator.generate())}
+
+    return {}
+
+
+def process_file(file_path: Path, output_dir: Path, write_sidecar: bool = False,
+                 sink: Optional[OutputSink] = None) -> Dict[Path, bytes]:
+    """
+    Process a single file.
+
+    Args:
+        file_path: XML (or SCL) source file
+        output_dir: Output directory (relative to the sink root when a sink is given)
+        write_sidecar: Also write <name>.block.json next to generated FB/FC
+            (parsed interface, networks and FB calls for downstream tools)
+        sink: Destination of the generated files (default: files in output_dir)
+
+    Returns:
+        Written files (output_dir / file name -> content); empty if the file
+        was skipped or the conversion failed
+    """
     ftype = identify_file_type(file_path)
     if not ftype:
-        return
+        return {}
 
     logger.info(f"Processing {ftype.upper()}: {file_path.name}")
-    
-    try:
-        output_file = None
 
+    # Path of the outputs inside the sink
+    sink_dir = output_dir
+    if sink is None:
+        sink = DirectorySink(output_dir)
+        sink_dir = Path('.')
+
+    try:
         # NUOVO: Handler per copia file SCL
         if ftype == 'scl_copy':
             # Copia file SCL mantenendo nome e metadata
             output_file = output_dir / file_path.name
-            shutil.copy2(file_path, output_file)
+            content = sink.copy_file(sink_dir / file_path.name, file_path)
             logger.info(f"Copied SCL file to: {output_file}")
-            return
-
-        if ftype in ['fb', 'fc']:
-            parser = FBFCParser(file_path)
-            data = parser.parse()
-            generator = FBFCGenerator(data)
-            output_file = output_dir / f"{data.get('name', file_path.stem)}.scl"
-            generator.generate(output_file)
-            
-        elif ftype == 'db':
-            parser = DBParser(file_path)
-            data = parser.parse()
-            generator = DBGenerator(data)
-            output_file = output_dir / f"{data.get('name', file_path.stem)}.db"
-            generator.generate(output_file)
-            
-        elif ftype == 'udt':
-            parser = UDTParser(file_path)
-            data = parser.parse()
-            generator = UDTGenerator(data)
-            output_file = output_dir / f"{data.get('name', file_path.stem)}.udt"
-            generator.generate(output_file)
-            
-        elif ftype == 'tags':
-            parser = PLCTagParser()
-            tags = parser.parse(file_path)
-            # Tag generator works on list of tags
-            generator = PLCTagGenerator(tags)
-            output_file = output_dir / f"{file_path.stem}.csv"
-            generator.generate(output_file)
-
-        if output_file:
+            return {output_file: content}
+
+        outputs = generate_outputs(file_path, ftype, write_sidecar)
+        written = {}
+        for name, content in outputs.items():
+            output_file = output_dir / name
+            sink.write(sink_dir / name, content)
+            written[output_file] = content
             logger.info(f"Generated: {output_file}")
+        return written
 
     except FileNotFoundError as e:
         logger.error(f"File not found during processing {file_path.name}: {e}")
@@ -174,13 +211,15 @@ def process_file(file_path: Path, output_dir: Path):
         logger.error(f"Failed to process {file_path.name}: {e}")
         # import traceback
         # traceback.print_exc()
+    return {}
 
 def main():
     parser = argparse.ArgumentParser(description="TIA Portal XML to SCL Converter")
     parser.add_argument("source", nargs='?', default=os.getcwd(), help="Input directory")
-    parser.add_argument("--output", "-o", default="output", help="Output directory")
+    parser.add_argument("--output", "-o", default="output", help="Output directory or archive (.zip, .tar, .tar.gz, .tar.xz)")
     parser.add_argument("--recursive", "-r", action="store_true", default=True, help="Scan recursively")
     parser.add_argument("--type", choices=['all', 'udt', 'db', 'fb', 'fc', 'tags'], default='all', help="Filter types")
+    parser.add_argument("--sidecar", action="store_true", help="Write <name>.block.json (parsed interface/networks) next to each FB/FC")
     
     args = parser.parse_args()
     
@@ -188,18 +227,21 @@ def main():
     
     source_path = Path(args.source)
     output_path = Path(args.output)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
+
     if not source_path.exists():
         logger.error(f"Source path not found: {source_path}")
         return
 
+    if archive_mode(output_path) is None:
+        output_path.mkdir(parents=True, exist_ok=True)
+    sink = open_sink(output_path)
+
     logger.info(f"Scanning {source_path}...")
     
     files_processed = 0
     
     if source_path.is_file():
-        process_file(source_path, output_path)
+        process_file(source_path, Path('.'), args.sidecar, sink)
         files_processed = 1
     else:
         # Walk directory
@@ -209,12 +251,13 @@ def main():
                     continue
                 
                 file_path = Path(root) / file
-                process_file(file_path, output_path)
+                process_file(file_path, Path('.'), args.sidecar, sink)
                 files_processed += 1
                 
             if not args.recursive:
                 break
                 
+    sink.close()
     logger.info(f"Conversion complete. Processed {files_processed} files.")
 
 if __name__ == "__main__":
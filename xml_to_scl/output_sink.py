@@ -0,0 +1,344 @@
+"""
+Output sinks for generated files
+
+The converter hands every generated file to a sink, addressed by its POSIX
+path relative to the output root:
+
+- DirectorySink: files under a directory (parent directories created on demand)
+- ZipSink / TarSink: entries streamed into a single archive (.zip, .tar,
+  .tar.gz/.tgz, .tar.bz2, .tar.xz), no intermediate files
+- MemorySink: dict relative path -> bytes, for API callers
+
+open_sink() picks the sink from the target name. BackgroundWriter wraps any
+sink and performs the writes in a separate thread, in batches, with a bounded
+amount of pending data, so conversion never waits for the disk.
+"""
+
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path, PurePosixPath
+from typing import Deque, Dict, List, Optional, Set, Tuple, Union
+
+# (relative path, content, mtime)
+WriteItem = Tuple[Union[str, Path], bytes, Optional[float]]
+
+DEFAULT_MAX_PENDING_BYTES = 64 * 1024 * 1024
+DEFAULT_WRITE_BATCH = 64
+
+TAR_MODES = {
+    '.tar': 'w',
+    '.tar.gz': 'w:gz',
+    '.tgz': 'w:gz',
+    '.tar.bz2': 'w:bz2',
+    '.tar.xz': 'w:xz',
+}
+
+
+def encode_text(content: str, encoding: str = 'utf-8') -> bytes:
+    """Text as open(path, 'w', encoding=encoding) writes it (platform newlines, BOM for utf-8-sig)"""
+    if os.linesep != '\n':
+        content = content.replace('\n', os.linesep)
+    return content.encode(encoding)
+
+
+def _entry_name(relative_path: Union[str, Path]) -> str:
+    """Normalized archive/dict key of a relative path"""
+    name = PurePosixPath(Path(relative_path).as_posix()).as_posix()
+    if name.startswith('/') or '..' in PurePosixPath(name).parts:
+        raise ValueError(f"Output path must be relative to the sink: {relative_path}")
+    return name
+
+
+class OutputSink(ABC):
+    """Destination of generated files"""
+
+    def __init__(self, location: str):
+        self.location = location
+        self.files_written = 0
+        self.bytes_written = 0
+
+    @abstractmethod
+    def write(self, relative_path: Union[str, Path], data: bytes, mtime: Optional[float] = None):
+        """Store one file (mtime: modification time to record, default now)"""
+        pass
+
+    def write_batch(self, items: List[WriteItem]):
+        """Store several files at once"""
+        for relative_path, data, mtime in items:
+            self.write(relative_path, data, mtime)
+
+    def copy_file(self, relative_path: Union[str, Path], source: Path) -> bytes:
+        """Store a copy of an existing file, keeping its modification time; returns its content"""
+        data = Path(source).read_bytes()
+        self.write(relative_path, data, Path(source).stat().st_mtime)
+        return data
+
+    def close(self):
+        """Finish the output (archives are only complete after close)"""
+
+    def _count(self, data: bytes):
+        self.files_written += 1
+        self.bytes_written += len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DirectorySink(OutputSink):
+    """
+    Files below a root directory
+
+    durable=True writes every file to <name>.tmp, fsyncs the whole batch, then
+    renames the files into place and fsyncs their directories once per batch:
+    a crash never leaves a truncated output behind.
+    """
+
+    def __init__(self, root: Path, durable: bool = False):
+        super().__init__(str(root))
+        self.root = Path(root)
+        self.durable = durable
+        self._created_dirs: Set[Path] = set()
+
+    def _target(self, relative_path: Union[str, Path]) -> Path:
+        target = self.root / _entry_name(relative_path)
+        if target.parent not in self._created_dirs:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(target.parent)
+        return target
+
+    def write(self, relative_path, data, mtime=None):
+        if self.durable:
+            self.write_batch([(relative_path, data, mtime)])
+            return
+        target = self._target(relative_path)
+        with open(target, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(target, (mtime, mtime))
+        self._count(data)
+
+    def write_batch(self, items):
+        if not self.durable:
+            super().write_batch(items)
+            return
+
+        # 1. Write all temporary files, 2. fsync them together, 3. rename into place
+        pending = []
+        try:
+            for relative_path, data, mtime in items:
+                target = self._target(relative_path)
+                tmp_path = target.with_name(target.name + '.tmp')
+                f = open(tmp_path, 'wb')
+                pending.append((f, tmp_path, target, data, mtime))
+                f.write(data)
+                f.flush()
+            for f, *_ in pending:
+                os.fsync(f.fileno())
+        except BaseException:
+            for f, tmp_path, *_ in pending:
+                f.close()
+                tmp_path.unlink(missing_ok=True)
+            raise
+        for f, *_ in pending:
+            f.close()
+
+        for _, tmp_path, target, data, mtime in pending:
+            os.replace(tmp_path, target)
+            if mtime is not None:
+                os.utime(target, (mtime, mtime))
+            self._count(data)
+        _fsync_directories({target.parent for _, _, target, _, _ in pending})
+
+    def copy_file(self, relative_path, source):
+        if self.durable:
+            return super().copy_file(relative_path, source)
+        target = self._target(relative_path)
+        shutil.copy2(source, target)
+        data = target.read_bytes()
+        self._count(data)
+        return data
+
+
+class ZipSink(OutputSink):
+    """Entries of a .zip archive"""
+
+    def __init__(self, path: Path, compression: int = zipfile.ZIP_DEFLATED):
+        super().__init__(str(path))
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._zip = zipfile.ZipFile(path, 'w', compression=compression)
+        self._lock = threading.Lock()
+
+    def write(self, relative_path, data, mtime=None):
+        info = zipfile.ZipInfo(_entry_name(relative_path), date_time=time.localtime(mtime or time.time())[:6])
+        info.compress_type = self._zip.compression
+        info.external_attr = 0o644 << 16
+        with self._lock:
+            self._zip.writestr(info, data)
+            self._count(data)
+
+    def close(self):
+        with self._lock:
+            self._zip.close()
+
+
+class TarSink(OutputSink):
+    """Members of a (compressed) tar archive"""
+
+    def __init__(self, path: Path, mode: str = 'w:gz'):
+        super().__init__(str(path))
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._tar = tarfile.open(path, mode)
+        self._lock = threading.Lock()
+
+    def write(self, relative_path, data, mtime=None):
+        info = tarfile.TarInfo(_entry_name(relative_path))
+        info.size = len(data)
+        info.mtime = int(mtime or time.time())
+        info.mode = 0o644
+        with self._lock:
+            self._tar.addfile(info, io.BytesIO(data))
+            self._count(data)
+
+    def close(self):
+        with self._lock:
+            self._tar.close()
+
+
+class MemorySink(OutputSink):
+    """Generated files kept in memory (relative path -> content)"""
+
+    def __init__(self):
+        super().__init__('<memory>')
+        self.files: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def write(self, relative_path, data, mtime=None):
+        with self._lock:
+            self.files[_entry_name(relative_path)] = data
+            self._count(data)
+
+
+class BackgroundWriter(OutputSink):
+    """
+    Asynchronous front end of another sink
+
+    write() only queues the content; a writer thread hands the queued files to
+    the wrapped sink in batches of up to batch_size. write() blocks while more
+    than max_pending_bytes are queued (bounded memory). Failed writes are
+    collected in `errors` instead of stopping the conversion.
+    """
+
+    def __init__(self, sink: OutputSink, max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+                 batch_size: int = DEFAULT_WRITE_BATCH):
+        super().__init__(sink.location)
+        self.sink = sink
+        self.max_pending_bytes = max_pending_bytes
+        self.batch_size = batch_size
+        self.errors: List[Tuple[str, Exception]] = []
+        self._queue: Deque[WriteItem] = deque()
+        self._pending_bytes = 0  # queued + being written
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='output-writer', daemon=True)
+        self._thread.start()
+
+    @property
+    def pending_files(self) -> int:
+        """Files queued and not yet handed to the wrapped sink"""
+        return len(self._queue)
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._pending_bytes
+
+    def write(self, relative_path, data, mtime=None):
+        with self._condition:
+            while self._pending_bytes and self._pending_bytes + len(data) > self.max_pending_bytes:
+                self._condition.wait()
+            if self._closed:
+                raise ValueError("write to closed BackgroundWriter")
+            self._queue.append((relative_path, data, mtime))
+            self._pending_bytes += len(data)
+            self._count(data)
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+            try:
+                self.sink.write_batch(batch)
+            except Exception:
+                # Retry one by one to find the failing file(s)
+                for relative_path, data, mtime in batch:
+                    try:
+                        self.sink.write(relative_path, data, mtime)
+                    except Exception as e:
+                        self.errors.append((str(relative_path), e))
+
+            with self._condition:
+                self._pending_bytes -= sum(len(data) for _, data, _ in batch)
+                self._condition.notify_all()
+
+    def flush(self):
+        """Wait until everything queued so far has been written"""
+        with self._condition:
+            while self._pending_bytes:
+                self._condition.wait()
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.sink.close()
+
+
+def _fsync_directories(directories):
+    """fsync directory entries after renames (not supported on Windows)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    for directory in directories:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def archive_mode(target: Union[str, Path]) -> Optional[str]:
+    """'zip', a tarfile write mode, or None for a plain directory"""
+    name = str(target).lower()
+    if name.endswith('.zip'):
+        return 'zip'
+    for suffix in sorted(TAR_MODES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return TAR_MODES[suffix]
+    return None
+
+
+def open_sink(target: Union[str, Path], durable: bool = False) -> OutputSink:
+    """Sink for an output target: archive by file extension, otherwise a directory"""
+    mode = archive_mode(target)
+    if mode == 'zip':
+        return ZipSink(Path(target))
+    if mode is not None:
+        return TarSink(Path(target), mode)
+    return DirectorySink(Path(target), durable=durable)
@@ -0,0 +1,526 @@
+"""
+Semantic SCL diff between two conversion outputs
+
+Compares two output trees of the converter (e.g. PLC_410D1_Parsed_Final and a
+new run) file by file. SCL sources (.scl, .db, .udt) are lexed, comments and
+formatting are dropped and every block is split into units that are hashed
+separately:
+
+- header:       block kind, name, attributes, VERSION
+- declaration:  one per top-level member of each VAR section / TYPE STRUCT
+- network:      one per top-level REGION of the body (statements outside
+                regions form the '<body>' unit)
+- fb_call:      one per call statement (#Instance(...), "Block"(...))
+
+Identical files are skipped on the raw bytes, files that differ only in
+comments/whitespace on the normalized hash; only changed units are reported.
+Other files (tag tables .csv, .error reports) are compared as whole files.
+
+Usage:
+    python scl_diff.py PLC_410D1_Parsed_Final PLC_410D1_Parsed_New
+    python scl_diff.py OLD NEW --json scl_diff.json --csv scl_diff.csv --jobs 4
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+SCL_EXTENSIONS = {'.scl', '.db', '.udt'}
+
+BLOCK_KEYWORDS = {
+    'FUNCTION_BLOCK': 'END_FUNCTION_BLOCK',
+    'FUNCTION': 'END_FUNCTION',
+    'ORGANIZATION_BLOCK': 'END_ORGANIZATION_BLOCK',
+    'DATA_BLOCK': 'END_DATA_BLOCK',
+    'TYPE': 'END_TYPE',
+}
+VAR_SECTION_KEYWORDS = {'VAR_INPUT', 'VAR_OUTPUT', 'VAR_IN_OUT', 'VAR_TEMP', 'VAR_STAT', 'VAR'}
+
+# Tokens after which a new statement starts (a call can only appear there)
+STATEMENT_START = {';', 'BEGIN', 'THEN', 'ELSE', 'DO', 'REPEAT', ':'}
+
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|\(\*.*?\*\)|/\*.*?\*/)
+  | (?P<string>'(?:\$.|[^'$])*')
+  | (?P<quoted>"[^"\n]*")
+  | (?P<literal>[A-Za-z_]+\#[^\s;,)(\]\[]*|\d[\w.#]*(?:[eE][+-]?\d+)?)
+  | (?P<ident>\#?[A-Za-z_]\w*)
+  | (?P<op>:=|=>|<>|>=|<=|\*\*|\.\.|\S)
+""", re.VERBOSE | re.DOTALL)
+
+REPORT_FIELDS = ['path', 'block', 'element', 'name', 'change']
+
+
+# ============================================================================
+# DATA STRUCTURES
+# ============================================================================
+
+@dataclass
+class Change:
+    """One semantically changed unit"""
+    path: str
+    block: str
+    element: str  # block, header, declaration, network, fb_call, file
+    name: str
+    change: str  # added, removed, changed
+    old: Optional[str] = None
+    new: Optional[str] = None
+
+
+@dataclass
+class FileDiff:
+    """Comparison result of one relative path"""
+    path: str
+    status: str  # unchanged, formatting, changed, added, removed, error
+    changes: List[Change] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """SCL tokens as (text, line), without whitespace and comments."""
+    text = text.lstrip('\ufeff')
+    tokens = []
+    line = 1
+    pos = 0
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        kind = match.lastgroup
+        value = match.group()
+        pos = match.end()
+        if kind not in ('ws', 'comment'):
+            tokens.append((value, line))
+        line += value.count('\n')
+        if kind == 'ident' and value.upper() == 'REGION':
+            # The title is free text up to the end of the line (it may hold
+            # apostrophes or dots): keep it as one raw token
+            end = text.find('\n', pos)
+            end = len(text) if end < 0 else end
+            title = text[pos:end].strip()
+            if title:
+                tokens.append((title, line))
+            pos = end
+    return tokens
+
+
+def unit_text(tokens: List[Tuple[str, int]]) -> str:
+    """Normalized text of a token run (single spaces)."""
+    return ' '.join(text for text, _ in tokens)
+
+
+def unit_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _keyword(token: Tuple[str, int]) -> str:
+    return token[0].upper()
+
+
+def split_blocks(tokens: List[Tuple[str, int]]) -> Dict[str, List[Tuple[str, int]]]:
+    """Blocks of a file keyed by 'KIND name' (tokens outside blocks keyed by '')."""
+    blocks: Dict[str, List[Tuple[str, int]]] = {}
+    i = 0
+    while i < len(tokens):
+        keyword = _keyword(tokens[i])
+        end_keyword = BLOCK_KEYWORDS.get(keyword)
+        if end_keyword is None or i + 1 >= len(tokens):
+            blocks.setdefault('', []).append(tokens[i])
+            i += 1
+            continue
+        end = i + 1
+        while end < len(tokens) and _keyword(tokens[end]) != end_keyword:
+            end += 1
+        key = f"{keyword} {tokens[i + 1][0]}"
+        blocks[_unique(blocks, key)] = tokens[i:end + 1]
+        i = end + 1
+    return blocks
+
+
+def _unique(units: Dict, key: str) -> str:
+    """key, or key#2, key#3, ... if already present"""
+    if key not in units:
+        return key
+    n = 2
+    while f"{key}#{n}" in units:
+        n += 1
+    return f"{key}#{n}"
+
+
+def _split_members(tokens: List[Tuple[str, int]], section: str,
+                   units: Dict[Tuple[str, str], str]) -> None:
+    """Top-level members of a declaration section (nested STRUCT stays in its member)."""
+    depth = 0
+    start = 0
+    for i, token in enumerate(tokens):
+        keyword = _keyword(token)
+        if keyword == 'STRUCT':
+            depth += 1
+        elif keyword == 'END_STRUCT':
+            depth -= 1
+        elif token[0] == ';' and depth == 0:
+            member = tokens[start:i + 1]
+            if member:
+                key = _unique_unit(units, 'declaration', f"{section}.{member[0][0]}")
+                units[('declaration', key)] = unit_text(member)
+            start = i + 1
+    if tokens[start:]:
+        key = _unique_unit(units, 'declaration', f"{section}.{tokens[start][0]}")
+        units[('declaration', key)] = unit_text(tokens[start:])
+
+
+def _unique_unit(units: Dict[Tuple[str, str], str], element: str, name: str) -> str:
+    if (element, name) not in units:
+        return name
+    n = 2
+    while (element, f"{name}#{n}") in units:
+        n += 1
+    return f"{name}#{n}"
+
+
+def _call_end(tokens: List[Tuple[str, int]], start: int) -> int:
+    """Index after the call starting at tokens[start] (callee, '(' ... ')' [;])."""
+    depth = 0
+    i = start + 1
+    while i < len(tokens):
+        if tokens[i][0] == '(':
+            depth += 1
+        elif tokens[i][0] == ')':
+            depth -= 1
+            if depth == 0:
+                break
+        i += 1
+    if i + 1 < len(tokens) and tokens[i + 1][0] == ';':
+        i += 1
+    return i + 1
+
+
+def _split_body(tokens: List[Tuple[str, int]], units: Dict[Tuple[str, str], str]) -> None:
+    """Networks (top-level REGIONs) and FB calls of a block body."""
+    outside: List[Tuple[str, int]] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        keyword = _keyword(token)
+
+        if keyword == 'REGION':
+            # Title: rest of the REGION line
+            title_end = i + 1
+            while title_end < len(tokens) and tokens[title_end][1] == token[1]:
+                title_end += 1
+            title = unit_text(tokens[i + 1:title_end]).strip('"') or '<untitled>'
+            depth = 1
+            end = title_end
+            while end < len(tokens) and depth:
+                nested = _keyword(tokens[end])
+                if nested == 'REGION':
+                    depth += 1
+                elif nested == 'END_REGION':
+                    depth -= 1
+                end += 1
+            name = _unique_unit(units, 'network', title)
+            units[('network', name)] = unit_text(tokens[i:end])
+            _find_calls(tokens[title_end:end], units)
+            i = end
+            continue
+
+        outside.append(token)
+        i += 1
+
+    if outside:
+        units[('network', '<body>')] = unit_text(outside)
+        _find_calls(outside, units)
+
+
+def _find_calls(tokens: List[Tuple[str, int]], units: Dict[Tuple[str, str], str]) -> None:
+    """Call statements: callee at statement start followed by '('."""
+    statement_start = True
+    i = 0
+    while i < len(tokens):
+        text = tokens[i][0]
+        if (statement_start and i + 1 < len(tokens) and tokens[i + 1][0] == '('
+                and (text.startswith('#') or text.startswith('"'))):
+            end = _call_end(tokens, i)
+            name = _unique_unit(units, 'fb_call', text)
+            units[('fb_call', name)] = unit_text(tokens[i:end])
+            i = end
+            statement_start = True
+            continue
+        if _keyword(tokens[i]) == 'REGION':
+            # Skip the title (rest of the REGION line), as _split_body does
+            line = tokens[i][1]
+            while i < len(tokens) and tokens[i][1] == line:
+                i += 1
+            statement_start = True
+            continue
+        statement_start = _keyword(tokens[i]) in STATEMENT_START or text == 'END_REGION'
+        i += 1
+
+
+def block_units(tokens: List[Tuple[str, int]]) -> Dict[Tuple[str, str], str]:
+    """(element, name) -> normalized text for header, declarations, networks and calls."""
+    units: Dict[Tuple[str, str], str] = {}
+    header: List[Tuple[str, int]] = []
+    i = 0
+    while i < len(tokens):
+        keyword = _keyword(tokens[i])
+
+        if keyword in VAR_SECTION_KEYWORDS:
+            section = keyword
+            start = i + 1
+            if keyword == 'VAR' and start < len(tokens) and _keyword(tokens[start]) in ('CONSTANT', 'RETAIN', 'NON_RETAIN'):
+                section = f"VAR_{_keyword(tokens[start])}"
+                start += 1
+            end = start
+            while end < len(tokens) and _keyword(tokens[end]) != 'END_VAR':
+                end += 1
+            _split_members(tokens[start:end], section, units)
+            i = end + 1
+            continue
+
+        if keyword == 'STRUCT' and tokens[0][0].upper() == 'TYPE':
+            # UDT: members of the outer STRUCT
+            depth = 1
+            end = i + 1
+            while end < len(tokens) and depth:
+                nested = _keyword(tokens[end])
+                if nested == 'STRUCT':
+                    depth += 1
+                elif nested == 'END_STRUCT':
+                    depth -= 1
+                end += 1
+            _split_members(tokens[i + 1:end - 1], 'STRUCT', units)
+            i = end
+            continue
+
+        if keyword == 'BEGIN':
+            end_keyword = BLOCK_KEYWORDS.get(_keyword(tokens[0]))
+            body_end = len(tokens) - 1 if tokens and _keyword(tokens[-1]) == end_keyword else len(tokens)
+            _split_body(tokens[i + 1:body_end], units)
+            break
+
+        header.append(tokens[i])
+        i += 1
+
+    units[('header', '')] = unit_text(header)
+    return units
+
+
+def file_units(text: str) -> Tuple[str, Dict[str, Dict[Tuple[str, str], str]]]:
+    """(normalized file hash, block -> units) of an SCL source."""
+    tokens = tokenize(text)
+    normalized_hash = unit_hash(unit_text(tokens))
+    return normalized_hash, {block: block_units(block_tokens) if block else {('header', ''): unit_text(block_tokens)}
+                             for block, block_tokens in split_blocks(tokens).items()}
+
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def _read_text(path: Path) -> str:
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        return f.read()
+
+
+def compare_units(rel_path: str, block: str, old: Dict[Tuple[str, str], str],
+                  new: Dict[Tuple[str, str], str], with_text: bool) -> List[Change]:
+    """Changed units of one block; unchanged units are skipped on their hash."""
+    changes = []
+    old_hashes = {key: unit_hash(text) for key, text in old.items()}
+    new_hashes = {key: unit_hash(text) for key, text in new.items()}
+    for key in list(old) + [k for k in new if k not in old]:
+        if old_hashes.get(key) == new_hashes.get(key):
+            continue
+        change = 'added' if key not in old else 'removed' if key not in new else 'changed'
+        changes.append(Change(
+            path=rel_path, block=block, element=key[0], name=key[1], change=change,
+            old=old.get(key) if with_text else None,
+            new=new.get(key) if with_text else None,
+        ))
+    return changes
+
+
+def compare_file(job: Tuple[str, str, str, bool]) -> FileDiff:
+    """Process-pool worker: compare one relative path between the two trees."""
+    old_root, new_root, rel_path, with_text = job
+    old_path = Path(old_root) / rel_path
+    new_path = Path(new_root) / rel_path
+
+    if not old_path.exists():
+        return FileDiff(rel_path, 'added', [Change(rel_path, '', 'file', '', 'added')])
+    if not new_path.exists():
+        return FileDiff(rel_path, 'removed', [Change(rel_path, '', 'file', '', 'removed')])
+
+    try:
+        old_bytes = old_path.read_bytes()
+        new_bytes = new_path.read_bytes()
+        if old_bytes == new_bytes:
+            return FileDiff(rel_path, 'unchanged')
+
+        old_text = _read_text(old_path)
+        new_text = _read_text(new_path)
+        if old_path.suffix.lower() not in SCL_EXTENSIONS:
+            old_lines = [line.rstrip() for line in old_text.splitlines()]
+            new_lines = [line.rstrip() for line in new_text.splitlines()]
+            if old_lines == new_lines:
+                return FileDiff(rel_path, 'formatting')
+            return FileDiff(rel_path, 'changed', [Change(
+                rel_path, '', 'file', '', 'changed',
+                old=old_text if with_text else None, new=new_text if with_text else None)])
+
+        old_hash, old_blocks = file_units(old_text)
+        new_hash, new_blocks = file_units(new_text)
+        if old_hash == new_hash:
+            return FileDiff(rel_path, 'formatting')
+
+        changes = []
+        for block in list(old_blocks) + [b for b in new_blocks if b not in old_blocks]:
+            if block not in new_blocks or block not in old_blocks:
+                change = 'removed' if block not in new_blocks else 'added'
+                changes.append(Change(rel_path, block, 'block', block, change))
+                continue
+            changes.extend(compare_units(rel_path, block, old_blocks[block], new_blocks[block], with_text))
+        return FileDiff(rel_path, 'changed' if changes else 'formatting', changes)
+
+    except Exception as e:
+        return FileDiff(rel_path, 'error', error=f"{type(e).__name__}: {e}")
+
+
+def list_files(root: Path) -> List[str]:
+    """Relative paths (posix) of all files under root."""
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            files.append((Path(dirpath) / filename).relative_to(root).as_posix())
+    return files
+
+
+def diff_trees(old_root: Path, new_root: Path, max_workers: Optional[int] = None,
+               with_text: bool = True) -> List[FileDiff]:
+    """Compare every file of both trees (process pool unless max_workers == 1)."""
+    rel_paths = sorted(set(list_files(old_root)) | set(list_files(new_root)))
+    jobs = [(str(old_root), str(new_root), rel_path, with_text) for rel_path in rel_paths]
+
+    if max_workers == 1 or len(jobs) <= 1:
+        return list(map(compare_file, jobs))
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(compare_file, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+def summarize(results: List[FileDiff]) -> Dict:
+    """Counts per file status and per changed element"""
+    by_status: Dict[str, int] = {}
+    by_element: Dict[str, int] = {}
+    for result in results:
+        by_status[result.status] = by_status.get(result.status, 0) + 1
+        for change in result.changes:
+            by_element[change.element] = by_element.get(change.element, 0) + 1
+    return {
+        'total_files': len(results),
+        'by_status': dict(sorted(by_status.items())),
+        'changes_by_element': dict(sorted(by_element.items())),
+        'total_changes': sum(by_element.values()),
+    }
+
+
+def write_json_report(path: Path, old_root: Path, new_root: Path, results: List[FileDiff]) -> None:
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'old': str(old_root),
+        'new': str(new_root),
+        'summary': summarize(results),
+        'files': [asdict(result) for result in results if result.status in ('changed', 'added', 'removed', 'error')],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def write_csv_report(path: Path, results: List[FileDiff]) -> None:
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(REPORT_FIELDS)
+        for result in results:
+            for change in result.changes:
+                writer.writerow([getattr(change, name) for name in REPORT_FIELDS])
+            if result.status == 'error':
+                writer.writerow([result.path, '', 'file', result.error, 'error'])
+
+
+def print_summary(results: List[FileDiff], verbose: bool = True) -> None:
+    summary = summarize(results)
+    for result in results if verbose else ():
+        if result.status == 'error':
+            print(f"  [ERROR] {result.path}: {result.error}")
+        for change in result.changes:
+            where = f" {change.block}" if change.block and change.element != 'block' else ''
+            name = f" {change.name}" if change.name else ''
+            print(f"  {change.change.upper():8} {result.path}{where} {change.element}{name}")
+
+    status = ', '.join(f"{key} {count}" for key, count in summary['by_status'].items())
+    elements = ', '.join(f"{key} {count}" for key, count in summary['changes_by_element'].items())
+    print(f"\nFiles: {summary['total_files']} ({status})")
+    print(f"Changes: {summary['total_changes']} ({elements or 'none'})")
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic diff of two SCL conversion outputs")
+    parser.add_argument("old", help="Reference output directory (e.g. PLC_410D1_Parsed_Final)")
+    parser.add_argument("new", help="New output directory")
+    parser.add_argument("--json", help="Write JSON change report (with old/new unit text)")
+    parser.add_argument("--csv", help="Write CSV change report (one row per changed unit)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Only print the summary")
+
+    args = parser.parse_args()
+
+    old_root = Path(args.old)
+    new_root = Path(args.new)
+    for root in (old_root, new_root):
+        if not root.is_dir():
+            print(f"ERROR: Directory not found: {root}")
+            sys.exit(2)
+
+    results = diff_trees(old_root, new_root, args.jobs, with_text=bool(args.json))
+
+    print_summary(results, verbose=not args.quiet)
+    if args.json:
+        write_json_report(Path(args.json), old_root, new_root, results)
+        print(f"JSON report: {args.json}")
+    if args.csv:
+        write_csv_report(Path(args.csv), results)
+        print(f"CSV report: {args.csv}")
+
+    changed = any(r.status in ('changed', 'added', 'removed', 'error') for r in results)
+    sys.exit(1 if changed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,52 @@ SCL_STANDARD_TYPES = {
 }
 
 
+def format_member_datatype(member: Dict) -> str:
+    """
+    Declared SCL type of a member (UDT names quoted, arrays as Array[..] of ...).
+    
+    Args:
+        member: Member data dictionary
+        
+    Returns:
+        Type string as written in the declaration
+    """
+    datatype = member.get('datatype', 'Void')
+    
+    # Handle array types
+    if member.get('is_array', False):
+        base_type = member.get('base_type', datatype)
+        bounds = member.get('array_bounds', '0..0')
+        # Standard types don't need quotes
+        if base_type in SCL_STANDARD_TYPES:
+            return f"Array[{bounds}] of {base_type}"
+        # UDT types need quotes
+        if not (base_type.startswith('"') and base_type.endswith('"')):
+            base_type = f'"{base_type}"'
+        return f"Array[{bounds}] of {base_type}"
+    
+    # Standard types don't need quotes
+    if datatype in SCL_STANDARD_TYPES:
+        return datatype
+    # UDT types need quotes
+    if not (datatype.startswith('"') and datatype.endswith('"')):
+        datatype = f'"{datatype}"'
+    return datatype
+
+
+def format_member_value(member: Dict) -> str:
+    """
+    Initial value of a member: explicit start_value from XML, else the type default
+    (VAR CONSTANT requires initialization).
+    """
+    datatype = member.get('datatype', 'Void')
+    if 'start_value' in member and member['start_value']:
+        # Use explicit start_value from XML
+        return format_scl_value(member['start_value'], datatype)
+    # Generate default value for type
+    return get_default_value_for_type(datatype)
+
+
 class SCLGeneratorBase(ABC):
     """Base class for SCL code generators"""
     
@@ -160,42 +206,13 @@ class SCLGeneratorBase(ABC):
             include_value: Whether to include initial value
         """
         name = escape_scl_identifier(member['name'])
-        datatype = member.get('datatype', 'Void')
-        
-        # Handle array types
-        if member.get('is_array', False):
-            base_type = member.get('base_type', datatype)
-            bounds = member.get('array_bounds', '0..0')
-            # Standard types don't need quotes
-            if base_type in SCL_STANDARD_TYPES:
-                datatype_str = f"Array[{bounds}] of {base_type}"
-            else:
-                # UDT types need quotes
-                if not (base_type.startswith('"') and base_type.endswith('"')):
-                    base_type = f'"{base_type}"'
-                datatype_str = f"Array[{bounds}] of {base_type}"
-        else:
-            # Standard types don't need quotes
-            if datatype in SCL_STANDARD_TYPES:
-                datatype_str = datatype
-            else:
-                # UDT types need quotes
-                if not (datatype.startswith('"') and datatype.endswith('"')):
-                    datatype = f'"{datatype}"'
-                datatype_str = datatype
         
         # Build declaration
-        declaration = f"{name} : {datatype_str}"
+        declaration = f"{name} : {format_member_datatype(member)}"
 
         # Add initial value if requested (for VAR CONSTANT, include_value is True)
         if include_value:
-            if 'start_value' in member and member['start_value']:
-                # Use explicit start_value from XML
-                value = format_scl_value(member['start_value'], datatype)
-            else:
-                # Generate default value for type (VAR CONSTANT requires initialization)
-                value = get_default_value_for_type(datatype)
-
+            value = format_member_value(member)
             if value:
                 declaration += f" := {value}"
 
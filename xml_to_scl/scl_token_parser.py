@@ -1,105 +1,181 @@
 """
 Parser for TIA Portal SCL Tokenized XML (StructuredText)
+
+Large SCL networks contain tens of thousands of Token/Blank/NewLine elements,
+so the walk is iterative (explicit stack, no recursion per child), node
+handlers are looked up in a dispatch dict, stripped tag names are cached and
+runs of leaf tokens are joined into one buffer entry.
 """
 
 import logging
 import xml.etree.ElementTree as ET
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# '{namespace}Tag' -> 'Tag'. StructuredText only uses a handful of tags.
+_LOCAL_NAMES: Dict[str, str] = {}
+
+# Num attribute -> rendered whitespace, for Blank and NewLine
+_BLANKS: Dict[str, str] = {}
+_NEWLINES: Dict[str, str] = {}
+
+
+def local_name(tag: str) -> str:
+    """Return tag without namespace, cached."""
+    name = _LOCAL_NAMES.get(tag)
+    if name is None:
+        name = _LOCAL_NAMES[tag] = tag.rpartition('}')[2]
+    return name
+
+
+def find_descendant(element: ET.Element, name: str) -> Optional[ET.Element]:
+    """
+    First descendant with local tag name, in document order.
+
+    Same result as element.find('.//{*}name') without the ElementPath overhead.
+    """
+    names = _LOCAL_NAMES
+    for elem in element.iter():
+        if elem is not element and (names.get(elem.tag) or local_name(elem.tag)) == name:
+            return elem
+    return None
+
+
+def _repeat(cache: Dict[str, str], char: str, num: str) -> str:
+    """Return char * int(num), cached on the raw attribute value."""
+    text = cache.get(num)
+    if text is None:
+        text = cache[num] = char * int(num)
+    return text
+
+
+# Stack entries: literal text to emit, or (local tag, element) to visit
+_StackItem = Union[str, Tuple[str, ET.Element]]
+
+
 class SCLTokenParser:
     """Parses StructuredText XML elements into SCL code string"""
-    
+
     def __init__(self, root_element: ET.Element):
         self.root = root_element
         self.buffer = []
-        
+        self._stack: List[_StackItem] = []
+        self._handlers: Dict[str, Callable[[ET.Element], None]] = {
+            'Access': self._handle_access,
+            'LineComment': self._handle_line_comment,
+            'Comment': self._handle_comment,
+            'Text': self._handle_text,
+            'Component': self._handle_component,
+            'PredefinedVariable': self._handle_predefined_variable,
+            'Symbol': self._push_children,
+            'Constant': self._handle_constant_name,
+            'ConstantValue': self._handle_text,
+            'CallInfo': self._handle_call_info,
+            'Parameter': self._handle_parameter,
+        }
+
     def parse(self) -> str:
         """Parse the element and return SCL string"""
         self.buffer = []
-        self._parse_element_children(self.root)
+        self._stack = []
+        self._push_children(self.root)
+
+        stack = self._stack
+        append = self.buffer.append
+        handlers = self._handlers
+        fallback = self._push_children
+
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                append(item)
+                continue
+            tag, node = item
+            handlers.get(tag, fallback)(node)
+
         return "".join(self.buffer)
-    
-    def _parse_element_children(self, element: ET.Element):
-        """Recursively parse children of an element"""
+
+    def _push_children(self, element: ET.Element):
+        """
+        Schedule children of an element for processing, in document order.
+
+        Token/Blank/NewLine children are rendered immediately and each run of
+        them is pushed as a single string.
+        """
+        items: List[_StackItem] = []
+        run: List[str] = []
+        names = _LOCAL_NAMES
+        blanks = _BLANKS
+        newlines = _NEWLINES
+
         for child in element:
-            tag = child.tag.split('}')[-1]
-            self._parse_node(child, tag)
-            
-    def _parse_node(self, node: ET.Element, tag: str):
-        """Parse a single node"""
-        if tag == 'Token':
-            self.buffer.append(node.get('Text', ''))
-            
-        elif tag == 'Blank':
-            count = int(node.get('Num', '1'))
-            self.buffer.append(' ' * count)
-            
-        elif tag == 'NewLine':
-            count = int(node.get('Num', '1'))
-            self.buffer.append('\n' * count)
-            
-        elif tag == 'Access':
-            self._handle_access(node)
-            
-        elif tag == 'LineComment':
-            self.buffer.append('//')
-            self._parse_element_children(node)
-            
-        elif tag == 'Comment':
-            self.buffer.append('(*')
-            self._parse_element_children(node)
-            self.buffer.append('*)')
-            
-        elif tag == 'Text':
-            if node.text:
-                self.buffer.append(node.text)
-                
-        elif tag == 'Component':
-            self.buffer.append(node.get('Name', ''))
-            self._parse_element_children(node)
-            
-        elif tag == 'PredefinedVariable':
-             self.buffer.append(node.get('Name', ''))
-             
-        elif tag == 'Symbol':
-             self._parse_element_children(node)
-             
-        elif tag == 'Constant':
-             # Handle GlobalConstant or UserConstant which use Name attribute
-             name = node.get('Name')
-             if name:
-                 self.buffer.append(name)
-             self._parse_element_children(node)
-             
-        elif tag == 'ConstantValue':
-             if node.text: self.buffer.append(node.text)
-             
-        elif tag == 'CallInfo':
-             self._handle_call_info(node)
-             
-        elif tag == 'Parameter':
-             self._handle_parameter(node)
-             
-        else:
-            # Fallback: recurse
-            self._parse_element_children(node)
+            tag = names.get(child.tag) or local_name(child.tag)
+            if tag == 'Token':
+                run.append(child.get('Text', ''))
+            elif tag == 'Blank':
+                num = child.get('Num', '1')
+                run.append(blanks.get(num) or _repeat(blanks, ' ', num))
+            elif tag == 'NewLine':
+                num = child.get('Num', '1')
+                run.append(newlines.get(num) or _repeat(newlines, '\n', num))
+            else:
+                if run:
+                    items.append(''.join(run))
+                    run = []
+                items.append((tag, child))
+
+        if run:
+            items.append(''.join(run))
+
+        self._stack.extend(reversed(items))
+
+    def _handle_line_comment(self, node: ET.Element):
+        """Handle LineComment element"""
+        self.buffer.append('//')
+        self._push_children(node)
+
+    def _handle_comment(self, node: ET.Element):
+        """Handle block Comment element"""
+        self.buffer.append('(*')
+        self._stack.append('*)')
+        self._push_children(node)
+
+    def _handle_text(self, node: ET.Element):
+        """Handle Text / ConstantValue elements (element text only)"""
+        if node.text:
+            self.buffer.append(node.text)
+
+    def _handle_component(self, node: ET.Element):
+        """Handle Component element"""
+        self.buffer.append(node.get('Name', ''))
+        self._push_children(node)
+
+    def _handle_predefined_variable(self, node: ET.Element):
+        """Handle PredefinedVariable element"""
+        self.buffer.append(node.get('Name', ''))
+
+    def _handle_constant_name(self, node: ET.Element):
+        """Handle GlobalConstant or UserConstant which use Name attribute"""
+        name = node.get('Name')
+        if name:
+            self.buffer.append(name)
+        self._push_children(node)
 
     def _handle_access(self, node: ET.Element):
         """Handle Access element"""
         scope = node.get('Scope')
 
         if scope == 'Call':
-            self._parse_element_children(node) # Will hit CallInfo
+            self._push_children(node) # Will hit CallInfo
         elif scope == 'LiteralConstant':
             self._handle_constant(node)
         elif scope == 'PredefinedVariable':
-            self._parse_element_children(node) # Will hit PredefinedVariable
+            self._push_children(node) # Will hit PredefinedVariable
         elif scope == 'LocalVariable':
             # Local variables: prefix with #
             self.buffer.append('#')
-            self._parse_element_children(node) # Will hit Symbol -> Component
+            self._push_children(node) # Will hit Symbol -> Component
         elif scope == 'GlobalVariable':
             # Global DB variables: first component in quotes, rest with dots
             self._handle_global_variable(node)
@@ -109,38 +185,38 @@ class SCLTokenParser:
             if scope in ['LocalConstant', 'TypedConstant']:
                 self.buffer.append('#')
 
-            self._parse_element_children(node) # Will hit Symbol -> Component
+            self._push_children(node) # Will hit Symbol -> Component
 
     def _handle_constant(self, node: ET.Element):
         """Handle LiteralConstant"""
         # Finds ConstantValue deep inside
-        constant = node.find('.//{*}Constant')
+        constant = find_descendant(node, 'Constant')
         if constant is not None:
-            val_node = constant.find('.//{*}ConstantValue')
+            val_node = find_descendant(constant, 'ConstantValue')
             if val_node is not None and val_node.text:
                  self.buffer.append(val_node.text)
                  return
-        self._parse_element_children(node)
+        self._push_children(node)
 
     def _handle_call_info(self, call_info: ET.Element):
         """Handle CallInfo"""
         # Check if Instance exists (FB call)
-        instance = call_info.find('.//{*}Instance')
+        instance = find_descendant(call_info, 'Instance')
         if instance is None:
              # FC Call? Use Name attribute
              name = call_info.get('Name')
              if name:
                  self.buffer.append(f'"{name}"')
-        
+
         # Recurse children
-        self._parse_element_children(call_info)
+        self._push_children(call_info)
 
     def _handle_parameter(self, param_node: ET.Element):
         """Handle Parameter element in a Call"""
         name = param_node.get('Name')
         if name:
             self.buffer.append(name)
-        self._parse_element_children(param_node)
+        self._push_children(param_node)
 
     def _handle_global_variable(self, node: ET.Element):
         """
@@ -151,17 +227,17 @@ class SCLTokenParser:
         - Subsequent components are separated by dots
         """
         # Find Symbol element
-        symbol = node.find('.//{*}Symbol')
+        symbol = find_descendant(node, 'Symbol')
         if symbol is None:
             # Fallback if no Symbol found
-            self._parse_element_children(node)
+            self._push_children(node)
             return
 
         # Extract all Component elements
+        names = _LOCAL_NAMES
         components = []
         for child in symbol:
-            tag = child.tag.split('}')[-1]
-            if tag == 'Component':
+            if (names.get(child.tag) or local_name(child.tag)) == 'Component':
                 comp_name = child.get('Name')
                 if comp_name:
                     components.append(comp_name)
@@ -169,15 +245,12 @@ class SCLTokenParser:
                     # Check for nested array index in Component
                     # Structure: <Component Name="Rest_Ls"><Access><Constant>1</Constant></Access></Component>
                     for sub_elem in child:
-                        sub_tag = sub_elem.tag.split('}')[-1]
-                        if sub_tag == 'Access':
+                        if (names.get(sub_elem.tag) or local_name(sub_elem.tag)) == 'Access':
                             # Found array index - parse it
                             for const_elem in sub_elem:
-                                const_tag = const_elem.tag.split('}')[-1]
-                                if const_tag == 'Constant':
+                                if (names.get(const_elem.tag) or local_name(const_elem.tag)) == 'Constant':
                                     for const_val in const_elem:
-                                        val_tag = const_val.tag.split('}')[-1]
-                                        if val_tag == 'ConstantValue':
+                                        if (names.get(const_val.tag) or local_name(const_val.tag)) == 'ConstantValue':
                                             idx = const_val.text
                                             if idx:
                                                 components.append(f'[{idx}]')
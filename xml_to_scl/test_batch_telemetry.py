@@ -0,0 +1,119 @@
+"""
+Test batch conversion telemetry (batch_telemetry.py)
+Tests the JSON-lines event stream, the Prometheus rendering and the local
+metrics endpoint.
+"""
+
+import json
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from batch_convert_project import BatchSummary, FileResult
+from batch_telemetry import BatchMetrics, BatchTelemetry, quantile
+
+
+def make_result(name, file_type, status, seconds, error_type=None):
+    return FileResult(
+        source_path=Path(name),
+        relative_path=Path('Program blocks') / name,
+        file_type=file_type,
+        status=status,
+        processing_time=seconds,
+        stage_times={'identify': 0.001, 'convert': seconds},
+        input_size=100,
+        output_size=50 if status != 'FAILED' else None,
+        error_type=error_type,
+    )
+
+
+class TestBatchTelemetry(unittest.TestCase):
+    """Test events, metrics and endpoint"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.results = [
+            make_result('A_FB.xml', 'fb', 'SUCCESS', 0.1),
+            make_result('B_FB.xml', 'fb', 'SUCCESS', 0.3),
+            make_result('C_FB.xml', 'fb', 'VALIDATION_ERROR', 0.2, 'PLACEHOLDER_ERROR'),
+            make_result('D.xml', 'udt', 'FAILED', 0.05, 'NO_OUTPUT'),
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_quantile(self):
+        """Test: nearest-rank quantiles"""
+        values = [0.1, 0.2, 0.3, 0.4]
+        self.assertEqual(quantile(values, 0.5), 0.2)
+        self.assertEqual(quantile(values, 0.95), 0.4)
+        self.assertEqual(quantile([], 0.5), 0.0)
+
+    def test_prometheus_rendering(self):
+        """Test: counters by status/type, errors, per-type quantiles and gauges"""
+        metrics = BatchMetrics(total_files=10, queue_depth=lambda: 3)
+        for result in self.results:
+            metrics.file_started()
+            metrics.record(result)
+        lines = metrics.render().splitlines()
+
+        self.assertIn('scl_batch_files_total{status="SUCCESS",file_type="fb"} 2', lines)
+        self.assertIn('scl_batch_errors_total{error_type="NO_OUTPUT"} 1', lines)
+        self.assertIn('scl_batch_file_duration_seconds{file_type="fb",quantile="0.5"} 0.200000', lines)
+        self.assertIn('scl_batch_file_duration_seconds{file_type="fb",quantile="0.95"} 0.300000', lines)
+        self.assertIn('scl_batch_file_duration_seconds_count{file_type="fb"} 3', lines)
+        self.assertIn('scl_batch_files_done 4', lines)
+        self.assertIn('scl_batch_files_in_progress 0', lines)
+        self.assertIn('scl_batch_write_queue_depth 3', lines)
+        self.assertIn('# TYPE scl_batch_files_per_second gauge', lines)
+
+    def test_write_error_counted_separately(self):
+        """Test: a failed background write has its own counter, files_total never goes down"""
+        metrics = BatchMetrics(total_files=1)
+        result = self.results[0]
+        metrics.record(result)
+        result.status, result.error_type = 'IO_ERROR', 'WRITE_ERROR'
+        metrics.record_write_error('SUCCESS', result)
+        lines = metrics.render().splitlines()
+
+        self.assertIn('scl_batch_files_total{status="SUCCESS",file_type="fb"} 1', lines)
+        self.assertFalse(any(line.startswith('scl_batch_files_total{status="IO_ERROR"') for line in lines))
+        self.assertIn('scl_batch_write_failures_total{status="SUCCESS",file_type="fb"} 1', lines)
+        self.assertIn('scl_batch_errors_total{error_type="WRITE_ERROR"} 1', lines)
+
+    def test_event_stream_and_endpoint(self):
+        """Test: JSON-lines events of a run and /metrics served during it"""
+        events_path = self.root / 'events.jsonl'
+        telemetry = BatchTelemetry(len(self.results), str(events_path), metrics_port=0)
+        try:
+            telemetry.run_started(Path('PLC'), Path('PLC_Parsed'))
+            for i, result in enumerate(self.results, 1):
+                telemetry.file_started(i, result.relative_path)
+                telemetry.file_finished(i, result)
+
+            url = f"http://127.0.0.1:{telemetry.server.port}"
+            opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+            with opener.open(f"{url}/metrics") as response:
+                self.assertIn('text/plain', response.headers['Content-Type'])
+                self.assertIn('scl_batch_files_done 4', response.read().decode('utf-8'))
+            with self.assertRaises(urllib.error.HTTPError):
+                opener.open(f"{url}/other")
+
+            telemetry.run_finished(BatchSummary(total_files=4, files_succeeded=2), 1.5)
+        finally:
+            telemetry.close()
+
+        events = [json.loads(line) for line in events_path.read_text(encoding='utf-8').splitlines()]
+        self.assertEqual([e['event'] for e in events],
+                         ['run_started'] + ['file_started', 'file_finished'] * 4 + ['run_finished'])
+        finished = events[2]
+        self.assertEqual(finished['path'], 'Program blocks/A_FB.xml')
+        self.assertEqual(finished['status'], 'SUCCESS')
+        self.assertEqual(finished['stages'], {'identify': 0.001, 'convert': 0.1})
+        self.assertEqual(events[-1]['succeeded'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Test FB/FC block sidecar (<name>.block.json)
+Tests that the sidecar describes the interface exactly as declared in the
+generated SCL and is tied to the generated code by its hash.
+"""
+
+import hashlib
+import json
+import unittest
+from fbfc_generator import FBFCGenerator
+from fbfc_parser import FBFCParser
+from block_sidecar import build_block_sidecar, sidecar_path, write_block_sidecar
+from main import process_file
+from block_fixtures import TempDirTestCase
+
+
+INTERFACE_SECTIONS = '''          <Section Name="Input">
+            <Member Name="Enable" Datatype="Bool" />
+            <Member Name="Config" Datatype="&quot;udt_Config&quot;" />
+            <Member Name="Cmd" Datatype="Struct">
+              <Member Name="Start" Datatype="Bool" />
+              <Member Name="Inner" Datatype="Struct">
+                <Member Name="Speed" Datatype="Real" />
+              </Member>
+              <Member Name="Stop" Datatype="Bool" />
+            </Member>
+          </Section>
+          <Section Name="Static">
+            <Member Name="Values" Datatype="Array[1..4] of Int" />
+          </Section>
+          <Section Name="Constant">
+            <Member Name="MAX_COUNT" Datatype="Int">
+              <StartValue>100</StartValue>
+            </Member>
+            <Member Name="NO_VALUE" Datatype="Int" />
+          </Section>'''
+
+
+class TestBlockSidecar(TempDirTestCase):
+    """Test sidecar content and writing"""
+
+    def setUp(self):
+        super().setUp()
+        self.xml_path = self.write_fb(self.root / 'SidecarFB.xml', 'SidecarFB', 12, INTERFACE_SECTIONS)
+
+    def _parse_and_generate(self):
+        data = FBFCParser(self.xml_path).parse()
+        return data, FBFCGenerator(data).generate()
+
+    def test_interface_matches_declarations(self):
+        """Test: member types are the declared SCL types, constants carry their values"""
+        data, scl_code = self._parse_and_generate()
+        sidecar = build_block_sidecar(data, scl_code)
+
+        self.assertEqual(sidecar['name'], 'SidecarFB')
+        self.assertEqual(sidecar['block_type'], 'FB')
+        self.assertEqual(list(sidecar['interface']), ['Input', 'Static', 'Constant'])
+
+        inputs = {m['name']: m for m in sidecar['interface']['Input']}
+        self.assertEqual(inputs['Enable'], {'name': 'Enable', 'type': 'Bool'})
+        self.assertEqual(inputs['Config']['type'], '"udt_Config"')
+        self.assertIn('Config : "udt_Config";', scl_code)
+
+        # Nested structs keep their hierarchy
+        cmd = inputs['Cmd']
+        self.assertEqual(cmd['type'], 'Struct')
+        self.assertEqual([m['name'] for m in cmd['members']], ['Start', 'Inner', 'Stop'])
+        self.assertEqual(cmd['members'][1]['members'][0], {'name': 'Speed', 'type': 'Real'})
+
+        values = sidecar['interface']['Static'][0]
+        self.assertEqual(values['type'], 'Array[1..4] of Int')
+        self.assertEqual(values['array_bounds'], '1..4')
+        self.assertIn('Values : Array[1..4] of Int;', scl_code)
+
+        constants = {m['name']: m['value'] for m in sidecar['interface']['Constant']}
+        self.assertEqual(constants, {'MAX_COUNT': '100', 'NO_VALUE': '0'})
+        self.assertIn('MAX_COUNT : Int := 100;', scl_code)
+
+    def test_hash_matches_generated_file(self):
+        """Test: scl_sha256 is the hash of the written .scl (BOM excluded)"""
+        data, _ = self._parse_and_generate()
+        scl_path = self.root / 'SidecarFB.scl'
+        scl_code = FBFCGenerator(data).generate(scl_path)
+        path = write_block_sidecar(data, scl_path, scl_code)
+
+        self.assertEqual(path, sidecar_path(scl_path))
+        self.assertEqual(path.name, 'SidecarFB.block.json')
+        sidecar = json.loads(path.read_text(encoding='utf-8'))
+        content = scl_path.read_text(encoding='utf-8-sig')
+        self.assertEqual(sidecar['scl_sha256'], hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    def test_process_file_writes_sidecar_on_request(self):
+        """Test: process_file writes the sidecar only with write_sidecar=True"""
+        plain_dir = self.root / 'plain'
+        sidecar_dir = self.root / 'sidecar'
+        plain_dir.mkdir()
+        sidecar_dir.mkdir()
+
+        process_file(self.xml_path, plain_dir)
+        process_file(self.xml_path, sidecar_dir, write_sidecar=True)
+
+        self.assertTrue((plain_dir / 'SidecarFB.scl').exists())
+        self.assertFalse((plain_dir / 'SidecarFB.block.json').exists())
+        self.assertTrue((sidecar_dir / 'SidecarFB.block.json').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
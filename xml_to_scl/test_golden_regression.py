@@ -0,0 +1,61 @@
+"""
+Test golden-corpus regression runner (golden_regression.py)
+Tests hash comparison against golden outputs, diff reporting and sharding.
+"""
+
+import unittest
+from golden_regression import discover_sources, run_regression, shard_of
+from block_fixtures import TempDirTestCase
+
+
+class TestGoldenRegression(TempDirTestCase):
+    """Test golden comparison and shard selection"""
+
+    def setUp(self):
+        super().setUp()
+        self.source = self.root / 'PLC'
+        self.golden = self.root / 'PLC_Parsed_Final'
+        self.write_fb(self.source / 'Program blocks' / 'GoldenFB.xml', 'GoldenFB', 7)
+        (self.source / 'Program blocks' / 'Copied.scl').write_text('FUNCTION "Copied" : Void\nEND_FUNCTION\n',
+                                                                 encoding='utf-8')
+
+    def _statuses(self, results):
+        return {r.relative_path: r.status for r in results}
+
+    def test_new_then_match(self):
+        """Test: outputs without golden file are 'new', after --update-golden they match"""
+        results = run_regression(self.source, self.golden, max_workers=1, update_golden=True)
+        self.assertEqual(set(self._statuses(results).values()), {'new'})
+        self.assertTrue((self.golden / 'Program blocks' / 'GoldenFB.scl').exists())
+
+        results = run_regression(self.source, self.golden, max_workers=1)
+        self.assertEqual(self._statuses(results), {
+            'Program blocks/Copied.scl': 'match',
+            'Program blocks/GoldenFB.xml': 'match',
+        })
+
+    def test_mismatch_has_diff(self):
+        """Test: a changed golden file is reported with a unified diff"""
+        run_regression(self.source, self.golden, max_workers=1, update_golden=True)
+        golden_file = self.golden / 'Program blocks' / 'GoldenFB.scl'
+        golden_file.write_text(golden_file.read_text(encoding='utf-8-sig').replace('Enable : Bool', 'Enable : Int'),
+                               encoding='utf-8-sig')
+
+        results = run_regression(self.source, self.golden, max_workers=1)
+        result = next(r for r in results if r.relative_path.endswith('GoldenFB.xml'))
+        self.assertEqual(result.status, 'mismatch')
+        diff = result.outputs[0].diff
+        self.assertIn('-      Enable : Int;', diff)
+        self.assertIn('+      Enable : Bool;', diff)
+
+    def test_shards_partition_corpus(self):
+        """Test: shards are disjoint, cover the corpus and are stable per path"""
+        all_sources = discover_sources(self.source)
+        shards = [discover_sources(self.source, i, 3) for i in range(3)]
+        self.assertEqual(sorted(p for shard in shards for p in shard), all_sources)
+        for i, shard in enumerate(shards):
+            self.assertTrue(all(shard_of(p, 3) == i for p in shard))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Unit Tests for the compact LAD network graph
+
+Tests verify that:
+1. Parsed networks convert back to the previous dict format
+2. Input/output adjacency keeps wire order and last-wire-wins semantics
+3. Expression trees built on the graph match the wire-list builder
+4. Dict assignment on LADLogicParser (tests, debug scripts) still works
+"""
+
+import unittest
+import xml.etree.ElementTree as ET
+from lad_graph import LadGraph
+from lad_parser import LADLogicParser
+from expression_builder import (
+    LadAccess, build_expression_tree, build_graph_expression_tree,
+    GraphAccesses, expression_to_scl
+)
+
+NETWORK = """
+<CompileUnit>
+    <NetworkSource>
+        <FlgNet xmlns="http://www.siemens.com/automation/Openness/SW/NetworkSource/FlgNet/v5">
+            <Parts>
+                <Access Scope="LocalVariable" UId="1"><Symbol><Component Name="a" /></Symbol></Access>
+                <Access Scope="GlobalVariable" UId="2"><Symbol><Component Name="Db" /><Component Name="b" /></Symbol></Access>
+                <Access Scope="LocalVariable" UId="3"><Symbol><Component Name="q1" /></Symbol></Access>
+                <Access Scope="LocalVariable" UId="4"><Symbol><Component Name="q2" /></Symbol></Access>
+                <Part Name="Contact" UId="5" />
+                <Part Name="Contact" UId="6"><Negated Name="operand" /></Part>
+                <Part Name="O" UId="7"><TemplateValue Name="Card" Type="Cardinality">2</TemplateValue></Part>
+                <Part Name="Coil" UId="8" />
+                <Part Name="Coil" UId="9" />
+            </Parts>
+            <Wires>
+                <Wire UId="20"><Powerrail /><NameCon UId="5" Name="in" /><NameCon UId="6" Name="in" /></Wire>
+                <Wire UId="21"><IdentCon UId="1" /><NameCon UId="5" Name="operand" /></Wire>
+                <Wire UId="22"><IdentCon UId="2" /><NameCon UId="6" Name="operand" /></Wire>
+                <Wire UId="23"><NameCon UId="5" Name="out" /><NameCon UId="7" Name="in1" /></Wire>
+                <Wire UId="24"><NameCon UId="6" Name="out" /><NameCon UId="7" Name="in2" /></Wire>
+                <Wire UId="25"><NameCon UId="7" Name="out" /><NameCon UId="8" Name="in" /><NameCon UId="9" Name="in" /></Wire>
+                <Wire UId="26"><IdentCon UId="3" /><NameCon UId="8" Name="operand" /></Wire>
+                <Wire UId="27"><IdentCon UId="4" /><NameCon UId="9" Name="operand" /></Wire>
+            </Wires>
+        </FlgNet>
+    </NetworkSource>
+</CompileUnit>
+"""
+
+
+def _parse() -> LADLogicParser:
+    parser = LADLogicParser(ET.fromstring(NETWORK))
+    parser.parse()
+    return parser
+
+
+class TestLadGraph(unittest.TestCase):
+    """Test graph storage and dict conversion"""
+
+    def test_dict_format(self):
+        parts, connections, wires = _parse().graph.to_dicts()
+        self.assertEqual(list(parts), [str(uid) for uid in range(1, 10)])
+        self.assertEqual(parts['1']['name'], '#a')
+        self.assertEqual(connections[('5', 'in')], {'type': 'Powerrail', 'uid': None, 'name': None})
+        self.assertEqual(connections[('7', 'in2')], {'type': 'NameCon', 'uid': '6', 'name': 'out'})
+        # One wire entry per destination, multi-target wires included
+        self.assertEqual(len(wires), 10)
+        self.assertEqual(wires[-3]['dest_uid'], '9')
+        self.assertEqual(wires[-3]['source_uid'], '7')
+
+    def test_adjacency(self):
+        graph = _parse().graph
+        self.assertEqual([pin for pin, _ in graph.inputs('7')], ['in1', 'in2'])
+        self.assertEqual(list(graph.outputs('7')), [('8', 'in', 'out'), ('9', 'in', 'out')])
+        self.assertEqual(list(graph.outputs('1')), [('5', 'operand', None)])
+        self.assertEqual(list(graph.inputs('unknown')), [])
+        self.assertIsNone(graph.source('8', 'operand2'))
+
+    def test_last_wire_wins(self):
+        graph = LadGraph()
+        graph.connect('1', 'in', 'IdentCon', '2', None)
+        graph.connect('1', 'en', 'Powerrail', None, None)
+        graph.connect('1', 'in', 'IdentCon', '3', None)
+        self.assertEqual(graph.source('1', 'in')['uid'], '3')
+        # Replaced connection keeps its original position
+        self.assertEqual(list(graph.connections_dict()), [('1', 'in'), ('1', 'en')])
+        self.assertEqual(list(graph.outputs('2')), [])
+        self.assertEqual(len(graph.wires()), 3)
+
+    def test_from_dicts_roundtrip(self):
+        parts, connections, _ = _parse().graph.to_dicts()
+        graph = LadGraph.from_dicts(parts, connections)
+        self.assertEqual(graph.parts_dict(), parts)
+        self.assertEqual(graph.connections_dict(), connections)
+
+    def test_extra_source_keys_are_kept(self):
+        info = {'type': 'val', 'val': '16#84', 'uid': '50', 'pin': 'out'}
+        graph = LadGraph.from_dicts({}, {('10', 'area'): info})
+        self.assertIs(graph.source('10', 'area'), info)
+
+
+class TestGraphExpressionTree(unittest.TestCase):
+    """Test expression builder on the graph"""
+
+    def test_matches_wire_list_builder(self):
+        parts, connections, _ = _parse().graph.to_dicts()
+        graph = LadGraph.from_dicts(parts, connections)
+
+        # Previous expression_builder input format
+        wires = []
+        for (dest_uid, dest_pin), source in connections.items():
+            conn = [] if source['type'] == 'Powerrail' else [(source['uid'], source['name'], source['type'])]
+            wires.append({'connections': conn + [(dest_uid, dest_pin, 'NameCon')]})
+        expr_parts = {uid: {'type': p.get('part_type', ''), 'negated': p.get('negated', False)}
+                      for uid, p in parts.items() if p['type'] != 'Access'}
+        accesses = {uid: LadAccess(uid=uid, symbol=p['name'], scope=p['scope'])
+                    for uid, p in parts.items() if p['type'] == 'Access'}
+
+        for uid in parts:
+            expected = build_expression_tree(uid, wires, expr_parts, accesses)
+            actual = build_graph_expression_tree(uid, graph)
+            self.assertEqual(actual, expected, uid)
+            if expected:
+                self.assertEqual(expression_to_scl(actual, GraphAccesses(graph)),
+                                 expression_to_scl(expected, accesses))
+
+        self.assertEqual(expression_to_scl(build_graph_expression_tree('6', graph), GraphAccesses(graph)),
+                         'NOT "Db".b')
+
+    def test_operations(self):
+        parser = _parse()
+        expected = expression_to_scl(build_graph_expression_tree('7', parser.graph), GraphAccesses(parser.graph))
+        operations = parser._extract_operations()
+        self.assertEqual([(op['variable'], op['expression']) for op in operations],
+                         [('#q1', expected), ('#q2', expected)])
+
+
+class TestParserDictViews(unittest.TestCase):
+    """Test parts/connections assignment on LADLogicParser"""
+
+    def test_assign_connections_then_parts(self):
+        parser = LADLogicParser(ET.Element('root'))
+        parser.connections = {('20', 'en'): {'type': 'Powerrail', 'uid': None, 'name': None}}
+        parser.parts = {'20': {'part_type': 'Return'}}
+        self.assertEqual(list(parser.connections), [('20', 'en')])
+        self.assertEqual(parser._extract_operations(), [{'type': 'return', 'condition': 'TRUE'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Unit Tests for LAD operation classification
+
+Tests verify that:
+1. Parts are tagged with their operation kind while parsing
+2. Operations are extracted through the kind dispatch table
+3. Instructions without an output fall back to a generic call
+"""
+
+import unittest
+import xml.etree.ElementTree as ET
+from lad_parser import LADLogicParser, classify_operation, OPERATION_KINDS
+
+
+def _parse(parts: str, wires: str) -> LADLogicParser:
+    xml_str = f"""
+    <CompileUnit>
+        <NetworkSource>
+            <FlgNet xmlns="http://www.siemens.com/automation/Openness/SW/NetworkSource/FlgNet/v5">
+                <Parts>{parts}</Parts>
+                <Wires>{wires}</Wires>
+            </FlgNet>
+        </NetworkSource>
+    </CompileUnit>
+    """
+    parser = LADLogicParser(ET.fromstring(xml_str))
+    parser.parse()
+    return parser
+
+
+class TestOperationClassification(unittest.TestCase):
+    """Test part classification tables"""
+
+    def test_classify_known_types(self):
+        self.assertEqual(classify_operation({'part_type': 'Coil'}), 'coil')
+        self.assertEqual(classify_operation({'part_type': 'RCoil'}), 'set_coil')
+        self.assertEqual(classify_operation({'part_type': 'Rs'}), 'flip_flop')
+        self.assertEqual(classify_operation({'part_type': 'Add'}), 'instruction')
+        self.assertEqual(classify_operation({'part_type': 'EN_CINT'}), 'instruction')
+        self.assertEqual(classify_operation({'part_type': 'JmpN'}), 'jump_not')
+
+    def test_classify_calls_and_unknown(self):
+        self.assertEqual(classify_operation({'part_type': 'TON', 'instance_name': 'T1'}), 'call')
+        self.assertEqual(classify_operation({'part_type': 'Contact', 'block_name': 'FC1'}), 'call')
+        self.assertIsNone(classify_operation({'part_type': 'Contact'}))
+
+    def test_every_kind_has_handler(self):
+        kinds = set(OPERATION_KINDS.values()) | {'call'}
+        self.assertEqual(kinds, set(LADLogicParser._OPERATION_HANDLERS))
+
+
+class TestOperationExtraction(unittest.TestCase):
+    """Test operation extraction through the dispatch table"""
+
+    def test_parts_are_tagged(self):
+        parser = _parse("""
+            <Access Scope="LocalVariable" UId="1"><Symbol><Component Name="a" /></Symbol></Access>
+            <Access Scope="LocalVariable" UId="2"><Symbol><Component Name="q" /></Symbol></Access>
+            <Part Name="Contact" UId="3" />
+            <Part Name="Coil" UId="4" />
+        """, """
+            <Wire UId="10"><Powerrail /><NameCon UId="3" Name="in" /></Wire>
+            <Wire UId="11"><IdentCon UId="1" /><NameCon UId="3" Name="operand" /></Wire>
+            <Wire UId="12"><NameCon UId="3" Name="out" /><NameCon UId="4" Name="in" /></Wire>
+            <Wire UId="13"><IdentCon UId="2" /><NameCon UId="4" Name="operand" /></Wire>
+        """)
+        self.assertIsNone(parser.parts['3']['op_kind'])
+        self.assertEqual(parser.parts['4']['op_kind'], 'coil')
+        self.assertNotIn('op_kind', parser.parts['1'])
+
+        operations = parser._extract_operations()
+        self.assertEqual(len(operations), 1)
+        self.assertEqual(operations[0]['type'], 'assignment')
+        self.assertEqual(operations[0]['variable'], '#q')
+
+    def test_untagged_parts_are_classified(self):
+        """Parts assigned without _parse_parts are classified on the fly"""
+        parser = LADLogicParser(ET.fromstring('<CompileUnit />'))
+        parser.parts = {'1': {'type': 'Part', 'part_type': 'Return'}}
+        operations = parser._extract_operations()
+        self.assertEqual(operations, [{'type': 'return', 'condition': 'TRUE'}])
+
+    def test_instruction_without_output_falls_back_to_call(self):
+        parser = _parse("""
+            <Call UId="1">
+                <CallInfo Name="Add" BlockType="FC" />
+            </Call>
+        """, "")
+        self.assertEqual(parser.parts['1']['op_kind'], 'instruction')
+        operations = parser._extract_operations()
+        self.assertEqual(len(operations), 1)
+        self.assertEqual(operations[0]['type'], 'instruction_call')
+
+
+if __name__ == '__main__':
+    unittest.main()
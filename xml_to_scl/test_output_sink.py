@@ -0,0 +1,143 @@
+"""
+Test output sinks (directory, zip/tar archive, in-memory)
+Tests that every sink stores the same bytes process_file writes to disk.
+"""
+
+import tarfile
+import unittest
+import zipfile
+from pathlib import Path
+from output_sink import BackgroundWriter, DirectorySink, MemorySink, TarSink, ZipSink, archive_mode, open_sink
+from main import process_file
+from batch_convert_project import FileProcessor, apply_write_errors
+from block_fixtures import TempDirTestCase
+
+
+class TestOutputSink(TempDirTestCase):
+    """Test sink selection and content of each sink"""
+
+    def setUp(self):
+        super().setUp()
+        self.xml_path = self.write_fb(self.root / 'SinkFB.xml', 'SinkFB', 3)
+
+        # Reference: plain directory output
+        self.reference_dir = self.root / 'reference'
+        process_file(self.xml_path, self.reference_dir, write_sidecar=True)
+        self.reference = {p.name: p.read_bytes() for p in self.reference_dir.iterdir()}
+
+    def test_open_sink_by_extension(self):
+        """Test: archive type from the target name, directory otherwise"""
+        self.assertEqual(archive_mode('out.zip'), 'zip')
+        self.assertEqual(archive_mode('out.tar.gz'), 'w:gz')
+        self.assertEqual(archive_mode('out.tgz'), 'w:gz')
+        self.assertEqual(archive_mode('out.tar.xz'), 'w:xz')
+        self.assertIsNone(archive_mode('PLC_410D1_Parsed'))
+        with open_sink(self.root / 'out.zip') as sink:
+            self.assertIsInstance(sink, ZipSink)
+        with open_sink(self.root / 'out.tar') as sink:
+            self.assertIsInstance(sink, TarSink)
+        self.assertIsInstance(open_sink(self.root / 'out'), DirectorySink)
+
+    def test_process_file_returns_written_content(self):
+        """Test: process_file returns the files it wrote (main output first)"""
+        outputs = process_file(self.xml_path, self.root / 'again')
+        self.assertEqual([p.name for p in outputs], ['SinkFB.scl'])
+        self.assertEqual(outputs[self.root / 'again' / 'SinkFB.scl'], self.reference['SinkFB.scl'])
+        self.assertTrue(self.reference['SinkFB.scl'].startswith(b'\xef\xbb\xbf'))
+
+    def test_memory_sink(self):
+        """Test: in-memory sink holds relative paths and the on-disk bytes"""
+        sink = MemorySink()
+        process_file(self.xml_path, Path('Program blocks'), write_sidecar=True, sink=sink)
+        self.assertEqual(sink.files, {f"Program blocks/{name}": data for name, data in self.reference.items()})
+        self.assertEqual(sink.files_written, 2)
+
+    def test_archive_sinks(self):
+        """Test: zip and tar.gz entries equal the directory output"""
+        with ZipSink(self.root / 'out.zip') as sink:
+            process_file(self.xml_path, Path('Program blocks'), write_sidecar=True, sink=sink)
+        with zipfile.ZipFile(self.root / 'out.zip') as archive:
+            self.assertEqual({n: archive.read(n) for n in archive.namelist()},
+                             {f"Program blocks/{name}": data for name, data in self.reference.items()})
+
+        with TarSink(self.root / 'out.tar.gz') as sink:
+            process_file(self.xml_path, Path('Program blocks'), sink=sink)
+        with tarfile.open(self.root / 'out.tar.gz') as archive:
+            member = archive.getmember('Program blocks/SinkFB.scl')
+            self.assertEqual(archive.extractfile(member).read(), self.reference['SinkFB.scl'])
+
+    def test_output_path_includes_output_root(self):
+        """Test: batch results record the output file under the directory or archive written to"""
+        archive_path = self.root / 'out.zip'
+        with ZipSink(archive_path) as sink:
+            result = FileProcessor(sink=sink, output_root=archive_path).process_with_tracking(
+                self.xml_path, Path('Program blocks'), self.root)
+        self.assertEqual(result.status, 'SUCCESS')
+        self.assertEqual(result.output_path, archive_path / 'Program blocks' / 'SinkFB.scl')
+
+    def test_paths_stay_inside_sink(self):
+        """Test: absolute or parent-relative paths are rejected"""
+        sink = MemorySink()
+        with self.assertRaises(ValueError):
+            sink.write('../escape.scl', b'')
+        with self.assertRaises(ValueError):
+            sink.write('/abs.scl', b'')
+
+    def test_background_writer(self):
+        """Test: queued writes all reach the wrapped sink, with bounded pending data"""
+        target = MemorySink()
+        writer = BackgroundWriter(target, max_pending_bytes=64, batch_size=4)
+        expected = {f"dir{i % 3}/file{i}.scl": bytes([i]) * 40 for i in range(50)}
+        for name, data in expected.items():
+            writer.write(name, data)
+            self.assertLessEqual(writer.pending_bytes, 80)
+        writer.flush()
+        self.assertEqual(writer.pending_files, 0)
+        self.assertEqual(target.files, expected)
+
+        writer.close()
+        with self.assertRaises(ValueError):
+            writer.write('late.scl', b'x')
+
+    def test_background_writer_collects_errors(self):
+        """Test: a failing write is reported, the other files are still written"""
+        out_dir = self.root / 'out'
+        (out_dir / 'Blocked.scl').mkdir(parents=True)
+        with BackgroundWriter(DirectorySink(out_dir), batch_size=8) as writer:
+            writer.write('A.scl', b'a')
+            writer.write('Blocked.scl', b'b')
+            writer.write('C.scl', b'c')
+
+        self.assertEqual([path for path, _ in writer.errors], ['Blocked.scl'])
+        self.assertEqual((out_dir / 'A.scl').read_bytes(), b'a')
+        self.assertEqual((out_dir / 'C.scl').read_bytes(), b'c')
+
+    def test_write_errors_mark_file_results(self):
+        """Test: a file whose output failed in the background writer becomes an IO_ERROR"""
+        out_dir = self.root / 'out'
+        (out_dir / 'Program blocks' / 'SinkFB.scl').mkdir(parents=True)
+        with BackgroundWriter(DirectorySink(out_dir)) as writer:
+            result = FileProcessor(sink=writer).process_with_tracking(
+                self.xml_path, Path('Program blocks'), self.root)
+            self.assertEqual(result.status, 'SUCCESS')
+            writer.flush()
+            failed = apply_write_errors([result], writer.errors)
+
+        self.assertEqual(failed, [(result, 'SUCCESS')])
+        self.assertEqual(result.status, 'IO_ERROR')
+        self.assertEqual(result.error_type, 'WRITE_ERROR')
+        self.assertIn('Program blocks/SinkFB.scl', result.error_message)
+
+    def test_durable_directory_sink(self):
+        """Test: durable batches are renamed into place without leftover temporary files"""
+        out_dir = self.root / 'durable'
+        with BackgroundWriter(open_sink(out_dir, durable=True)) as writer:
+            process_file(self.xml_path, Path('Program blocks'), write_sidecar=True, sink=writer)
+            writer.write('Program blocks/SinkFB.scl', self.reference['SinkFB.scl'])
+
+        files = {p.name: p.read_bytes() for p in (out_dir / 'Program blocks').iterdir()}
+        self.assertEqual(files, self.reference)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Unit tests for the placeholder cleanup engine (clean_placeholders / fix_xml_placeholders)
+
+Tests verify that:
+1. The byte pre-filter only selects files containing ???
+2. Only MultiLanguageText/Text element text is rewritten, formatting is kept
+3. Dry-run produces a diff and leaves files untouched
+4. The process pool path gives the same results as the in-process path
+5. The single-pass compiled regex gives the same output as the sequential
+   PATTERNS passes (edge cases, seeded fuzz and the PLC_410D1 corpus)
+"""
+
+import re
+import random
+import unittest
+import tempfile
+from pathlib import Path
+
+from clean_placeholders import (
+    PlaceholderCleaner, PLACEHOLDER_RE, _replace_placeholder, replace_placeholders,
+    has_placeholders, clean_content, clean_file, clean_tree
+)
+from fix_xml_placeholders import fix_placeholders_in_file
+
+
+SAMPLE_XML = (
+    '\ufeff<?xml version="1.0" encoding="utf-8"?>\r\n'
+    '<Document>\r\n'
+    '  <MultiLanguageText Lang="it-IT">Passaggio 12 - ??? lato operatore</MultiLanguageText>\r\n'
+    '  <Text>Passaggio 3 (???) - apertura</Text>\r\n'
+    '  <Comment Name="???" />\r\n'
+    '</Document>\r\n'
+)
+
+
+class TestPlaceholderCleanup(unittest.TestCase):
+    """Test the cleanup engine on temporary XML files."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_path = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_file(self, name: str, content: str) -> Path:
+        path = self.temp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content.encode('utf-8'))
+        return path
+
+    def test_prefilter(self):
+        """Files without ??? (and empty files) are rejected by the byte scan."""
+        self.assertTrue(has_placeholders(self.create_file('a.xml', SAMPLE_XML)))
+        self.assertFalse(has_placeholders(self.create_file('b.xml', '<Document/>')))
+        self.assertFalse(has_placeholders(self.create_file('c.xml', '')))
+
+    def test_text_only_rewrite_preserves_formatting(self):
+        """Only text element content changes; BOM, CRLF and attributes are kept."""
+        path = self.create_file('a.xml', SAMPLE_XML)
+        found, replaced = PlaceholderCleaner().clean_xml_file(path)
+
+        self.assertEqual(found, 3)
+        self.assertEqual(replaced, 2)
+        expected = (SAMPLE_XML
+                    .replace('12 - ??? lato', '12 - [UNDEFINED] lato')
+                    .replace('3 (???)', '3 (UNKNOWN)'))
+        self.assertEqual(path.read_bytes(), expected.encode('utf-8'))
+
+    def test_whole_file_rewrite(self):
+        """fix_xml_placeholders rewrites every placeholder, attributes included."""
+        path = self.create_file('a.xml', SAMPLE_XML)
+        found, replaced = fix_placeholders_in_file(path)
+
+        self.assertEqual((found, replaced), (3, 3))
+        self.assertNotIn('???', path.read_text(encoding='utf-8'))
+        self.assertIn('Name="[PLACEHOLDER]"', path.read_text(encoding='utf-8'))
+
+    def test_dry_run_reports_diff(self):
+        """Dry-run returns a unified diff and does not touch the file."""
+        path = self.create_file('a.xml', SAMPLE_XML)
+        result = clean_file(path, dry_run=True)
+
+        self.assertEqual(result.replaced, 2)
+        self.assertIn('+  <Text>Passaggio 3 (UNKNOWN) - apertura</Text>', result.diff)
+        self.assertEqual(path.read_bytes(), SAMPLE_XML.encode('utf-8'))
+
+    def test_clean_tree_parallel_matches_serial(self):
+        """Pool and in-process runs clean the same files the same way."""
+        for i in range(4):
+            self.create_file(f'sub{i}/p{i}.xml', SAMPLE_XML)
+        self.create_file('clean.xml', '<Document/>')
+
+        total, serial = clean_tree(self.temp_path, dry_run=True, workers=1)
+        _, parallel = clean_tree(self.temp_path, dry_run=True, workers=2)
+
+        self.assertEqual(total, 5)
+        self.assertEqual(len(serial), 4)
+        self.assertEqual([(r.path, r.diff) for r in serial],
+                         [(r.path, r.diff) for r in parallel])
+
+    def test_clean_content_without_placeholders(self):
+        """Content without placeholders is returned unchanged."""
+        content = '<Text>ok</Text>'
+        self.assertEqual(clean_content(content), (content, 0))
+
+
+def clean_sequential(text: str) -> str:
+    """Reference implementation: one re.sub per PATTERNS entry, in order."""
+    for pattern, replacement in PlaceholderCleaner.PATTERNS:
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+CORPUS_DIR = Path(__file__).parent.parent / 'PLC_410D1'
+
+
+class TestPlaceholderRegexEquivalence(unittest.TestCase):
+    """Single-pass engine must match the sequential passes exactly."""
+
+    EDGE_CASES = [
+        'Passaggio 12 - ??? lato operatore',
+        'Passaggio 3 (???) - apertura',
+        '??? what it means?',
+        '???? what it means?',
+        '?????? what it means?',
+        '??????? what it means?',
+        'Passaggio 1 - ???? lato',
+        'Passaggio 1 -??? lato / Passaggio 2(???)',
+        'Passaggio 1 (??? what it means?)',
+        'x ??? what it means??? lato',
+        'Passaggio 1 - x ??? lato',
+        'Passaggio\t7\n-\n???\n lato',
+        '(???) lato ??? ?? ?',
+    ]
+
+    def assertEquivalent(self, text: str):
+        expected = clean_sequential(text)
+        self.assertEqual(replace_placeholders(text), expected, repr(text))
+        self.assertEqual(PLACEHOLDER_RE.sub(_replace_placeholder, text), expected, repr(text))
+
+    def test_edge_cases(self):
+        for text in self.EDGE_CASES:
+            self.assertEquivalent(text)
+
+    def test_seeded_fuzz(self):
+        rnd = random.Random(410)
+        tokens = ['?', '???', 'Passaggio', ' ', '1', '12', '-', '(', ')', 'lato', ' lato',
+                  'what it means?', ' what it means?', 'x', '\n', 'Passaggio 3 (', 'Passaggio 4 - ']
+        for _ in range(20000):
+            self.assertEquivalent(''.join(rnd.choice(tokens) for _ in range(rnd.randint(1, 12))))
+
+    @unittest.skipUnless(CORPUS_DIR.exists(), "PLC_410D1 corpus not available")
+    def test_corpus(self):
+        """Every XML/SCL file of PLC_410D1, as-is and with ??? injected after each quote."""
+        files = [p for p in CORPUS_DIR.rglob('*') if p.suffix in ('.xml', '.scl')]
+        self.assertTrue(files)
+        for path in files:
+            text = path.read_text(encoding='utf-8', errors='replace')
+            self.assertEquivalent(text)
+            if 'Passaggio' in text or '???' in text:
+                self.assertEquivalent(text.replace('"', '"??? '))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Test semantic SCL diff (scl_diff.py)
+Tests that formatting/comment changes are ignored and that only the changed
+declarations, networks and FB calls of a block are reported.
+"""
+
+import csv
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from scl_diff import diff_trees, file_units, summarize, write_csv_report, write_json_report
+
+
+OLD_FB = '''FUNCTION_BLOCK "Conveyor_FB"
+{ S7_Optimized_Access := 'TRUE' }
+VERSION : 0.1
+   VAR_INPUT
+      Enable : Bool;
+      Speed : Real;
+   END_VAR
+
+   VAR
+      Cmd : Struct
+         Start : Bool;
+         Stop : Bool;
+      END_STRUCT;
+      Motor : "Motor_FB";
+   END_VAR
+
+BEGIN
+   REGION "Network 1"
+      // Start motor
+      #Motor(Enable := #Enable,
+             Speed := #Speed);
+   END_REGION
+
+   REGION "Network 2"
+      #Cmd.Start := FALSE;
+   END_REGION
+END_FUNCTION_BLOCK
+'''
+
+
+class TestSclDiff(unittest.TestCase):
+    """Test unit extraction and tree comparison"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.old = self.root / 'old'
+        self.new = self.root / 'new'
+        self.old.mkdir()
+        self.new.mkdir()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, root, name, text):
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8-sig')
+
+    def _compare(self, new_text):
+        self._write(self.old, 'Blocks/Conveyor_FB.scl', OLD_FB)
+        self._write(self.new, 'Blocks/Conveyor_FB.scl', new_text)
+        results = diff_trees(self.old, self.new, max_workers=1)
+        self.assertEqual(len(results), 1)
+        return results[0]
+
+    def test_units(self):
+        """Test: header, declarations (nested struct kept whole), networks and calls"""
+        _, blocks = file_units(OLD_FB)
+        units = blocks['FUNCTION_BLOCK "Conveyor_FB"']
+
+        self.assertEqual(units[('declaration', 'VAR_INPUT.Enable')], 'Enable : Bool ;')
+        self.assertEqual(units[('declaration', 'VAR.Cmd')],
+                         'Cmd : Struct Start : Bool ; Stop : Bool ; END_STRUCT ;')
+        self.assertIn(('network', 'Network 1'), units)
+        self.assertIn(('network', 'Network 2'), units)
+        self.assertEqual(units[('fb_call', '#Motor')],
+                         '#Motor ( Enable := #Enable , Speed := #Speed ) ;')
+        self.assertIn('VERSION', units[('header', '')])
+
+    def test_calls_in_nested_regions(self):
+        """Test: calls right after a nested REGION line are found, titles are kept raw"""
+        text = OLD_FB.replace('''      #Cmd.Start := FALSE;''', '''      REGION Inner
+         #Motor(Enable := #Enable);
+      END_REGION
+      REGION Cambio dell'ordine
+         #Pump(Run := TRUE);
+      END_REGION''').replace('REGION "Network 2"', "REGION Agg.Contatori dell'ordine")
+        _, blocks = file_units(text)
+        units = blocks['FUNCTION_BLOCK "Conveyor_FB"']
+
+        self.assertIn(('network', "Agg.Contatori dell'ordine"), units)
+        self.assertEqual(units[('fb_call', '#Pump')], '#Pump ( Run := TRUE ) ;')
+        self.assertEqual(len([key for key in units if key[0] == 'fb_call']), 3)
+
+    def test_formatting_only(self):
+        """Test: comments and whitespace are not semantic changes"""
+        new_text = OLD_FB.replace('// Start motor', '// Start the motor').replace('      Speed : Real;', 'Speed:Real; (* set point *)')
+        result = self._compare(new_text)
+        self.assertEqual(result.status, 'formatting')
+        self.assertEqual(result.changes, [])
+
+    def test_changed_units_only(self):
+        """Test: only the changed declaration, network and call are reported"""
+        new_text = OLD_FB.replace('Speed := #Speed', 'Speed := 2.0 * #Speed').replace('Stop : Bool;', 'Stop : Int;')
+        result = self._compare(new_text)
+
+        self.assertEqual(result.status, 'changed')
+        changed = {(c.element, c.name, c.change) for c in result.changes}
+        self.assertEqual(changed, {
+            ('declaration', 'VAR.Cmd', 'changed'),
+            ('network', 'Network 1', 'changed'),
+            ('fb_call', '#Motor', 'changed'),
+        })
+
+    def test_added_removed(self):
+        """Test: added/removed networks and files"""
+        new_text = OLD_FB.replace('''   REGION "Network 2"
+      #Cmd.Start := FALSE;
+   END_REGION''', '''   REGION "Network 3"
+      #Cmd.Stop := TRUE;
+   END_REGION''')
+        result = self._compare(new_text)
+        changed = {(c.element, c.name, c.change) for c in result.changes}
+        self.assertEqual(changed, {('network', 'Network 2', 'removed'), ('network', 'Network 3', 'added')})
+
+        self._write(self.old, 'Removed.udt', 'TYPE "Removed"\nSTRUCT\n  A : Bool;\nEND_STRUCT;\nEND_TYPE\n')
+        self._write(self.new, 'Tags.csv', 'Name;Type\n')
+
+        results = diff_trees(self.old, self.new, max_workers=1)
+        self.assertEqual(summarize(results)['by_status'], {'added': 1, 'changed': 1, 'removed': 1})
+
+    def test_reports(self):
+        """Test: JSON report carries old/new text, CSV one row per change"""
+        result = self._compare(OLD_FB.replace('Enable : Bool;', 'Enable : Int;'))
+        json_path = self.root / 'diff.json'
+        csv_path = self.root / 'diff.csv'
+        write_json_report(json_path, self.old, self.new, [result])
+        write_csv_report(csv_path, [result])
+
+        report = json.loads(json_path.read_text(encoding='utf-8'))
+        change = report['files'][0]['changes'][0]
+        self.assertEqual((change['old'], change['new']), ('Enable : Bool ;', 'Enable : Int ;'))
+
+        with open(csv_path, encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['name'], 'VAR_INPUT.Enable')
+
+
+if __name__ == '__main__':
+    unittest.main()
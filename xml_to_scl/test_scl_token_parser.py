@@ -0,0 +1,67 @@
+"""
+Unit tests for SCLTokenParser (StructuredText -> SCL)
+
+Tests verify that:
+1. Token/Blank/NewLine runs are rendered in document order
+2. Comments, local and global variables, calls and constants render as before
+3. Deeply nested networks do not hit the recursion limit
+"""
+
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+
+from scl_token_parser import SCLTokenParser, find_descendant
+
+NS = 'http://www.siemens.com/automation/Openness/SW/NetworkSource/StructuredText/v3'
+
+
+def parse_scl(body: str) -> str:
+    root = ET.fromstring(f'<StructuredText xmlns="{NS}">{body}</StructuredText>')
+    return SCLTokenParser(root).parse()
+
+
+class TestSCLTokenParser(unittest.TestCase):
+    """Render StructuredText fragments to SCL."""
+
+    def test_token_runs(self):
+        body = ('<Token Text="IF" /><Blank /><Token Text="TRUE" /><Blank Num="2" />'
+                '<Token Text="THEN" /><NewLine Num="2" /><Token Text="END_IF" />'
+                '<Token Text=";" /><NewLine />')
+        self.assertEqual(parse_scl(body), 'IF TRUE  THEN\n\nEND_IF;\n')
+
+    def test_comments(self):
+        body = ('<LineComment><Text>line</Text></LineComment><NewLine />'
+                '<Comment><Text>block</Text></Comment><Token Text=";" />')
+        self.assertEqual(parse_scl(body), '//line\n(*block*);')
+
+    def test_local_and_global_variables(self):
+        body = ('<Access Scope="LocalVariable"><Symbol><Component Name="a" /><Token Text="." />'
+                '<Component Name="b" /></Symbol></Access>'
+                '<Blank /><Token Text=":=" /><Blank />'
+                '<Access Scope="GlobalVariable"><Symbol><Component Name="DB">'
+                '</Component><Component Name="Arr"><Access Scope="LiteralConstant"><Constant>'
+                '<ConstantValue>3</ConstantValue></Constant></Access></Component>'
+                '<Component Name="x" /></Symbol></Access><Token Text=";" />')
+        self.assertEqual(parse_scl(body), '#a.b := "DB".Arr[3].x;')
+
+    def test_fc_call_and_literal(self):
+        body = ('<Access Scope="Call"><CallInfo Name="MyFC" BlockType="FC">'
+                '<Token Text="(" /><Parameter Name="IN"><Blank /><Token Text=":=" /><Blank />'
+                '<Access Scope="LiteralConstant"><Constant><ConstantValue>16#FF</ConstantValue>'
+                '</Constant></Access></Parameter><Token Text=")" /></CallInfo></Access>')
+        self.assertEqual(parse_scl(body), '"MyFC"(IN := 16#FF)')
+
+    def test_deep_nesting_is_iterative(self):
+        depth = sys.getrecursionlimit() + 500
+        body = '<Symbol>' * depth + '<Token Text="x" />' + '</Symbol>' * depth
+        self.assertEqual(parse_scl(body), 'x')
+
+    def test_find_descendant_matches_elementpath(self):
+        root = ET.fromstring(f'<a xmlns="{NS}"><b><c Name="1" /></b><c Name="2" /></a>')
+        self.assertIs(find_descendant(root, 'c'), root.find('.//{*}c'))
+        self.assertIsNone(find_descendant(root, 'a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -261,20 +261,11 @@ class XMLParserBase(ABC):
         if version:
             member_data['version'] = version
         
-<<<<<<< HEAD
         # Get start value - try with and without namespace
         start_value_elem = member.find('StartValue')
         if start_value_elem is None:
             # Try with namespace
             start_value_elem = member.find('{' + NAMESPACES.get('sw', '') + '}StartValue')
-=======
-        # Get start value - try with and without namespace
-        start_value_elem = member.find('StartValue')
-        if start_value_elem is None:
-            # Try with namespace
-            start_value_elem = member.find('{' + NAMESPACES.get('sw', '') + '}StartValue')
-
->>>>>>> origin/claude/verify-xml-parser-cleanup-jmpca
         if start_value_elem is not None and start_value_elem.text:
             member_data['start_value'] = start_value_elem.text
         